@@ -25,6 +25,21 @@ from controllers.material_controller import material_bp, material_global_bp
 from controllers.reference_file_controller import reference_file_bp
 from controllers.settings_controller import settings_bp
 from controllers import project_bp, page_bp, template_bp, user_template_bp, export_bp, file_bp
+from services.task_manager import task_manager
+from services.concurrency import scheduler
+from services.adaptive_concurrency import adaptive_concurrency
+from services.http_sessions import http_sessions
+from services.response_cache import response_cache
+from services.image_result_cache import image_result_cache
+from services.reference_images import reference_images
+from services.remote_images import remote_images
+from services.reference_index import reference_index
+from services.context_cache import context_cache
+from services.image_editability.analysis_cache import editable_analysis_cache
+from services.image_editability.element_crops import element_crops
+from services.ai_providers.rate_limiter import rate_limiter
+from services.progress_hub import progress_hub
+from services.progress_writer import progress_writer
 
 
 # Enable SQLite WAL mode for all connections
@@ -114,6 +129,30 @@ def create_app():
         # Load settings from database and sync to app.config
         _load_settings_to_config(app)
 
+    # Process-wide concurrency budgets (text/image LLM, MinerU, Baidu, local CPU, downloads),
+    # provider rate limits and the shared HTTP connection pools sized from those budgets
+    scheduler.init_app(app)
+    adaptive_concurrency.init_app(app)
+    rate_limiter.init_app(app)
+    http_sessions.init_app(app)
+
+    # Push committed task progress to SSE / long-poll subscribers
+    progress_hub.init_app(app)
+    progress_writer.init_app(app)
+
+    # Content-addressed caches for text LLM responses (memory LRU + disk) and, opt-in, generated images
+    response_cache.init_app(app)
+    image_result_cache.init_app(app)
+    reference_images.init_app(app)
+    remote_images.init_app(app)
+    reference_index.init_app(app)
+    context_cache.init_app(app)
+    editable_analysis_cache.init_app(app)
+    element_crops.init_app(app)
+
+    # Start consuming the durable task queue (tasks left over from a previous run are resumed)
+    task_manager.init_app(app, start_dispatcher=app.config['TASK_QUEUE_EMBEDDED_WORKER'])
+
     # Health check endpoint
     @app.route('/health')
     def health_check():
@@ -77,6 +77,76 @@ class Config:
     MAX_DESCRIPTION_WORKERS = int(os.getenv('MAX_DESCRIPTION_WORKERS', '5'))
     MAX_IMAGE_WORKERS = int(os.getenv('MAX_IMAGE_WORKERS', '8'))
     
+    # 后台任务队列配置（任务持久化在数据库 tasks 表中）
+    TASK_WORKERS = int(os.getenv('TASK_WORKERS', '4'))  # 本进程同时执行的任务数
+    TASK_QUEUE_POLL_INTERVAL = float(os.getenv('TASK_QUEUE_POLL_INTERVAL', '2.0'))  # 队列轮询间隔（秒）
+    TASK_LEASE_SECONDS = int(os.getenv('TASK_LEASE_SECONDS', '60'))  # 任务租约时长，过期未心跳的任务会被重新派发
+    TASK_MAX_ATTEMPTS = int(os.getenv('TASK_MAX_ATTEMPTS', '3'))  # 单个任务最多执行次数
+    TASK_QUEUE_EMBEDDED_WORKER = os.getenv('TASK_QUEUE_EMBEDDED_WORKER', 'true').lower() == 'true'  # web 进程内是否消费队列
+    WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', '1'))  # 独立 worker（worker.py）的进程数
+    # 任务进度推送（SSE / 长轮询，见 services/progress_hub.py）
+    TASK_EVENTS_FALLBACK_INTERVAL = float(os.getenv('TASK_EVENTS_FALLBACK_INTERVAL', '5.0'))  # 无推送时回退查库的间隔（秒），任务在独立 worker 中执行时依赖它
+    TASK_EVENTS_KEEPALIVE = float(os.getenv('TASK_EVENTS_KEEPALIVE', '15.0'))  # SSE 心跳间隔（秒）
+    TASK_EVENTS_MAX_DURATION = float(os.getenv('TASK_EVENTS_MAX_DURATION', '300'))  # 单个 SSE 连接最长时间（秒），到期后客户端自动重连
+    PROGRESS_FLUSH_INTERVAL = float(os.getenv('PROGRESS_FLUSH_INTERVAL', '1.0'))  # 任务进度批量落库的间隔（秒），见 services/progress_writer.py
+    # 文本 LLM 响应缓存（见 services/response_cache.py），磁盘层位于 UPLOAD_FOLDER/cache/llm
+    LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+    LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', str(7 * 24 * 3600)))  # 缓存有效期（秒）
+    LLM_CACHE_MEMORY_ENTRIES = int(os.getenv('LLM_CACHE_MEMORY_ENTRIES', '256'))  # 内存 LRU 条目数
+    LLM_CACHE_DISK_MAX_MB = float(os.getenv('LLM_CACHE_DISK_MAX_MB', '100'))  # 磁盘缓存上限（MB），0 表示只用内存
+    # provider 端上下文缓存（见 services/context_cache.py），默认关闭：页面描述的共享前缀只注册一次
+    CONTEXT_CACHE_ENABLED = os.getenv('CONTEXT_CACHE_ENABLED', 'false').lower() == 'true'
+    CONTEXT_CACHE_TTL = int(os.getenv('CONTEXT_CACHE_TTL', '600'))  # provider 端缓存有效期（秒）
+    CONTEXT_CACHE_MIN_TOKENS = int(os.getenv('CONTEXT_CACHE_MIN_TOKENS', '2048'))  # 前缀短于该值（估算 token 数）时不注册
+    # 生图结果缓存（见 services/image_result_cache.py），默认关闭，位于 UPLOAD_FOLDER/cache/images
+    IMAGE_CACHE_ENABLED = os.getenv('IMAGE_CACHE_ENABLED', 'false').lower() == 'true'
+    IMAGE_CACHE_DISK_MAX_MB = float(os.getenv('IMAGE_CACHE_DISK_MAX_MB', '2048'))  # 磁盘上限（MB），超出后淘汰最久未使用的图片
+    # 可编辑 PPTX 导出的版面分析结果缓存（见 services/image_editability/analysis_cache.py），位于 UPLOAD_FOLDER/cache/editable
+    EDITABLE_CACHE_ENABLED = os.getenv('EDITABLE_CACHE_ENABLED', 'true').lower() == 'true'
+    EDITABLE_CACHE_MAX_MB = float(os.getenv('EDITABLE_CACHE_MAX_MB', '2048'))  # 磁盘上限（MB），超出后淘汰最久未使用的页面
+    ELEMENT_CROP_MEMORY_MB = float(os.getenv('ELEMENT_CROP_MEMORY_MB', '512'))  # 可编辑导出时内存中元素裁剪图的上限（MB），超出后写盘释放，见 services/image_editability/element_crops.py
+    MINERU_BATCH_MAX_PAGES = int(os.getenv('MINERU_BATCH_MAX_PAGES', '50'))  # 可编辑导出时整套幻灯片合成一份多页PDF提交MinerU的最大页数，0 表示逐页提交
+    REFERENCE_IMAGE_CACHE_MB = float(os.getenv('REFERENCE_IMAGE_CACHE_MB', '512'))  # 已解码 / 已编码参考图（模板等）的内存上限（MB），见 services/reference_images.py
+    REFERENCE_IMAGE_MAX_EDGE = int(os.getenv('REFERENCE_IMAGE_MAX_EDGE', '2048'))  # 发送给生图模型的参考图长边上限（像素），0 表示不缩小
+    REFERENCE_IMAGE_JPEG_QUALITY = int(os.getenv('REFERENCE_IMAGE_JPEG_QUALITY', '90'))  # 参考图 JPEG 编码质量
+    REFERENCE_URL_CACHE_MB = float(os.getenv('REFERENCE_URL_CACHE_MB', '512'))  # 下载的参考图 URL 磁盘缓存上限（MB），位于 UPLOAD_FOLDER/cache/urls
+    REFERENCE_URL_MAX_MB = float(os.getenv('REFERENCE_URL_MAX_MB', '20'))  # 单张参考图下载大小上限（MB）
+    # 页面描述 prompt 中参考文件内容的检索裁剪（见 services/reference_index.py）
+    REFERENCE_CONTEXT_TOKEN_BUDGET = int(os.getenv('REFERENCE_CONTEXT_TOKEN_BUDGET', '12000'))  # 每页参考文件内容的 token 预算，0 表示不裁剪
+    REFERENCE_CONTEXT_TOP_K = int(os.getenv('REFERENCE_CONTEXT_TOP_K', '12'))  # 每页最多保留的相关分块数
+    REFERENCE_CHUNK_CHARS = int(os.getenv('REFERENCE_CHUNK_CHARS', '1500'))  # 参考文件分块大小（字符）
+    
+    # 全局并发预算（按资源类别，见 services/concurrency.py）
+    # text/image LLM 未配置时使用 MAX_DESCRIPTION_WORKERS / MAX_IMAGE_WORKERS
+    CONCURRENCY_TEXT_LLM = int(os.getenv('CONCURRENCY_TEXT_LLM', '0')) or None
+    CONCURRENCY_IMAGE_LLM = int(os.getenv('CONCURRENCY_IMAGE_LLM', '0')) or None
+    CONCURRENCY_MINERU = int(os.getenv('CONCURRENCY_MINERU', '4'))
+    CONCURRENCY_BAIDU_OCR = int(os.getenv('CONCURRENCY_BAIDU_OCR', '4'))
+    CONCURRENCY_BAIDU_INPAINT = int(os.getenv('CONCURRENCY_BAIDU_INPAINT', '2'))
+    CONCURRENCY_LOCAL_CPU = int(os.getenv('CONCURRENCY_LOCAL_CPU', str(os.cpu_count() or 4)))
+    CONCURRENCY_NETWORK_IO = int(os.getenv('CONCURRENCY_NETWORK_IO', '8'))  # 参考图 URL 并发下载数
+    # requests 类 provider 的共享连接池（见 services/http_sessions.py），池大小跟随上面的并发预算
+    HTTP_CONNECT_RETRIES = int(os.getenv('HTTP_CONNECT_RETRIES', '3'))  # 建立连接失败时的重试次数
+    HTTP_RETRY_BACKOFF = float(os.getenv('HTTP_RETRY_BACKOFF', '0.5'))  # 重试退避系数（秒）
+    # text/image LLM 并发自适应（AIMD）：遇到限流时减半，延迟正常时逐步恢复到上面的预算
+    ADAPTIVE_CONCURRENCY_ENABLED = os.getenv('ADAPTIVE_CONCURRENCY_ENABLED', 'true').lower() == 'true'
+    ADAPTIVE_CONCURRENCY_MIN = int(os.getenv('ADAPTIVE_CONCURRENCY_MIN', '1'))  # 自适应下限
+    ADAPTIVE_CONCURRENCY_COOLDOWN = float(os.getenv('ADAPTIVE_CONCURRENCY_COOLDOWN', '10'))  # 两次减少之间的最短间隔（秒）
+    
+    # 外部服务限流（令牌桶，见 services/ai_providers/rate_limiter.py）
+    # memory: 进程内；sqlite: 多个进程（web + worker）通过共享文件使用同一份配额
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory').lower()
+    RATE_LIMIT_DB_PATH = os.getenv('RATE_LIMIT_DB_PATH', os.path.join(BASE_DIR, 'instance', 'rate_limits.db'))
+    RATE_LIMIT_PENALTY_SECONDS = float(os.getenv('RATE_LIMIT_PENALTY_SECONDS', '2.0'))  # 服务端返回限流错误后的退避时间
+    # 各 provider 限额，格式 "每秒请求数[:突发容量]"，0 表示不限速；未设置时使用默认值
+    RATE_LIMIT_GENAI = os.getenv('RATE_LIMIT_GENAI')
+    RATE_LIMIT_OPENAI = os.getenv('RATE_LIMIT_OPENAI')
+    RATE_LIMIT_VOLCENGINE = os.getenv('RATE_LIMIT_VOLCENGINE')
+    RATE_LIMIT_BAIDU_INPAINT = os.getenv('RATE_LIMIT_BAIDU_INPAINT')
+    RATE_LIMIT_BAIDU_OCR = os.getenv('RATE_LIMIT_BAIDU_OCR')
+    RATE_LIMIT_BAIDU_TABLE_OCR = os.getenv('RATE_LIMIT_BAIDU_TABLE_OCR')
+    RATE_LIMIT_MINERU = os.getenv('RATE_LIMIT_MINERU')
+    
     # 图片生成配置
     DEFAULT_ASPECT_RATIO = "16:9"
     DEFAULT_RESOLUTION = "2K"
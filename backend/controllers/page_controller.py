@@ -250,7 +250,8 @@ def generate_page_description(project_id, page_id):
             outline,
             page_data,
             page.order_index + 1,
-            language=language
+            language=language,
+            use_cache=not force_regenerate
         )
         
         # Save description
@@ -280,7 +281,7 @@ def generate_page_image(project_id, page_id):
     Request body:
     {
         "use_template": true,
-        "force_regenerate": false
+        "force_regenerate": false  # overwrite an existing image; also skips the image result cache
     }
     """
     try:
@@ -434,7 +435,8 @@ def generate_page_image(project_id, page_id):
             current_app.config['DEFAULT_RESOLUTION'],
             app,
             combined_requirements if combined_requirements.strip() else None,
-            language
+            language,
+            use_cache=not force_regenerate
         )
         
         # Return task_id immediately
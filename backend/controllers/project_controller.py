@@ -2,11 +2,12 @@
 Project Controller - handles project-related endpoints
 """
 import json
+import time
 import logging
 import traceback
 from datetime import datetime
 
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from sqlalchemy import desc
 from sqlalchemy.orm import joinedload
 from werkzeug.exceptions import BadRequest
@@ -17,8 +18,12 @@ from services.ai_service_manager import get_ai_service
 from services.task_manager import (
     task_manager,
     generate_descriptions_task,
-    generate_images_task
+    generate_images_task,
+    generate_descriptions_and_images_task
 )
+from services.task_queue import TERMINAL_STATUSES
+from services.progress_hub import progress_hub
+from services.progress_writer import progress_writer
 from utils import (
     success_response, error_response, not_found, bad_request,
     parse_page_ids_from_body, get_filtered_pages
@@ -349,7 +354,8 @@ def generate_outline(project_id):
     Request body (optional):
     {
         "idea_prompt": "...",  # for idea type
-        "language": "zh"  # output language: zh, en, ja, auto
+        "language": "zh",  # output language: zh, en, ja, auto
+        "force_regenerate": false  # skip the LLM response cache (default: true when the project already has pages)
     }
     """
     try:
@@ -364,6 +370,8 @@ def generate_outline(project_id):
         # Get request data and language parameter
         data = request.get_json() or {}
         language = data.get('language', current_app.config.get('OUTPUT_LANGUAGE', 'zh'))
+        # 已有大纲时再次生成是用户主动要求重新生成，不读取响应缓存
+        use_cache = not data.get('force_regenerate', bool(project.pages))
         
         # Get reference files content and create project context
         reference_files_content = _get_project_reference_files_content(project_id)
@@ -382,7 +390,7 @@ def generate_outline(project_id):
             
             # Create project context and parse outline text into structured format
             project_context = ProjectContext(project, reference_files_content)
-            outline = ai_service.parse_outline_text(project_context, language=language)
+            outline = ai_service.parse_outline_text(project_context, language=language, use_cache=use_cache)
         elif project.creation_type == 'descriptions':
             # 从描述生成：这个类型应该使用专门的端点
             return bad_request("Use /generate/from-description endpoint for descriptions type")
@@ -397,7 +405,7 @@ def generate_outline(project_id):
             
             # Create project context and generate outline from idea
             project_context = ProjectContext(project, reference_files_content)
-            outline = ai_service.generate_outline(project_context, language=language)
+            outline = ai_service.generate_outline(project_context, language=language, use_cache=use_cache)
         
         # Flatten outline to pages
         pages_data = ai_service.flatten_outline(outline)
@@ -569,7 +577,11 @@ def generate_descriptions(project_id):
     Request body:
     {
         "max_workers": 5,
-        "language": "zh"  # output language: zh, en, ja, auto
+        "language": "zh",  # output language: zh, en, ja, auto
+        "render_images": false,  # optional: generate each page's image as soon as its description is ready
+        "use_template": true,  # only used with render_images
+        "force_regenerate": false  # skip the LLM response cache (default: true when pages already have descriptions);
+                                   # with render_images, an explicit true also skips the image result cache
     }
     """
     try:
@@ -597,11 +609,14 @@ def generate_descriptions(project_id):
         # 从配置中读取默认并发数，如果请求中提供了则使用请求的值
         max_workers = data.get('max_workers', current_app.config.get('MAX_DESCRIPTION_WORKERS', 5))
         language = data.get('language', current_app.config.get('OUTPUT_LANGUAGE', 'zh'))
+        render_images = bool(data.get('render_images', False))
+        has_descriptions = any(page.get_description_content() for page in pages)
+        use_cache = not data.get('force_regenerate', has_descriptions)
         
         # Create task
         task = Task(
             project_id=project_id,
-            task_type='GENERATE_DESCRIPTIONS',
+            task_type='GENERATE_DESCRIPTIONS_AND_IMAGES' if render_images else 'GENERATE_DESCRIPTIONS',
             status='PENDING'
         )
         task.set_progress({
@@ -623,18 +638,47 @@ def generate_descriptions(project_id):
         # Get app instance for background task
         app = current_app._get_current_object()
         
-        # Submit background task
-        task_manager.submit_task(
-            task.id,
-            generate_descriptions_task,
-            project_id,
-            ai_service,
-            project_context,
-            outline,
-            max_workers,
-            app,
-            language
-        )
+        if render_images:
+            # 流水线模式：每页描述完成后立即生成该页图片
+            from services import FileService
+            file_service = FileService(current_app.config['UPLOAD_FOLDER'])
+            
+            # 合并额外要求和风格描述（与 generate_images 一致）
+            combined_requirements = project.extra_requirements or ""
+            if project.template_style:
+                combined_requirements += f"\n\nppt页面风格描述：\n\n{project.template_style}"
+            
+            task_manager.submit_task(
+                task.id,
+                generate_descriptions_and_images_task,
+                project_id,
+                ai_service,
+                file_service,
+                project_context,
+                outline,
+                data.get('use_template', True),
+                current_app.config['DEFAULT_ASPECT_RATIO'],
+                current_app.config['DEFAULT_RESOLUTION'],
+                app,
+                combined_requirements if combined_requirements.strip() else None,
+                language,
+                use_cache=use_cache,
+                use_image_cache=not data.get('force_regenerate', False)
+            )
+        else:
+            # Submit background task
+            task_manager.submit_task(
+                task.id,
+                generate_descriptions_task,
+                project_id,
+                ai_service,
+                project_context,
+                outline,
+                max_workers,
+                app,
+                language,
+                use_cache=use_cache
+            )
         
         # Update project status
         project.status = 'GENERATING_DESCRIPTIONS'
@@ -662,7 +706,8 @@ def generate_images(project_id):
         "max_workers": 8,
         "use_template": true,
         "language": "zh",  # output language: zh, en, ja, auto
-        "page_ids": ["id1", "id2"]  # optional: specific page IDs to generate (if not provided, generates all)
+        "page_ids": ["id1", "id2"],  # optional: specific page IDs to generate (if not provided, generates all)
+        "force_regenerate": false  # optional: skip the image result cache (IMAGE_CACHE_ENABLED)
     }
     """
     try:
@@ -739,7 +784,8 @@ def generate_images(project_id):
             app,
             combined_requirements if combined_requirements.strip() else None,
             language,
-            selected_page_ids if selected_page_ids else None
+            selected_page_ids if selected_page_ids else None,
+            use_cache=not data.get('force_regenerate', False)
         )
         
         # Update project status
@@ -758,10 +804,58 @@ def generate_images(project_id):
         return error_response('SERVER_ERROR', str(e), 500)
 
 
+# 长轮询最多挂起的秒数
+MAX_TASK_WAIT_SECONDS = 60
+
+
+def _load_task_snapshot(task_id):
+    """
+    从数据库读取任务快照并立即归还连接
+
+    SSE / 长轮询会长时间占用请求线程，不能一直持有连接池中的连接。
+    """
+    try:
+        task = Task.query.get(task_id)
+        return progress_writer.apply_pending(task.to_dict()) if task else None
+    finally:
+        db.session.remove()
+
+
+def _wait_task_snapshot(task_id, since, timeout):
+    """
+    等待版本号大于 since 的任务快照
+
+    优先等待 hub 推送；每隔 TASK_EVENTS_FALLBACK_INTERVAL 秒没有推送时查一次库
+    （任务在其他进程执行时只能这样感知）。
+
+    Returns:
+        (version, snapshot)；超时或任务已删除时返回 None
+    """
+    fallback_interval = current_app.config.get('TASK_EVENTS_FALLBACK_INTERVAL', 5.0)
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        result = progress_hub.wait(task_id, since, min(remaining, fallback_interval))
+        if result:
+            return result
+        snapshot = _load_task_snapshot(task_id)
+        if snapshot is None:
+            return None
+        version, snapshot = progress_hub.sync(task_id, snapshot)
+        if version > since:
+            return version, snapshot
+
+
 @project_bp.route('/<project_id>/tasks/<task_id>', methods=['GET'])
 def get_task_status(project_id, task_id):
     """
     GET /api/projects/{project_id}/tasks/{task_id} - Get task status
+    
+    Query params (optional, long-poll):
+    - wait: 最多等待的秒数（上限 60），有比 since 更新的版本时立即返回
+    - since: 客户端已知的版本号（上次响应中的 version）
     """
     try:
         task = Task.query.get(task_id)
@@ -769,13 +863,121 @@ def get_task_status(project_id, task_id):
         if not task or task.project_id != project_id:
             return not_found('Task')
         
-        return success_response(task.to_dict())
+        version, snapshot = progress_hub.sync(task_id, progress_writer.apply_pending(task.to_dict()))
+        
+        wait = min(request.args.get('wait', default=0, type=float), MAX_TASK_WAIT_SECONDS)
+        since = request.args.get('since', default=0, type=int)
+        if wait > 0 and version <= since and snapshot['status'] not in TERMINAL_STATUSES:
+            db.session.remove()
+            result = _wait_task_snapshot(task_id, since, wait)
+            if result:
+                version, snapshot = result
+        
+        return success_response(dict(snapshot, version=version))
     
     except Exception as e:
         logger.error(f"get_task_status failed: {str(e)}", exc_info=True)
         return error_response('SERVER_ERROR', str(e), 500)
 
 
+@project_bp.route('/<project_id>/tasks/<task_id>/events', methods=['GET'])
+def stream_task_events(project_id, task_id):
+    """
+    GET /api/projects/{project_id}/tasks/{task_id}/events - Server-Sent Events stream
+    
+    连接建立后先推送一次当前状态，之后每次任务快照变化推送一条 `progress` 事件，
+    任务结束（COMPLETED / FAILED / CANCELLED）后关闭连接。连接超过
+    TASK_EVENTS_MAX_DURATION 秒会主动断开，EventSource 会自动重连。
+    """
+    task = Task.query.get(task_id)
+    if not task or task.project_id != project_id:
+        return not_found('Task')
+    
+    version, snapshot = progress_hub.sync(task_id, progress_writer.apply_pending(task.to_dict()))
+    db.session.remove()
+    
+    keepalive = current_app.config.get('TASK_EVENTS_KEEPALIVE', 15.0)
+    max_duration = current_app.config.get('TASK_EVENTS_MAX_DURATION', 300.0)
+    
+    def format_event(version, snapshot):
+        return f"id: {version}\nevent: progress\ndata: {json.dumps(dict(snapshot, version=version))}\n\n"
+    
+    def generate():
+        nonlocal version, snapshot
+        deadline = time.monotonic() + max_duration
+        yield format_event(version, snapshot)
+        while snapshot['status'] not in TERMINAL_STATUSES and time.monotonic() < deadline:
+            result = _wait_task_snapshot(task_id, version, min(keepalive, max(deadline - time.monotonic(), 0)))
+            if result is None:
+                # 注释行保持连接，防止代理因空闲断开
+                yield ": keepalive\n\n"
+                continue
+            version, snapshot = result
+            yield format_event(version, snapshot)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@project_bp.route('/<project_id>/tasks/<task_id>/cancel', methods=['POST'])
+def cancel_task(project_id, task_id):
+    """
+    POST /api/projects/{project_id}/tasks/{task_id}/cancel - Cancel a running or queued task
+
+    排队中的页面级工作直接丢弃，正在执行的工作在下一个阶段边界停止；
+    已经生成的页面保留。
+    """
+    try:
+        task = Task.query.get(task_id)
+
+        if not task or task.project_id != project_id:
+            return not_found('Task')
+
+        if not task_manager.cancel_task(task_id):
+            return bad_request(f"Task already finished with status {task.status}")
+
+        db.session.expire_all()
+        task = Task.query.get(task_id)
+        return success_response(task.to_dict())
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"cancel_task failed: {str(e)}", exc_info=True)
+        return error_response('SERVER_ERROR', str(e), 500)
+
+
+@project_bp.route('/<project_id>/tasks/<task_id>/retry', methods=['POST'])
+def retry_task(project_id, task_id):
+    """
+    POST /api/projects/{project_id}/tasks/{task_id}/retry - Retry a failed or cancelled task
+
+    批量任务只重新生成缺失、失败或输入已变化的页面，已完成的页面直接跳过。
+    已取消但仍在停止中（尚未释放租约）的任务返回 409，稍后再重试。
+    """
+    try:
+        task = Task.query.get(task_id)
+
+        if not task or task.project_id != project_id:
+            return not_found('Task')
+
+        if not task_manager.retry_task(task_id):
+            if task_manager.queue.is_leased(task_id):
+                return error_response('TASK_STILL_RUNNING', "Task is still stopping; retry after it has finished", 409)
+            return bad_request(f"Task with status {task.status} cannot be retried")
+
+        db.session.expire_all()
+        task = Task.query.get(task_id)
+        return success_response(task.to_dict())
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"retry_task failed: {str(e)}", exc_info=True)
+        return error_response('SERVER_ERROR', str(e), 500)
+
+
 @project_bp.route('/<project_id>/refine/outline', methods=['POST'])
 def refine_outline(project_id):
     """
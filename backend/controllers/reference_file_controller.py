@@ -16,6 +16,7 @@ import threading
 from models import db, ReferenceFile, Project
 from utils.response import success_response, error_response, bad_request, not_found
 from services.file_parser_service import FileParserService
+from services.reference_index import reference_index
 
 logger = logging.getLogger(__name__)
 
@@ -81,6 +82,12 @@ def _parse_file_async(file_id: str, file_path: str, filename: str, app):
             else:
                 reference_file.parse_status = 'completed'
                 reference_file.markdown_content = markdown_content
+                # 提前建好分块索引，页面描述生成时直接检索
+                if markdown_content:
+                    try:
+                        reference_index.build(markdown_content)
+                    except Exception as index_error:
+                        logger.warning(f"Failed to index reference file {filename}: {index_error}")
                 if failed_image_count > 0:
                     logger.warning(f"File parsing completed: {filename}, but {failed_image_count} images failed to generate captions")
                 else:
@@ -144,6 +144,77 @@ def update_settings():
         )
 
 
+@settings_bp.route("/concurrency", methods=["GET"], strict_slashes=False)
+def get_concurrency():
+    """
+    GET /api/settings/concurrency - Get runtime concurrency budgets
+
+    返回全局调度器各资源类别的当前上限/占用、自适应控制器的状态、合并的相同 provider 请求数，
+    以及各 host 的 HTTP 连接池状态
+    """
+    try:
+        from services.concurrency import scheduler
+        from services.adaptive_concurrency import adaptive_concurrency
+        from services.single_flight import text_flight, image_flight
+        from services.http_sessions import http_sessions
+        return success_response({
+            "budgets": scheduler.stats(),
+            "adaptive": adaptive_concurrency.stats(),
+            "single_flight": {
+                "text": text_flight.stats(),
+                "image": image_flight.stats(),
+            },
+            "http_pools": http_sessions.stats(),
+        })
+    except Exception as e:
+        logger.error(f"Error getting concurrency stats: {str(e)}")
+        return error_response(
+            "GET_CONCURRENCY_ERROR",
+            f"Failed to get concurrency stats: {str(e)}",
+            500,
+        )
+
+
+@settings_bp.route("/caches", methods=["GET"], strict_slashes=False)
+def get_caches():
+    """
+    GET /api/settings/caches - Get AI result cache stats
+
+    返回文本 LLM 响应缓存、生图结果缓存各层的命中次数、未命中 / 绕过 / 写入次数和容量占用，
+    参考图解码 / 编码缓存和参考图 URL 下载缓存的状态、参考文件分块索引的裁剪情况、
+    provider 端上下文缓存的注册 / 复用次数、可编辑导出版面分析缓存的命中情况、内存中的元素裁剪图，
+    以及 LLM JSON 修复省下的重新生成次数
+    """
+    try:
+        from services.response_cache import response_cache
+        from services.image_result_cache import image_result_cache
+        from services.reference_images import reference_images
+        from services.remote_images import remote_images
+        from services.llm_json import llm_json
+        from services.reference_index import reference_index
+        from services.context_cache import context_cache
+        from services.image_editability.analysis_cache import editable_analysis_cache
+        from services.image_editability.element_crops import element_crops
+        return success_response({
+            "text_llm": response_cache.stats(),
+            "image": image_result_cache.stats(),
+            "reference_images": reference_images.stats(),
+            "reference_urls": remote_images.stats(),
+            "reference_index": reference_index.stats(),
+            "context_cache": context_cache.stats(),
+            "editable_analysis": editable_analysis_cache.stats(),
+            "element_crops": element_crops.stats(),
+            "llm_json": llm_json.stats(),
+        })
+    except Exception as e:
+        logger.error(f"Error getting cache stats: {str(e)}")
+        return error_response(
+            "GET_CACHES_ERROR",
+            f"Failed to get cache stats: {str(e)}",
+            500,
+        )
+
+
 @settings_bp.route("/reset", methods=["POST"], strict_slashes=False)
 def reset_settings():
     """
@@ -268,6 +339,11 @@ def _sync_settings_to_config(settings: Settings):
     current_app.config["MAX_DESCRIPTION_WORKERS"] = settings.max_description_workers
     current_app.config["MAX_IMAGE_WORKERS"] = settings.max_image_workers
     logger.info(f"Updated worker settings: desc={settings.max_description_workers}, img={settings.max_image_workers}")
+    # 未单独配置预算时，worker 设置即为 text/image LLM 的全局并发预算
+    from services.concurrency import scheduler
+    from services.adaptive_concurrency import adaptive_concurrency
+    scheduler.init_app(current_app)
+    adaptive_concurrency.init_app(current_app)
 
     # Sync MinerU settings (optional, fall back to Config defaults if None)
     if settings.mineru_api_base:
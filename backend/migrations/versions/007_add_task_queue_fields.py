@@ -0,0 +1,66 @@
+"""add task queue fields to tasks
+
+Revision ID: 007_add_task_queue_fields
+Revises: 006_add_export_settings
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = '007_add_task_queue_fields'
+down_revision = '006_add_export_settings'
+branch_labels = None
+depends_on = None
+
+
+def _column_exists(table_name: str, column_name: str) -> bool:
+    """Check if column exists"""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    columns = [col['name'] for col in inspector.get_columns(table_name)]
+    return column_name in columns
+
+
+def _index_exists(table_name: str, index_name: str) -> bool:
+    """Check if index exists"""
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    return index_name in [idx['name'] for idx in inspector.get_indexes(table_name)]
+
+
+def upgrade() -> None:
+    """
+    Add durable queue fields to tasks table.
+    - payload: JSON encoded handler name and arguments
+    - attempts: number of times the task has been claimed by a worker
+    - lease_owner / lease_expires_at / heartbeat_at: worker lease bookkeeping
+    
+    Idempotent: checks if column exists before adding.
+    """
+    if not _column_exists('tasks', 'payload'):
+        op.add_column('tasks', sa.Column('payload', sa.Text(), nullable=True))
+    if not _column_exists('tasks', 'attempts'):
+        op.add_column('tasks', sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+    if not _column_exists('tasks', 'lease_owner'):
+        op.add_column('tasks', sa.Column('lease_owner', sa.String(length=128), nullable=True))
+    if not _column_exists('tasks', 'lease_expires_at'):
+        op.add_column('tasks', sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+    if not _column_exists('tasks', 'heartbeat_at'):
+        op.add_column('tasks', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+    
+    # 认领任务时按状态 + 租约过期时间扫描
+    if not _index_exists('tasks', 'ix_tasks_status_lease'):
+        op.create_index('ix_tasks_status_lease', 'tasks', ['status', 'lease_expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_status_lease', table_name='tasks')
+    op.drop_column('tasks', 'heartbeat_at')
+    op.drop_column('tasks', 'lease_expires_at')
+    op.drop_column('tasks', 'lease_owner')
+    op.drop_column('tasks', 'attempts')
+    op.drop_column('tasks', 'payload')
@@ -0,0 +1,48 @@
+"""add task checkpoints table
+
+Revision ID: 008_add_task_checkpoints
+Revises: 007_add_task_queue_fields
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision = '008_add_task_checkpoints'
+down_revision = '007_add_task_queue_fields'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Create task_checkpoints table: pages finished by a batch task and their input fingerprints,
+    so a re-dispatched or retried task only regenerates missing, failed or stale pages.
+    
+    Idempotent: skips if 'task_checkpoints' table already exists.
+    """
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if 'task_checkpoints' in inspector.get_table_names():
+        return
+    
+    op.create_table('task_checkpoints',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('task_id', sa.String(length=36), nullable=False),
+    sa.Column('page_id', sa.String(length=36), nullable=False),
+    sa.Column('stage', sa.String(length=20), nullable=False),
+    sa.Column('fingerprint', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('task_id', 'page_id', 'stage', name='uq_task_checkpoints_task_page_stage')
+    )
+    op.create_index('ix_task_checkpoints_task_id', 'task_checkpoints', ['task_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_task_checkpoints_task_id', table_name='task_checkpoints')
+    op.drop_table('task_checkpoints')
@@ -19,11 +19,12 @@ db = SQLAlchemy(
 from .project import Project
 from .page import Page
 from .task import Task
+from .task_checkpoint import TaskCheckpoint
 from .user_template import UserTemplate
 from .page_image_version import PageImageVersion
 from .material import Material
 from .reference_file import ReferenceFile
 from .settings import Settings
 
-__all__ = ['db', 'Project', 'Page', 'Task', 'UserTemplate', 'PageImageVersion', 'Material', 'ReferenceFile', 'Settings']
+__all__ = ['db', 'Project', 'Page', 'Task', 'TaskCheckpoint', 'UserTemplate', 'PageImageVersion', 'Material', 'ReferenceFile', 'Settings']
 
@@ -12,6 +12,9 @@ class Task(db.Model):
     Task model - tracks asynchronous generation tasks
     """
     __tablename__ = 'tasks'
+    __table_args__ = (
+        db.Index('ix_tasks_status_lease', 'status', 'lease_expires_at'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     project_id = db.Column(db.String(36), db.ForeignKey('projects.id'), nullable=False)
@@ -22,8 +25,17 @@ class Task(db.Model):
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime, nullable=True)
     
+    # 持久化任务队列字段（见 services/task_queue.py）
+    payload = db.Column(db.Text, nullable=True)  # JSON string: {"handler": "...", "args": [...], "kwargs": {...}}
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # 已被 worker 认领执行的次数
+    lease_owner = db.Column(db.String(128), nullable=True)  # 当前持有租约的 worker 标识
+    lease_expires_at = db.Column(db.DateTime, nullable=True)  # 租约过期时间，过期后任务会被重新派发
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # worker 最近一次心跳时间
+    
     # Relationships
     project = db.relationship('Project', back_populates='tasks')
+    checkpoints = db.relationship('TaskCheckpoint', back_populates='task', lazy='dynamic',
+                                  cascade='all, delete-orphan')
     
     def get_progress(self):
         """Parse progress from JSON string"""
@@ -41,13 +53,30 @@ class Task(db.Model):
         else:
             self.progress = None
     
-    def update_progress(self, completed=None, failed=None):
-        """Update progress incrementally"""
+    def get_payload(self):
+        """Parse queue payload from JSON string"""
+        if self.payload:
+            try:
+                return json.loads(self.payload)
+            except json.JSONDecodeError:
+                return None
+        return None
+    
+    def set_payload(self, data):
+        """Set queue payload as JSON string"""
+        if data:
+            self.payload = json.dumps(data, ensure_ascii=False)
+        else:
+            self.payload = None
+    
+    def update_progress(self, completed=None, failed=None, **extra):
+        """Update progress incrementally (extra keys are merged as-is)"""
         prog = self.get_progress()
         if completed is not None:
             prog['completed'] = completed
         if failed is not None:
             prog['failed'] = failed
+        prog.update(extra)
         self.set_progress(prog)
     
     def to_dict(self):
@@ -60,6 +89,7 @@ class Task(db.Model):
             'error_message': self.error_message,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'attempts': self.attempts or 0,
         }
     
     def __repr__(self):
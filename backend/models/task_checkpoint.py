@@ -0,0 +1,32 @@
+"""
+Task checkpoint model - records pages already finished by a batch task
+"""
+import uuid
+from datetime import datetime
+from . import db
+
+
+class TaskCheckpoint(db.Model):
+    """
+    Task checkpoint model - one row per (task, page, stage) finished by a batch task
+    
+    fingerprint 是该页生成输入（描述、大纲、生成参数等）的摘要。任务被重新派发或重试时，
+    指纹仍然一致且结果仍在的页面直接跳过，只重新生成缺失、失败或输入已变化的页面。
+    """
+    __tablename__ = 'task_checkpoints'
+    __table_args__ = (
+        db.UniqueConstraint('task_id', 'page_id', 'stage', name='uq_task_checkpoints_task_page_stage'),
+    )
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    task_id = db.Column(db.String(36), db.ForeignKey('tasks.id'), nullable=False, index=True)
+    page_id = db.Column(db.String(36), nullable=False)
+    stage = db.Column(db.String(20), nullable=False)  # description|image
+    fingerprint = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    # Relationships
+    task = db.relationship('Task', back_populates='checkpoints')
+    
+    def __repr__(self):
+        return f'<TaskCheckpoint {self.task_id}: page={self.page_id}, stage={self.stage}>'
@@ -0,0 +1,166 @@
+"""
+Adaptive Concurrency - 根据 provider 反馈动态调整 text/image LLM 并发（AIMD）
+
+MAX_DESCRIPTION_WORKERS / MAX_IMAGE_WORKERS 是静态配置：设置过高会频繁触发 429 和
+tenacity 退避，设置过低又浪费 provider 吞吐。这里在每次 provider 调用时记录耗时和
+限流错误，运行时调整全局调度器（services/concurrency.py）中对应类别的并发上限：
+
+- 加性增长：延迟没有明显劣化时，每成功完成约 limit 次调用，上限 +1（不超过配置值）
+- 乘性减少：遇到限流错误时上限乘以 DECREASE_FACTOR（冷却期内只减少一次）
+
+配置值（MAX_*_WORKERS / CONCURRENCY_*）作为上限天花板，自适应只在 [min_limit, 天花板] 内调整。
+
+    with adaptive_concurrency.observe(ResourceClass.IMAGE_LLM):
+        response = client.models.generate_content(...)
+"""
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict
+
+from services.concurrency import scheduler, ResourceClass
+from services.ai_providers.rate_limiter import is_rate_limit_error
+
+logger = logging.getLogger(__name__)
+
+# 参与自适应调整的资源类别
+ADAPTIVE_RESOURCES = (ResourceClass.TEXT_LLM, ResourceClass.IMAGE_LLM)
+
+DECREASE_FACTOR = 0.5
+# 延迟 EWMA 超过基线的倍数时停止增长
+LATENCY_TOLERANCE = 2.0
+EWMA_ALPHA = 0.2
+
+
+class _AdaptiveState:
+    """单个资源类别的 AIMD 状态"""
+
+    def __init__(self, ceiling: int, min_limit: int):
+        self.ceiling = max(1, int(ceiling))
+        self.min_limit = max(1, min(int(min_limit), self.ceiling))
+        self.limit = self.ceiling
+        self.credit = 0.0
+        self.latency_ewma = None
+        self.baseline = None
+        self.successes = 0
+        self.throttles = 0
+        self.last_decrease = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'limit': self.limit,
+            'ceiling': self.ceiling,
+            'min_limit': self.min_limit,
+            'latency_ewma': round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            'latency_baseline': round(self.baseline, 3) if self.baseline is not None else None,
+            'successes': self.successes,
+            'throttles': self.throttles,
+        }
+
+
+class AdaptiveConcurrencyController:
+    """
+    AIMD 并发控制器
+
+    状态只在当前进程内生效；多进程部署时每个进程独立调整自己的预算。
+    """
+
+    def __init__(self, cooldown_seconds: float = 10.0, min_limit: int = 1):
+        self.enabled = True
+        self.cooldown_seconds = cooldown_seconds
+        self.min_limit = min_limit
+        self._states: Dict[str, _AdaptiveState] = {}
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        """读取配置；天花板取当前调度器预算（由 MAX_*_WORKERS / CONCURRENCY_* 决定）"""
+        self.enabled = bool(app.config.get('ADAPTIVE_CONCURRENCY_ENABLED', True))
+        self.cooldown_seconds = float(app.config.get('ADAPTIVE_CONCURRENCY_COOLDOWN', self.cooldown_seconds))
+        self.min_limit = int(app.config.get('ADAPTIVE_CONCURRENCY_MIN', self.min_limit))
+
+        with self._lock:
+            self._states = {
+                resource: _AdaptiveState(scheduler.get_limit(resource), self.min_limit)
+                for resource in ADAPTIVE_RESOURCES
+            }
+        logger.info(f"Adaptive concurrency {'enabled' if self.enabled else 'disabled'}: "
+                    f"{ {r: s.ceiling for r, s in self._states.items()} }")
+
+    def _state(self, resource: str) -> _AdaptiveState:
+        state = self._states.get(resource)
+        if state is None:
+            with self._lock:
+                state = self._states.setdefault(
+                    resource, _AdaptiveState(scheduler.get_limit(resource), self.min_limit)
+                )
+        return state
+
+    def _apply(self, resource: str, state: _AdaptiveState, new_limit: int, reason: str):
+        if new_limit == state.limit:
+            return
+        logger.info(f"Adaptive concurrency [{resource}]: {state.limit} -> {new_limit} ({reason})")
+        state.limit = new_limit
+        scheduler.set_limit(resource, new_limit)
+
+    def record_success(self, resource: str, latency: float):
+        """记录一次成功调用及其耗时"""
+        if not self.enabled or resource not in ADAPTIVE_RESOURCES:
+            return
+        with self._lock:
+            state = self._state(resource)
+            state.successes += 1
+            if state.latency_ewma is None:
+                state.latency_ewma = latency
+            else:
+                state.latency_ewma = EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * state.latency_ewma
+            # 基线取观测到的最小延迟（缓慢上浮，避免一次异常快的调用永久压低基线）
+            state.baseline = latency if state.baseline is None else min(latency, state.baseline * 1.01)
+
+            if state.limit >= state.ceiling:
+                return
+            if state.latency_ewma > state.baseline * LATENCY_TOLERANCE:
+                return
+            state.credit += 1.0 / state.limit
+            if state.credit >= 1.0:
+                state.credit = 0.0
+                self._apply(resource, state, state.limit + 1, 'additive increase')
+
+    def record_throttle(self, resource: str):
+        """记录一次限流错误"""
+        if not self.enabled or resource not in ADAPTIVE_RESOURCES:
+            return
+        with self._lock:
+            state = self._state(resource)
+            state.throttles += 1
+            now = time.monotonic()
+            if state.last_decrease is not None and now - state.last_decrease < self.cooldown_seconds:
+                return
+            state.last_decrease = now
+            state.credit = 0.0
+            new_limit = max(state.min_limit, int(state.limit * DECREASE_FACTOR))
+            self._apply(resource, state, new_limit, 'throttled by provider')
+
+    @contextmanager
+    def observe(self, resource: str):
+        """记录一次 provider 调用的耗时与限流错误（其他异常不参与调整）"""
+        start = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self.record_throttle(resource)
+            raise
+        self.record_success(resource, time.monotonic() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        """当前自适应状态"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'resources': {resource: state.to_dict() for resource, state in self._states.items()},
+            }
+
+
+# Global adaptive concurrency controller
+adaptive_concurrency = AdaptiveConcurrencyController()
@@ -12,18 +12,12 @@ from typing import Dict, List, Any, Optional, Tuple
 from PIL import Image
 import io
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-import time
-import threading
-import os
+from ..rate_limiter import rate_limiter
+from services.concurrency import ResourceClass
+from services.http_sessions import http_sessions
 
 logger = logging.getLogger(__name__)
 
-# Simple in-process rate limiter to avoid QPS limit exceeded errors
-# Use environment variable BAIDU_API_MIN_INTERVAL to configure minimal interval between requests (seconds)
-_BAIDU_MIN_INTERVAL = float(os.getenv('BAIDU_API_MIN_INTERVAL', '1.0'))
-_baidu_lock = threading.Lock()
-_baidu_last_request_time = 0.0
-
 
 class BaiduInpaintingProvider:
     """
@@ -152,19 +146,11 @@ class BaiduInpaintingProvider:
                 'rectangle': valid_rectangles
             }
             
-            # Throttle requests within this process to reduce QPS errors
-            global _baidu_last_request_time
-            with _baidu_lock:
-                now = time.time()
-                wait = _BAIDU_MIN_INTERVAL - (now - _baidu_last_request_time)
-                if wait > 0:
-                    logger.debug(f"Baidu inpaint throttling: sleeping {wait:.2f}s to respect min interval")
-                    time.sleep(wait)
-                # mark the time just before sending request
-                _baidu_last_request_time = time.time()
+            # 令牌桶限流（按 API Key 共享配额，可跨进程，见 RATE_LIMIT_BAIDU_INPAINT）
+            rate_limiter.acquire('baidu_inpaint', self.api_key)
 
             logger.info("🌐 发送请求到百度图像修复API...")
-            response = requests.post(
+            response = http_sessions.get(ResourceClass.BAIDU_INPAINT).post(
                 url,
                 headers=headers,
                 json=request_body,
@@ -174,16 +160,13 @@ class BaiduInpaintingProvider:
             
             result = response.json()
             
-            # 检查错误 - 对 QPS 限流 (error_code == 18) 做短等待再重试
+            # 检查错误 - QPS 限流 (error_code == 18) 时让整个令牌桶退避，由 tenacity 重试
             if 'error_code' in result:
                 error_msg = result.get('error_msg', 'Unknown error')
                 error_code = result.get('error_code')
                 logger.error(f"❌ 百度API错误: [{error_code}] {error_msg}")
                 if int(error_code) == 18:
-                    # QPS limit reached - wait longer before retrying
-                    retry_sleep = 5
-                    logger.warning(f"Baidu QPS limit reached, sleeping {retry_sleep}s before retrying")
-                    time.sleep(retry_sleep)
+                    rate_limiter.penalize('baidu_inpaint', self.api_key)
                 raise Exception(f"Baidu API error [{error_code}]: {error_msg}")
             
             # 解析结果
@@ -12,6 +12,10 @@ from google import genai
 from google.genai import types
 from PIL import Image
 from tenacity import retry, stop_after_attempt, wait_exponential
+from services.concurrency import ResourceClass
+from services.adaptive_concurrency import adaptive_concurrency
+from services.reference_images import reference_images
+from ..rate_limiter import rate_limiter
 from .base import ImageProvider
 from config import get_config
 
@@ -73,7 +77,23 @@ class GenAIImageProvider(ImageProvider):
             )
 
         self.model = model
+        # 限流按 API Key（Vertex AI 模式按项目）共享配额
+        self._rate_limit_key = project_id if vertexai else api_key
     
+    @staticmethod
+    def _to_part(image: Image.Image):
+        """
+        参考图 -> 请求内容
+
+        PNG / JPEG 文件直接发送原始字节，省去 SDK 的重新编码；其他情况交给 SDK 转换 PIL 对象。
+        """
+        path = reference_images.source_path(image)
+        mime_type = Image.MIME.get(image.format or '')
+        if path and mime_type in ('image/png', 'image/jpeg'):
+            with open(path, 'rb') as f:
+                return types.Part.from_bytes(data=f.read(), mime_type=mime_type)
+        return image
+
     @retry(
         stop=stop_after_attempt(get_config().GENAI_MAX_RETRIES + 1),
         wait=wait_exponential(multiplier=1, min=2, max=10)
@@ -106,7 +126,8 @@ class GenAIImageProvider(ImageProvider):
             # Add reference images first (if any)
             if ref_images:
                 for ref_img in ref_images:
-                    contents.append(ref_img)
+                    # 同一模板在所有页面线程间只序列化一次
+                    contents.append(reference_images.payload(ref_img, 'genai_part', self._to_part))
             
             # Add text prompt
             contents.append(prompt)
@@ -129,11 +150,12 @@ class GenAIImageProvider(ImageProvider):
                     include_thoughts=True
                 )
             
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=contents,
-                config=types.GenerateContentConfig(**config_params)
-            )
+            with rate_limiter.limit('genai', self._rate_limit_key), adaptive_concurrency.observe(ResourceClass.IMAGE_LLM):
+                response = self.client.models.generate_content(
+                    model=self.model,
+                    contents=contents,
+                    config=types.GenerateContentConfig(**config_params)
+                )
             
             logger.debug("GenAI API call completed")
             
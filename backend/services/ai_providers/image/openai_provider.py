@@ -4,11 +4,15 @@ OpenAI SDK implementation for image generation
 import logging
 import base64
 import re
-import requests
 from io import BytesIO
 from typing import Optional, List
 from openai import OpenAI
 from PIL import Image
+from services.concurrency import ResourceClass
+from services.adaptive_concurrency import adaptive_concurrency
+from services.reference_images import reference_images
+from services.http_sessions import http_sessions
+from ..rate_limiter import rate_limiter
 from .base import ImageProvider
 from config import get_config
 
@@ -34,6 +38,7 @@ class OpenAIImageProvider(ImageProvider):
             max_retries=get_config().OPENAI_MAX_RETRIES  # set max retries from config
         )
         self.model = model
+        self._rate_limit_key = api_key
     
     def _encode_image_to_base64(self, image: Image.Image) -> str:
         """
@@ -45,11 +50,17 @@ class OpenAIImageProvider(ImageProvider):
         Returns:
             Base64 encoded string
         """
+        # 本地 JPEG 参考图（含缩小后的版本）直接发送原始字节，不重新编码
+        path = reference_images.source_path(image)
+        if path and image.format == 'JPEG':
+            with open(path, 'rb') as f:
+                return base64.b64encode(f.read()).decode('utf-8')
+        
         buffered = BytesIO()
         # Convert to RGB if necessary (e.g., RGBA images)
         if image.mode in ('RGBA', 'LA', 'P'):
             image = image.convert('RGB')
-        image.save(buffered, format="JPEG", quality=95)
+        image.save(buffered, format="JPEG", quality=reference_images.jpeg_quality)
         return base64.b64encode(buffered.getvalue()).decode('utf-8')
     
     def generate_image(
@@ -80,7 +91,8 @@ class OpenAIImageProvider(ImageProvider):
             # Add reference images first (if any)
             if ref_images:
                 for ref_img in ref_images:
-                    base64_image = self._encode_image_to_base64(ref_img)
+                    # 同一模板在所有页面线程间只编码一次
+                    base64_image = reference_images.payload(ref_img, 'openai_jpeg_base64', self._encode_image_to_base64)
                     content.append({
                         "type": "image_url",
                         "image_url": {
@@ -95,14 +107,15 @@ class OpenAIImageProvider(ImageProvider):
             logger.debug(f"Config - aspect_ratio: {aspect_ratio} (resolution ignored, OpenAI format only supports 1K)")
             
             # Note: resolution is not supported in OpenAI format, only aspect_ratio via system message
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": f"aspect_ratio={aspect_ratio}"},
-                    {"role": "user", "content": content},
-                ],
-                modalities=["text", "image"]
-            )
+            with rate_limiter.limit('openai', self._rate_limit_key), adaptive_concurrency.observe(ResourceClass.IMAGE_LLM):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": f"aspect_ratio={aspect_ratio}"},
+                        {"role": "user", "content": content},
+                    ],
+                    modalities=["text", "image"]
+                )
             
             logger.debug("OpenAI API call completed")
             
@@ -171,7 +184,7 @@ class OpenAIImageProvider(ImageProvider):
                         image_url = markdown_matches[0]  # Use the first image URL found
                         logger.debug(f"Found Markdown image URL: {image_url}")
                         try:
-                            response = requests.get(image_url, timeout=30, stream=True)
+                            response = http_sessions.get(ResourceClass.NETWORK_IO).get(image_url, timeout=30)
                             response.raise_for_status()
                             image = Image.open(BytesIO(response.content))
                             image.load()  # Ensure image is fully loaded
@@ -187,7 +200,7 @@ class OpenAIImageProvider(ImageProvider):
                         image_url = url_matches[0]
                         logger.debug(f"Found plain image URL: {image_url}")
                         try:
-                            response = requests.get(image_url, timeout=30, stream=True)
+                            response = http_sessions.get(ResourceClass.NETWORK_IO).get(image_url, timeout=30)
                             response.raise_for_status()
                             image = Image.open(BytesIO(response.content))
                             image.load()
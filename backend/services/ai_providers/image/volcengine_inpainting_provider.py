@@ -11,6 +11,9 @@ from io import BytesIO
 from typing import Optional
 from PIL import Image
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from services.concurrency import ResourceClass
+from services.http_sessions import http_sessions
+from ..rate_limiter import rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -34,7 +37,28 @@ class VolcengineInpaintingProvider:
         self.access_key = access_key
         self.secret_key = secret_key
         self.timeout = timeout
+        self._service = None
         logger.info("火山引擎 Inpainting Provider 初始化（直接HTTP模式）")
+
+    def _get_service(self):
+        """
+        复用同一个 VisualService（及其 HTTP 会话）
+
+        以前每次修复都新建 SDK 实例，每次调用都重新握手。SDK 内部的 requests Session
+        挂载共享连接池适配器（keep-alive、连接失败重试，见 services/http_sessions.py）。
+        """
+        if self._service is None:
+            from volcengine.visual.VisualService import VisualService
+            service = VisualService()
+            service.set_ak(self.access_key)
+            service.set_sk(self.secret_key)
+            session = getattr(service, 'session', None)
+            if isinstance(session, requests.Session):
+                adapter = http_sessions.make_adapter(ResourceClass.BAIDU_INPAINT)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+            self._service = service
+        return self._service
         
     def _encode_image_to_base64(self, image: Image.Image, is_mask: bool = False) -> str:
         """
@@ -135,15 +159,13 @@ class VolcengineInpaintingProvider:
             logger.debug(f"请求体大小: {len(json.dumps(request_body))} bytes")
             
             # 6. 使用SDK（它会处理签名）
-            from volcengine.visual.VisualService import VisualService
-            service = VisualService()
-            service.set_ak(self.access_key)
-            service.set_sk(self.secret_key)
+            service = self._get_service()
             
             # 使用SDK的json_handler方法（这个方法会处理签名）
             logger.info("使用SDK发送请求（带正确签名）")
             
             try:
+                rate_limiter.acquire('volcengine', self.access_key)
                 # 使用SDK的通用API调用方法
                 response = service.json(
                     "CVProcess",
@@ -224,6 +246,9 @@ class VolcengineInpaintingProvider:
                 code = response.get("code") or response.get("status")
                 message = response.get("message", "未知错误")
                 logger.error(f"❌ API错误: code={code}, message={message}")
+                if code == 50429:
+                    # QPS 超限
+                    rate_limiter.penalize('volcengine', self.access_key)
                 return None
                 
         except Exception as e:
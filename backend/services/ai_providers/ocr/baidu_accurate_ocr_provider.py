@@ -12,6 +12,9 @@ from typing import Dict, List, Any, Optional, Literal
 from PIL import Image
 import io
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from ..rate_limiter import rate_limiter
+from services.concurrency import ResourceClass
+from services.http_sessions import http_sessions
 
 logger = logging.getLogger(__name__)
 
@@ -200,7 +203,8 @@ class BaiduAccurateOCRProvider:
             data = '&'.join([f"{k}={v}" for k, v in form_data.items()])
             
             logger.info("🌐 发送请求到百度高精度OCR API...")
-            response = requests.post(url, headers=headers, data=data, timeout=60)
+            rate_limiter.acquire('baidu_ocr', self.api_key)
+            response = http_sessions.get(ResourceClass.BAIDU_OCR).post(url, headers=headers, data=data, timeout=60)
             response.raise_for_status()
             
             result = response.json()
@@ -210,6 +214,8 @@ class BaiduAccurateOCRProvider:
                 error_msg = result.get('error_msg', 'Unknown error')
                 error_code = result.get('error_code')
                 logger.error(f"❌ 百度API错误: [{error_code}] {error_msg}")
+                if int(error_code) == 18:
+                    rate_limiter.penalize('baidu_ocr', self.api_key)
                 raise Exception(f"Baidu API error [{error_code}]: {error_msg}")
             
             # 解析结果
@@ -0,0 +1,313 @@
+"""
+Rate Limiter - 外部服务的令牌桶限流
+
+所有 provider 在发起请求前调用 `rate_limiter.acquire(provider, api_key)`，
+按 (provider, API Key) 维度共享一个令牌桶（速率 + 突发容量）：
+
+    from services.ai_providers.rate_limiter import rate_limiter
+
+    with rate_limiter.limit('genai', api_key):
+        response = client.models.generate_content(...)
+
+后端可选：
+- memory：进程内令牌桶（默认，单进程部署）
+- sqlite：令牌桶状态保存在共享的 SQLite 文件中，BEGIN IMMEDIATE 事务保证原子性，
+  web 进程和多个独立 worker 进程共享同一份配额
+
+服务端返回限流错误（百度 error_code 18、HTTP 429 等）时调用 penalize()，
+整个桶暂停一段时间，所有线程/进程一起退避，而不是每个线程各自 sleep。
+"""
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# 默认限额：provider -> (每秒请求数, 突发容量)；速率为 0 表示不限速（仍然支持 penalize 退避）
+DEFAULT_LIMITS: Dict[str, Tuple[float, float]] = {
+    'genai': (0, 0),
+    'openai': (0, 0),
+    'volcengine': (2, 2),
+    'baidu_inpaint': (1.0 / max(float(os.getenv('BAIDU_API_MIN_INTERVAL', '1.0')), 0.001), 1),
+    'baidu_ocr': (2, 2),
+    'baidu_table_ocr': (2, 2),
+    'mineru': (2, 4),
+}
+
+DEFAULT_PENALTY_SECONDS = 2.0
+
+
+def parse_limit(value) -> Optional[Tuple[float, float]]:
+    """
+    解析限额配置，格式为 "qps" 或 "qps:burst"（如 "2" / "0.5:1"）
+
+    Returns:
+        (rate, burst)，无法解析时返回 None
+    """
+    if value is None or value == '':
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            rate, burst = float(value), None
+        else:
+            parts = str(value).split(':', 1)
+            rate = float(parts[0])
+            burst = float(parts[1]) if len(parts) > 1 and parts[1] else None
+    except ValueError:
+        logger.warning(f"Invalid rate limit value: {value!r}")
+        return None
+    rate = max(rate, 0.0)
+    if burst is None:
+        burst = max(rate, 1.0) if rate > 0 else 0.0
+    return rate, (max(burst, 1.0) if rate > 0 else 0.0)
+
+
+# 没有状态码可用时（如 provider 把异常包装成字符串）只认明确的限流描述，
+# 不能仅凭消息中出现 "429"（尺寸、ID、token 数都可能含有这串数字）
+_RATE_LIMIT_PHRASE = r'(?:too many requests|resource_exhausted|rate[ _-]?limit)'
+_RATE_LIMIT_MESSAGE = re.compile(
+    rf'\b429\b[^\n]{{0,80}}?{_RATE_LIMIT_PHRASE}'
+    rf'|{_RATE_LIMIT_PHRASE}[^\n]{{0,80}}?\b429\b'
+    r'|rate[ _-]?limit(?:ed\b|[ _-](?:exceeded|reached))',
+    re.IGNORECASE
+)
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """判断异常是否为服务端限流（HTTP 429 / RESOURCE_EXHAUSTED / SDK 的 RateLimitError）"""
+    if any(cls.__name__ == 'RateLimitError' for cls in type(error).__mro__):
+        return True
+    if getattr(error, 'status', None) == 'RESOURCE_EXHAUSTED':
+        return True
+    status = getattr(error, 'status_code', None) or getattr(error, 'code', None)
+    response = getattr(error, 'response', None)
+    if status is None and response is not None:
+        status = getattr(response, 'status_code', None)
+    if isinstance(status, int) and not isinstance(status, bool):
+        return status == 429
+    return bool(_RATE_LIMIT_MESSAGE.search(str(error)))
+
+
+def _take(tokens: float, updated_at: float, blocked_until: float, now: float,
+          rate: float, burst: float, count: float) -> Tuple[float, float]:
+    """
+    令牌桶计算：补充令牌后预留 count 个令牌
+
+    预留后令牌数可以为负，调用方需要等待的时间 = 欠下的令牌 / 速率。
+    这样同一个桶上的多个等待者按到达顺序排队，不会在同一时刻一起醒来。
+
+    Returns:
+        (预留后的令牌数, 需要等待的秒数)
+    """
+    wait = max(0.0, blocked_until - now)
+    if rate <= 0:
+        return tokens, wait
+    tokens = min(burst, tokens + max(0.0, now - updated_at) * rate) - count
+    if tokens < 0:
+        wait = max(wait, -tokens / rate)
+    return tokens, wait
+
+
+class InProcessBackend:
+    """进程内令牌桶存储"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> [tokens, updated_at, blocked_until]
+        self._buckets: Dict[str, list] = {}
+
+    def reserve(self, key: str, rate: float, burst: float, count: float = 1) -> float:
+        with self._lock:
+            now = time.time()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [burst, now, 0.0]
+            tokens, wait = _take(bucket[0], bucket[1], bucket[2], now, rate, burst, count)
+            bucket[0], bucket[1] = tokens, now
+            return wait
+
+    def block(self, key: str, rate: float, seconds: float):
+        with self._lock:
+            now = time.time()
+            bucket = self._buckets.setdefault(key, [0.0, now, 0.0])
+            bucket[2] = max(bucket[2], now + seconds)
+            # 清空令牌，退避结束后按正常速率恢复，而不是一次性放出整个突发容量
+            bucket[0], bucket[1] = min(bucket[0], -rate * seconds), now
+
+
+class SQLiteBackend:
+    """
+    基于 SQLite 文件的令牌桶存储，多个进程共享同一配额
+
+    每次预留都在 BEGIN IMMEDIATE 事务中完成（读取 -> 计算 -> 写回），
+    SQLite 的写锁保证跨进程的原子性。
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rate_buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                'updated_at REAL NOT NULL, blocked_until REAL NOT NULL DEFAULT 0)'
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _load(self, conn, key: str, default_tokens: float, now: float) -> Tuple[float, float, float]:
+        row = conn.execute(
+            'SELECT tokens, updated_at, blocked_until FROM rate_buckets WHERE key = ?', (key,)
+        ).fetchone()
+        return row if row else (default_tokens, now, 0.0)
+
+    def _store(self, conn, key: str, tokens: float, updated_at: float, blocked_until: float):
+        conn.execute(
+            'INSERT OR REPLACE INTO rate_buckets (key, tokens, updated_at, blocked_until) VALUES (?, ?, ?, ?)',
+            (key, tokens, updated_at, blocked_until)
+        )
+
+    def reserve(self, key: str, rate: float, burst: float, count: float = 1) -> float:
+        with self._transaction() as conn:
+            now = time.time()
+            tokens, updated_at, blocked_until = self._load(conn, key, burst, now)
+            tokens, wait = _take(tokens, updated_at, blocked_until, now, rate, burst, count)
+            self._store(conn, key, tokens, now, blocked_until)
+            return wait
+
+    def block(self, key: str, rate: float, seconds: float):
+        with self._transaction() as conn:
+            now = time.time()
+            tokens, _, blocked_until = self._load(conn, key, 0.0, now)
+            self._store(conn, key, min(tokens, -rate * seconds), now, max(blocked_until, now + seconds))
+
+
+class RateLimiter:
+    """
+    按 (provider, API Key) 维度限流
+
+    provider 的限额来自 DEFAULT_LIMITS，可通过 app.config / 环境变量
+    RATE_LIMIT_<PROVIDER>（如 RATE_LIMIT_BAIDU_OCR=2:2）覆盖。
+    """
+
+    def __init__(self, backend=None, limits: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.backend = backend or InProcessBackend()
+        self._limits: Dict[str, Tuple[float, float]] = dict(DEFAULT_LIMITS)
+        self._limits.update(limits or {})
+        self.penalty_seconds = DEFAULT_PENALTY_SECONDS
+        self._lock = threading.Lock()
+        self._load_env_limits()
+
+    def _load_env_limits(self):
+        for provider in list(self._limits):
+            limit = parse_limit(os.getenv(f'RATE_LIMIT_{provider.upper()}'))
+            if limit:
+                self._limits[provider] = limit
+
+    def init_app(self, app):
+        """根据 app.config 选择后端并加载各 provider 限额"""
+        backend_name = str(app.config.get('RATE_LIMIT_BACKEND') or 'memory').lower()
+        if backend_name == 'sqlite':
+            path = app.config.get('RATE_LIMIT_DB_PATH')
+            if not isinstance(self.backend, SQLiteBackend) or self.backend.path != path:
+                self.backend = SQLiteBackend(path)
+        elif not isinstance(self.backend, InProcessBackend):
+            self.backend = InProcessBackend()
+
+        for provider in list(self._limits):
+            limit = parse_limit(app.config.get(f'RATE_LIMIT_{provider.upper()}'))
+            if limit:
+                self.set_limit(provider, *limit)
+
+        penalty = app.config.get('RATE_LIMIT_PENALTY_SECONDS')
+        if penalty is not None:
+            self.penalty_seconds = float(penalty)
+
+        logger.info(f"Rate limiter backend={self.backend.name}, limits={self._limits}")
+
+    def set_limit(self, provider: str, rate: float, burst: float = None):
+        """运行时调整某 provider 的速率（每秒请求数）和突发容量"""
+        if burst is None:
+            burst = max(rate, 1.0) if rate > 0 else 0.0
+        with self._lock:
+            self._limits[provider] = (float(rate), float(burst))
+
+    def get_limit(self, provider: str) -> Tuple[float, float]:
+        return self._limits.get(provider, (0.0, 0.0))
+
+    @staticmethod
+    def _key(provider: str, api_key: Optional[str]) -> str:
+        # 只保存 API Key 的摘要，共享的限流文件中不出现明文密钥
+        digest = hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()[:16]
+        return f'{provider}:{digest}'
+
+    def acquire(self, provider: str, api_key: Optional[str] = None, tokens: float = 1) -> float:
+        """
+        获取令牌，必要时阻塞等待
+
+        Returns:
+            实际等待的秒数
+        """
+        rate, burst = self.get_limit(provider)
+        wait = self.backend.reserve(self._key(provider, api_key), rate, burst, tokens)
+        if wait > 0:
+            logger.debug(f"Rate limit [{provider}]: waiting {wait:.2f}s")
+            time.sleep(wait)
+        return wait
+
+    def penalize(self, provider: str, api_key: Optional[str] = None, seconds: float = None):
+        """服务端返回限流错误时调用：该桶上的所有调用方一起暂停 seconds 秒"""
+        seconds = self.penalty_seconds if seconds is None else seconds
+        rate, _ = self.get_limit(provider)
+        logger.warning(f"Rate limit [{provider}] hit on server side, backing off {seconds:.1f}s")
+        self.backend.block(self._key(provider, api_key), rate, seconds)
+
+    @contextmanager
+    def limit(self, provider: str, api_key: Optional[str] = None):
+        """
+        acquire() + 遇到限流异常时 penalize() 的上下文管理器
+
+        Example:
+            with rate_limiter.limit('openai', api_key):
+                response = client.chat.completions.create(...)
+        """
+        self.acquire(provider, api_key)
+        try:
+            yield
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self.penalize(provider, api_key)
+            raise
+
+
+# Global rate limiter instance
+rate_limiter = RateLimiter()
@@ -2,11 +2,16 @@
 Abstract base class for text generation providers
 """
 from abc import ABC, abstractmethod
+from typing import Optional
 
 
 class TextProvider(ABC):
     """Abstract base class for text generation"""
     
+    # Whether the provider can register a prompt prefix as a server-side context cache
+    # (see services/context_cache.py). Providers without it always receive the full prompt.
+    supports_context_cache = False
+
     @abstractmethod
     def generate_text(self, prompt: str, thinking_budget: int = 1000) -> str:
         """
@@ -20,3 +25,30 @@ class TextProvider(ABC):
             Generated text content
         """
         pass
+
+    def create_context_cache(self, prefix: str, ttl_seconds: int) -> Optional[str]:
+        """
+        Register a shared prompt prefix as a server-side context cache
+
+        Args:
+            prefix: The prompt prefix shared by many calls
+            ttl_seconds: How long the provider should keep the cache
+
+        Returns:
+            Cache handle to pass to generate_text_with_context, or None if unsupported
+        """
+        return None
+
+    def generate_text_with_context(self, cache_handle: str, suffix: str, thinking_budget: int = 1000) -> str:
+        """
+        Generate text for prefix + suffix, where the prefix was registered via create_context_cache
+
+        Args:
+            cache_handle: Handle returned by create_context_cache
+            suffix: The part of the prompt after the cached prefix
+            thinking_budget: Budget for thinking/reasoning (provider-specific)
+
+        Returns:
+            Generated text content
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support context caching")
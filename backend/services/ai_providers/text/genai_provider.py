@@ -9,6 +9,9 @@ import logging
 from google import genai
 from google.genai import types
 from tenacity import retry, stop_after_attempt, wait_exponential
+from services.concurrency import ResourceClass
+from services.adaptive_concurrency import adaptive_concurrency
+from ..rate_limiter import rate_limiter
 from .base import TextProvider
 from config import get_config
 
@@ -18,6 +21,8 @@ logger = logging.getLogger(__name__)
 class GenAITextProvider(TextProvider):
     """Text generation using Google GenAI SDK (supports both AI Studio and Vertex AI)"""
 
+    supports_context_cache = True
+
     def __init__(
         self,
         api_key: str = None,
@@ -62,6 +67,8 @@ class GenAITextProvider(TextProvider):
             )
 
         self.model = model
+        # 限流按 API Key（Vertex AI 模式按项目）共享配额
+        self._rate_limit_key = project_id if vertexai else api_key
     
     @retry(
         stop=stop_after_attempt(get_config().GENAI_MAX_RETRIES + 1),
@@ -78,13 +85,63 @@ class GenAITextProvider(TextProvider):
         Returns:
             Generated text
         """
-        response = self.client.models.generate_content(
-            model=self.model,
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget),
-            ),
-        )
+        with rate_limiter.limit('genai', self._rate_limit_key), adaptive_concurrency.observe(ResourceClass.TEXT_LLM):
+            response = self.client.models.generate_content(
+                model=self.model,
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget),
+                ),
+            )
+        return response.text
+    
+    def create_context_cache(self, prefix: str, ttl_seconds: int) -> str:
+        """
+        Register the shared prompt prefix as a Gemini cached content
+        
+        Args:
+            prefix: The prompt prefix shared by many calls
+            ttl_seconds: Cache lifetime on the server
+            
+        Returns:
+            Cached content name
+        """
+        with rate_limiter.limit('genai', self._rate_limit_key):
+            cache = self.client.caches.create(
+                model=self.model,
+                config=types.CreateCachedContentConfig(
+                    contents=[prefix],
+                    ttl=f"{int(ttl_seconds)}s",
+                    display_name='banana-slides shared prefix',
+                ),
+            )
+        return cache.name
+
+    @retry(
+        stop=stop_after_attempt(get_config().GENAI_MAX_RETRIES + 1),
+        wait=wait_exponential(multiplier=1, min=2, max=10)
+    )
+    def generate_text_with_context(self, cache_handle: str, suffix: str, thinking_budget: int = 1000) -> str:
+        """
+        Generate text using a cached prefix plus the per-call suffix
+        
+        Args:
+            cache_handle: Cached content name from create_context_cache
+            suffix: The rest of the prompt
+            thinking_budget: Thinking budget for the model
+            
+        Returns:
+            Generated text
+        """
+        with rate_limiter.limit('genai', self._rate_limit_key), adaptive_concurrency.observe(ResourceClass.TEXT_LLM):
+            response = self.client.models.generate_content(
+                model=self.model,
+                contents=suffix,
+                config=types.GenerateContentConfig(
+                    cached_content=cache_handle,
+                    thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget),
+                ),
+            )
         return response.text
     
     @retry(
@@ -111,11 +168,12 @@ class GenAITextProvider(TextProvider):
         # 构建多模态内容
         contents = [img, prompt]
         
-        response = self.client.models.generate_content(
-            model=self.model,
-            contents=contents,
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget),
-            ),
-        )
+        with rate_limiter.limit('genai', self._rate_limit_key), adaptive_concurrency.observe(ResourceClass.TEXT_LLM):
+            response = self.client.models.generate_content(
+                model=self.model,
+                contents=contents,
+                config=types.GenerateContentConfig(
+                    thinking_config=types.ThinkingConfig(thinking_budget=thinking_budget),
+                ),
+            )
         return response.text
\ No newline at end of file
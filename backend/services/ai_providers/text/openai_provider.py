@@ -3,6 +3,9 @@ OpenAI SDK implementation for text generation
 """
 import logging
 from openai import OpenAI
+from services.concurrency import ResourceClass
+from services.adaptive_concurrency import adaptive_concurrency
+from ..rate_limiter import rate_limiter
 from .base import TextProvider
 from config import get_config
 
@@ -28,6 +31,7 @@ class OpenAITextProvider(TextProvider):
             max_retries=get_config().OPENAI_MAX_RETRIES  # set max retries from config
         )
         self.model = model
+        self._rate_limit_key = api_key
     
     def generate_text(self, prompt: str, thinking_budget: int = 1000) -> str:
         """
@@ -40,10 +44,11 @@ class OpenAITextProvider(TextProvider):
         Returns:
             Generated text
         """
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
+        with rate_limiter.limit('openai', self._rate_limit_key), adaptive_concurrency.observe(ResourceClass.TEXT_LLM):
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            )
         return response.choices[0].message.content
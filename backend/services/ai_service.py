@@ -7,7 +7,6 @@ import os
 import json
 import re
 import logging
-import requests
 from typing import List, Dict, Optional, Union
 from textwrap import dedent
 from PIL import Image
@@ -15,7 +14,7 @@ from tenacity import retry, stop_after_attempt, retry_if_exception_type
 from .prompts import (
     get_outline_generation_prompt,
     get_outline_parsing_prompt,
-    get_page_description_prompt,
+    get_page_description_prompt_parts,
     get_image_generation_prompt,
     get_image_edit_prompt,
     get_description_to_outline_prompt,
@@ -24,6 +23,14 @@ from .prompts import (
     get_descriptions_refinement_prompt
 )
 from .ai_providers import get_text_provider, get_image_provider, TextProvider, ImageProvider
+from .response_cache import response_cache
+from .image_result_cache import image_result_cache
+from .single_flight import text_flight, image_flight
+from .llm_json import llm_json
+from .context_cache import context_cache
+from .reference_images import reference_images
+from .remote_images import remote_images
+from .concurrency import scheduler, ResourceClass
 from config import get_config
 
 logger = logging.getLogger(__name__)
@@ -157,13 +164,14 @@ class AIService:
         retry=retry_if_exception_type((json.JSONDecodeError, ValueError)),
         reraise=True
     )
-    def generate_json(self, prompt: str, thinking_budget: int = 1000) -> Union[Dict, List]:
+    def generate_json(self, prompt: str, thinking_budget: int = 1000, use_cache: bool = True) -> Union[Dict, List]:
         """
-        生成并解析JSON，如果解析失败则重新生成
+        生成并解析JSON，输出无法修复（见 services/llm_json.py）时重新生成
         
         Args:
             prompt: 生成提示词
             thinking_budget: 思考预算
+            use_cache: 是否读取响应缓存（False 时强制调用模型，结果仍写入缓存）
             
         Returns:
             解析后的JSON对象（字典或列表）
@@ -171,17 +179,62 @@ class AIService:
         Raises:
             json.JSONDecodeError: JSON解析失败（重试3次后仍失败）
         """
-        # 调用AI生成文本
-        response_text = self.text_provider.generate_text(prompt, thinking_budget=thinking_budget)
-        
-        # 清理响应文本：移除markdown代码块标记和多余空白
-        cleaned_text = response_text.strip().strip("```json").strip("```").strip()
+        cache_key = self._text_cache_key(prompt, thinking_budget=thinking_budget)
+        cached_text = response_cache.get(cache_key) if use_cache else None
+        if cached_text is not None:
+            return json.loads(cached_text)
+        if not use_cache:
+            response_cache.record_bypass()
+
+        # 调用AI生成文本（并发的相同请求合并为一次调用）
+        response_text = text_flight.do(
+            cache_key, self.text_provider.generate_text, prompt, thinking_budget=thinking_budget
+        )
         
+        # 解析响应：代码块、前后说明文字、多余逗号、截断的结尾括号等先修复，不必重新生成
         try:
-            return json.loads(cleaned_text)
+            result = llm_json.parse(response_text)
         except json.JSONDecodeError as e:
-            logger.warning(f"JSON解析失败，将重新生成。原始文本: {cleaned_text[:200]}... 错误: {str(e)}")
+            logger.warning(f"JSON解析失败，将重新生成。原始文本: {response_text.strip()[:200]}... 错误: {str(e)}")
             raise
+        # 只缓存能解析的响应（修复后的规范 JSON），重试不会命中坏结果
+        response_cache.set(cache_key, json.dumps(result, ensure_ascii=False))
+        return result
+
+    def generate_text(self, prompt: str, thinking_budget: int = 1000, use_cache: bool = True,
+                      shared_prefix: Optional[str] = None) -> str:
+        """
+        生成文本（经过响应缓存）
+        
+        Args:
+            prompt: 生成提示词
+            thinking_budget: 思考预算
+            use_cache: 是否读取响应缓存（False 时强制调用模型，结果仍写入缓存）
+            shared_prefix: prompt 中被多次调用共享的前缀，provider 支持时注册为上下文缓存
+        """
+        cache_key = self._text_cache_key(prompt, thinking_budget=thinking_budget)
+        if use_cache:
+            cached_text = response_cache.get(cache_key)
+            if cached_text is not None:
+                return cached_text
+        else:
+            response_cache.record_bypass()
+
+        if shared_prefix:
+            response_text = text_flight.do(
+                cache_key, context_cache.generate, self.text_provider, prompt, shared_prefix,
+                thinking_budget=thinking_budget
+            )
+        else:
+            response_text = text_flight.do(
+                cache_key, self.text_provider.generate_text, prompt, thinking_budget=thinking_budget
+            )
+        response_cache.set(cache_key, response_text)
+        return response_text
+
+    def _text_cache_key(self, prompt: str, **params) -> str:
+        """文本响应的缓存 key：provider 类型 + 文本模型 + 提示词 + 参数"""
+        return response_cache.make_key(self.text_provider, self.text_model, prompt, **params)
     
     @retry(
         stop=stop_after_attempt(3),
@@ -190,7 +243,7 @@ class AIService:
     )
     def generate_json_with_image(self, prompt: str, image_path: str, thinking_budget: int = 1000) -> Union[Dict, List]:
         """
-        带图片输入的JSON生成，如果解析失败则重新生成（最多重试3次）
+        带图片输入的JSON生成，输出无法修复时重新生成（最多重试3次）
         
         Args:
             prompt: 生成提示词
@@ -220,13 +273,10 @@ class AIService:
         else:
             raise ValueError("text_provider 不支持图片输入")
         
-        # 清理响应文本：移除markdown代码块标记和多余空白
-        cleaned_text = response_text.strip().removeprefix("```json").removeprefix("```").removesuffix("```").strip()
-        
         try:
-            return json.loads(cleaned_text)
+            return llm_json.parse(response_text)
         except json.JSONDecodeError as e:
-            logger.warning(f"JSON解析失败（带图片），将重新生成。原始文本: {cleaned_text[:200]}... 错误: {str(e)}")
+            logger.warning(f"JSON解析失败（带图片），将重新生成。原始文本: {response_text.strip()[:200]}... 错误: {str(e)}")
             raise
     
     @staticmethod
@@ -248,7 +298,7 @@ class AIService:
     @staticmethod
     def download_image_from_url(url: str) -> Optional[Image.Image]:
         """
-        从 URL 下载图片并返回 PIL Image 对象
+        从 URL 下载图片并返回 PIL Image 对象（经本地 URL 缓存，见 services/remote_images.py）
         
         Args:
             url: 图片 URL
@@ -258,47 +308,76 @@ class AIService:
         """
         try:
             logger.debug(f"Downloading image from URL: {url}")
-            response = requests.get(url, timeout=30, stream=True)
-            response.raise_for_status()
-            
-            # 从响应内容创建 PIL Image
-            image = Image.open(response.raw)
-            # 确保图片被加载
-            image.load()
+            image = remote_images.open(url)
             logger.debug(f"Successfully downloaded image: {image.size}, {image.mode}")
             return image
         except Exception as e:
             logger.error(f"Failed to download image from {url}: {str(e)}")
             return None
+
+    def _resolve_reference_image(self, ref_img: Union[str, Image.Image]) -> Optional[Image.Image]:
+        """
+        把一个额外参考图（PIL 对象、本地路径、URL 或 MinerU 路径）解析为 PIL Image，无法解析时返回 None
+        """
+        if isinstance(ref_img, Image.Image):
+            # 已经是 PIL Image 对象
+            return ref_img
+        if not isinstance(ref_img, str):
+            logger.warning(f"Invalid image reference: {ref_img}, skipping...")
+            return None
+        # 可能是本地路径或 URL
+        if os.path.exists(ref_img):
+            # 本地路径
+            return reference_images.open(ref_img)
+        if ref_img.startswith('http://') or ref_img.startswith('https://'):
+            # URL，需要下载
+            downloaded_img = self.download_image_from_url(ref_img)
+            if not downloaded_img:
+                logger.warning(f"Failed to download image from URL: {ref_img}, skipping...")
+            return downloaded_img
+        if ref_img.startswith('/files/mineru/'):
+            # MinerU 本地文件路径，需要转换为文件系统路径（支持前缀匹配）
+            local_path = self._convert_mineru_path_to_local(ref_img)
+            if local_path and os.path.exists(local_path):
+                logger.debug(f"Loaded MinerU image from local path: {local_path}")
+                return reference_images.open(local_path)
+            logger.warning(f"MinerU image file not found (with prefix matching): {ref_img}, skipping...")
+            return None
+        logger.warning(f"Invalid image reference: {ref_img}, skipping...")
+        return None
     
-    def generate_outline(self, project_context: ProjectContext, language: str = None) -> List[Dict]:
+    def generate_outline(self, project_context: ProjectContext, language: str = None,
+                         use_cache: bool = True) -> List[Dict]:
         """
         Generate PPT outline from idea prompt
         Based on demo.py gen_outline()
         
         Args:
             project_context: 项目上下文对象，包含所有原始信息
+            use_cache: 是否读取响应缓存
             
         Returns:
             List of outline items (may contain parts with pages or direct pages)
         """
         outline_prompt = get_outline_generation_prompt(project_context, language)
-        outline = self.generate_json(outline_prompt, thinking_budget=1000)
+        outline = self.generate_json(outline_prompt, thinking_budget=1000, use_cache=use_cache)
         return outline
     
-    def parse_outline_text(self, project_context: ProjectContext, language: str = None) -> List[Dict]:
+    def parse_outline_text(self, project_context: ProjectContext, language: str = None,
+                           use_cache: bool = True) -> List[Dict]:
         """
         Parse user-provided outline text into structured outline format
         This method analyzes the text and splits it into pages without modifying the original text
         
         Args:
             project_context: 项目上下文对象，包含所有原始信息
+            use_cache: 是否读取响应缓存
         
         Returns:
             List of outline items (may contain parts with pages or direct pages)
         """
         parse_prompt = get_outline_parsing_prompt(project_context, language)
-        outline = self.generate_json(parse_prompt, thinking_budget=1000)
+        outline = self.generate_json(parse_prompt, thinking_budget=1000, use_cache=use_cache)
         return outline
     
     def flatten_outline(self, outline: List[Dict]) -> List[Dict]:
@@ -320,7 +399,8 @@ class AIService:
         return pages
     
     def generate_page_description(self, project_context: ProjectContext, outline: List[Dict], 
-                                 page_outline: Dict, page_index: int, language='zh') -> str:
+                                 page_outline: Dict, page_index: int, language='zh',
+                                 use_cache: bool = True) -> str:
         """
         Generate description for a single page
         Based on demo.py gen_desc() logic
@@ -330,13 +410,15 @@ class AIService:
             outline: Complete outline
             page_outline: Outline for this specific page
             page_index: Page number (1-indexed)
+            use_cache: 是否读取响应缓存
         
         Returns:
             Text description for the page
         """
         part_info = f"\nThis page belongs to: {page_outline['part']}" if 'part' in page_outline else ""
         
-        desc_prompt = get_page_description_prompt(
+        # 前缀（参考文件、原始需求、大纲）在同一项目的各页之间共享
+        prefix, suffix = get_page_description_prompt_parts(
             project_context=project_context,
             outline=outline,
             page_outline=page_outline,
@@ -345,7 +427,9 @@ class AIService:
             language=language
         )
         
-        response_text = self.text_provider.generate_text(desc_prompt, thinking_budget=1000)
+        response_text = self.generate_text(
+            prefix + suffix, thinking_budget=1000, use_cache=use_cache, shared_prefix=prefix
+        )
         
         return dedent(response_text)
     
@@ -413,7 +497,8 @@ class AIService:
     
     def generate_image(self, prompt: str, ref_image_path: Optional[str] = None, 
                       aspect_ratio: str = "16:9", resolution: str = "2K",
-                      additional_ref_images: Optional[List[Union[str, Image.Image]]] = None) -> Optional[Image.Image]:
+                      additional_ref_images: Optional[List[Union[str, Image.Image]]] = None,
+                      use_cache: bool = True) -> Optional[Image.Image]:
         """
         Generate image using configured image provider
         Based on gemini_genai.py gen_image()
@@ -424,6 +509,7 @@ class AIService:
             aspect_ratio: Image aspect ratio
             resolution: Image resolution (note: OpenAI format only supports 1K)
             additional_ref_images: 额外的参考图片列表，可以是本地路径、URL 或 PIL Image 对象
+            use_cache: 生图结果缓存开启时是否读取缓存（False 时强制调用 provider，结果仍写入缓存）
         
         Returns:
             PIL Image object or None if failed
@@ -444,47 +530,53 @@ class AIService:
             if ref_image_path:
                 if not os.path.exists(ref_image_path):
                     raise FileNotFoundError(f"Reference image not found: {ref_image_path}")
-                main_ref_image = Image.open(ref_image_path)
+                main_ref_image = reference_images.open(ref_image_path)
                 ref_images.append(main_ref_image)
             
-            # 添加额外的参考图片
+            # 添加额外的参考图片：下载 / 读取并发进行（受 network_io 预算限制），结果保持原顺序
             if additional_ref_images:
-                for ref_img in additional_ref_images:
-                    if isinstance(ref_img, Image.Image):
-                        # 已经是 PIL Image 对象
-                        ref_images.append(ref_img)
-                    elif isinstance(ref_img, str):
-                        # 可能是本地路径或 URL
-                        if os.path.exists(ref_img):
-                            # 本地路径
-                            ref_images.append(Image.open(ref_img))
-                        elif ref_img.startswith('http://') or ref_img.startswith('https://'):
-                            # URL，需要下载
-                            downloaded_img = self.download_image_from_url(ref_img)
-                            if downloaded_img:
-                                ref_images.append(downloaded_img)
-                            else:
-                                logger.warning(f"Failed to download image from URL: {ref_img}, skipping...")
-                        elif ref_img.startswith('/files/mineru/'):
-                            # MinerU 本地文件路径，需要转换为文件系统路径（支持前缀匹配）
-                            local_path = self._convert_mineru_path_to_local(ref_img)
-                            if local_path and os.path.exists(local_path):
-                                ref_images.append(Image.open(local_path))
-                                logger.debug(f"Loaded MinerU image from local path: {local_path}")
-                            else:
-                                logger.warning(f"MinerU image file not found (with prefix matching): {ref_img}, skipping...")
-                        else:
-                            logger.warning(f"Invalid image reference: {ref_img}, skipping...")
+                if len(additional_ref_images) == 1:
+                    resolved = [self._resolve_reference_image(additional_ref_images[0])]
+                else:
+                    futures = [
+                        scheduler.submit(ResourceClass.NETWORK_IO, self._resolve_reference_image, ref_img)
+                        for ref_img in additional_ref_images
+                    ]
+                    resolved = [future.result() for future in futures]
+                ref_images.extend(img for img in resolved if img is not None)
+            
+            # 按参考图策略缩小超出长边上限的图片（模板、素材）
+            ref_images = [reference_images.prepare(img) for img in ref_images]
+            
+            # 同一 key 同时用于结果缓存和合并并发的相同请求
+            request_key = image_result_cache.make_image_key(
+                self.image_provider, self.image_model, prompt, ref_images, aspect_ratio, resolution
+            )
+            if image_result_cache.enabled:
+                if use_cache:
+                    cached_image = image_result_cache.get_image(request_key)
+                    if cached_image is not None:
+                        logger.info("Image result cache hit, skipping image provider call")
+                        return cached_image
+                else:
+                    image_result_cache.record_bypass()
             
             logger.debug(f"Calling image provider for generation with {len(ref_images)} reference images...")
             
             # 使用 image_provider 生成图片
-            return self.image_provider.generate_image(
+            image = image_flight.do(
+                request_key, self.image_provider.generate_image,
                 prompt=prompt,
                 ref_images=ref_images if ref_images else None,
                 aspect_ratio=aspect_ratio,
                 resolution=resolution
             )
+            if image_result_cache.enabled and image is not None:
+                try:
+                    image_result_cache.set_image(request_key, image)
+                except Exception as e:
+                    logger.warning(f"Failed to cache generated image: {e}")
+            return image
             
         except Exception as e:
             error_detail = f"Error generating image: {type(e).__name__}: {str(e)}"
@@ -515,37 +607,43 @@ class AIService:
             edit_instruction=prompt,
             original_description=original_description
         )
-        return self.generate_image(edit_instruction, current_image_path, aspect_ratio, resolution, additional_ref_images)
+        # 编辑是对当前图片的再创作，重复同一指令时期望得到新结果，不读取缓存
+        return self.generate_image(edit_instruction, current_image_path, aspect_ratio, resolution, additional_ref_images,
+                                   use_cache=False)
     
-    def parse_description_to_outline(self, project_context: ProjectContext, language='zh') -> List[Dict]:
+    def parse_description_to_outline(self, project_context: ProjectContext, language='zh',
+                                     use_cache: bool = True) -> List[Dict]:
         """
         从描述文本解析出大纲结构
         
         Args:
             project_context: 项目上下文对象，包含所有原始信息
+            use_cache: 是否读取响应缓存
         
         Returns:
             List of outline items (may contain parts with pages or direct pages)
         """
         parse_prompt = get_description_to_outline_prompt(project_context, language)
-        outline = self.generate_json(parse_prompt, thinking_budget=1000)
+        outline = self.generate_json(parse_prompt, thinking_budget=1000, use_cache=use_cache)
         return outline
     
     def parse_description_to_page_descriptions(self, project_context: ProjectContext, 
                                                outline: List[Dict],
-                                               language='zh') -> List[str]:
+                                               language='zh',
+                                               use_cache: bool = True) -> List[str]:
         """
         从描述文本切分出每页描述
         
         Args:
             project_context: 项目上下文对象，包含所有原始信息
             outline: 已解析出的大纲结构
+            use_cache: 是否读取响应缓存
         
         Returns:
             List of page descriptions (strings), one for each page in the outline
         """
         split_prompt = get_description_split_prompt(project_context, outline, language)
-        descriptions = self.generate_json(split_prompt, thinking_budget=1000)
+        descriptions = self.generate_json(split_prompt, thinking_budget=1000, use_cache=use_cache)
         
         # 确保返回的是字符串列表
         if isinstance(descriptions, list):
@@ -556,7 +654,7 @@ class AIService:
     def refine_outline(self, current_outline: List[Dict], user_requirement: str,
                       project_context: ProjectContext,
                       previous_requirements: Optional[List[str]] = None,
-                      language='zh') -> List[Dict]:
+                      language='zh', use_cache: bool = True) -> List[Dict]:
         """
         根据用户要求修改已有大纲
         
@@ -565,6 +663,7 @@ class AIService:
             user_requirement: 用户的新要求
             project_context: 项目上下文对象，包含所有原始信息
             previous_requirements: 之前的修改要求列表（可选）
+            use_cache: 是否读取响应缓存
         
         Returns:
             修改后的大纲结构
@@ -576,14 +675,14 @@ class AIService:
             previous_requirements=previous_requirements,
             language=language
         )
-        outline = self.generate_json(refinement_prompt, thinking_budget=1000)
+        outline = self.generate_json(refinement_prompt, thinking_budget=1000, use_cache=use_cache)
         return outline
     
     def refine_descriptions(self, current_descriptions: List[Dict], user_requirement: str,
                            project_context: ProjectContext,
                            outline: List[Dict] = None,
                            previous_requirements: Optional[List[str]] = None,
-                           language='zh') -> List[str]:
+                           language='zh', use_cache: bool = True) -> List[str]:
         """
         根据用户要求修改已有页面描述
         
@@ -593,6 +692,7 @@ class AIService:
             project_context: 项目上下文对象，包含所有原始信息
             outline: 完整的大纲结构（可选）
             previous_requirements: 之前的修改要求列表（可选）
+            use_cache: 是否读取响应缓存
         
         Returns:
             修改后的页面描述列表（字符串列表）
@@ -605,7 +705,7 @@ class AIService:
             previous_requirements=previous_requirements,
             language=language
         )
-        descriptions = self.generate_json(refinement_prompt, thinking_budget=1000)
+        descriptions = self.generate_json(refinement_prompt, thinking_budget=1000, use_cache=use_cache)
         
         # 确保返回的是字符串列表
         if isinstance(descriptions, list):
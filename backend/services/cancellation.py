@@ -0,0 +1,133 @@
+"""
+Task Cancellation - 协作式任务取消
+
+取消请求写入数据库（Task.status = 'CANCELLED'），因此无论任务在 web 进程还是独立
+worker 进程中执行都能感知。任务在阶段边界检查取消令牌：
+
+    token = get_cancellation_token(task_id, app)
+
+    for page in pages:
+        token.raise_if_cancelled()
+        ...
+
+- 尚未开始的页面级工作在开始执行时检查令牌后直接放弃
+- 正在执行的工作在下一个阶段边界（提取 -> 修复 -> 递归、生成提示词 -> 生图 -> 保存）停止
+- 已经发出的 provider 请求不会被中断
+"""
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CANCELLED_STATUS = 'CANCELLED'
+
+
+class TaskCancelledError(Exception):
+    """任务已被取消"""
+
+    def __init__(self, task_id: Optional[str] = None):
+        self.task_id = task_id
+        super().__init__(f"Task {task_id} was cancelled" if task_id else "Task was cancelled")
+
+
+class CancellationToken:
+    """
+    取消令牌
+
+    进程内取消立即生效；其他进程发起的取消通过定期读取任务状态感知
+    （最多每 check_interval 秒查询一次数据库）。
+    """
+
+    def __init__(self, task_id: Optional[str] = None, app=None, check_interval: float = 1.0):
+        self.task_id = task_id
+        self._app = app
+        self.check_interval = check_interval
+        self._event = threading.Event()
+        self._last_check = 0.0
+        self._check_lock = threading.Lock()
+
+    def cancel(self):
+        """在当前进程内标记取消"""
+        self._event.set()
+
+    def _poll_status(self) -> bool:
+        from models import db, Task
+
+        with self._app.app_context():
+            status = db.session.query(Task.status).filter(Task.id == self.task_id).scalar()
+        return status == CANCELLED_STATUS
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.task_id and self._app is not None:
+            now = time.monotonic()
+            # 只让一个线程去查数据库，其余线程沿用上次的结果
+            if now - self._last_check >= self.check_interval and self._check_lock.acquire(blocking=False):
+                try:
+                    self._last_check = now
+                    if self._poll_status():
+                        self._event.set()
+                except Exception as e:
+                    logger.warning(f"Failed to check cancellation for task {self.task_id}: {e}")
+                finally:
+                    self._check_lock.release()
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        """已取消时抛出 TaskCancelledError"""
+        if self.cancelled:
+            raise TaskCancelledError(self.task_id)
+
+
+# 进程内的任务令牌：task_id -> CancellationToken
+_tokens: Dict[str, CancellationToken] = {}
+_tokens_lock = threading.Lock()
+
+
+def get_cancellation_token(task_id: str, app=None) -> CancellationToken:
+    """获取（必要时创建）任务的取消令牌，同一进程内同一任务共享一个令牌"""
+    with _tokens_lock:
+        token = _tokens.get(task_id)
+        if token is None:
+            token = _tokens[task_id] = CancellationToken(task_id, app)
+        elif app is not None and token._app is None:
+            token._app = app
+        return token
+
+
+def reset_cancellation_token(task_id: str, app=None) -> CancellationToken:
+    """为任务的新一次执行创建令牌，替换上一次执行（如被取消后重试）遗留的令牌"""
+    with _tokens_lock:
+        token = _tokens[task_id] = CancellationToken(task_id, app)
+        return token
+
+
+def discard_cancellation_token(task_id: str, token: Optional[CancellationToken] = None):
+    """
+    任务结束后释放令牌
+
+    Args:
+        token: 只释放这一次执行的令牌；任务已被重新认领时保留新执行的令牌
+    """
+    with _tokens_lock:
+        if token is None or _tokens.get(task_id) is token:
+            _tokens.pop(task_id, None)
+
+
+def cancel_local_task(task_id: str) -> bool:
+    """
+    立即通知本进程内正在执行的任务
+
+    Returns:
+        该任务是否在本进程中有令牌
+    """
+    with _tokens_lock:
+        token = _tokens.get(task_id)
+    if token is None:
+        return False
+    token.cancel()
+    return True
@@ -0,0 +1,235 @@
+"""
+Concurrency Scheduler - 进程级统一并发预算
+
+以前每个阶段都创建自己的 ThreadPoolExecutor（任务池、导出页面池、递归子元素池、
+混合提取池、文字样式池），实际线程数随嵌套层级相乘，导出时很容易打满 provider QPS。
+
+现在所有阶段都通过全局 `scheduler` 提交工作，按资源类别（text LLM、image LLM、
+MinerU、百度 OCR、百度修复、本地 CPU、外部下载）共享一份预算：
+
+    from services.concurrency import scheduler, ResourceClass
+
+    future = scheduler.submit(ResourceClass.IMAGE_LLM, generate_page, page_id)
+
+    with scheduler.slot(ResourceClass.BAIDU_INPAINT):
+        provider.inpaint(...)
+
+规则：
+- submit() 把工作放入该类别的线程池，执行期间占用该类别的一个名额
+- slot() 在当前线程上占用一个名额，适合直接调用外部服务的代码
+- 同一线程已经持有某类别名额时，再次 slot()/submit() 同类别会直接在当前线程执行
+  （可重入，避免递归处理时父任务等待子任务造成死锁）
+"""
+import os
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceClass:
+    """资源类别名称"""
+    TEXT_LLM = 'text_llm'            # 文本/视觉理解模型（描述生成、文字样式识别）
+    IMAGE_LLM = 'image_llm'          # 图片生成/编辑模型
+    MINERU = 'mineru'                # MinerU 版面解析
+    BAIDU_OCR = 'baidu_ocr'          # 百度 OCR（高精度/表格）
+    BAIDU_INPAINT = 'baidu_inpaint'  # 百度图像修复
+    LOCAL_CPU = 'local_cpu'          # 本地 CPU 密集型工作（页面级版面分析编排、裁剪、合成）
+    NETWORK_IO = 'network_io'        # 外部 URL 下载（参考图等）
+
+    ALL = (TEXT_LLM, IMAGE_LLM, MINERU, BAIDU_OCR, BAIDU_INPAINT, LOCAL_CPU, NETWORK_IO)
+
+
+DEFAULT_LIMITS = {
+    ResourceClass.TEXT_LLM: 8,
+    ResourceClass.IMAGE_LLM: 8,
+    ResourceClass.MINERU: 4,
+    ResourceClass.BAIDU_OCR: 4,
+    ResourceClass.BAIDU_INPAINT: 2,
+    ResourceClass.LOCAL_CPU: os.cpu_count() or 4,
+    ResourceClass.NETWORK_IO: 8,
+}
+
+# app.config 中各类别预算的配置键
+CONFIG_KEYS = {
+    ResourceClass.TEXT_LLM: 'CONCURRENCY_TEXT_LLM',
+    ResourceClass.IMAGE_LLM: 'CONCURRENCY_IMAGE_LLM',
+    ResourceClass.MINERU: 'CONCURRENCY_MINERU',
+    ResourceClass.BAIDU_OCR: 'CONCURRENCY_BAIDU_OCR',
+    ResourceClass.BAIDU_INPAINT: 'CONCURRENCY_BAIDU_INPAINT',
+    ResourceClass.LOCAL_CPU: 'CONCURRENCY_LOCAL_CPU',
+    ResourceClass.NETWORK_IO: 'CONCURRENCY_NETWORK_IO',
+}
+
+
+class _Budget:
+    """
+    单个资源类别的预算：可调整上限的计数信号量 + 专属线程池
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self._limit = max(1, int(limit))
+        self._in_use = 0
+        self._waiting = 0
+        self._total = 0
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=self._limit, thread_name_prefix=f'{name}')
+        self._executor_size = self._limit
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    def set_limit(self, limit: int):
+        """调整上限；扩容时替换线程池（旧线程池中已提交的工作照常执行完毕）"""
+        limit = max(1, int(limit))
+        with self._cond:
+            self._limit = limit
+            if limit > self._executor_size:
+                old_executor = self._executor
+                self._executor = ThreadPoolExecutor(max_workers=limit, thread_name_prefix=f'{self.name}')
+                self._executor_size = limit
+                old_executor.shutdown(wait=False)
+            self._cond.notify_all()
+
+    def acquire(self):
+        with self._cond:
+            self._waiting += 1
+            try:
+                while self._in_use >= self._limit:
+                    self._cond.wait()
+            finally:
+                self._waiting -= 1
+            self._in_use += 1
+            self._total += 1
+
+    def release(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        with self._cond:
+            executor = self._executor
+        return executor.submit(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                'limit': self._limit,
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                'total': self._total,
+            }
+
+
+class ConcurrencyScheduler:
+    """
+    进程级并发调度器
+
+    每个资源类别一个预算；submit() 和 slot() 共享同一预算，
+    因此无论调用嵌套多少层，同一类别的并发数都不会超过上限。
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self._budgets: Dict[str, _Budget] = {name: _Budget(name, limit) for name, limit in limits.items()}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _budget(self, resource: str) -> _Budget:
+        budget = self._budgets.get(resource)
+        if budget is None:
+            with self._lock:
+                budget = self._budgets.setdefault(resource, _Budget(resource, DEFAULT_LIMITS.get(resource, 4)))
+        return budget
+
+    def _held(self) -> Dict[str, int]:
+        held = getattr(self._local, 'held', None)
+        if held is None:
+            held = self._local.held = {}
+        return held
+
+    def init_app(self, app):
+        """从 app.config 读取各类别预算（未配置的类别沿用默认值）"""
+        fallbacks = {
+            ResourceClass.TEXT_LLM: app.config.get('MAX_DESCRIPTION_WORKERS'),
+            ResourceClass.IMAGE_LLM: app.config.get('MAX_IMAGE_WORKERS'),
+        }
+        for resource, key in CONFIG_KEYS.items():
+            limit = app.config.get(key) or fallbacks.get(resource)
+            if limit:
+                self.set_limit(resource, limit)
+        logger.info(f"Concurrency budgets: { {name: b.limit for name, b in self._budgets.items()} }")
+
+    def set_limit(self, resource: str, limit: int):
+        """运行时调整某类别的并发上限"""
+        self._budget(resource).set_limit(limit)
+
+    def get_limit(self, resource: str) -> int:
+        return self._budget(resource).limit
+
+    def holds(self, resource: str) -> bool:
+        """当前线程是否已持有该类别的名额"""
+        return self._held().get(resource, 0) > 0
+
+    @contextmanager
+    def slot(self, resource: str):
+        """
+        在当前线程占用一个名额（可重入）
+
+        Example:
+            with scheduler.slot(ResourceClass.BAIDU_OCR):
+                result = provider.recognize(image_path)
+        """
+        held = self._held()
+        if held.get(resource, 0) > 0:
+            held[resource] += 1
+            try:
+                yield
+            finally:
+                held[resource] -= 1
+            return
+
+        budget = self._budget(resource)
+        budget.acquire()
+        held[resource] = 1
+        try:
+            yield
+        finally:
+            held[resource] = 0
+            budget.release()
+
+    def submit(self, resource: str, fn: Callable, *args, **kwargs) -> Future:
+        """
+        提交工作到某资源类别
+
+        当前线程已持有该类别名额时直接在当前线程执行（返回已完成的 Future），
+        否则放入该类别的线程池，执行前占用一个名额。
+        """
+        if self.holds(resource):
+            future = Future()
+            try:
+                with self.slot(resource):
+                    future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            return future
+
+        def _run():
+            with self.slot(resource):
+                return fn(*args, **kwargs)
+
+        return self._budget(resource).submit(_run)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """各资源类别的预算使用情况"""
+        return {name: budget.stats() for name, budget in self._budgets.items()}
+
+
+# Global scheduler instance
+scheduler = ConcurrencyScheduler()
@@ -0,0 +1,166 @@
+"""
+Context Cache - provider 端的共享前缀缓存（可选，CONTEXT_CACHE_ENABLED）
+
+一次项目生成中，每一页的描述 prompt 都以相同的大段前缀开头：参考文件、原始需求、完整大纲
+（见 prompts.get_page_description_prompt_parts）。provider 支持上下文缓存时（TextProvider.
+supports_context_cache，目前是 GenAI），前缀只注册一次，各页并行调用只发送页面后缀：
+
+    text = context_cache.generate(provider, prompt, prefix, thinking_budget=1000)
+
+- 句柄按 (provider, 模型, 前缀内容) 复用，到期前（CONTEXT_CACHE_TTL）同一项目后续各页、
+  重试和重新生成都直接使用；并发的首次注册只创建一次
+- 前缀短于 CONTEXT_CACHE_MIN_TOKENS（provider 有最小缓存长度）、provider 不支持、
+  注册失败或句柄已失效时，退回发送完整 prompt，结果与不开启时一致
+- 其他错误（限流、网络等）原样抛出并保留句柄：限流时再发完整 prompt 只会加重负载
+- OpenAI 格式的 provider 没有显式接口，但稳定的前缀本身即可命中其自动前缀缓存
+"""
+import re
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from .single_flight import SingleFlight
+from .reference_index import estimate_tokens
+from .ai_providers.rate_limiter import is_rate_limit_error
+
+logger = logging.getLogger(__name__)
+
+# 注册失败后多久内不再尝试（秒）
+FAILURE_BACKOFF = 60
+# 句柄剩余有效期少于该值时不再使用，避免请求途中过期（秒）
+EXPIRY_MARGIN = 30
+
+# provider 报告缓存内容不存在 / 已过期（如 GenAI 的 404 NOT_FOUND、"CachedContent ... expired"）
+_CACHE_GONE_MESSAGE = re.compile(
+    r'cache[^\n]{0,80}?(?:not[ _]found|expired|does not exist|no longer)'
+    r'|(?:not[ _]found|expired|does not exist|no longer)[^\n]{0,80}?cache',
+    re.IGNORECASE
+)
+
+
+def _root_error(error: BaseException) -> BaseException:
+    """tenacity 重试耗尽后抛出 RetryError，取出最后一次尝试的异常"""
+    last_attempt = getattr(error, 'last_attempt', None)
+    if last_attempt is not None and last_attempt.failed:
+        return last_attempt.exception()
+    return error
+
+
+def is_cache_gone_error(error: BaseException) -> bool:
+    """判断异常是否表示 provider 端的缓存句柄已不存在或已过期"""
+    error = _root_error(error)
+    if is_rate_limit_error(error):
+        return False
+    status = getattr(error, 'status_code', None) or getattr(error, 'code', None)
+    if status == 404:
+        return True
+    return bool(_CACHE_GONE_MESSAGE.search(str(error)))
+
+
+class ContextCacheRegistry:
+    """共享前缀 -> provider 端缓存句柄"""
+
+    def __init__(self, enabled: bool = False, ttl: int = 600, min_tokens: int = 2048):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self._lock = threading.Lock()
+        # key -> (句柄或 None（注册失败）, 过期时间)
+        self._handles: Dict[str, Tuple[Optional[str], float]] = {}
+        self._flight = SingleFlight('context cache')
+        self.created = 0
+        self.reused = 0
+        self.fallbacks = 0
+        self.failures = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get('CONTEXT_CACHE_ENABLED', False)
+        self.ttl = int(app.config.get('CONTEXT_CACHE_TTL', self.ttl))
+        self.min_tokens = int(app.config.get('CONTEXT_CACHE_MIN_TOKENS', self.min_tokens))
+
+    @staticmethod
+    def _key(provider: Any, prefix: str) -> str:
+        digest = hashlib.sha256(f"{type(provider).__name__}:{getattr(provider, 'model', '')}:".encode('utf-8'))
+        digest.update(prefix.encode('utf-8'))
+        return digest.hexdigest()
+
+    def generate(self, provider: Any, prompt: str, prefix: str, thinking_budget: int = 1000) -> str:
+        """
+        生成 prompt 的回复；prompt 以 prefix 开头时尽量通过缓存的前缀发送
+        """
+        handle = self.handle_for(provider, prefix) if prompt.startswith(prefix) else None
+        if handle is None:
+            return provider.generate_text(prompt, thinking_budget=thinking_budget)
+        try:
+            return provider.generate_text_with_context(handle, prompt[len(prefix):], thinking_budget=thinking_budget)
+        except Exception as e:
+            # 只有句柄已在 provider 端过期或被删除时才丢弃并按完整 prompt 重试一次；
+            # 限流等其他错误保留句柄原样抛出（provider 已按自己的策略重试过）
+            if not is_cache_gone_error(e):
+                raise
+            logger.warning(f"Context cache {handle} unusable, sending the full prompt: {e}")
+            self._forget(provider, prefix, handle)
+            with self._lock:
+                self.fallbacks += 1
+            return provider.generate_text(prompt, thinking_budget=thinking_budget)
+
+    def handle_for(self, provider: Any, prefix: str) -> Optional[str]:
+        """前缀对应的缓存句柄（必要时注册）；不适用时返回 None"""
+        if not self.enabled or not getattr(provider, 'supports_context_cache', False):
+            return None
+        if estimate_tokens(prefix) < self.min_tokens:
+            return None
+        key = self._key(provider, prefix)
+        with self._lock:
+            entry = self._handles.get(key)
+            if entry is not None and entry[1] - EXPIRY_MARGIN > time.time():
+                if entry[0] is not None:
+                    self.reused += 1
+                return entry[0]
+        return self._flight.do(key, self._create, provider, prefix, key)
+
+    def _create(self, provider: Any, prefix: str, key: str) -> Optional[str]:
+        try:
+            handle = provider.create_context_cache(prefix, self.ttl)
+        except Exception as e:
+            logger.warning(f"Failed to create context cache, falling back to full prompts: {e}")
+            handle = None
+        with self._lock:
+            if handle is None:
+                self.failures += 1
+                self._handles[key] = (None, time.time() + FAILURE_BACKOFF + EXPIRY_MARGIN)
+            else:
+                self.created += 1
+                self._handles[key] = (handle, time.time() + self.ttl)
+                logger.info(f"Registered context cache {handle} (~{estimate_tokens(prefix)} tokens, ttl {self.ttl}s)")
+            self._prune()
+        return handle
+
+    def _forget(self, provider: Any, prefix: str, handle: str):
+        key = self._key(provider, prefix)
+        with self._lock:
+            if self._handles.get(key, (None,))[0] == handle:
+                del self._handles[key]
+
+    def _prune(self):
+        now = time.time()
+        for key in [k for k, (_, expires_at) in self._handles.items() if expires_at <= now]:
+            del self._handles[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.time()
+            return {
+                'enabled': self.enabled,
+                'active': sum(1 for handle, expires_at in self._handles.values() if handle and expires_at > now),
+                'created': self.created,
+                'reused': self.reused,
+                'fallbacks': self.fallbacks,
+                'failures': self.failures,
+            }
+
+
+# Global context cache registry
+context_cache = ContextCacheRegistry()
@@ -519,6 +519,32 @@ class ExportService:
         except Exception as e:
             logger.error(f"Failed to add image element: {str(e)}")
     
+    @staticmethod
+    def _release_element_crops(editable_images: List):
+        """释放这些页面（含递归子图）在 element_crops 中的内存裁剪图"""
+        from services.image_editability.element_crops import element_crops
+        element_crops.release(
+            elem.image_path
+            for editable_img in editable_images
+            for elem in ExportService._iter_elements(editable_img.elements)
+            if elem.image_path
+        )
+
+    @staticmethod
+    def _release_future_crops(future):
+        """页面分析 Future 完成后释放其结果的裁剪图（失败 / 取消的 Future 没有结果）"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        ExportService._release_element_crops([future.result()])
+
+    @staticmethod
+    def _iter_elements(elements: List):
+        """深度优先遍历元素树（含子元素）"""
+        for elem in elements:
+            yield elem
+            if elem.children:
+                yield from ExportService._iter_elements(elem.children)
+    
     @staticmethod
     def _collect_text_elements_for_extraction(
         elements: List,  # List[EditableElement]
@@ -534,6 +560,8 @@ class ExportService:
         Returns:
             元组列表，每个元组为 (element_id, image_path, text_content)
         """
+        from services.image_editability.element_crops import element_crops
+        
         text_items = []
         
         for elem in elements:
@@ -541,7 +569,7 @@ class ExportService:
             
             # 文本类型元素需要提取样式
             if elem_type in ['text', 'title', 'table_cell', 'list', 'paragraph', 'header', 'footer', 'heading', 'table_caption', 'image_caption']:
-                if elem.content and elem.image_path and os.path.exists(elem.image_path):
+                if elem.content and element_crops.exists(elem.image_path):
                     text = elem.content.strip()
                     if text:
                         text_items.append((elem.element_id, elem.image_path, text))
@@ -560,7 +588,8 @@ class ExportService:
     def _batch_extract_text_styles(
         text_items: List[tuple],
         text_attribute_extractor,
-        max_workers: int = 8
+        max_workers: int = 8,
+        cancel_token=None
     ) -> Dict[str, Any]:
         """
         批量并行提取文本样式（逐个裁剪区域分析）
@@ -573,25 +602,33 @@ class ExportService:
         Args:
             text_items: 元组列表，每个元组为 (element_id, image_path, text_content)
             text_attribute_extractor: 文本属性提取器
-            max_workers: 并发数
+            max_workers: 保留参数（并发数由全局调度器的 text_llm 预算控制）
+            cancel_token: 取消令牌（可选），取消后排队中的元素直接跳过
         
         Returns:
             字典，key为element_id，value为TextStyleResult
+        
+        Raises:
+            TaskCancelledError: 任务已被取消
         """
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        from concurrent.futures import as_completed
+        from services.concurrency import scheduler, ResourceClass
+        from services.image_editability.element_crops import element_crops
         
         if not text_items or not text_attribute_extractor:
             return {}
         
-        logger.info(f"并行提取 {len(text_items)} 个文本元素的样式（并发数: {max_workers}）...")
+        logger.info(f"并行提取 {len(text_items)} 个文本元素的样式（并发数: {scheduler.get_limit(ResourceClass.TEXT_LLM)}）...")
         
         results = {}
         
         def extract_single(item):
             element_id, image_path, text_content = item
+            if cancel_token is not None and cancel_token.cancelled:
+                return element_id, None
             try:
                 style = text_attribute_extractor.extract(
-                    image=image_path,
+                    image=element_crops.open(image_path),  # 内存中的裁剪图，不再读回 PNG
                     text_content=text_content
                 )
                 return element_id, style
@@ -599,13 +636,15 @@ class ExportService:
                 logger.warning(f"提取文字样式失败 [{element_id}]: {e}")
                 return element_id, None
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {executor.submit(extract_single, item): item[0] for item in text_items}
-            
-            for future in as_completed(futures):
-                element_id, style = future.result()
-                if style is not None:
-                    results[element_id] = style
+        futures = {scheduler.submit(ResourceClass.TEXT_LLM, extract_single, item): item[0] for item in text_items}
+        
+        for future in as_completed(futures):
+            element_id, style = future.result()
+            if style is not None:
+                results[element_id] = style
+        
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
         
         logger.info(f"✓ 文本样式提取完成，成功 {len(results)}/{len(text_items)} 个")
         return results
@@ -657,7 +696,8 @@ class ExportService:
     def _batch_extract_text_styles_with_full_image(
         editable_images: List,  # List[EditableImage]
         text_attribute_extractor,
-        max_workers: int = 4
+        max_workers: int = 4,
+        cancel_token=None
     ) -> Dict[str, Any]:
         """
         【新逻辑】使用全图批量提取所有文本样式
@@ -670,12 +710,14 @@ class ExportService:
         Args:
             editable_images: EditableImage列表，每个对应一张PPT页面
             text_attribute_extractor: 文本属性提取器（需要有 extract_batch_with_full_image 方法）
-            max_workers: 并发处理页面数
+            max_workers: 保留参数（并发数由全局调度器的 text_llm 预算控制）
+            cancel_token: 取消令牌（可选），取消后排队中的页面直接跳过
         
         Returns:
             字典，key为element_id，value为TextStyleResult
         """
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        from concurrent.futures import as_completed
+        from services.concurrency import scheduler, ResourceClass
         
         if not editable_images or not text_attribute_extractor:
             return {}
@@ -691,7 +733,8 @@ class ExportService:
             return ExportService._batch_extract_text_styles(
                 text_items=all_text_items,
                 text_attribute_extractor=text_attribute_extractor,
-                max_workers=max_workers * 2
+                max_workers=max_workers * 2,
+                cancel_token=cancel_token
             )
         
         logger.info(f"【新逻辑】使用全图批量分析 {len(editable_images)} 页的文本样式...")
@@ -700,6 +743,8 @@ class ExportService:
         
         def process_single_page(editable_img, page_idx):
             """处理单个页面的文本样式提取"""
+            if cancel_token is not None and cancel_token.cancelled:
+                return {}
             try:
                 # 收集该页面的所有文本元素
                 text_elements = ExportService._collect_text_elements_for_batch_extraction(
@@ -728,20 +773,22 @@ class ExportService:
                 logger.error(f"页面 {page_idx + 1} 文本样式提取失败: {e}", exc_info=True)
                 return {}
         
-        # 并发处理所有页面
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {
-                executor.submit(process_single_page, img, idx): idx 
-                for idx, img in enumerate(editable_images)
-            }
-            
-            for future in as_completed(futures):
-                page_idx = futures[future]
-                try:
-                    page_results = future.result()
-                    all_results.update(page_results)
-                except Exception as e:
-                    logger.error(f"页面 {page_idx + 1} 处理失败: {e}")
+        # 并发处理所有页面（共享 text_llm 预算）
+        futures = {
+            scheduler.submit(ResourceClass.TEXT_LLM, process_single_page, img, idx): idx
+            for idx, img in enumerate(editable_images)
+        }
+        
+        for future in as_completed(futures):
+            page_idx = futures[future]
+            try:
+                page_results = future.result()
+                all_results.update(page_results)
+            except Exception as e:
+                logger.error(f"页面 {page_idx + 1} 处理失败: {e}")
+        
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
         
         total_elements = sum(
             len(ExportService._collect_text_elements_for_batch_extraction(img.elements))
@@ -755,7 +802,8 @@ class ExportService:
     def _batch_extract_text_styles_hybrid(
         editable_images: List,  # List[EditableImage]
         text_attribute_extractor,
-        max_workers: int = 8
+        max_workers: int = 8,
+        cancel_token=None
     ) -> Tuple[Dict[str, Any], List[Tuple[str, str]]]:
         """
         【混合策略】结合全局识别和单个裁剪识别的优势
@@ -769,15 +817,18 @@ class ExportService:
         Args:
             editable_images: EditableImage列表，每个对应一张PPT页面
             text_attribute_extractor: 文本属性提取器
-            max_workers: 并发数
+            max_workers: 保留参数（并发数由全局调度器的 text_llm 预算控制）
+            cancel_token: 取消令牌（可选），取消后排队中的识别直接跳过
         
         Returns:
             (results, failed_extractions):
             - results: 字典，key为element_id，value为TextStyleResult（合并后的结果）
             - failed_extractions: 失败列表，每项为 (element_id, error_reason)
         """
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        from concurrent.futures import as_completed
+        from services.concurrency import scheduler, ResourceClass
         from services.image_editability.text_attribute_extractors import TextStyleResult
+        from services.image_editability.element_crops import element_crops
         
         if not editable_images or not text_attribute_extractor:
             return {}, []
@@ -792,7 +843,8 @@ class ExportService:
             results = ExportService._batch_extract_text_styles(
                 text_items=all_text_items,
                 text_attribute_extractor=text_attribute_extractor,
-                max_workers=max_workers
+                max_workers=max_workers,
+                cancel_token=cancel_token
             )
             return results, []  # 回退方法暂不收集失败信息
         
@@ -826,6 +878,8 @@ class ExportService:
         
         def extract_global_for_page(page_idx, page_data):
             """全局识别单页"""
+            if cancel_token is not None and cancel_token.cancelled:
+                return page_idx, {}
             try:
                 results = text_attribute_extractor.extract_batch_with_full_image(
                     full_image=page_data['image_path'],
@@ -842,9 +896,11 @@ class ExportService:
         def extract_local_single(item):
             """单个裁剪识别"""
             element_id, image_path, text_content = item
+            if cancel_token is not None and cancel_token.cancelled:
+                return element_id, None, None
             try:
                 style = text_attribute_extractor.extract(
-                    image=image_path,
+                    image=element_crops.open(image_path),  # 内存中的裁剪图，不再读回 PNG
                     text_content=text_content
                 )
                 # 只要 style 不为 None 就算成功（黑色也是有效颜色）
@@ -859,40 +915,42 @@ class ExportService:
         # 并发执行全局识别和单个裁剪识别
         logger.info(f"  并发执行: 全局识别 {len(page_text_elements)} 页 + 单个识别 {len(all_text_items)} 个元素...")
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # 提交全局识别任务
-            global_futures = {
-                executor.submit(extract_global_for_page, idx, data): ('global', idx)
-                for idx, data in page_text_elements.items()
-            }
-            
-            # 提交单个裁剪识别任务
-            local_futures = {
-                executor.submit(extract_local_single, item): ('local', item[0])
-                for item in all_text_items
-            }
-            
-            # 收集全局识别结果
-            for future in as_completed(global_futures):
-                task_type, page_idx = global_futures[future]
-                try:
-                    _, page_results = future.result()
-                    global_results.update(page_results)
-                except Exception as e:
-                    logger.error(f"全局识别任务失败: {e}")
-            
-            # 收集单个裁剪识别结果
-            for future in as_completed(local_futures):
-                task_type, element_id = local_futures[future]
-                try:
-                    elem_id, style, error = future.result()
-                    if style is not None:
-                        local_results[elem_id] = style
-                    if error:
-                        failed_extractions.append((elem_id, error))
-                except Exception as e:
-                    logger.error(f"单个识别任务失败: {e}")
-                    failed_extractions.append((element_id, str(e)))
+        # 提交全局识别任务（共享 text_llm 预算）
+        global_futures = {
+            scheduler.submit(ResourceClass.TEXT_LLM, extract_global_for_page, idx, data): ('global', idx)
+            for idx, data in page_text_elements.items()
+        }
+        
+        # 提交单个裁剪识别任务
+        local_futures = {
+            scheduler.submit(ResourceClass.TEXT_LLM, extract_local_single, item): ('local', item[0])
+            for item in all_text_items
+        }
+        
+        # 收集全局识别结果
+        for future in as_completed(global_futures):
+            task_type, page_idx = global_futures[future]
+            try:
+                _, page_results = future.result()
+                global_results.update(page_results)
+            except Exception as e:
+                logger.error(f"全局识别任务失败: {e}")
+        
+        # 收集单个裁剪识别结果
+        for future in as_completed(local_futures):
+            task_type, element_id = local_futures[future]
+            try:
+                elem_id, style, error = future.result()
+                if style is not None:
+                    local_results[elem_id] = style
+                if error:
+                    failed_extractions.append((elem_id, error))
+            except Exception as e:
+                logger.error(f"单个识别任务失败: {e}")
+                failed_extractions.append((element_id, str(e)))
+        
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
         
         # Step 3: 合并结果
         # 优先使用全局识别的布局属性，使用单个识别的颜色属性
@@ -943,7 +1001,8 @@ class ExportService:
         text_attribute_extractor = None,  # 可选：文字属性提取器，用于提取颜色、粗体、斜体等样式
         progress_callback = None,  # 可选：进度回调函数 (step, message, percent) -> None
         export_extractor_method: str = 'hybrid',  # 组件提取方法: mineru, hybrid
-        export_inpaint_method: str = 'hybrid'  # 背景修复方法: generative, baidu, hybrid
+        export_inpaint_method: str = 'hybrid',  # 背景修复方法: generative, baidu, hybrid
+        cancel_token = None  # 可选：取消令牌，在版面分析 -> 样式提取 -> 构建PPTX 之间检查
     ) -> Tuple[Optional[bytes], ExportWarnings]:
         """
         使用递归图片可编辑化服务创建可编辑PPTX
@@ -962,17 +1021,21 @@ class ExportService:
             slide_width_pixels: 目标幻灯片宽度
             slide_height_pixels: 目标幻灯片高度
             max_depth: 最大递归深度
-            max_workers: 并发处理数
+            max_workers: 保留参数（并发数由全局调度器控制，见 services/concurrency.py）
             editable_images: 已分析的EditableImage列表（可选，与image_paths二选一）
             text_attribute_extractor: 文字属性提取器（可选），用于提取文字颜色、粗体、斜体等样式
                 可通过 TextAttributeExtractorFactory.create_caption_model_extractor() 创建
             export_extractor_method: 组件提取方法 ('mineru' 或 'hybrid'，默认 'hybrid')
             export_inpaint_method: 背景修复方法 ('generative', 'baidu', 'hybrid'，默认 'hybrid')
+            cancel_token: 取消令牌（可选），取消后排队中的页面不再分析，正在分析的页面在下一阶段停止
         
         Returns:
             (pptx_bytes, warnings): 元组，包含 PPTX 字节流和警告信息
             - pptx_bytes: PPTX 文件字节流（如果 output_file 为 None），否则为 None
             - warnings: ExportWarnings 对象，包含所有警告信息
+        
+        Raises:
+            TaskCancelledError: 任务已被取消
         """
         from services.image_editability import ServiceConfig, ImageEditabilityService
         from utils.pptx_builder import PPTXBuilder
@@ -989,39 +1052,52 @@ class ExportService:
                 except Exception as e:
                     logger.warning(f"进度回调失败: {e}")
         
-        # 如果已提供分析结果，直接使用；否则需要分析
-        if editable_images is not None:
-            logger.info(f"使用已提供的 {len(editable_images)} 个分析结果创建PPTX")
-            report_progress("准备", f"使用已有分析结果（{len(editable_images)} 页）", 10)
-        else:
-            if not image_paths:
-                raise ValueError("必须提供 image_paths 或 editable_images 之一")
+        # 分析 / 构建过程中登记的内存裁剪图在 finally 中释放（含失败、取消和提前返回）
+        futures = {}
+        results = []
+        try:
+            # 如果已提供分析结果，直接使用；否则需要分析
+            if editable_images is not None:
+                logger.info(f"使用已提供的 {len(editable_images)} 个分析结果创建PPTX")
+                report_progress("准备", f"使用已有分析结果（{len(editable_images)} 页）", 10)
+            else:
+                if not image_paths:
+                    raise ValueError("必须提供 image_paths 或 editable_images 之一")
             
-            total_pages = len(image_paths)
-            logger.info(f"开始使用递归分析方法创建可编辑PPTX，共 {total_pages} 页")
-            report_progress("开始", f"准备分析 {total_pages} 页幻灯片...", 0)
+                total_pages = len(image_paths)
+                logger.info(f"开始使用递归分析方法创建可编辑PPTX，共 {total_pages} 页")
+                report_progress("开始", f"准备分析 {total_pages} 页幻灯片...", 0)
             
-            # 1. 创建ImageEditabilityService（配置自动从 Flask config 获取，使用项目导出设置）
-            logger.info(f"使用导出设置: extractor={export_extractor_method}, inpaint={export_inpaint_method}")
-            config = ServiceConfig.from_defaults(
-                max_depth=max_depth,
-                extractor_method=export_extractor_method,
-                inpaint_method=export_inpaint_method
-            )
-            editability_service = ImageEditabilityService(config)
+                # 1. 创建ImageEditabilityService（配置自动从 Flask config 获取，使用项目导出设置）
+                logger.info(f"使用导出设置: extractor={export_extractor_method}, inpaint={export_inpaint_method}")
+                config = ServiceConfig.from_defaults(
+                    max_depth=max_depth,
+                    extractor_method=export_extractor_method,
+                    inpaint_method=export_inpaint_method
+                )
+                editability_service = ImageEditabilityService(config)
             
-            # 2. 并发处理所有页面，生成EditableImage结构
-            report_progress("版面分析", f"开始分析 {total_pages} 张图片（并发数: {max_workers}）...", 5)
-            from concurrent.futures import ThreadPoolExecutor, as_completed
+                # 2. 并发处理所有页面，生成EditableImage结构
+                from concurrent.futures import as_completed
+                from services.concurrency import scheduler, ResourceClass
+                # 整套幻灯片一次提交版面分析（MinerU 多页批量），之后逐页分析直接复用结果
+                if total_pages > 1:
+                    report_progress("版面分析", f"批量提交 {total_pages} 页进行版面识别...", 3)
+                    editability_service.prefetch(image_paths)
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+                report_progress("版面分析", f"开始分析 {total_pages} 张图片（并发数: {scheduler.get_limit(ResourceClass.LOCAL_CPU)}）...", 5)
             
-            editable_images = []
-            completed_count = 0
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # 页面级编排占用 local_cpu 预算；MinerU / OCR / 修复调用各自占用对应类别的预算
+                completed_count = 0
                 futures = {
-                    executor.submit(editability_service.make_image_editable, img_path): idx
+                    scheduler.submit(
+                        ResourceClass.LOCAL_CPU, editability_service.make_image_editable, img_path,
+                        cancel_token=cancel_token
+                    ): idx
                     for idx, img_path in enumerate(image_paths)
                 }
-                
+            
                 results = [None] * len(image_paths)
                 for future in as_completed(futures):
                     idx = futures[future]
@@ -1033,107 +1109,123 @@ class ExportService:
                         report_progress("版面分析", f"已完成第 {completed_count}/{total_pages} 页的版面分析", percent)
                     except Exception as e:
                         logger.error(f"处理图片 {image_paths[idx]} 失败: {e}")
+                        for pending in futures:
+                            pending.cancel()
                         raise
-                
+            
                 editable_images = results
         
-        # 2.5. 使用混合策略提取所有文本元素的样式（如果提供了提取器）
-        # 混合策略：全局识别（粗体/斜体/下划线/对齐）+ 单个裁剪识别（颜色）
-        text_styles_cache = {}
-        if text_attribute_extractor:
-            report_progress("样式提取", "开始提取文本样式（混合策略）...", 45)
-            
-            # 统计文本元素数量
-            total_text_count = sum(
-                len(ExportService._collect_text_elements_for_extraction(img.elements))
-                for img in editable_images
-            )
+            # 2.5. 使用混合策略提取所有文本元素的样式（如果提供了提取器）
+            # 混合策略：全局识别（粗体/斜体/下划线/对齐）+ 单个裁剪识别（颜色）
+            text_styles_cache = {}
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            if text_attribute_extractor:
+                report_progress("样式提取", "开始提取文本样式（混合策略）...", 45)
             
-            if total_text_count > 0:
-                report_progress("样式提取", f"混合策略分析 {total_text_count} 个文本元素...", 50)
-                text_styles_cache, failed_extractions = ExportService._batch_extract_text_styles_hybrid(
-                    editable_images=editable_images,
-                    text_attribute_extractor=text_attribute_extractor,
-                    max_workers=max_workers * 2
+                # 统计文本元素数量
+                total_text_count = sum(
+                    len(ExportService._collect_text_elements_for_extraction(img.elements))
+                    for img in editable_images
                 )
+            
+                if total_text_count > 0:
+                    report_progress("样式提取", f"混合策略分析 {total_text_count} 个文本元素...", 50)
+                    text_styles_cache, failed_extractions = ExportService._batch_extract_text_styles_hybrid(
+                        editable_images=editable_images,
+                        text_attribute_extractor=text_attribute_extractor,
+                        max_workers=max_workers * 2,
+                        cancel_token=cancel_token
+                    )
                 
-                # 记录样式提取失败的元素（详细）
-                for element_id, reason in failed_extractions:
-                    warnings.add_style_extraction_failed(element_id, reason)
+                    # 记录样式提取失败的元素（详细）
+                    for element_id, reason in failed_extractions:
+                        warnings.add_style_extraction_failed(element_id, reason)
                 
-                # 记录汇总信息
-                extracted_count = len(text_styles_cache)
-                failed_count = len(failed_extractions)
-                if failed_count > 0:
-                    logger.warning(f"样式提取: {failed_count}/{total_text_count} 个元素失败")
+                    # 记录汇总信息
+                    extracted_count = len(text_styles_cache)
+                    failed_count = len(failed_extractions)
+                    if failed_count > 0:
+                        logger.warning(f"样式提取: {failed_count}/{total_text_count} 个元素失败")
                 
-                report_progress("样式提取", f"✓ 完成 {extracted_count}/{total_text_count} 个文本样式提取（{failed_count} 个失败）", 70)
-        
-        report_progress("构建PPTX", "开始构建可编辑PPTX文件...", 75)
-        
-        # 4. 创建PPTX构建器
-        builder = PPTXBuilder()
-        builder.create_presentation()
-        builder.setup_presentation_size(slide_width_pixels, slide_height_pixels)
-        
-        # 5. 为每个页面构建幻灯片
-        total_pages = len(editable_images)
-        for page_idx, editable_img in enumerate(editable_images):
-            # 构建PPTX占 75% - 95% 的进度
-            percent = 75 + int(20 * page_idx / total_pages)
-            report_progress("构建PPTX", f"构建第 {page_idx + 1}/{total_pages} 页...", percent)
-            logger.info(f"  构建第 {page_idx + 1}/{total_pages} 页...")
+                    report_progress("样式提取", f"✓ 完成 {extracted_count}/{total_text_count} 个文本样式提取（{failed_count} 个失败）", 70)
+        
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            report_progress("构建PPTX", "开始构建可编辑PPTX文件...", 75)
+        
+            # 4. 创建PPTX构建器
+            builder = PPTXBuilder()
+            builder.create_presentation()
+            builder.setup_presentation_size(slide_width_pixels, slide_height_pixels)
+        
+            # 5. 为每个页面构建幻灯片
+            total_pages = len(editable_images)
+            for page_idx, editable_img in enumerate(editable_images):
+                # 构建PPTX占 75% - 95% 的进度
+                percent = 75 + int(20 * page_idx / total_pages)
+                report_progress("构建PPTX", f"构建第 {page_idx + 1}/{total_pages} 页...", percent)
+                logger.info(f"  构建第 {page_idx + 1}/{total_pages} 页...")
             
-            # 创建空白幻灯片
-            slide = builder.add_blank_slide()
+                # 创建空白幻灯片
+                slide = builder.add_blank_slide()
             
-            # 添加背景图（参考原实现，使用slide.shapes.add_picture）
-            if editable_img.clean_background and os.path.exists(editable_img.clean_background):
-                logger.info(f"    添加clean background: {editable_img.clean_background}")
-                try:
-                    slide.shapes.add_picture(
-                        editable_img.clean_background,
-                        left=0,
-                        top=0,
-                        width=builder.prs.slide_width,
-                        height=builder.prs.slide_height
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to add background: {e}")
-            else:
-                # 回退到原图
-                logger.info(f"    使用原图作为背景: {editable_img.image_path}")
-                try:
-                    slide.shapes.add_picture(
-                        editable_img.image_path,
-                        left=0,
-                        top=0,
-                        width=builder.prs.slide_width,
-                        height=builder.prs.slide_height
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to add background: {e}")
+                # 添加背景图（参考原实现，使用slide.shapes.add_picture）
+                if editable_img.clean_background and os.path.exists(editable_img.clean_background):
+                    logger.info(f"    添加clean background: {editable_img.clean_background}")
+                    try:
+                        slide.shapes.add_picture(
+                            editable_img.clean_background,
+                            left=0,
+                            top=0,
+                            width=builder.prs.slide_width,
+                            height=builder.prs.slide_height
+                        )
+                    except Exception as e:
+                        logger.error(f"Failed to add background: {e}")
+                else:
+                    # 回退到原图
+                    logger.info(f"    使用原图作为背景: {editable_img.image_path}")
+                    try:
+                        slide.shapes.add_picture(
+                            editable_img.image_path,
+                            left=0,
+                            top=0,
+                            width=builder.prs.slide_width,
+                            height=builder.prs.slide_height
+                        )
+                    except Exception as e:
+                        logger.error(f"Failed to add background: {e}")
             
-            # 添加所有元素（递归地）
-            # 计算缩放比例：将原始图片坐标映射到统一的幻灯片坐标
-            # 背景图已经缩放到幻灯片尺寸，所以元素坐标也需要相应缩放
-            scale_x = slide_width_pixels / editable_img.width
-            scale_y = slide_height_pixels / editable_img.height
-            logger.info(f"    元素数量: {len(editable_img.elements)}, 图片尺寸: {editable_img.width}x{editable_img.height}, "
-                       f"幻灯片尺寸: {slide_width_pixels}x{slide_height_pixels}, 缩放比例: {scale_x:.3f}x{scale_y:.3f}")
+                # 添加所有元素（递归地）
+                # 计算缩放比例：将原始图片坐标映射到统一的幻灯片坐标
+                # 背景图已经缩放到幻灯片尺寸，所以元素坐标也需要相应缩放
+                scale_x = slide_width_pixels / editable_img.width
+                scale_y = slide_height_pixels / editable_img.height
+                logger.info(f"    元素数量: {len(editable_img.elements)}, 图片尺寸: {editable_img.width}x{editable_img.height}, "
+                           f"幻灯片尺寸: {slide_width_pixels}x{slide_height_pixels}, 缩放比例: {scale_x:.3f}x{scale_y:.3f}")
             
-            ExportService._add_editable_elements_to_slide(
-                builder=builder,
-                slide=slide,
-                elements=editable_img.elements,
-                scale_x=scale_x,
-                scale_y=scale_y,
-                depth=0,
-                text_styles_cache=text_styles_cache,  # 使用预提取的样式缓存
-                warnings=warnings  # 收集警告
-            )
+                ExportService._add_editable_elements_to_slide(
+                    builder=builder,
+                    slide=slide,
+                    elements=editable_img.elements,
+                    scale_x=scale_x,
+                    scale_y=scale_y,
+                    depth=0,
+                    text_styles_cache=text_styles_cache,  # 使用预提取的样式缓存
+                    warnings=warnings  # 收集警告
+                )
             
-            logger.info(f"    ✓ 第 {page_idx + 1} 页完成，添加了 {len(editable_img.elements)} 个元素")
+                logger.info(f"    ✓ 第 {page_idx + 1} 页完成，添加了 {len(editable_img.elements)} 个元素")
+        finally:
+            # 元素图片已插入PPTX（或导出已中止），释放内存中的裁剪图
+            ExportService._release_element_crops(
+                editable_images if editable_images is not None else [r for r in results if r is not None]
+            )
+            # 导出中止时仍在分析的页面，分析结束后再释放它们的裁剪图
+            for future in futures:
+                if not future.done():
+                    future.add_done_callback(ExportService._release_future_crops)
         
         # 5. 保存或返回字节流
         report_progress("保存文件", "正在保存PPTX文件...", 95)
@@ -1184,6 +1276,8 @@ class ExportService:
         Note:
             elem.image_path 现在是绝对路径，无需额外的目录参数
         """
+        from services.image_editability.element_crops import element_crops
+        
         if text_styles_cache is None:
             text_styles_cache = {}
         
@@ -1290,11 +1384,11 @@ class ExportService:
                 else:
                     # 没有子元素，添加整体表格图片
                     # elem.image_path 现在是绝对路径
-                    if elem.image_path and os.path.exists(elem.image_path):
+                    if element_crops.exists(elem.image_path):
                         try:
                             builder.add_image_element(
                                 slide=slide,
-                                image_path=elem.image_path,
+                                image_path=element_crops.materialize(elem.image_path),
                                 bbox=bbox_list
                             )
                         except Exception as e:
@@ -1354,11 +1448,11 @@ class ExportService:
                 else:
                     # 没有子元素或子元素占比过大，直接添加原图
                     # elem.image_path 现在是绝对路径
-                    if elem.image_path and os.path.exists(elem.image_path):
+                    if element_crops.exists(elem.image_path):
                         try:
                             builder.add_image_element(
                                 slide=slide,
-                                image_path=elem.image_path,
+                                image_path=element_crops.materialize(elem.image_path),
                                 bbox=bbox_list
                             )
                         except Exception as e:
@@ -10,10 +10,14 @@ import io
 import base64
 import requests
 from typing import Optional, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed
 from PIL import Image
 from markitdown import MarkItDown
 
+from services.concurrency import scheduler, ResourceClass
+from services.ai_providers.rate_limiter import rate_limiter
+from services.http_sessions import http_sessions
+
 logger = logging.getLogger(__name__)
 
 
@@ -288,7 +292,8 @@ class FileParserService:
         }
         
         try:
-            response = requests.post(
+            rate_limiter.acquire('mineru', self.mineru_token)
+            response = http_sessions.get(ResourceClass.MINERU).post(
                 self.get_upload_url_api,
                 headers=headers,
                 json=upload_data,
@@ -315,7 +320,7 @@ class FileParserService:
         """Upload file to MinerU"""
         try:
             with open(file_path, 'rb') as f:
-                response = requests.put(
+                response = http_sessions.get(ResourceClass.MINERU).put(
                     upload_url,
                     data=f,
                     headers={"Authorization": None},  # Remove auth for upload
@@ -354,7 +359,8 @@ class FileParserService:
                 return None, None, error_msg
             
             try:
-                response = requests.get(result_url, headers=headers, timeout=30)
+                rate_limiter.acquire('mineru', self.mineru_token)
+                response = http_sessions.get(ResourceClass.MINERU).get(result_url, headers=headers, timeout=30)
                 response.raise_for_status()
                 task_info = response.json()
                 
@@ -390,7 +396,7 @@ class FileParserService:
             Tuple of (markdown_content, extract_id, error_message)
         """
         try:
-            response = requests.get(zip_url, timeout=60)
+            response = http_sessions.get(ResourceClass.MINERU).get(zip_url, timeout=60)
             response.raise_for_status()
             
             # Generate unique directory name for this extraction
@@ -569,7 +575,7 @@ class FileParserService:
         
         Args:
             image_urls: List of image URLs
-            max_workers: Maximum number of parallel workers
+            max_workers: Kept for compatibility (concurrency is bounded by the global text_llm budget)
             max_retries: Maximum number of retries for each image
             
         Returns:
@@ -598,22 +604,22 @@ class FileParserService:
             logger.error(f"Failed to generate caption for image {idx + 1} after {max_retries} attempts")
             return (idx, "", False)
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_idx = {
-                executor.submit(generate_with_retry, url, idx): idx
-                for idx, url in enumerate(image_urls)
-            }
-            
-            for future in as_completed(future_to_idx):
-                try:
-                    idx, caption, success = future.result()
-                    captions[idx] = caption
-                    if not success:
-                        failed_count += 1
-                except Exception as e:
-                    idx = future_to_idx[future]
-                    logger.error(f"Unexpected error generating caption for image {idx + 1}: {str(e)}")
+        # 图片描述属于 text LLM 调用，共享全局 text_llm 并发预算
+        future_to_idx = {
+            scheduler.submit(ResourceClass.TEXT_LLM, generate_with_retry, url, idx): idx
+            for idx, url in enumerate(image_urls)
+        }
+        
+        for future in as_completed(future_to_idx):
+            try:
+                idx, caption, success = future.result()
+                captions[idx] = caption
+                if not success:
                     failed_count += 1
+            except Exception as e:
+                idx = future_to_idx[future]
+                logger.error(f"Unexpected error generating caption for image {idx + 1}: {str(e)}")
+                failed_count += 1
         
         return captions, failed_count
     
@@ -631,7 +637,7 @@ class FileParserService:
             # Load image based on URL type
             if image_url.startswith('http://') or image_url.startswith('https://'):
                 # Download from HTTP(S) URL
-                response = requests.get(image_url, timeout=30)
+                response = http_sessions.get(ResourceClass.NETWORK_IO).get(image_url, timeout=30)
                 response.raise_for_status()
                 image = Image.open(io.BytesIO(response.content))
             elif image_url.startswith('/files/mineru/'):
@@ -668,19 +674,20 @@ class FileParserService:
                 image.save(buffered, format="JPEG", quality=95)
                 base64_image = base64.b64encode(buffered.getvalue()).decode('utf-8')
                 
-                response = client.chat.completions.create(
-                    model=self.image_caption_model,
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}},
-                                {"type": "text", "text": prompt}
-                            ]
-                        }
-                    ],
-                    temperature=0.3
-                )
+                with rate_limiter.limit('openai', self._openai_api_key):
+                    response = client.chat.completions.create(
+                        model=self.image_caption_model,
+                        messages=[
+                            {
+                                "role": "user",
+                                "content": [
+                                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}},
+                                    {"type": "text", "text": prompt}
+                                ]
+                            }
+                        ],
+                        temperature=0.3
+                    )
                 caption = response.choices[0].message.content.strip()
             else:
                 # Use Gemini SDK format (default)
@@ -690,13 +697,14 @@ class FileParserService:
                     logger.warning("Gemini client not initialized, skipping caption generation")
                     return ""
                 
-                result = client.models.generate_content(
-                    model=self.image_caption_model,
-                    contents=[image, prompt],
-                    config=types.GenerateContentConfig(
-                        temperature=0.3,  # Lower temperature for more consistent captions
+                with rate_limiter.limit('genai', self._google_api_key):
+                    result = client.models.generate_content(
+                        model=self.image_caption_model,
+                        contents=[image, prompt],
+                        config=types.GenerateContentConfig(
+                            temperature=0.3,  # Lower temperature for more consistent captions
+                        )
                     )
-                )
                 caption = result.text.strip()
             
             return caption
@@ -2,6 +2,7 @@
 File Service - handles all file operations
 """
 import os
+import shutil
 import uuid
 from pathlib import Path
 from typing import Optional
@@ -9,6 +10,7 @@ from werkzeug.utils import secure_filename
 from PIL import Image
 from models import Project
 from models import db
+from services.reference_images import VARIANT_DIR
 
 
 class FileService:
@@ -209,6 +211,8 @@ class FileService:
         for file in template_dir.iterdir():
             if file.is_file():
                 file.unlink()
+        # 缩小后的参考图版本（见 services/reference_images.py）
+        shutil.rmtree(template_dir / VARIANT_DIR, ignore_errors=True)
         
         return True
     
@@ -0,0 +1,107 @@
+"""
+HTTP Sessions - 基于 requests 的 provider 共享连接池
+
+百度修复 / OCR、MinerU（上传、轮询、下载）、参考图下载等以前都直接调用模块级
+requests.get / post，每次调用都重新建立 TCP + TLS 连接，MinerU 每 2 秒一次的轮询也不例外。
+
+现在每个资源类别共享一个 keep-alive 的 Session：
+
+    from services.http_sessions import http_sessions
+    from services.concurrency import ResourceClass
+
+    response = http_sessions.get(ResourceClass.MINERU).get(url, timeout=30)
+
+- 每个 host 的连接池大小与该类别的并发预算一致（见 services/concurrency.py），
+  并发请求不会因为池太小而反复建连 / 丢弃连接
+- 连接建立失败（DNS、拒绝连接、TLS 握手超时）按 HTTP_CONNECT_RETRIES 自动重试；
+  请求已发出后的读取错误不重试，避免重复提交非幂等的 POST
+- stats() 按 host 汇报连接池的建连数、请求数和空闲连接数
+"""
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class HttpSessionRegistry:
+    """资源类别 -> 共享 requests.Session"""
+
+    def __init__(self, connect_retries: int = 3, backoff_factor: float = 0.5):
+        self.connect_retries = connect_retries
+        self.backoff_factor = backoff_factor
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._adapters: Dict[str, HTTPAdapter] = {}
+
+    def init_app(self, app):
+        self.connect_retries = int(app.config.get('HTTP_CONNECT_RETRIES', self.connect_retries))
+        self.backoff_factor = float(app.config.get('HTTP_RETRY_BACKOFF', self.backoff_factor))
+        with self._lock:
+            # 配置变化后按新参数重建（旧 Session 上进行中的请求照常完成）
+            self._sessions.clear()
+            self._adapters.clear()
+
+    def get(self, resource: str) -> requests.Session:
+        """该资源类别的共享 Session（首次使用时创建）"""
+        session = self._sessions.get(resource)
+        if session is not None:
+            return session
+        with self._lock:
+            session = self._sessions.get(resource)
+            if session is None:
+                adapter = self.make_adapter(resource)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._sessions[resource] = session
+                self._adapters[resource] = adapter
+            return session
+
+    def make_adapter(self, resource: str) -> HTTPAdapter:
+        """按资源类别的并发预算创建连接池适配器（第三方 SDK 自带的 Session 也可以挂载）"""
+        from services.concurrency import scheduler
+
+        pool_size = max(1, scheduler.get_limit(resource))
+        retry = Retry(
+            total=None,
+            connect=self.connect_retries,
+            read=0,
+            status=0,
+            other=0,
+            backoff_factor=self.backoff_factor,
+            raise_on_status=False,
+        )
+        return HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    def stats(self) -> Dict[str, Any]:
+        """按资源类别和 host 汇总连接池状态"""
+        with self._lock:
+            adapters = dict(self._adapters)
+        return {resource: self._adapter_stats(adapter) for resource, adapter in adapters.items()}
+
+    @staticmethod
+    def _adapter_stats(adapter: HTTPAdapter) -> Dict[str, Dict[str, Optional[int]]]:
+        hosts = {}
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = f"{key.key_scheme}://{key.key_host}:{key.key_port}"
+            idle = pool.pool.qsize() if pool.pool is not None else None
+            hosts[host] = {
+                'connections_created': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle': idle,
+                'maxsize': adapter._pool_maxsize,
+            }
+        return hosts
+
+
+# Global HTTP session registry
+http_sessions = HttpSessionRegistry()
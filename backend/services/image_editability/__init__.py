@@ -25,15 +25,13 @@ Example:
     >>> # 串行处理
     >>> result = service.make_image_editable("image.png")
     >>> 
-    >>> # 并行处理（推荐）
-    >>> from concurrent.futures import ThreadPoolExecutor, as_completed
+    >>> # 并行处理（推荐，使用全局并发调度器）
+    >>> from services.concurrency import scheduler, ResourceClass
     >>> 
     >>> images = ["img1.png", "img2.png", "img3.png"]
-    >>> with ThreadPoolExecutor(max_workers=4) as executor:
-    ...     futures = {executor.submit(service.make_image_editable, img): img 
-    ...                for img in images}
-    ...     results = {images[i]: future.result() 
-    ...                for i, future in enumerate(as_completed(futures))}
+    >>> futures = {img: scheduler.submit(ResourceClass.LOCAL_CPU, service.make_image_editable, img)
+    ...            for img in images}
+    >>> results = {img: future.result() for img, future in futures.items()}
 """
 
 # 数据模型
@@ -87,6 +85,15 @@ from .factories import (
 # 主服务
 from .service import ImageEditabilityService
 
+# 分析结果缓存
+from .analysis_cache import EditableAnalysisCache, editable_analysis_cache
+
+# 元素裁剪图（内存 + 后台写入）
+from .element_crops import ElementCropStore, element_crops
+
+# 空间索引（bbox 批量包含 / 相交查询）
+from .spatial_index import SpatialIndex
+
 __all__ = [
     # 数据模型
     'BBox',
@@ -123,5 +130,13 @@ __all__ = [
     'ServiceConfig',
     # 主服务
     'ImageEditabilityService',
+    # 分析结果缓存
+    'EditableAnalysisCache',
+    'editable_analysis_cache',
+    # 元素裁剪图
+    'ElementCropStore',
+    'element_crops',
+    # 空间索引
+    'SpatialIndex',
 ]
 
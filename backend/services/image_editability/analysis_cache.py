@@ -0,0 +1,270 @@
+"""
+分析结果缓存 - 可编辑 PPTX 导出的版面分析结果持久化
+
+每次导出可编辑 PPTX，每一页都要重新上传 MinerU、调用百度 OCR、重绘背景并递归分析子图，
+即使页面图片自上次导出后没有任何变化。现在整页的分析结果按内容寻址保存：
+
+    key = 页面图片内容哈希 + 提取器 / 重绘方法 / 递归参数（ServiceConfig.analysis_settings）
+
+缓存条目是 UPLOAD_FOLDER/cache/editable/<key[:2]>/<key>/ 目录，包含 EditableImage 树（tree.json）
+以及它引用的元素裁剪图和 clean background 副本。重新导出时未变化的页面直接读取，
+只有变化的页面重新分析。超过 EDITABLE_CACHE_MAX_MB 时淘汰最久未使用的条目；
+最近 EVICTION_MIN_AGE 秒内读取过的条目不淘汰（导出仍在从中 add_picture）。
+
+只缓存完整的分析结果：提取失败（没有任何元素）、背景重绘失败或子图分析出错的页面不写入，
+下次导出会重新分析。
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .data_models import EditableImage
+from .element_crops import element_crops
+
+logger = logging.getLogger(__name__)
+
+# 缓存格式变化时递增，旧条目自然失效
+CACHE_VERSION = 1
+
+TREE_FILE = 'tree.json'
+FILES_DIR = 'files'
+
+# 条目被读取后至少保留多久（秒）：load() 返回的路径指向条目内部，导出构建 PPTX 期间不能删除
+EVICTION_MIN_AGE = 15 * 60
+
+# EditableImage / EditableElement 中引用本地文件的字段
+_PATH_FIELDS = ('image_path', 'inpainted_background_path', 'clean_background')
+
+# 子图分析出错 / 结果不完整时 ImageEditabilityService 写入元素 metadata 的标记
+ERROR_MARKERS = ('analysis_error', 'analysis_incomplete')
+
+
+def _hash_file(path: str, digest) -> None:
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+
+
+class EditableAnalysisCache:
+    """页面图片 -> 完整的 EditableImage 分析结果"""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 2048 * 1024 * 1024, enabled: bool = True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled and directory is not None
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.skipped = 0
+        self.evictions = 0
+
+    def init_app(self, app):
+        self.directory = os.path.join(app.config['UPLOAD_FOLDER'], 'cache', 'editable')
+        self.max_bytes = int(float(app.config.get('EDITABLE_CACHE_MAX_MB', 2048)) * 1024 * 1024)
+        self.enabled = app.config.get('EDITABLE_CACHE_ENABLED', True)
+        with self._lock:
+            self._total_bytes = None
+
+    @staticmethod
+    def make_key(image_path: str, settings: Dict[str, Any]) -> str:
+        digest = hashlib.sha256(f"v{CACHE_VERSION}:".encode('utf-8'))
+        digest.update(json.dumps(settings, sort_keys=True, default=str).encode('utf-8'))
+        _hash_file(image_path, digest)
+        return digest.hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def load(self, key: str, image_path: str) -> Optional[EditableImage]:
+        """读取缓存的分析结果；引用的文件缺失时视为未命中"""
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry_dir, TREE_FILE), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            self._count('misses')
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable editable analysis cache entry {entry_dir}: {e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            self._count('misses')
+            return None
+
+        # 先刷新使用时间，再校验文件：并发导出的淘汰不会删除正在被读取的条目
+        try:
+            os.utime(os.path.join(entry_dir, TREE_FILE))
+        except OSError:
+            pass
+
+        paths = []
+
+        def resolve(rel: str) -> str:
+            path = os.path.join(entry_dir, rel)
+            paths.append(path)
+            return path
+
+        self._walk_paths(data, resolve)
+        if not all(os.path.exists(path) for path in paths):
+            logger.warning(f"Editable analysis cache entry {key[:12]} is missing files, re-analyzing")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            self._count('misses')
+            return None
+
+        data['image_path'] = image_path
+        editable = EditableImage.from_dict(data)
+        self._count('hits')
+        return editable
+
+    def contains(self, key: str) -> bool:
+        """是否已有该 key 的条目（不校验引用的文件，也不计入命中统计）"""
+        return self.enabled and os.path.exists(os.path.join(self._entry_dir(key), TREE_FILE))
+
+    def save(self, key: str, editable: EditableImage):
+        """保存完整的分析结果（连同引用的图片副本）；不完整的结果跳过"""
+        if not self.is_complete(editable):
+            self._count('skipped')
+            return
+        entry_dir = self._entry_dir(key)
+        if os.path.exists(entry_dir):
+            return
+        tmp_dir = f"{entry_dir}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.join(tmp_dir, FILES_DIR), exist_ok=True)
+            data = editable.to_dict()
+            # 源图片就是调用方传入的页面图片，读取时替换为当时的路径
+            data['image_path'] = None
+            copied: Dict[str, str] = {}
+            writes = []
+
+            def store(path: str) -> str:
+                # 同一文件只复制一次（子图背景等可能被多处引用）；
+                # 还在内存中的元素裁剪图交给后台写入线程直接编码到条目中
+                if path not in copied:
+                    rel = os.path.join(FILES_DIR, f"{len(copied)}{Path(path).suffix or '.png'}")
+                    writes.append(element_crops.write_copy(path, os.path.join(tmp_dir, rel)))
+                    copied[path] = rel
+                return copied[path]
+
+            self._walk_paths(data, store)
+            for write in writes:
+                write.result()
+            with open(os.path.join(tmp_dir, TREE_FILE), 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            size = self._dir_size(tmp_dir)
+            os.replace(tmp_dir, entry_dir)
+        except OSError as e:
+            # 目标已存在（其他线程 / 进程同时写入了同一页）或复制失败：不影响导出
+            logger.debug(f"Skipped storing editable analysis {key[:12]}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+        with self._lock:
+            self.stores += 1
+            if self._total_bytes is None:
+                self._total_bytes = sum(s for _, _, s in self._list_entries())
+            else:
+                self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    @staticmethod
+    def is_complete(editable: EditableImage) -> bool:
+        """没有提取到任何元素、背景重绘失败或子图分析出错的结果不缓存"""
+        if not editable.elements or editable.metadata.get('incomplete'):
+            return False
+        stack = list(editable.elements)
+        while stack:
+            element = stack.pop()
+            if any(element.metadata.get(marker) for marker in ERROR_MARKERS):
+                return False
+            stack.extend(element.children)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'skipped_incomplete': self.skipped,
+                'evictions': self.evictions,
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    # ---- helpers ----
+
+    @staticmethod
+    def _walk_paths(node: Dict[str, Any], transform):
+        """对 to_dict() 树中各节点的文件路径字段应用 transform（原地修改）"""
+        for field in _PATH_FIELDS:
+            if node.get(field):
+                node[field] = transform(node[field])
+        for child in node.get('elements', []) + node.get('children', []):
+            EditableAnalysisCache._walk_paths(child, transform)
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def _list_entries(self) -> List[Tuple[str, float, int]]:
+        """[(条目目录, 最近使用时间, 大小)]"""
+        entries = []
+        if not self.directory or not os.path.isdir(self.directory):
+            return entries
+        for prefix in os.listdir(self.directory):
+            prefix_dir = os.path.join(self.directory, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                entry_dir = os.path.join(prefix_dir, name)
+                if name.endswith('.tmp') or not os.path.isdir(entry_dir):
+                    continue
+                try:
+                    mtime = os.path.getmtime(os.path.join(entry_dir, TREE_FILE))
+                except OSError:
+                    mtime = 0
+                entries.append((entry_dir, mtime, self._dir_size(entry_dir)))
+        return entries
+
+    def _evict(self):
+        """
+        按最近使用时间从旧到新删除，直到低于上限的 90%（调用方持有 self._lock）
+
+        EVICTION_MIN_AGE 内使用过的条目即使超出上限也保留，可能仍有导出在读取其中的文件。
+        """
+        entries = sorted(self._list_entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        target = self.max_bytes * 0.9
+        in_use_after = time.time() - EVICTION_MIN_AGE
+        for entry_dir, mtime, size in entries:
+            if total <= target or mtime > in_use_after:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            self.evictions += 1
+        self._total_bytes = total
+
+
+# Global editable analysis cache
+editable_analysis_cache = EditableAnalysisCache()
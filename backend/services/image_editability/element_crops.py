@@ -0,0 +1,216 @@
+"""
+元素裁剪图 - 内存中的惰性裁剪结果 + 后台写入
+
+版面分析会为每个元素（包括每一行文字）从原图裁剪一张图片，以前每张都立即用默认压缩级别
+写成 PNG，之后样式提取和导出再逐个读回。一套 40 页的幻灯片就是几千次同步的压缩 + 写盘。
+
+现在裁剪结果先以 PIL Image 留在内存中，image_path 只是它将来的文件位置：
+
+    element_crops.add(path, cropped, persist=False)  # 登记，不编码
+    element_crops.open(path)         # 需要图片的地方（样式识别）直接拿内存中的图片（只读）
+    element_crops.materialize(path)  # 需要文件的地方（add_picture）等待写入完成后返回路径
+    element_crops.write_copy(path, dest)  # 持久化到其他位置（分析结果缓存），返回 Future
+
+- 写盘统一交给后台写入线程，使用快速压缩级别（PNG_COMPRESS_LEVEL）
+- 图片 / 表格类元素 persist=True：添加时就交给后台写入，构建 PPTX 时通常已写完
+- 写入完成后释放内存副本；内存占用超过 ELEMENT_CROP_MEMORY_MB 时最早的裁剪图写盘后释放
+- 一次导出结束后 release() 释放该导出的裁剪图，未写入磁盘的不再写入
+"""
+import os
+import shutil
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# 裁剪图 PNG 压缩级别（0-9）：裁剪图只在本机使用，优先编码速度
+PNG_COMPRESS_LEVEL = 1
+# 后台写入线程数
+WRITER_THREADS = 2
+
+
+def _image_bytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+class ElementCropStore:
+    """裁剪图文件路径 -> 尚未写盘（或正在写盘）的 PIL Image"""
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._crops: 'OrderedDict[str, Image.Image]' = OrderedDict()
+        self._writes: Dict[str, Future] = {}
+        self._bytes = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.added = 0
+        self.written = 0
+        self.spilled = 0
+        self.released = 0
+        self.memory_reads = 0
+
+    def init_app(self, app):
+        self.max_bytes = int(float(app.config.get('ELEMENT_CROP_MEMORY_MB', 512)) * 1024 * 1024)
+
+    def _writer(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=WRITER_THREADS, thread_name_prefix='crop-writer')
+            return self._executor
+
+    def add(self, path: str, image: Image.Image, persist: bool = False):
+        """登记裁剪图（不编码）；persist=True 时立即交给后台写入 path"""
+        with self._lock:
+            old = self._crops.pop(path, None)
+            if old is not None:
+                self._bytes -= _image_bytes(old)
+            self._crops[path] = image
+            self._bytes += _image_bytes(image)
+            self.added += 1
+            over_budget = self._bytes > self.max_bytes
+        if persist:
+            self.persist(path)
+        if over_budget:
+            self._spill()
+
+    def persist(self, path: str) -> Optional[Future]:
+        """把内存中的裁剪图交给后台写入 path；已在写入时返回同一个 Future，不在内存中时返回 None"""
+        with self._lock:
+            future = self._writes.get(path)
+            if future is not None:
+                return future
+            image = self._crops.get(path)
+            if image is None:
+                return None
+        executor = self._writer()
+        with self._lock:
+            future = self._writes.get(path)
+            if future is None:
+                future = self._writes[path] = executor.submit(self._write_and_release, path, image)
+        return future
+
+    def exists(self, path: Optional[str]) -> bool:
+        """裁剪图在内存中或已写入磁盘"""
+        if not path:
+            return False
+        with self._lock:
+            if path in self._crops:
+                return True
+        return os.path.exists(path)
+
+    def open(self, path: str) -> Image.Image:
+        """内存中的裁剪图（多线程共享，只读），否则从磁盘打开"""
+        with self._lock:
+            image = self._crops.get(path)
+            if image is not None:
+                self.memory_reads += 1
+                return image
+            future = self._writes.get(path)
+        if future is not None:
+            future.result()
+        return Image.open(path)
+
+    def materialize(self, path: str) -> str:
+        """确保裁剪图已写入磁盘（需要时等待后台写入），返回路径"""
+        future = self.persist(path)
+        if future is not None:
+            future.result()
+        return path
+
+    def write_copy(self, path: str, dest: str) -> Future:
+        """把裁剪图写到另一个位置（如分析结果缓存条目）；内存中的交给后台编码，否则复制文件"""
+        with self._lock:
+            image = self._crops.get(path)
+            pending = self._writes.get(path)
+        if image is not None:
+            return self._writer().submit(self._encode, image, dest)
+        if pending is not None:
+            pending.result()
+        done = Future()
+        try:
+            shutil.copyfile(path, dest)
+            done.set_result(dest)
+        except OSError as e:
+            done.set_exception(e)
+        return done
+
+    def release(self, paths: Iterable[str]):
+        """释放内存中的裁剪图（一次导出结束后调用）；尚未写入磁盘的不再写入"""
+        with self._lock:
+            for path in paths:
+                # 正在写入的由 _write_and_release 在写完后释放
+                if path in self._writes:
+                    continue
+                image = self._crops.pop(path, None)
+                if image is not None:
+                    self._bytes -= _image_bytes(image)
+                    self.released += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'in_memory': len(self._crops),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'pending_writes': len(self._writes),
+                'added': self.added,
+                'written': self.written,
+                'spilled': self.spilled,
+                'released': self.released,
+                'memory_reads': self.memory_reads,
+            }
+
+    # ---- helpers ----
+
+    @staticmethod
+    def _encode(image: Image.Image, dest: str) -> str:
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp_path = f"{dest}.{threading.get_ident()}.tmp"
+        try:
+            image.save(tmp_path, format='PNG', compress_level=PNG_COMPRESS_LEVEL)
+            os.replace(tmp_path, dest)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return dest
+
+    def _write_and_release(self, path: str, image: Image.Image) -> str:
+        try:
+            self._encode(image, path)
+        except Exception as e:
+            logger.warning(f"Failed to write element crop {path}: {e}")
+            with self._lock:
+                self._writes.pop(path, None)
+            raise
+        with self._lock:
+            self._writes.pop(path, None)
+            self.written += 1
+            # 已在磁盘上，释放内存副本（之后 open() 从文件读取）
+            if self._crops.get(path) is image:
+                del self._crops[path]
+                self._bytes -= _image_bytes(image)
+        return path
+
+    def _spill(self):
+        """内存超出上限：把最早登记的裁剪图交给后台写盘，写完后释放"""
+        with self._lock:
+            excess = self._bytes - self.max_bytes
+            victims = []
+            for path, image in self._crops.items():
+                if excess <= 0:
+                    break
+                if path not in self._writes:
+                    victims.append(path)
+                    excess -= _image_bytes(image)
+            self.spilled += len(victims)
+        for path in victims:
+            self.persist(path)
+
+
+# Global element crop store
+element_crops = ElementCropStore()
@@ -10,16 +10,33 @@
 """
 import os
 import json
+import shutil
 import logging
 import tempfile
 import uuid
 from abc import ABC, abstractmethod
 from typing import Dict, Any, List, Optional, Tuple, Type
 from pathlib import Path
+import numpy as np
 from PIL import Image
 
+from services.concurrency import scheduler, ResourceClass
+from .spatial_index import SpatialIndex
+
 logger = logging.getLogger(__name__)
 
+# MinerU 批量解析时每份PDF的默认最大页数（MINERU_BATCH_MAX_PAGES）
+DEFAULT_BATCH_MAX_PAGES = 50
+
+
+def _batch_max_pages() -> int:
+    """从 Flask config 读取 MINERU_BATCH_MAX_PAGES，不在应用上下文中时使用默认值"""
+    from flask import current_app, has_app_context
+    
+    if has_app_context():
+        return int(current_app.config.get('MINERU_BATCH_MAX_PAGES', DEFAULT_BATCH_MAX_PAGES))
+    return DEFAULT_BATCH_MAX_PAGES
+
 
 class ExtractionContext:
     """提取上下文 - 提取器可能需要的额外信息"""
@@ -106,6 +123,19 @@ class ElementExtractor(ABC):
             是否支持该类型
         """
         pass
+    
+    def prefetch(self, image_paths: List[str], **kwargs) -> None:
+        """
+        批量预取（可选实现）：在逐页调用 extract 之前，为多张图片一次性准备提取结果
+        
+        默认不做任何事；实现方应把结果放入自己的缓存，使随后的 extract 直接命中。
+        预取失败不应抛出异常，extract 会按单张图片的方式重新处理。
+        
+        Args:
+            image_paths: 图像文件路径列表
+            **kwargs: 其他由具体实现自定义的参数
+        """
+        pass
 
 
 class MinerUElementExtractor(ElementExtractor):
@@ -175,27 +205,172 @@ class MinerUElementExtractor(ElementExtractor):
         
         return ExtractionResult(elements=elements, context=context)
     
+    def _image_index_path(self, image_path: str) -> Path:
+        """图片内容哈希 -> MinerU extract_id 的索引文件（MinerU 结果只取决于图片内容）"""
+        import hashlib
+        
+        digest = hashlib.sha256()
+        with open(image_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return self._upload_folder / 'mineru_files' / '.image_index' / digest.hexdigest()
+    
     def _find_cache(self, image_path: str) -> Optional[str]:
-        """查找缓存的MinerU结果"""
+        """查找同一图片内容之前的MinerU结果（例如只更换了重绘方法后重新导出）"""
         try:
-            import hashlib
-            import time
-            
-            img_path = Path(image_path)
-            if not img_path.exists():
+            index_path = self._image_index_path(image_path)
+            if not index_path.exists():
                 return None
             
-            mineru_files_dir = self._upload_folder / 'mineru_files'
-            if not mineru_files_dir.exists():
+            extract_id = index_path.read_text(encoding='utf-8').strip()
+            result_dir = (self._upload_folder / 'mineru_files' / extract_id).resolve()
+            if not extract_id or not (result_dir / 'layout.json').exists():
+                # 结果目录已被清理，索引失效
+                index_path.unlink(missing_ok=True)
                 return None
-            
-            # 简单策略：不使用缓存（更安全）
-            return None
+            return str(result_dir)
             
         except Exception as e:
             logger.debug(f"查找缓存失败: {e}")
             return None
     
+    def _remember_result(self, image_path: str, extract_id: str):
+        """记录图片内容对应的MinerU结果，供 _find_cache 复用"""
+        try:
+            index_path = self._image_index_path(image_path)
+            index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = index_path.with_name(f"{index_path.name}.{uuid.uuid4().hex[:8]}.tmp")
+            tmp_path.write_text(extract_id, encoding='utf-8')
+            os.replace(tmp_path, index_path)
+        except Exception as e:
+            logger.debug(f"记录MinerU结果索引失败: {e}")
+    
+    def prefetch(self, image_paths: List[str], **kwargs) -> None:
+        """
+        把多张图片合成一份多页PDF一次提交MinerU（一次上传、一次轮询、一次下载），
+        再按页拆分结果并记录索引，之后逐页 extract 直接命中 _find_cache
+        
+        支持的kwargs:
+        - max_pages: int, 每份PDF的最大页数（默认读取 MINERU_BATCH_MAX_PAGES），小于2时不批量
+        """
+        max_pages = kwargs.get('max_pages') or _batch_max_pages()
+        if max_pages < 2:
+            return
+        
+        # 跳过已有结果的图片；内容相同的图片只提交一次
+        pending: Dict[str, List[str]] = {}
+        for image_path in image_paths:
+            if not os.path.exists(image_path) or self._find_cache(image_path):
+                continue
+            pending.setdefault(str(self._image_index_path(image_path)), []).append(image_path)
+        if len(pending) < 2:
+            return
+        
+        groups = list(pending.values())
+        batches = [groups[i:i + max_pages] for i in range(0, len(groups), max_pages)]
+        logger.info(f"MinerU批量解析: {len(groups)} 张图片，{len(batches)} 个批次")
+        futures = [scheduler.submit(ResourceClass.MINERU, self._parse_batch, batch) for batch in batches]
+        for future in futures:
+            future.result()
+    
+    def _parse_batch(self, groups: List[List[str]]):
+        """解析一个批次（每组是内容相同的图片，第一张作为PDF中的一页），失败时只记录日志"""
+        from services.export_service import ExportService
+        
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp_pdf:
+            pdf_path = tmp_pdf.name
+        
+        try:
+            ExportService.create_pdf_from_images([group[0] for group in groups], output_file=pdf_path)
+            
+            batch_name = f"deck_{str(uuid.uuid4())[:8]}.pdf"
+            batch_id, markdown_content, extract_id, error_message, failed_image_count = \
+                self._parser_service.parse_file(pdf_path, batch_name)
+            if error_message or not extract_id:
+                logger.warning(f"MinerU批量解析失败，回退到逐页解析: {error_message}")
+                return
+            
+            mineru_result_dir = self._upload_folder / 'mineru_files' / extract_id
+            page_ids = self._split_batch_result(mineru_result_dir, extract_id, len(groups))
+            for group, page_id in zip(groups, page_ids):
+                if page_id:
+                    for image_path in group:
+                        self._remember_result(image_path, page_id)
+            logger.info(f"MinerU批量解析完成: {sum(1 for p in page_ids if p)}/{len(groups)} 页")
+        
+        except Exception as e:
+            logger.warning(f"MinerU批量解析失败，回退到逐页解析: {e}")
+        
+        finally:
+            if os.path.exists(pdf_path):
+                os.remove(pdf_path)
+    
+    @staticmethod
+    def _split_batch_result(mineru_result_dir: Path, extract_id: str, page_count: int) -> List[Optional[str]]:
+        """
+        把多页PDF的MinerU结果拆分为单页结果目录（mineru_files/<extract_id>_p<页码>），
+        格式与单张图片的结果相同，_extract_from_result 无需区分
+        
+        Returns:
+            每页的结果目录名（extract_id），页数对不上时全部为 None
+        """
+        layout_file = mineru_result_dir / 'layout.json'
+        content_list_files = list(mineru_result_dir.glob("*_content_list.json"))
+        if not layout_file.exists() or not content_list_files:
+            logger.warning("MinerU批量结果缺少layout.json或content_list.json")
+            return [None] * page_count
+        
+        with open(layout_file, 'r', encoding='utf-8') as f:
+            layout_data = json.load(f)
+        with open(content_list_files[0], 'r', encoding='utf-8') as f:
+            content_list = json.load(f)
+        
+        pdf_info = layout_data.get('pdf_info') or []
+        if len(pdf_info) != page_count:
+            logger.warning(f"MinerU批量结果页数不符: 期望 {page_count}，实际 {len(pdf_info)}")
+            return [None] * page_count
+        
+        def referenced_images(node, found):
+            """layout 中 span.image_path（相对 images/）和 content_list 中 img_path 引用的图片"""
+            if isinstance(node, dict):
+                for key, value in node.items():
+                    if key == 'image_path' and isinstance(value, str) and value:
+                        found.add(value if value.startswith('images/') else 'images/' + value)
+                    elif key == 'img_path' and isinstance(value, str) and value:
+                        found.add(value)
+                    else:
+                        referenced_images(value, found)
+            elif isinstance(node, list):
+                for item in node:
+                    referenced_images(item, found)
+            return found
+        
+        page_ids = []
+        for idx, page_info in enumerate(pdf_info):
+            page_id = f"{extract_id}_p{idx + 1}"
+            page_dir = mineru_result_dir.parent / page_id
+            page_items = [
+                {**item, 'page_idx': 0}
+                for item in content_list if item.get('page_idx', 0) == idx
+            ]
+            
+            for rel_path in referenced_images([page_info, page_items], set()):
+                src = mineru_result_dir / rel_path
+                if src.is_file():
+                    dst = page_dir / rel_path
+                    dst.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(src, dst)
+            
+            page_dir.mkdir(parents=True, exist_ok=True)
+            with open(page_dir / content_list_files[0].name, 'w', encoding='utf-8') as f:
+                json.dump(page_items, f, ensure_ascii=False)
+            # layout.json 最后写入：_find_cache 以它的存在判断结果完整
+            with open(page_dir / 'layout.json', 'w', encoding='utf-8') as f:
+                json.dump({**layout_data, 'pdf_info': [{**page_info, 'page_idx': 0}]}, f, ensure_ascii=False)
+            page_ids.append(page_id)
+        
+        return page_ids
+    
     def _parse_image(self, image_path: str, depth: int) -> Optional[str]:
         """解析图片，返回MinerU结果目录"""
         from services.export_service import ExportService
@@ -209,8 +384,9 @@ class MinerUElementExtractor(ElementExtractor):
             
             # 调用MinerU解析
             image_id = str(uuid.uuid4())[:8]
-            batch_id, markdown_content, extract_id, error_message, failed_image_count = \
-                self._parser_service.parse_file(pdf_path, f"image_{image_id}.pdf")
+            with scheduler.slot(ResourceClass.MINERU):
+                batch_id, markdown_content, extract_id, error_message, failed_image_count = \
+                    self._parser_service.parse_file(pdf_path, f"image_{image_id}.pdf")
             
             if error_message or not extract_id:
                 logger.error(f"{'  ' * depth}MinerU解析失败: {error_message}")
@@ -221,6 +397,7 @@ class MinerUElementExtractor(ElementExtractor):
                 logger.error(f"{'  ' * depth}MinerU结果目录不存在")
                 return None
             
+            self._remember_result(image_path, extract_id)
             return str(mineru_result_dir)
         
         finally:
@@ -475,10 +652,11 @@ class BaiduOCRElementExtractor(ElementExtractor):
         
         try:
             # 调用百度OCR识别表格
-            ocr_result = self._ocr_provider.recognize_table(
-                image_path,
-                cell_contents=True
-            )
+            with scheduler.slot(ResourceClass.BAIDU_OCR):
+                ocr_result = self._ocr_provider.recognize_table(
+                    image_path,
+                    cell_contents=True
+                )
             
             table_cells = ocr_result.get('cells', [])
             # OCR结果通常会包含image_size，如果没有则自己获取
@@ -552,32 +730,35 @@ class BaiduOCRElementExtractor(ElementExtractor):
             })
         
         def calculate_min_gap(cell_data):
+            """
+            单元格之间的最小间距（重叠为负数）
+            
+            只需要知道是否小于 TARGET_MIN_GAP：用空间索引只比较彼此相距不到 TARGET_MIN_GAP 的
+            单元格对；没有这样的单元格对时返回 inf（表示间距已满足要求）
+            """
             if len(cell_data) <= 1:
                 return float('inf')
             
-            min_gap = float('inf')
-            for i, data1 in enumerate(cell_data):
-                x0_1, y0_1, x1_1, y1_1 = data1['current_bbox']
-                for j, data2 in enumerate(cell_data):
-                    if i >= j:
-                        continue
-                    x0_2, y0_2, x1_2, y1_2 = data2['current_bbox']
-                    
-                    x_overlap = not (x1_1 <= x0_2 or x1_2 <= x0_1)
-                    y_overlap = not (y1_1 <= y0_2 or y1_2 <= y0_1)
-                    
-                    if x_overlap and y_overlap:
-                        overlap_x = min(x1_1, x1_2) - max(x0_1, x0_2)
-                        overlap_y = min(y1_1, y1_2) - max(y0_1, y0_2)
-                        min_gap = min(min_gap, -min(overlap_x, overlap_y))
-                    elif x_overlap:
-                        gap = y0_2 - y1_1 if y1_1 <= y0_2 else y0_1 - y1_2
-                        min_gap = min(min_gap, gap)
-                    elif y_overlap:
-                        gap = x0_2 - x1_1 if x1_1 <= x0_2 else x0_1 - x1_2
-                        min_gap = min(min_gap, gap)
-            
-            return min_gap
+            boxes = np.array([data['current_bbox'] for data in cell_data], dtype=np.float64)
+            first, second = SpatialIndex(boxes.tolist()).pairs_within(TARGET_MIN_GAP)
+            if not len(first):
+                return float('inf')
+            a, b = boxes[first], boxes[second]
+            
+            x_overlap = ~((a[:, 2] <= b[:, 0]) | (b[:, 2] <= a[:, 0]))
+            y_overlap = ~((a[:, 3] <= b[:, 1]) | (b[:, 3] <= a[:, 1]))
+            
+            gaps = np.full(len(first), np.inf)
+            both = x_overlap & y_overlap
+            overlap_x = np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0])
+            overlap_y = np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1])
+            gaps[both] = -np.minimum(overlap_x, overlap_y)[both]
+            only_x = x_overlap & ~y_overlap
+            gaps[only_x] = np.where(a[:, 3] <= b[:, 1], b[:, 1] - a[:, 3], a[:, 1] - b[:, 3])[only_x]
+            only_y = y_overlap & ~x_overlap
+            gaps[only_y] = np.where(a[:, 2] <= b[:, 0], b[:, 0] - a[:, 2], a[:, 0] - b[:, 2])[only_y]
+            
+            return float(gaps.min())
         
         iteration = 0
         total_shrink_ratio = 0
@@ -587,9 +768,9 @@ class BaiduOCRElementExtractor(ElementExtractor):
             
             if current_min_gap >= TARGET_MIN_GAP:
                 if iteration == 0:
-                    logger.info(f"{'  ' * depth}单元格间距已满足要求（最小={current_min_gap:.1f}px），无需收缩")
+                    logger.info(f"{'  ' * depth}单元格间距已满足要求（最小≥{TARGET_MIN_GAP}px），无需收缩")
                 else:
-                    logger.info(f"{'  ' * depth}收缩完成：{iteration}次迭代，最小间距={current_min_gap:.1f}px")
+                    logger.info(f"{'  ' * depth}收缩完成：{iteration}次迭代，最小间距≥{TARGET_MIN_GAP}px")
                 break
             
             all_cells_can_shrink = True
@@ -683,14 +864,15 @@ class BaiduAccurateOCRElementExtractor(ElementExtractor):
         
         try:
             # 调用百度高精度OCR识别
-            ocr_result = self._ocr_provider.recognize(
-                image_path,
-                language_type=language_type,
-                recognize_granularity=recognize_granularity,
-                detect_direction=detect_direction,
-                paragraph=paragraph,
-                probability=True,  # 获取置信度
-            )
+            with scheduler.slot(ResourceClass.BAIDU_OCR):
+                ocr_result = self._ocr_provider.recognize(
+                    image_path,
+                    language_type=language_type,
+                    recognize_granularity=recognize_granularity,
+                    detect_direction=detect_direction,
+                    paragraph=paragraph,
+                    probability=True,  # 获取置信度
+                )
             
             text_lines = ocr_result.get('text_lines', [])
             image_size = ocr_result.get('image_size', (0, 0))
@@ -847,6 +1029,12 @@ class ExtractorRegistry:
         # 返回默认提取器
         return self._default_extractor
     
+    def describe(self) -> Dict[str, str]:
+        """注册情况的可序列化描述（元素类型 -> 提取器类名），用于分析结果缓存的 key"""
+        mapping = {t: e.__class__.__name__ for t, e in self._type_mapping.items()}
+        mapping['default'] = self._default_extractor.__class__.__name__ if self._default_extractor else None
+        return mapping
+    
     def get_all_extractors(self) -> List[ElementExtractor]:
         """
         获取所有已注册的提取器（去重）
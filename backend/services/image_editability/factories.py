@@ -2,7 +2,7 @@
 工厂类 - 负责创建和配置具体的提取器和Inpaint提供者
 """
 import logging
-from typing import List, Optional, Any
+from typing import Any, Dict, List, Optional
 from pathlib import Path
 
 from .extractors import ElementExtractor, MinerUElementExtractor, BaiduOCRElementExtractor, BaiduAccurateOCRElementExtractor, ExtractorRegistry
@@ -464,7 +464,8 @@ class ServiceConfig:
         inpaint_registry: InpaintProviderRegistry,
         max_depth: int = 1,
         min_image_size: int = 200,
-        min_image_area: int = 40000
+        min_image_area: int = 40000,
+        settings: Optional[Dict[str, Any]] = None
     ):
         """
         初始化服务配置
@@ -476,6 +477,7 @@ class ServiceConfig:
             max_depth: 最大递归深度（默认1）
             min_image_size: 最小图片尺寸
             min_image_area: 最小图片面积
+            settings: 提取器 / 重绘方法的其他参数（阈值、画质提升等），参与分析结果缓存的 key
         """
         self.upload_folder = upload_folder
         self.extractor_registry = extractor_registry
@@ -483,6 +485,18 @@ class ServiceConfig:
         self.max_depth = max_depth
         self.min_image_size = min_image_size
         self.min_image_area = min_image_area
+        self.settings = settings or {}
+    
+    def analysis_settings(self) -> Dict[str, Any]:
+        """影响分析结果的全部设置（见 analysis_cache.py）"""
+        return {
+            'extractors': self.extractor_registry.describe(),
+            'inpaint': self.inpaint_registry.describe(),
+            'max_depth': self.max_depth,
+            'min_image_size': self.min_image_size,
+            'min_image_area': self.min_image_area,
+            **self.settings
+        }
     
     @classmethod
     def from_defaults(
@@ -668,7 +682,12 @@ class ServiceConfig:
             inpaint_registry=inpaint_registry,
             max_depth=kwargs.get('max_depth', 1),
             min_image_size=kwargs.get('min_image_size', 200),
-            min_image_area=kwargs.get('min_image_area', 40000)
+            min_image_area=kwargs.get('min_image_area', 40000),
+            settings={
+                'contain_threshold': kwargs.get('contain_threshold', 0.8),
+                'intersection_threshold': kwargs.get('intersection_threshold', 0.3),
+                'enhance_quality': kwargs.get('enhance_quality', True),
+            }
         )
 
 
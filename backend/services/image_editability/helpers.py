@@ -33,7 +33,8 @@ def collect_bboxes_from_elements(elements: List[EditableElement]) -> List[tuple]
 
 def crop_element_from_image(
     source_image_path: str,
-    bbox: BBox
+    bbox: BBox,
+    image_cache=None
 ) -> str:
     """
     从源图片中裁剪出元素区域
@@ -41,20 +42,24 @@ def crop_element_from_image(
     Args:
         source_image_path: 源图片路径
         bbox: 裁剪区域
+        image_cache: DecodedImageCache（可选），从已解码的源图片裁剪，并登记裁剪结果供子图分析复用
         
     Returns:
         裁剪后图片的临时文件路径
     """
-    img = Image.open(source_image_path)
-    
     # 裁剪
     crop_box = (int(bbox.x0), int(bbox.y0), int(bbox.x1), int(bbox.y1))
-    cropped = img.crop(crop_box)
+    if image_cache is not None:
+        cropped = image_cache.crop(source_image_path, crop_box)
+    else:
+        cropped = Image.open(source_image_path).crop(crop_box)
     
     # 保存到临时文件
     with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
         cropped.save(tmp.name)
-        return tmp.name
+    if image_cache is not None:
+        image_cache.put(tmp.name, cropped)
+    return tmp.name
 
 
 def should_recurse_into_element(
@@ -10,9 +10,10 @@
 """
 import logging
 from typing import Dict, Any, List, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed
 from PIL import Image
 
+from services.concurrency import scheduler, ResourceClass
 from .extractors import (
     ElementExtractor, 
     ExtractionResult, 
@@ -20,6 +21,7 @@ from .extractors import (
     MinerUElementExtractor,
     BaiduAccurateOCRElementExtractor
 )
+from .spatial_index import SpatialIndex
 
 logger = logging.getLogger(__name__)
 
@@ -192,6 +194,10 @@ class HybridElementExtractor(ElementExtractor):
         """混合提取器支持所有类型"""
         return True
     
+    def prefetch(self, image_paths: List[str], **kwargs) -> None:
+        """MinerU 部分批量预取；百度OCR按单张图片调用，不需要预取"""
+        self._mineru_extractor.prefetch(image_paths, **kwargs)
+    
     def extract(
         self,
         image_path: str,
@@ -233,21 +239,21 @@ class HybridElementExtractor(ElementExtractor):
         def run_baidu_ocr():
             return self._baidu_ocr_extractor.extract(image_path, element_type, **kwargs)
         
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            future_mineru = executor.submit(run_mineru)
-            future_baidu = executor.submit(run_baidu_ocr)
-            
-            # 等待两个任务完成
-            for future in as_completed([future_mineru, future_baidu]):
-                try:
-                    if future == future_mineru:
-                        mineru_result = future.result()
-                        logger.info(f"{indent}  ✅ MinerU识别到 {len(mineru_result.elements)} 个元素")
-                    else:
-                        baidu_result = future.result()
-                        logger.info(f"{indent}  ✅ 百度OCR识别到 {len(baidu_result.elements)} 个元素")
-                except Exception as e:
-                    logger.error(f"{indent}  ❌ 提取失败: {e}")
+        # 分别占用 MinerU / 百度OCR 的全局并发预算
+        future_mineru = scheduler.submit(ResourceClass.MINERU, run_mineru)
+        future_baidu = scheduler.submit(ResourceClass.BAIDU_OCR, run_baidu_ocr)
+        
+        # 等待两个任务完成
+        for future in as_completed([future_mineru, future_baidu]):
+            try:
+                if future == future_mineru:
+                    mineru_result = future.result()
+                    logger.info(f"{indent}  ✅ MinerU识别到 {len(mineru_result.elements)} 个元素")
+                else:
+                    baidu_result = future.result()
+                    logger.info(f"{indent}  ✅ 百度OCR识别到 {len(baidu_result.elements)} 个元素")
+            except Exception as e:
+                logger.error(f"{indent}  ❌ 提取失败: {e}")
         
         # 确保两个结果都存在
         if mineru_result is None:
@@ -321,40 +327,32 @@ class HybridElementExtractor(ElementExtractor):
         baidu_to_keep = set(range(len(baidu_elements)))  # 初始全部保留
         baidu_in_table = set()  # 在表格内的百度OCR元素
         
+        # 百度OCR bbox 的空间索引：每个MinerU元素只和附近的OCR结果比较（判断规则同 BBoxUtils）
+        baidu_index = SpatialIndex([baidu_elem.get('bbox') for baidu_elem in baidu_elements])
+        
         # 规则1: 图片类型bbox里包含的百度OCR bbox → 删除
         for img_elem in image_elements:
-            img_bbox = img_elem.get('bbox', [])
-            for idx, baidu_elem in enumerate(baidu_elements):
-                baidu_bbox = baidu_elem.get('bbox', [])
-                if BBoxUtils.is_contained(baidu_bbox, img_bbox, self._contain_threshold):
-                    baidu_to_keep.discard(idx)
-                    logger.debug(f"{indent}    百度OCR[{idx}]被图片包含，删除")
+            for idx in baidu_index.contained_in(img_elem.get('bbox'), self._contain_threshold).tolist():
+                baidu_to_keep.discard(idx)
+                logger.debug(f"{indent}    百度OCR[{idx}]被图片包含，删除")
         
         # 规则2: 表格类型bbox里包含的百度OCR bbox → 保留，并标记
         tables_to_remove = set()
         for table_idx, table_elem in enumerate(table_elements):
-            table_bbox = table_elem.get('bbox', [])
-            has_contained_text = False
-            for idx, baidu_elem in enumerate(baidu_elements):
-                baidu_bbox = baidu_elem.get('bbox', [])
-                if BBoxUtils.is_contained(baidu_bbox, table_bbox, self._contain_threshold):
-                    baidu_in_table.add(idx)
-                    has_contained_text = True
-                    logger.debug(f"{indent}    百度OCR[{idx}]在表格内，保留")
+            contained = baidu_index.contained_in(table_elem.get('bbox'), self._contain_threshold).tolist()
+            for idx in contained:
+                baidu_in_table.add(idx)
+                logger.debug(f"{indent}    百度OCR[{idx}]在表格内，保留")
             
-            if has_contained_text:
+            if contained:
                 tables_to_remove.add(table_idx)
                 logger.debug(f"{indent}    表格[{table_idx}]有文字，删除表格bbox")
         
         # 规则3: 其他类型与百度OCR bbox有交集 → 使用百度OCR结果
         other_to_remove = set()
         for other_idx, other_elem in enumerate(other_elements):
-            other_bbox = other_elem.get('bbox', [])
-            for idx, baidu_elem in enumerate(baidu_elements):
-                if idx not in baidu_to_keep:
-                    continue
-                baidu_bbox = baidu_elem.get('bbox', [])
-                if BBoxUtils.has_intersection(other_bbox, baidu_bbox, self._intersection_threshold):
+            for idx in baidu_index.intersecting(other_elem.get('bbox'), self._intersection_threshold).tolist():
+                if idx in baidu_to_keep:
                     other_to_remove.add(other_idx)
                     logger.debug(f"{indent}    MinerU其他[{other_idx}]与百度OCR[{idx}]有交集，使用百度OCR")
                     break
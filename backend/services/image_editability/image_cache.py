@@ -0,0 +1,88 @@
+"""
+已解码图片缓存 - 一次整页分析内共享解码结果
+
+分析一页时，同一张图片会被多处打开并完整解码：元素裁剪、背景重绘（当前图和整页原图）、
+每个递归子图的裁剪，以及子图自身的再次分析。PNG 解码是大型导出的主要 CPU 开销。
+
+ImageEditabilityService.make_image_editable 在根层级创建一个 DecodedImageCache，
+沿递归传给子图分析，页面处理完成后 close() 释放内存：
+
+    image = image_cache.get(path)           # 每个文件只解码一次，多线程共享（只读）
+    child = image_cache.crop(path, box)     # 从已解码图片裁剪（独立副本，可修改）
+    image_cache.put(child_path, child)      # 登记已在内存中的图片（如写入临时文件的子图）
+
+get() 返回的图片被多个线程共享，调用方只能读取，需要修改时先 copy()。
+"""
+import os
+import logging
+import threading
+from typing import Dict, Tuple
+
+from PIL import Image
+
+from services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class DecodedImageCache:
+    """文件路径 -> 已解码的 PIL Image（一次整页分析内有效）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._images: Dict[str, Image.Image] = {}
+        self._flight = SingleFlight('decoded image')
+        self.decodes = 0
+        self.hits = 0
+
+    def get(self, path: str) -> Image.Image:
+        """已解码的图片（只读）；并发请求同一文件时只解码一次"""
+        key = os.path.abspath(path)
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self.hits += 1
+                return image
+        return self._flight.do(key, self._decode, key)
+
+    def _decode(self, key: str) -> Image.Image:
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self.hits += 1
+                return image
+        image = Image.open(key)
+        image.load()
+        with self._lock:
+            self._images[key] = image
+            self.decodes += 1
+        return image
+
+    def size(self, path: str) -> Tuple[int, int]:
+        """图片尺寸；未解码时只读取文件头"""
+        with self._lock:
+            image = self._images.get(os.path.abspath(path))
+        if image is not None:
+            return image.size
+        with Image.open(path) as image:
+            return image.size
+
+    def crop(self, path: str, box: Tuple[int, int, int, int]) -> Image.Image:
+        """从已解码图片裁剪出的独立副本"""
+        return self.get(path).crop(box)
+
+    def put(self, path: str, image: Image.Image):
+        """登记已在内存中的图片，之后按该路径读取时不再解码"""
+        with self._lock:
+            self._images[os.path.abspath(path)] = image
+
+    def close(self):
+        """释放所有已解码图片"""
+        with self._lock:
+            images = list(self._images.values())
+            self._images.clear()
+            decodes, hits = self.decodes, self.hits
+        for image in images:
+            image.close()
+        if decodes or hits:
+            logger.debug(f"DecodedImageCache: {decodes} decodes, {hits} reuses")
@@ -17,6 +17,7 @@ from typing import List, Optional, Dict
 from PIL import Image
 
 from utils.mask_utils import create_mask_from_bboxes
+from services.concurrency import scheduler, ResourceClass
 
 logger = logging.getLogger(__name__)
 
@@ -97,16 +98,17 @@ class DefaultInpaintProvider(InpaintProvider):
         crop_box = kwargs.get('crop_box')
         
         try:
-            result_img = self.inpainting_service.remove_regions_by_bboxes(
-                image=image,
-                bboxes=bboxes,
-                expand_pixels=expand_pixels,
-                merge_bboxes=merge_bboxes,
-                merge_threshold=merge_threshold,
-                save_mask_path=save_mask_path,
-                full_page_image=full_page_image,
-                crop_box=crop_box
-            )
+            with scheduler.slot(ResourceClass.IMAGE_LLM):
+                result_img = self.inpainting_service.remove_regions_by_bboxes(
+                    image=image,
+                    bboxes=bboxes,
+                    expand_pixels=expand_pixels,
+                    merge_bboxes=merge_bboxes,
+                    merge_threshold=merge_threshold,
+                    save_mask_path=save_mask_path,
+                    full_page_image=full_page_image,
+                    crop_box=crop_box
+                )
             return result_img
         except Exception as e:
             logger.error(f"DefaultInpaintProvider处理失败: {e}", exc_info=True)
@@ -178,14 +180,15 @@ class GenerativeEditInpaintProvider(InpaintProvider):
             logger.info("GenerativeEditInpaintProvider: 开始生成式编辑重绘...")
             
             # 调用AI服务编辑图片
-            clean_bg_image = self.ai_service.edit_image(
-                prompt=edit_instruction,
-                current_image_path=tmp_path,
-                aspect_ratio=aspect_ratio,
-                resolution=resolution,
-                original_description=None,
-                additional_ref_images=None
-            )
+            with scheduler.slot(ResourceClass.IMAGE_LLM):
+                clean_bg_image = self.ai_service.edit_image(
+                    prompt=edit_instruction,
+                    current_image_path=tmp_path,
+                    aspect_ratio=aspect_ratio,
+                    resolution=resolution,
+                    original_description=None,
+                    additional_ref_images=None
+                )
             
             if not clean_bg_image:
                 logger.error("GenerativeEditInpaintProvider: 生成式编辑返回空结果")
@@ -249,11 +252,12 @@ class BaiduInpaintProvider(InpaintProvider):
         try:
             logger.info(f"BaiduInpaintProvider: 开始修复 {len(bboxes)} 个区域...")
             
-            result_image = self._provider.inpaint_bboxes(
-                image=image,
-                bboxes=bboxes,
-                expand_pixels=expand_pixels
-            )
+            with scheduler.slot(ResourceClass.BAIDU_INPAINT):
+                result_image = self._provider.inpaint_bboxes(
+                    image=image,
+                    bboxes=bboxes,
+                    expand_pixels=expand_pixels
+                )
             
             if result_image:
                 logger.info("BaiduInpaintProvider: 修复完成")
@@ -426,14 +430,15 @@ class HybridInpaintProvider(InpaintProvider):
             res = resolution or self._generative_provider.resolution
             
             # 调用AI服务
-            enhanced_image = self._generative_provider.ai_service.edit_image(
-                prompt=enhance_prompt,
-                current_image_path=tmp_path,
-                aspect_ratio=ar,
-                resolution=res,
-                original_description=None,
-                additional_ref_images=None
-            )
+            with scheduler.slot(ResourceClass.IMAGE_LLM):
+                enhanced_image = self._generative_provider.ai_service.edit_image(
+                    prompt=enhance_prompt,
+                    current_image_path=tmp_path,
+                    aspect_ratio=ar,
+                    resolution=res,
+                    original_description=None,
+                    additional_ref_images=None
+                )
             
             if not enhanced_image:
                 return None
@@ -547,6 +552,12 @@ class InpaintProviderRegistry:
         # 返回默认提供者
         return self._default_provider
     
+    def describe(self) -> Dict[str, str]:
+        """注册情况的可序列化描述（元素类型 -> 重绘方法类名），用于分析结果缓存的 key"""
+        mapping = {t: p.__class__.__name__ for t, p in self._type_mapping.items()}
+        mapping['default'] = self._default_provider.__class__.__name__ if self._default_provider else None
+        return mapping
+    
     def get_all_providers(self) -> List[InpaintProvider]:
         """
         获取所有已注册的重绘提供者（去重）
@@ -12,12 +12,16 @@ import uuid
 from typing import List, Optional, Tuple
 from PIL import Image
 
+from services.cancellation import TaskCancelledError
 from .data_models import BBox, EditableElement, EditableImage
 from .coordinate_mapper import CoordinateMapper
 from .extractors import ElementExtractor, ExtractionResult
 from .inpaint_providers import InpaintProvider
 from .factories import ServiceConfig
 from .helpers import collect_bboxes_from_elements, should_recurse_into_element, crop_element_from_image
+from .analysis_cache import editable_analysis_cache
+from .image_cache import DecodedImageCache
+from .element_crops import element_crops
 
 logger = logging.getLogger(__name__)
 
@@ -36,14 +40,16 @@ class ImageEditabilityService:
         >>> # 串行处理
         >>> result = service.make_image_editable("image.png")
         >>> 
-        >>> # 并行处理（由调用者控制）
-        >>> from concurrent.futures import ThreadPoolExecutor
-        >>> with ThreadPoolExecutor() as executor:
-        ...     futures = [executor.submit(service.make_image_editable, img) 
-        ...                for img in image_paths]
-        ...     results = [f.result() for f in futures]
+        >>> # 并行处理（由调用者通过全局调度器控制）
+        >>> from services.concurrency import scheduler, ResourceClass
+        >>> futures = [scheduler.submit(ResourceClass.LOCAL_CPU, service.make_image_editable, img)
+        ...            for img in image_paths]
+        >>> results = [f.result() for f in futures]
     """
     
+    # 构建 PPTX 时以图片形式插入的元素类型，裁剪图需要写成文件
+    FILE_ELEMENT_TYPES = {'image', 'figure', 'chart', 'table'}
+    
     def __init__(self, config: ServiceConfig):
         """
         初始化服务
@@ -59,6 +65,8 @@ class ImageEditabilityService:
         self._min_image_size = config.min_image_size
         self._min_image_area = config.min_image_area
         self._max_child_coverage_ratio = 0.85
+        # 影响分析结果的设置，参与分析结果缓存的 key
+        self._analysis_settings = config.analysis_settings()
         
         extractors = self._extractor_registry.get_all_extractors()
         inpaint_providers = self._inpaint_registry.get_all_providers()
@@ -76,7 +84,9 @@ class ImageEditabilityService:
         parent_bbox: Optional[BBox] = None,
         root_image_size: Optional[Tuple[int, int]] = None,
         element_type: Optional[str] = None,
-        root_image_path: Optional[str] = None
+        root_image_path: Optional[str] = None,
+        cancel_token=None,
+        image_cache: Optional[DecodedImageCache] = None
     ) -> EditableImage:
         """
         将图片转换为可编辑结构（递归）
@@ -91,6 +101,8 @@ class ImageEditabilityService:
             root_image_size: 根图片尺寸（内部使用）
             element_type: 元素类型，用于选择提取器（内部使用）
             root_image_path: 根图片路径（内部使用）
+            cancel_token: 取消令牌（可选），在提取 -> 重绘 -> 递归之间检查
+            image_cache: 已解码图片缓存（内部使用，根层级创建，递归子图共享）
         
         Returns:
             EditableImage对象
@@ -98,14 +110,67 @@ class ImageEditabilityService:
         Raises:
             FileNotFoundError: 图片文件不存在
             ValueError: 图片格式不支持
+            TaskCancelledError: 任务已被取消
         """
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        
+        # 整页分析：图片内容和设置都没变时直接复用上次导出的结果
+        cache_key = None
+        if depth == 0 and editable_analysis_cache.enabled:
+            try:
+                cache_key = editable_analysis_cache.make_key(image_path, self._analysis_settings)
+                cached = editable_analysis_cache.load(cache_key, image_path)
+            except OSError as e:
+                logger.warning(f"读取版面分析缓存失败: {e}")
+                cache_key, cached = None, None
+            if cached is not None:
+                logger.info(f"[{cached.image_id}] 图片未变化，使用缓存的版面分析结果")
+                return cached
+        
+        # 整页（含递归子图）共享解码结果，根层级处理完成后释放
+        owns_image_cache = image_cache is None
+        if owns_image_cache:
+            image_cache = DecodedImageCache()
+        try:
+            editable_image = self._analyze_image(
+                image_path=image_path,
+                depth=depth,
+                parent_id=parent_id,
+                parent_bbox=parent_bbox,
+                root_image_size=root_image_size,
+                element_type=element_type,
+                root_image_path=root_image_path,
+                cancel_token=cancel_token,
+                image_cache=image_cache
+            )
+        finally:
+            if owns_image_cache:
+                image_cache.close()
+        
+        if cache_key is not None:
+            editable_analysis_cache.save(cache_key, editable_image)
+        return editable_image
+    
+    def _analyze_image(
+        self,
+        image_path: str,
+        depth: int,
+        parent_id: Optional[str],
+        parent_bbox: Optional[BBox],
+        root_image_size: Optional[Tuple[int, int]],
+        element_type: Optional[str],
+        root_image_path: Optional[str],
+        cancel_token,
+        image_cache: DecodedImageCache
+    ) -> EditableImage:
+        """分析一张图片：提取 -> 转换元素 -> 重绘背景 -> 递归子图"""
         image_id = str(uuid.uuid4())[:8]
         logger.info(f"{'  ' * depth}[{image_id}] 开始处理")
         
         # 1. 加载图片
         try:
-            img = Image.open(image_path)
-            width, height = img.size
+            width, height = image_cache.get(image_path).size
         except Exception as e:
             logger.error(f"无法加载图片 {image_path}: {e}")
             raise
@@ -132,12 +197,15 @@ class ImageEditabilityService:
             parent_bbox=parent_bbox,
             image_size=extracted_image_size,
             root_image_size=root_image_size,
-            source_image_path=image_path  # 传入源图片路径用于裁剪
+            source_image_path=image_path,  # 传入源图片路径用于裁剪
+            image_cache=image_cache
         )
         
         logger.info(f"{'  ' * depth}提取到 {len(elements)} 个元素")
         
         # 3. 生成clean background（根据元素类型选择重绘方法）
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
         clean_background = None
         if self._inpaint_registry and elements:
             clean_background = self._generate_clean_background(
@@ -148,12 +216,15 @@ class ImageEditabilityService:
                 parent_bbox=parent_bbox,
                 root_image_path=root_image_path,
                 image_size=(width, height),
-                element_type=element_type  # 传递元素类型以选择对应的重绘方法
+                element_type=element_type,  # 传递元素类型以选择对应的重绘方法
+                image_cache=image_cache
             )
         
         # 4. 递归处理子元素
         # max_depth 语义：max_depth=1 表示只处理1层不递归，max_depth=2 递归一次
         if depth + 1 < self._max_depth:
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
             self._process_children(
                 elements=elements,
                 current_image_path=image_path,
@@ -161,7 +232,9 @@ class ImageEditabilityService:
                 image_id=image_id,
                 root_image_size=root_image_size,
                 current_image_size=(width, height),
-                root_image_path=root_image_path
+                root_image_path=root_image_path,
+                cancel_token=cancel_token,
+                image_cache=image_cache
             )
         
         # 5. 构建结果
@@ -175,10 +248,37 @@ class ImageEditabilityService:
             depth=depth,
             parent_id=parent_id
         )
+        # 有元素却没有生成背景（重绘失败）的结果不进入分析缓存
+        if elements and self._inpaint_registry and clean_background is None:
+            editable_image.metadata['incomplete'] = True
         
         logger.info(f"{'  ' * depth}[{image_id}] 处理完成")
         return editable_image
     
+    def prefetch(self, image_paths: List[str]) -> None:
+        """
+        批量预取整页的提取结果（导出前调用一次，然后再并行调用 make_image_editable）
+        
+        分析缓存已有的页面跳过，其余页面交给根提取器一次性准备，例如 MinerU 把整套幻灯片
+        合成一份多页PDF只上传、轮询一次。预取失败不影响之后的逐页分析。
+        """
+        pending = []
+        for image_path in image_paths:
+            try:
+                if editable_analysis_cache.contains(
+                    editable_analysis_cache.make_key(image_path, self._analysis_settings)
+                ):
+                    continue
+            except OSError:
+                continue
+            pending.append(image_path)
+        if not pending:
+            return
+        try:
+            self._select_extractor(None).prefetch(pending)
+        except Exception as e:
+            logger.warning(f"批量预取失败，回退到逐页提取: {e}")
+    
     def _extract_elements(
         self,
         image_path: str,
@@ -212,13 +312,16 @@ class ImageEditabilityService:
         parent_bbox: Optional[BBox],
         image_size: Tuple[int, int],
         root_image_size: Tuple[int, int],
-        source_image_path: Optional[str] = None
+        source_image_path: Optional[str] = None,
+        image_cache: Optional[DecodedImageCache] = None
     ) -> List[EditableElement]:
         """
         将提取器返回的字典转换为EditableElement对象
         
-        对每个元素根据 bbox 从原图裁剪并保存图片，不依赖 MinerU 提取的图片。
+        对每个元素根据 bbox 从原图裁剪图片，不依赖 MinerU 提取的图片。
         这样所有元素（包括文字）都有 image_path，可用于样式提取。
+        裁剪结果先留在内存中（element_crops），需要文件时才编码写盘；
+        图片 / 表格类元素构建 PPTX 时一定需要文件，立即交给后台写入。
         """
         elements = []
         
@@ -227,9 +330,8 @@ class ImageEditabilityService:
         source_img = None
         if source_image_path:
             output_dir = self._upload_folder / 'editable_images' / image_id / 'elements'
-            output_dir.mkdir(parents=True, exist_ok=True)
             try:
-                source_img = Image.open(source_image_path)
+                source_img = image_cache.get(source_image_path) if image_cache else Image.open(source_image_path)
             except Exception as e:
                 logger.warning(f"无法加载源图片进行裁剪: {e}")
         
@@ -253,7 +355,7 @@ class ImageEditabilityService:
                     parent_image_size=root_image_size
                 )
             
-            # 为每个元素裁剪并保存图片（统一使用自己裁剪的图片）
+            # 为每个元素裁剪图片（统一使用自己裁剪的图片）
             element_image_path = None
             if source_img and output_dir:
                 try:
@@ -269,7 +371,10 @@ class ImageEditabilityService:
                     if crop_box[2] > crop_box[0] and crop_box[3] > crop_box[1]:
                         cropped = source_img.crop(crop_box)
                         element_image_path = str(output_dir / f"{idx}_{elem_dict['type']}.png")
-                        cropped.save(element_image_path)
+                        element_crops.add(
+                            element_image_path, cropped,
+                            persist=elem_dict['type'] in self.FILE_ELEMENT_TYPES
+                        )
                 except Exception as e:
                     logger.warning(f"裁剪元素 {idx} 失败: {e}")
             
@@ -285,8 +390,8 @@ class ImageEditabilityService:
             
             elements.append(element)
         
-        # 关闭源图片
-        if source_img:
+        # 关闭源图片（共享的已解码图片由缓存统一释放）
+        if source_img and not image_cache:
             source_img.close()
         
         return elements
@@ -300,7 +405,8 @@ class ImageEditabilityService:
         parent_bbox: Optional[BBox],
         root_image_path: str,
         image_size: Tuple[int, int],
-        element_type: Optional[str] = None
+        element_type: Optional[str] = None,
+        image_cache: Optional[DecodedImageCache] = None
     ) -> Optional[str]:
         """
         生成clean background
@@ -319,7 +425,7 @@ class ImageEditabilityService:
         
         try:
             bboxes = collect_bboxes_from_elements(elements)
-            img = Image.open(image_path)
+            img = image_cache.get(image_path) if image_cache else Image.open(image_path)
             img_width, img_height = img.size
             element_types = [elem.element_type for elem in elements]
             
@@ -339,7 +445,7 @@ class ImageEditabilityService:
             # 加载完整页面图像
             full_page_img = None
             if root_image_path != image_path:
-                full_page_img = Image.open(root_image_path)
+                full_page_img = image_cache.get(root_image_path) if image_cache else Image.open(root_image_path)
             
             # 过滤覆盖过大的bbox
             filtered_bboxes = []
@@ -392,7 +498,9 @@ class ImageEditabilityService:
         image_id: str,
         root_image_size: Tuple[int, int],
         current_image_size: Tuple[int, int],
-        root_image_path: str
+        root_image_path: str,
+        cancel_token=None,
+        image_cache: Optional[DecodedImageCache] = None
     ):
         """递归处理子元素（通过裁剪原图获取子图，并行处理多个子元素）"""
         logger.info(f"{'  ' * depth}递归处理子元素...")
@@ -412,8 +520,9 @@ class ImageEditabilityService:
         if not elements_to_process:
             return
         
-        # 并行处理多个子元素
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        # 并行处理多个子元素（共享 local_cpu 预算；在页面级任务内部递归时直接在当前线程执行）
+        from concurrent.futures import as_completed
+        from services.concurrency import scheduler, ResourceClass
         
         def process_single_element(element):
             """处理单个子元素"""
@@ -421,7 +530,8 @@ class ImageEditabilityService:
                 # 从当前图片裁剪出子区域
                 child_image_path = crop_element_from_image(
                     source_image_path=current_image_path,
-                    bbox=element.bbox
+                    bbox=element.bbox,
+                    image_cache=image_cache
                 )
                 
                 child_editable = self.make_image_editable(
@@ -431,7 +541,9 @@ class ImageEditabilityService:
                     parent_bbox=element.bbox_global,
                     root_image_size=root_image_size,
                     element_type=element.element_type,
-                    root_image_path=root_image_path
+                    root_image_path=root_image_path,
+                    cancel_token=cancel_token,
+                    image_cache=image_cache
                 )
                 
                 return element, child_editable, None
@@ -441,17 +553,24 @@ class ImageEditabilityService:
         
         logger.info(f"{'  ' * depth}  并行处理 {len(elements_to_process)} 个子元素...")
         
-        # 使用线程池并行处理
-        max_workers = min(8, len(elements_to_process))  # 限制并发数
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {executor.submit(process_single_element, elem): elem for elem in elements_to_process}
+        futures = {
+            scheduler.submit(ResourceClass.LOCAL_CPU, process_single_element, elem): elem
+            for elem in elements_to_process
+        }
+        
+        for future in as_completed(futures):
+            element, child_editable, error = future.result()
             
-            for future in as_completed(futures):
-                element, child_editable, error = future.result()
-                
-                if error:
-                    logger.error(f"{'  ' * depth}  ✗ {element.element_id} 失败: {error}")
-                else:
-                    element.children = child_editable.elements
-                    element.inpainted_background_path = child_editable.clean_background
-                    logger.info(f"{'  ' * depth}  ✓ {element.element_id} 完成: {len(child_editable.elements)} 个子元素")
+            if isinstance(error, TaskCancelledError):
+                for pending in futures:
+                    pending.cancel()
+                raise error
+            if error:
+                logger.error(f"{'  ' * depth}  ✗ {element.element_id} 失败: {error}")
+                element.metadata['analysis_error'] = str(error)
+            else:
+                element.children = child_editable.elements
+                element.inpainted_background_path = child_editable.clean_background
+                if child_editable.metadata.get('incomplete'):
+                    element.metadata['analysis_incomplete'] = True
+                logger.info(f"{'  ' * depth}  ✓ {element.element_id} 完成: {len(child_editable.elements)} 个子元素")
@@ -0,0 +1,156 @@
+"""
+空间索引 - bbox 包含 / 相交的批量查询
+
+混合提取器合并结果时，要拿每个 MinerU 图片 / 表格 / 其他元素和每个百度OCR文字行比较
+（BBoxUtils.is_contained / has_intersection），表格单元格收缩时要反复计算所有单元格两两之间的
+间距，都是 O(M×N) 次 Python 调用，文字多的页面会有几百行 OCR 结果。
+
+SpatialIndex 把一组 bbox 放进 NumPy 数组上的均匀网格，查询时只取与查询框重叠的格子里的候选，
+再对候选做向量化的精确判断：
+
+    index = SpatialIndex([elem['bbox'] for elem in baidu_elements])
+    index.contained_in(image_bbox, threshold=0.8)      # 被 image_bbox 包含的 bbox 下标
+    index.intersecting(text_bbox, min_overlap_ratio=0.3)  # 与 text_bbox 有交集的 bbox 下标
+    i, j = index.pairs_within(6)                       # 间距小于 6px 的 bbox 对
+
+判断规则与 BBoxUtils 完全一致（交集必须有正面积，比例用相同的浮点运算），可以直接替换。
+无效的 bbox（缺失、不是 4 个数、宽或高不为正）不会被任何查询命中。
+"""
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 每个方向的最大格子数：限制单个大 bbox 登记的格子数
+MAX_CELLS_PER_AXIS = 64
+
+_EMPTY = np.empty(0, dtype=np.intp)
+
+
+class SpatialIndex:
+    """一组轴对齐 bbox [x0, y0, x1, y1] 的均匀网格索引（建立后只读，可多线程查询）"""
+
+    def __init__(self, boxes: Sequence[Optional[Sequence[float]]], cell_size: Optional[float] = None):
+        """
+        Args:
+            boxes: bbox 列表，查询结果是这个列表中的下标
+            cell_size: 网格边长（像素），默认取 bbox 长边的中位数
+        """
+        nan_box = (math.nan,) * 4
+        self.boxes = np.array(
+            [box if box is not None and len(box) == 4 else nan_box for box in boxes],
+            dtype=np.float64
+        ).reshape(-1, 4)
+        widths = self.boxes[:, 2] - self.boxes[:, 0]
+        heights = self.boxes[:, 3] - self.boxes[:, 1]
+        self.areas = widths * heights
+        valid = (widths > 0) & (heights > 0)  # NaN 比较结果为 False
+        self._valid = np.flatnonzero(valid)
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        self._grid_size = (0, 0)
+        if not len(self._valid):
+            return
+
+        valid_boxes = self.boxes[self._valid]
+        self._origin = valid_boxes[:, :2].min(axis=0)
+        extent = float((valid_boxes[:, 2:].max(axis=0) - self._origin).max())
+        if cell_size is None:
+            cell_size = float(np.median(np.maximum(widths[self._valid], heights[self._valid])))
+        self._cell = max(cell_size, extent / MAX_CELLS_PER_AXIS, 1e-6)
+
+        first = self._cell_coords(valid_boxes[:, :2])
+        last = self._cell_coords(valid_boxes[:, 2:])
+        self._grid_size = (int(last[:, 0].max()) + 1, int(last[:, 1].max()) + 1)
+        for box_idx, (cx0, cy0), (cx1, cy1) in zip(self._valid.tolist(), first.tolist(), last.tolist()):
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    self._cells.setdefault((cx, cy), []).append(box_idx)
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def _cell_coords(self, points: np.ndarray) -> np.ndarray:
+        return np.floor((points - self._origin) / self._cell).astype(np.intp)
+
+    def query(self, box: Optional[Sequence[float]], expand: float = 0.0) -> np.ndarray:
+        """
+        与 box（四周各扩展 expand 像素）有正面积交集的 bbox 下标（升序）
+        """
+        if not box or len(box) != 4 or not len(self._valid):
+            return _EMPTY
+        x0, y0, x1, y1 = (float(v) for v in box)
+        x0, y0, x1, y1 = x0 - expand, y0 - expand, x1 + expand, y1 + expand
+        if not (x1 > x0 and y1 > y0):
+            return _EMPTY
+
+        (cx0, cy0), (cx1, cy1) = self._cell_coords(np.array([[x0, y0], [x1, y1]])).tolist()
+        cx0, cy0 = max(cx0, 0), max(cy0, 0)
+        cx1, cy1 = min(cx1, self._grid_size[0] - 1), min(cy1, self._grid_size[1] - 1)
+        if cx0 > cx1 or cy0 > cy1:
+            return _EMPTY
+
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) >= len(self._valid):
+            # 查询框覆盖的格子比 bbox 还多：直接检查全部
+            candidates = self._valid
+        else:
+            found = set()
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    found.update(self._cells.get((cx, cy), ()))
+            if not found:
+                return _EMPTY
+            candidates = np.fromiter(sorted(found), dtype=np.intp, count=len(found))
+
+        b = self.boxes[candidates]
+        hit = (np.minimum(b[:, 2], x1) > np.maximum(b[:, 0], x0)) & \
+              (np.minimum(b[:, 3], y1) > np.maximum(b[:, 1], y0))
+        return candidates[hit]
+
+    def _intersection_areas(self, candidates: np.ndarray, box: Sequence[float]) -> np.ndarray:
+        x0, y0, x1, y1 = (float(v) for v in box)
+        b = self.boxes[candidates]
+        return (np.minimum(b[:, 2], x1) - np.maximum(b[:, 0], x0)) * \
+               (np.minimum(b[:, 3], y1) - np.maximum(b[:, 1], y0))
+
+    def contained_in(self, outer_box: Optional[Sequence[float]], threshold: float = 0.8) -> np.ndarray:
+        """被 outer_box 包含的 bbox 下标（同 BBoxUtils.is_contained(bbox, outer_box, threshold)）"""
+        candidates = self.query(outer_box)
+        if not len(candidates):
+            return candidates
+        ratios = self._intersection_areas(candidates, outer_box) / self.areas[candidates]
+        return candidates[ratios >= threshold]
+
+    def intersecting(self, box: Optional[Sequence[float]], min_overlap_ratio: float = 0.1) -> np.ndarray:
+        """与 box 有交集的 bbox 下标（同 BBoxUtils.has_intersection(box, bbox, min_overlap_ratio)）"""
+        candidates = self.query(box)
+        if not len(candidates):
+            return candidates
+        x0, y0, x1, y1 = (float(v) for v in box)
+        min_areas = np.minimum(self.areas[candidates], (x1 - x0) * (y1 - y0))
+        ratios = self._intersection_areas(candidates, box) / min_areas
+        return candidates[ratios >= min_overlap_ratio]
+
+    def contained_in_many(self, outer_boxes: Sequence[Optional[Sequence[float]]], threshold: float = 0.8) -> List[np.ndarray]:
+        """批量 contained_in：每个外框对应一个下标数组"""
+        return [self.contained_in(box, threshold) for box in outer_boxes]
+
+    def intersecting_many(self, boxes: Sequence[Optional[Sequence[float]]], min_overlap_ratio: float = 0.1) -> List[np.ndarray]:
+        """批量 intersecting：每个查询框对应一个下标数组"""
+        return [self.intersecting(box, min_overlap_ratio) for box in boxes]
+
+    def pairs_within(self, distance: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        水平和竖直方向间距都小于 distance（或相互重叠）的 bbox 对 (i, j)，i < j
+
+        间距为 distance 以上的 bbox 对一定不在结果中，适合只关心“近邻”的计算
+        """
+        firsts, seconds = [], []
+        for i in self._valid.tolist():
+            neighbors = self.query(self.boxes[i].tolist(), expand=distance)
+            neighbors = neighbors[neighbors > i]
+            if len(neighbors):
+                firsts.append(np.full(len(neighbors), i, dtype=np.intp))
+                seconds.append(neighbors)
+        if not firsts:
+            return _EMPTY, _EMPTY
+        return np.concatenate(firsts), np.concatenate(seconds)
@@ -0,0 +1,83 @@
+"""
+Image Result Cache - 生图结果的确定性缓存（可选，IMAGE_CACHE_ENABLED）
+
+AIService.generate_image 是系统中最贵的调用（2K 图片，每张数秒到数分钟）。页面的提示词、
+模板和素材参考图都没有变化时重新生图，会再付一次费用。开启后按最终输入内容寻址：
+
+    key = 最终提示词 + 各参考图的内容哈希 + 宽高比 + 分辨率 + provider 类型 + 图片模型
+
+命中时直接返回保存的图片，不调用 provider。结果以 PNG 保存在 UPLOAD_FOLDER/cache/images，
+超过 IMAGE_CACHE_DISK_MAX_MB 时淘汰最久未使用的条目。接口的 force_regenerate 会跳过读取
+（新结果仍写入缓存）。
+"""
+import io
+import os
+import hashlib
+import logging
+from typing import List, Optional
+
+from PIL import Image
+
+from .response_cache import ResponseCache, BinaryDiskTier
+from .reference_images import reference_images
+
+logger = logging.getLogger(__name__)
+
+
+def _pixel_digest(image: Image.Image) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{image.mode}:{image.size}".encode('utf-8'))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class ImageResultCache(ResponseCache):
+    """生图结果缓存：只有磁盘层，默认关闭"""
+
+    def __init__(self):
+        super().__init__(tiers=[], enabled=False)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('IMAGE_CACHE_ENABLED', False)
+        max_mb = float(app.config.get('IMAGE_CACHE_DISK_MAX_MB', 2048))
+        directory = os.path.join(app.config['UPLOAD_FOLDER'], 'cache', 'images')
+        with self._lock:
+            self.tiers = [BinaryDiskTier(directory, max_bytes=int(max_mb * 1024 * 1024), suffix='.png')]
+            self._counters = self._empty_counters()
+
+    @staticmethod
+    def image_fingerprint(image: Image.Image) -> str:
+        """参考图的内容哈希（按解码后的像素计算，与文件路径和编码格式无关；同一模板只计算一次）"""
+        return reference_images.payload(image, 'sha256', _pixel_digest)
+
+    def make_image_key(self, provider, model: str, prompt: str, ref_images: Optional[List[Image.Image]],
+                       aspect_ratio: str, resolution: str) -> str:
+        return self.make_key(
+            provider, model, prompt,
+            ref_images=[self.image_fingerprint(img) for img in ref_images or []],
+            aspect_ratio=aspect_ratio,
+            resolution=resolution,
+        )
+
+    def get_image(self, key: str) -> Optional[Image.Image]:
+        data = self.get(key)
+        if data is None:
+            return None
+        try:
+            image = Image.open(io.BytesIO(data))
+            image.load()
+            return image
+        except Exception as e:
+            logger.warning(f"Discarding undecodable cached image {key}: {e}")
+            return None
+
+    def set_image(self, key: str, image: Image.Image):
+        if not self.enabled:
+            return
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        self.set(key, buffer.getvalue())
+
+
+# Global image result cache
+image_result_cache = ImageResultCache()
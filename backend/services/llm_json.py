@@ -0,0 +1,178 @@
+"""
+LLM JSON - 容错的 LLM JSON 输出解析
+
+AIService.generate_json 以前只去掉代码块标记后直接 json.loads，任何 JSONDecodeError 都会让
+tenacity 重新调用一次模型（最多 3 次）。实际的失败大多是可以机械修复的格式问题：
+
+- JSON 前后带有说明文字，或包在 ```json 代码块中间
+- 对象 / 数组末尾多余的逗号
+- 字符串里未转义的换行、制表符等控制字符
+- 输出在最后一个元素完整之后被截断，缺少结尾的 ] / }
+
+    result = llm_json.parse(response_text)
+
+先按原样解析；失败时定位 JSON 片段并修复后再解析。只做不丢失内容的修复：截断在字符串
+中间、键后缺少值等情况仍然抛出 json.JSONDecodeError，由调用方重新生成。
+stats() 中的 repaired 即为省下的 provider 调用次数。
+"""
+import re
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?[ \t]*\n?(.*?)(?:```|$)", re.DOTALL)
+_CLOSERS = {'{': '}', '[': ']'}
+_CONTROL_ESCAPES = {'\n': '\\n', '\r': '\\r', '\t': '\\t', '\b': '\\b', '\f': '\\f'}
+
+# 尝试作为 JSON 起点的 { / [ 最多几个（说明文字里可能有括号）
+MAX_CANDIDATES = 8
+
+
+def _strip_trailing_comma(out: List[str]) -> bool:
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ',':
+        out.pop()
+        return True
+    return False
+
+
+def _repair_from(text: str, start: int) -> Tuple[Optional[str], List[str], int]:
+    """
+    从 text[start]（{ 或 [）开始扫描一个 JSON 值并修复，返回 (修复后的文本, 修复类型, 扫描结束位置)
+
+    无法在不丢失内容的前提下修复时修复后的文本为 None。
+    """
+    out: List[str] = []
+    fixes: List[str] = []
+    stack: List[str] = []
+    in_string = False
+    escape = False
+
+    for pos in range(start, len(text)):
+        ch = text[pos]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+            elif ch < ' ':
+                out.append(_CONTROL_ESCAPES.get(ch, f'\\u{ord(ch):04x}'))
+                if 'control_chars' not in fixes:
+                    fixes.append('control_chars')
+                continue
+            out.append(ch)
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+        elif ch in '}]':
+            if not stack or stack[-1] != ch:
+                return None, fixes, pos + 1
+            if _strip_trailing_comma(out) and 'trailing_comma' not in fixes:
+                fixes.append('trailing_comma')
+            stack.pop()
+            out.append(ch)
+            if not stack:
+                return ''.join(out), fixes, pos + 1
+            continue
+        out.append(ch)
+
+    # 到达文本末尾仍未闭合：只在截断点位于完整的值之后时补齐括号
+    if in_string:
+        return None, fixes, len(text)
+    _strip_trailing_comma(out)
+    if not out or out[-1] == ':':
+        return None, fixes, len(text)
+    fixes.append('closed_brackets')
+    return ''.join(out) + ''.join(reversed(stack)), fixes, len(text)
+
+
+class LLMJsonParser:
+    """解析（必要时修复）LLM 返回的 JSON，并统计修复情况"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.parsed = 0
+        self.repaired = 0
+        self.failed = 0
+        self.fixes: Dict[str, int] = {}
+
+    def parse(self, text: str) -> Any:
+        """
+        解析 LLM 输出中的 JSON
+
+        Raises:
+            json.JSONDecodeError: 输出中没有可用的 JSON（调用方应重新生成）
+        """
+        stripped = text.strip()
+        try:
+            result = json.loads(stripped)
+        except json.JSONDecodeError as e:
+            error = e
+        else:
+            self._count(parsed=1)
+            return result
+
+        repaired = self._repair(stripped)
+        if repaired is None:
+            self._count(failed=1)
+            raise error
+        result, fixes = repaired
+        self._count(repaired=1, fixes=fixes)
+        logger.info(f"Repaired malformed LLM JSON ({', '.join(fixes)}), skipped regeneration")
+        return result
+
+    def _repair(self, text: str) -> Optional[Tuple[Any, List[str]]]:
+        fixes: List[str] = []
+        fence = _FENCE_RE.search(text)
+        if fence and fence.group(1).strip():
+            text = fence.group(1)
+            fixes.append('code_fence')
+
+        starts = [i for i, ch in enumerate(text) if ch in _CLOSERS][:MAX_CANDIDATES]
+        scanned_to = 0
+        for start in starts:
+            if start < scanned_to:
+                # 位于上一个候选内部（例如被截断数组中的某个元素），单独取出会丢失内容
+                continue
+            repaired_text, candidate_fixes, scanned_to = _repair_from(text, start)
+            if repaired_text is None:
+                continue
+            try:
+                result = json.loads(repaired_text)
+            except json.JSONDecodeError:
+                continue
+            if text[:start].strip() or text[scanned_to:].strip():
+                fixes.append('surrounding_text')
+            return result, fixes + candidate_fixes
+        return None
+
+    def _count(self, parsed: int = 0, repaired: int = 0, failed: int = 0, fixes: Optional[List[str]] = None):
+        with self._lock:
+            self.parsed += parsed
+            self.repaired += repaired
+            self.failed += failed
+            for fix in fixes or []:
+                self.fixes[fix] = self.fixes.get(fix, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'parsed': self.parsed,
+                'repaired': self.repaired,
+                'provider_calls_saved': self.repaired,
+                'failed': self.failed,
+                'fixes': dict(self.fixes),
+            }
+
+
+# Global LLM JSON parser
+llm_json = LLMJsonParser()
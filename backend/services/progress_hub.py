@@ -0,0 +1,125 @@
+"""
+Progress Hub - 进程内任务进度发布/订阅
+
+客户端以前每秒轮询 GET /api/projects/<id>/tasks/<task_id>，每次轮询都要查库并解析
+progress JSON。现在任务状态的变化在数据库提交后发布到进程内的 hub：
+
+- SSE：GET /api/projects/<id>/tasks/<task_id>/events，一个连接持续接收推送
+- 长轮询：GET /api/projects/<id>/tasks/<task_id>?wait=30&since=<version>，
+  有新版本时立即返回，否则最多挂起 wait 秒
+
+发布源：
+- SQLAlchemy 会话事件：任何 Task 对象（Task.set_progress、状态变更）提交后，hub 发布一份
+  to_dict() 快照。只发布已提交的数据，订阅方不会看到随后被回滚的进度
+- progress_writer：页面级进度和导出的 progress_callback 先写入内存缓冲，同时推送实时快照
+
+hub 只在当前进程内生效。任务在独立 worker 进程中执行时，web 进程收不到推送，
+订阅方等待超时后回退为低频查库（见 TASK_EVENTS_FALLBACK_INTERVAL）。
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# 最多保留的任务快照数（按最近更新淘汰）
+MAX_TRACKED_TASKS = 1000
+
+_PENDING_KEY = 'progress_hub_pending'
+
+
+class ProgressHub:
+    """
+    任务快照的发布/订阅中心
+
+    每个任务保存最新快照和单调递增的版本号；订阅方带着已知版本号等待更新的版本，
+    中间被覆盖的快照不会补发（进度只关心最新值）。
+    """
+
+    def __init__(self, max_tasks: int = MAX_TRACKED_TASKS):
+        self.max_tasks = max_tasks
+        self._cond = threading.Condition()
+        # task_id -> (version, snapshot)
+        self._latest: 'OrderedDict[str, Tuple[int, Dict[str, Any]]]' = OrderedDict()
+        self._installed = False
+
+    def publish(self, task_id: str, snapshot: Dict[str, Any]) -> int:
+        """发布任务快照，返回新版本号"""
+        with self._cond:
+            version = self._latest[task_id][0] + 1 if task_id in self._latest else 1
+            self._latest[task_id] = (version, snapshot)
+            self._latest.move_to_end(task_id)
+            while len(self._latest) > self.max_tasks:
+                self._latest.popitem(last=False)
+            self._cond.notify_all()
+        return version
+
+    def sync(self, task_id: str, snapshot: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """
+        用从数据库读到的快照校准 hub，内容变化时才发布新版本
+
+        其他进程（独立 worker）的更新不经过本进程的会话事件，订阅方回退查库后经由这里进入 hub，
+        同一任务的其他订阅方也随之被唤醒。
+        """
+        with self._cond:
+            current = self._latest.get(task_id)
+            if current is not None and current[1] == snapshot:
+                return current
+        return self.publish(task_id, snapshot), snapshot
+
+    def latest(self, task_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """最新的 (version, snapshot)，hub 中没有该任务时返回 None"""
+        with self._cond:
+            return self._latest.get(task_id)
+
+    def wait(self, task_id: str, since: int = 0, timeout: float = 30.0) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """
+        等待版本号大于 since 的快照
+
+        Returns:
+            (version, snapshot)；超时返回 None
+        """
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: task_id in self._latest and self._latest[task_id][0] > since,
+                timeout=timeout
+            ):
+                return None
+            return self._latest[task_id]
+
+    def init_app(self, app):
+        """注册会话事件：Task 提交后发布快照（全局只注册一次）"""
+        if self._installed:
+            return
+        event.listen(Session, 'after_flush', self._collect)
+        event.listen(Session, 'after_commit', self._flush_pending)
+        event.listen(Session, 'after_soft_rollback', self._discard_pending)
+        self._installed = True
+
+    # ---- SQLAlchemy session hooks ----
+
+    def _collect(self, session, flush_context):
+        from models import Task
+
+        for obj in list(session.new) + list(session.dirty):
+            if isinstance(obj, Task):
+                # 在 flush 时取快照：commit 后对象会过期，再访问属性会触发查询
+                session.info.setdefault(_PENDING_KEY, {})[obj.id] = obj.to_dict()
+
+    def _flush_pending(self, session):
+        pending = session.info.pop(_PENDING_KEY, None)
+        if not pending:
+            return
+        for task_id, snapshot in pending.items():
+            self.publish(task_id, snapshot)
+
+    def _discard_pending(self, session, previous_transaction):
+        session.info.pop(_PENDING_KEY, None)
+
+
+# Global progress hub
+progress_hub = ProgressHub()
@@ -0,0 +1,172 @@
+"""
+Progress Writer - 合并任务进度写入
+
+以前每完成一页就 `task.update_progress(...)` + `db.session.commit()`，导出的
+progress_callback 每一步也提交一次。8 个以上的线程同时抢 SQLite 写锁时，这些小事务
+互相排队，连带拖慢图片保存。
+
+现在进度先写入内存缓冲，后台线程每隔 PROGRESS_FLUSH_INTERVAL 秒把所有任务的最新进度
+合并成一个事务写回；状态切换（完成 / 失败 / 取消）前任务显式调用 flush(task_id)：
+
+    progress_writer.update(task_id, completed=3, failed=0)
+    ...
+    progress_writer.flush(task_id)
+    task.status = 'COMPLETED'
+
+读取方通过 pending() / apply_pending() 看到尚未落库的实时进度，update() 也会把实时快照
+推送给 progress_hub（SSE / 长轮询订阅方）。缓冲只在当前进程内，进程崩溃时最多丢失
+一个刷新间隔的进度（任务本身会被队列重新派发）。
+"""
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressWriter:
+    """任务进度的写缓冲"""
+
+    def __init__(self, flush_interval: float = 1.0):
+        self.flush_interval = flush_interval
+        self._app = None
+        self._lock = threading.Lock()
+        # task_id -> 最新的完整进度
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._wakeup = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def init_app(self, app):
+        self._app = app
+        self.flush_interval = float(app.config.get('PROGRESS_FLUSH_INTERVAL', self.flush_interval))
+
+    # ---- 写入 ----
+
+    def update(self, task_id: str, completed=None, failed=None, **extra) -> Dict[str, Any]:
+        """增量更新进度（语义同 Task.update_progress），返回合并后的进度"""
+        with self._lock:
+            progress = self._pending.get(task_id)
+        if progress is None:
+            # 该任务第一次缓冲时以数据库中的进度为基础
+            progress = self._load(task_id)
+        else:
+            progress = dict(progress)
+        if completed is not None:
+            progress['completed'] = completed
+        if failed is not None:
+            progress['failed'] = failed
+        progress.update(extra)
+        return self.set(task_id, progress)
+
+    def set(self, task_id: str, progress: Dict[str, Any]) -> Dict[str, Any]:
+        """整体替换进度（语义同 Task.set_progress）"""
+        progress = dict(progress)
+        with self._lock:
+            self._pending[task_id] = progress
+        self._publish(task_id, progress)
+        self._ensure_flusher()
+        return progress
+
+    def discard(self, task_id: str):
+        """丢弃未落库的进度（任务结束后调用）"""
+        with self._lock:
+            self._pending.pop(task_id, None)
+
+    # ---- 读取 ----
+
+    def pending(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """尚未落库的最新进度，没有时返回 None"""
+        with self._lock:
+            progress = self._pending.get(task_id)
+        return dict(progress) if progress is not None else None
+
+    def apply_pending(self, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """用实时进度覆盖 Task.to_dict() 快照中的 progress（已结束的任务以数据库为准）"""
+        from services.task_queue import TERMINAL_STATUSES
+
+        if snapshot.get('status') in TERMINAL_STATUSES:
+            return snapshot
+        progress = self.pending(snapshot.get('task_id'))
+        return dict(snapshot, progress=progress) if progress is not None else snapshot
+
+    # ---- 落库 ----
+
+    def flush(self, task_id: Optional[str] = None):
+        """
+        立即写回缓冲的进度
+
+        Args:
+            task_id: 只写回该任务（任务状态切换前调用）；为 None 时写回全部未结束任务的进度
+        """
+        with self._lock:
+            if task_id is None:
+                batch = dict(self._pending)
+            elif task_id in self._pending:
+                batch = {task_id: self._pending[task_id]}
+            else:
+                return
+        if batch:
+            self._write(batch, only_unfinished=task_id is None)
+
+    def _write(self, batch: Dict[str, Dict[str, Any]], only_unfinished: bool):
+        from models import db, Task
+        from services.task_queue import TERMINAL_STATUSES
+
+        try:
+            with self._app.app_context():
+                for task_id, progress in batch.items():
+                    query = Task.query.filter(Task.id == task_id)
+                    if only_unfinished:
+                        # 后台刷新不能覆盖任务结束时写入的最终进度（如导出的 download_url）
+                        query = query.filter(Task.status.notin_(TERMINAL_STATUSES))
+                    query.update({'progress': json.dumps(progress)}, synchronize_session=False)
+                db.session.commit()
+        except Exception as e:
+            logger.warning(f"Failed to flush progress for {len(batch)} task(s): {e}")
+            return
+
+        with self._lock:
+            for task_id, progress in batch.items():
+                # 写回期间又有新进度时保留缓冲，等下一轮刷新
+                if self._pending.get(task_id) is progress:
+                    del self._pending[task_id]
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Progress flusher error: {e}")
+
+    def _ensure_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._flush_loop, name='progress-writer', daemon=True
+                )
+                self._flusher.start()
+
+    # ---- helpers ----
+
+    def _load(self, task_id: str) -> Dict[str, Any]:
+        from models import Task
+
+        with self._app.app_context():
+            task = Task.query.get(task_id)
+            return task.get_progress() if task else {}
+
+    def _publish(self, task_id: str, progress: Dict[str, Any]):
+        from services.progress_hub import progress_hub
+
+        latest = progress_hub.latest(task_id)
+        if latest is not None:
+            progress_hub.publish(task_id, dict(latest[1], progress=progress))
+
+
+# Global progress writer
+progress_writer = ProgressWriter()
@@ -4,7 +4,9 @@ AI Service Prompts - 集中管理所有 AI 服务的 prompt 模板
 import json
 import logging
 from textwrap import dedent
-from typing import List, Dict, Optional, TYPE_CHECKING
+from typing import List, Dict, Optional, Tuple, TYPE_CHECKING
+
+from .reference_index import reference_index
 
 if TYPE_CHECKING:
     from services.ai_service import ProjectContext
@@ -106,6 +108,24 @@ def _format_reference_files_xml(reference_files_content: Optional[List[Dict[str,
     return '\n'.join(xml_parts)
 
 
+def _page_query(page_outline, part_info: str = "") -> str:
+    """页面大纲中的文字（标题、要点、章节），用于检索相关的参考文件分块"""
+    texts = [part_info]
+
+    def collect(value):
+        if isinstance(value, dict):
+            for v in value.values():
+                collect(v)
+        elif isinstance(value, (list, tuple)):
+            for v in value:
+                collect(v)
+        elif value is not None:
+            texts.append(str(value))
+
+    collect(page_outline)
+    return '\n'.join(t for t in texts if t)
+
+
 def get_outline_generation_prompt(project_context: 'ProjectContext', language: str = None) -> str:
     """
     生成 PPT 大纲的 prompt
@@ -239,7 +259,29 @@ def get_page_description_prompt(project_context: 'ProjectContext', outline: list
     Returns:
         格式化后的 prompt 字符串
     """
-    files_xml = _format_reference_files_xml(project_context.reference_files_content)
+    prefix, suffix = get_page_description_prompt_parts(
+        project_context, outline, page_outline, page_index, part_info, language
+    )
+    return prefix + suffix
+
+
+def get_page_description_prompt_parts(project_context: 'ProjectContext', outline: list,
+                                      page_outline: dict, page_index: int,
+                                      part_info: str = "",
+                                      language: str = None) -> Tuple[str, str]:
+    """
+    生成单个页面描述的 prompt，拆分为 (共享前缀, 页面后缀)
+
+    前缀（参考文件、原始需求、完整大纲）对同一项目的所有页面完全相同，可以注册为
+    provider 端的上下文缓存（见 services/context_cache.py）；两者拼接即为完整 prompt。
+    参考文件被检索裁剪时各页内容不同，裁剪后的片段放在后缀中。
+    """
+    # 参考文件过大时只带上与本页相关的分块
+    reference_files = reference_index.select(
+        project_context.reference_files_content, _page_query(page_outline, part_info)
+    )
+    trimmed = reference_files is not project_context.reference_files_content
+    files_xml = _format_reference_files_xml(reference_files)
     # 根据项目类型选择最相关的原始输入
     if project_context.creation_type == 'idea' and project_context.idea_prompt:
         original_input = project_context.idea_prompt
@@ -250,10 +292,12 @@ def get_page_description_prompt(project_context: 'ProjectContext', outline: list
     else:
         original_input = project_context.idea_prompt or ""
     
-    prompt = (f"""\
+    prefix = (f"""\
 我们正在为PPT的每一页生成内容描述。
 用户的原始需求是：\n{original_input}\n
-我们已经有了完整的大纲：\n{outline}\n{part_info}
+我们已经有了完整的大纲：\n{outline}\n""")
+    suffix = (f"""\
+{part_info}
 现在请为第 {page_index} 页生成描述：
 {page_outline}
 {"**除非特殊要求，第一页的内容需要保持极简，只放标题副标题以及演讲人等（输出到标题后）, 不添加任何素材。**" if page_index == 1 else ""}
@@ -282,9 +326,12 @@ def get_page_description_prompt(project_context: 'ProjectContext', outline: list
 {get_language_instruction(language)}
 """)
     
-    final_prompt = files_xml + prompt
-    logger.debug(f"[get_page_description_prompt] Final prompt:\n{final_prompt}")
-    return final_prompt
+    if not trimmed:
+        prefix = files_xml + prefix
+    elif files_xml:
+        suffix = f"以下是参考文件中与本页相关的片段：\n{files_xml}" + suffix
+    logger.debug(f"[get_page_description_prompt] Final prompt:\n{prefix + suffix}")
+    return prefix, suffix
 
 
 def get_image_generation_prompt(page_desc: str, outline_text: str, 
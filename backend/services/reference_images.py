@@ -0,0 +1,213 @@
+"""
+Reference Images - 进程内共享的参考图解码 / 编码缓存
+
+批量生图时 N 个页面线程各自 Image.open 同一张项目模板并解码，provider 再为每一页把它
+重新编码（OpenAI 格式转 JPEG + base64，GenAI 由 SDK 再序列化一次）。40 页的 4K 模板
+就是 40 次重复的解码 + 编码。
+
+现在本地参考图按 (路径, 修改时间, 文件大小) 缓存解码结果，provider 需要的发送格式
+也按同一 key 缓存，每张模板只解码、编码一次：
+
+    image = reference_images.open(path)                      # AIService.generate_image
+    payload = reference_images.payload(image, 'openai_jpeg_base64', self._encode_image_to_base64)
+
+缓存的 Image 对象在线程间共享，调用方只能读取，需要修改时先 copy()。
+文件被替换后 mtime / size 变化，旧条目不再命中并按 LRU 淘汰。
+
+发送前 prepare() 按 REFERENCE_IMAGE_MAX_EDGE 把长边超限的参考图缩小（4K 模板对生图模型
+没有额外价值，只会增大请求体和上传时间）。缩小后的版本保存在原文件旁边的 .refcache 目录，
+无透明通道时存为 JPEG（REFERENCE_IMAGE_JPEG_QUALITY），有透明通道时存为 PNG；
+原文件更新后重新生成。
+"""
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# 挂在缓存 Image 对象上的属性，provider 据此找到对应的缓存条目
+_KEY_ATTR = '_reference_cache_key'
+
+# 缩小后的参考图所在的子目录（位于原文件所在目录下）
+VARIANT_DIR = '.refcache'
+
+
+class _Entry:
+    def __init__(self, path: str, image: Image.Image, size: int):
+        self.path = path
+        self.image = image
+        self.size = size
+        self.payloads: Dict[str, Any] = {}
+        self.lock = threading.Lock()
+
+
+class ReferenceImageCache:
+    """按文件身份缓存解码后的参考图及各 provider 的发送格式"""
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024, max_edge: int = 2048, jpeg_quality: int = 90):
+        self.max_bytes = max_bytes
+        self.max_edge = max_edge
+        self.jpeg_quality = jpeg_quality
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Tuple, _Entry]' = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.encodes = 0
+
+    def init_app(self, app):
+        self.max_bytes = int(float(app.config.get('REFERENCE_IMAGE_CACHE_MB', 512)) * 1024 * 1024)
+        self.max_edge = int(app.config.get('REFERENCE_IMAGE_MAX_EDGE', self.max_edge))
+        self.jpeg_quality = int(app.config.get('REFERENCE_IMAGE_JPEG_QUALITY', self.jpeg_quality))
+
+    @staticmethod
+    def _file_key(path: str) -> Tuple:
+        st = os.stat(path)
+        return (os.path.realpath(path), st.st_mtime_ns, st.st_size)
+
+    def open(self, path: str) -> Image.Image:
+        """打开本地参考图（已解码，线程间共享，只读）"""
+        key = self._file_key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.image
+            self.misses += 1
+
+        image = Image.open(path)
+        image.load()
+        setattr(image, _KEY_ATTR, key)
+        entry = _Entry(path, image, self._estimate_size(image))
+
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                # 其他线程同时解码了同一文件，以先放入的为准
+                return existing.image
+            self._entries[key] = entry
+            self._total_bytes += entry.size
+            self._evict()
+        return image
+
+    def payload(self, image: Image.Image, fmt: str, encode: Callable[[Image.Image], Any]) -> Any:
+        """
+        取参考图的某种发送格式，未缓存时调用 encode(image) 生成
+
+        不是由 open() 得到的图片（下载的 URL、调用方传入的 PIL 对象）直接编码、不缓存。
+        """
+        entry = self._entry_for(image)
+        if entry is None:
+            return encode(image)
+        # 同一条目的同一格式只编码一次，其余线程等待
+        with entry.lock:
+            if fmt not in entry.payloads:
+                entry.payloads[fmt] = encode(image)
+                self.encodes += 1
+                with self._lock:
+                    added = self._estimate_size(entry.payloads[fmt])
+                    entry.size += added
+                    self._total_bytes += added
+            return entry.payloads[fmt]
+
+    def prepare(self, image: Image.Image) -> Image.Image:
+        """
+        按参考图策略返回要发送的图片：长边不超过 max_edge（max_edge <= 0 时不缩小）
+
+        本地文件的缩小版本写入 .refcache 并经 open() 缓存，每张图片只缩放一次；
+        其他图片在内存中缩小一份副本。
+        """
+        if self.max_edge <= 0 or max(image.size) <= self.max_edge:
+            return image
+        path = self.source_path(image)
+        if path is None:
+            return self._downscale(image)
+        variant_path = self.payload(
+            image, f'variant:{self.max_edge}:{self.jpeg_quality}', lambda img: self._write_variant(img, path)
+        )
+        return self.open(variant_path)
+
+    def source_path(self, image: Image.Image) -> Optional[str]:
+        """缓存图片对应的本地文件路径（可以直接发送原始文件字节时使用）"""
+        entry = self._entry_for(image)
+        return entry.path if entry is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'encodes': self.encodes,
+            }
+
+    # ---- helpers ----
+
+    def _entry_for(self, image: Image.Image) -> Optional[_Entry]:
+        key = getattr(image, _KEY_ATTR, None)
+        if key is None:
+            return None
+        with self._lock:
+            return self._entries.get(key)
+
+    def _downscale(self, image: Image.Image) -> Image.Image:
+        resized = image.copy()
+        resized.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS)
+        return resized
+
+    def _write_variant(self, image: Image.Image, path: str) -> str:
+        """生成（或复用）原文件旁边的缩小版本，返回其路径"""
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        ext = 'png' if has_alpha else 'jpg'
+        stem = os.path.splitext(os.path.basename(path))[0]
+        variant_dir = os.path.join(os.path.dirname(path), VARIANT_DIR)
+        variant_path = os.path.join(variant_dir, f"{stem}.{self.max_edge}.q{self.jpeg_quality}.{ext}")
+        try:
+            if os.path.getmtime(variant_path) >= os.path.getmtime(path):
+                return variant_path
+        except OSError:
+            pass
+
+        resized = self._downscale(image)
+        os.makedirs(variant_dir, exist_ok=True)
+        tmp_path = f"{variant_path}.{os.getpid()}.tmp"
+        if has_alpha:
+            resized.save(tmp_path, format='PNG', optimize=True)
+        else:
+            if resized.mode != 'RGB':
+                resized = resized.convert('RGB')
+            resized.save(tmp_path, format='JPEG', quality=self.jpeg_quality, optimize=True)
+        os.replace(tmp_path, variant_path)
+        logger.debug(f"Prepared reference image {path} -> {variant_path} ({image.size} -> {resized.size})")
+        return variant_path
+
+    def _evict(self):
+        # 至少保留最新的一条，单张超大图片也能复用
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.size
+
+    @staticmethod
+    def _estimate_size(value: Any) -> int:
+        if isinstance(value, Image.Image):
+            return value.width * value.height * len(value.getbands())
+        if isinstance(value, (bytes, str)):
+            return len(value)
+        data = getattr(getattr(value, 'inline_data', None), 'data', None)
+        return len(data) if data else 0
+
+
+# Global reference image cache
+reference_images = ReferenceImageCache()
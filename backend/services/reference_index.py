@@ -0,0 +1,305 @@
+"""
+Reference Index - 参考文件的本地分块检索（BM25）
+
+以前每个页面描述的 prompt 都嵌入所有参考文件的完整 markdown。100 页的 PDF 参考文件、
+30 页的 PPT 就是把同样的几 MB 上下文发送 30 次，既慢又贵，有时还会超出上下文窗口。
+
+参考文件解析完成时按段落切块并建立 BM25 索引（纯本地，不调用任何接口），索引按内容哈希
+保存在 UPLOAD_FOLDER/cache/reference_index。生成页面描述时：
+
+    files = reference_index.select(project_context.reference_files_content, query)
+
+- 参考文件总量在 REFERENCE_CONTEXT_TOKEN_BUDGET 以内时原样返回，行为与以前一致
+- 超出时只保留与该页（标题、要点、章节）最相关的 REFERENCE_CONTEXT_TOP_K 个分块，
+  按原文顺序拼接，总量不超过预算；没有任何相关分块时保留文件开头部分
+
+中英文混排按英文单词 + 中文字二元组（bigram）分词。大纲生成、整体修改等需要全文的 prompt 不受影响。
+"""
+import os
+import re
+import math
+import hashlib
+import logging
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .response_cache import DiskTier
+
+logger = logging.getLogger(__name__)
+
+# 索引格式变化时递增，旧索引自然失效
+INDEX_VERSION = 1
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9_\-\.]*[a-z0-9]|[a-z0-9]")
+_CJK_RE = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]+")
+_HEADING_RE = re.compile(r"^#{1,6}\s+\S")
+
+# BM25 参数
+_K1 = 1.5
+_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """英文按单词（小写），中文按相邻两字（单字成段时取单字）"""
+    text = text.lower()
+    tokens = _WORD_RE.findall(text)
+    for run in _CJK_RE.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计模型 token 数：中文约每字 1 个，其他约每 4 个字符 1 个"""
+    cjk = sum(len(run) for run in _CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def split_chunks(content: str, chunk_chars: int) -> List[Dict[str, str]]:
+    """
+    按空行分段、按最近的标题归组，把 markdown 切成不超过 chunk_chars 的分块
+
+    Returns:
+        [{'heading': 所属标题, 'text': 分块原文}, ...]，按原文顺序
+    """
+    chunks: List[Dict[str, str]] = []
+    heading = ''
+    current: List[str] = []
+    current_len = 0
+
+    def flush():
+        nonlocal current, current_len
+        if current:
+            chunks.append({'heading': heading, 'text': '\n\n'.join(current)})
+        current, current_len = [], 0
+
+    for block in re.split(r"\n\s*\n", content):
+        block = block.strip()
+        if not block:
+            continue
+        first_line = block.split('\n', 1)[0]
+        if _HEADING_RE.match(first_line):
+            flush()
+            heading = first_line.strip()
+        # 超长段落按行再切，单行仍超长时硬切
+        pieces = [block] if len(block) <= chunk_chars else _split_long_block(block, chunk_chars)
+        for piece in pieces:
+            if current and current_len + len(piece) > chunk_chars:
+                flush()
+            current.append(piece)
+            current_len += len(piece) + 2
+    flush()
+    return chunks
+
+
+def _split_long_block(block: str, chunk_chars: int) -> List[str]:
+    pieces, current = [], ''
+    for line in block.split('\n'):
+        while len(line) > chunk_chars:
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(line[:chunk_chars])
+            line = line[chunk_chars:]
+        if current and len(current) + len(line) + 1 > chunk_chars:
+            pieces.append(current)
+            current = ''
+        current = f"{current}\n{line}" if current else line
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+class _FileIndex:
+    """单个参考文件的分块及词频"""
+
+    def __init__(self, chunks: List[Dict[str, str]], term_freqs: List[Dict[str, int]]):
+        self.chunks = chunks
+        self.term_freqs = term_freqs
+        self.lengths = [sum(tf.values()) for tf in term_freqs]
+        self.doc_freq: Counter = Counter()
+        for tf in term_freqs:
+            self.doc_freq.update(tf.keys())
+
+    @classmethod
+    def build(cls, content: str, chunk_chars: int) -> '_FileIndex':
+        chunks = split_chunks(content, chunk_chars)
+        term_freqs = [dict(Counter(tokenize(f"{c['heading']}\n{c['text']}"))) for c in chunks]
+        return cls(chunks, term_freqs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'chunks': self.chunks, 'term_freqs': self.term_freqs}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> '_FileIndex':
+        return cls(data['chunks'], data['term_freqs'])
+
+
+class ReferenceIndex:
+    """参考文件分块索引（内存 LRU + 磁盘），按文件内容寻址"""
+
+    def __init__(self, token_budget: int = 12000, top_k: int = 12, chunk_chars: int = 1500,
+                 memory_entries: int = 32):
+        self.token_budget = token_budget
+        self.top_k = top_k
+        self.chunk_chars = chunk_chars
+        self.memory_entries = memory_entries
+        self._lock = threading.Lock()
+        self._memory: 'OrderedDict[str, _FileIndex]' = OrderedDict()
+        self._disk: Optional[DiskTier] = None
+        self.built = 0
+        self.loaded = 0
+        self.trimmed_prompts = 0
+        self.tokens_saved = 0
+
+    def init_app(self, app):
+        self.token_budget = int(app.config.get('REFERENCE_CONTEXT_TOKEN_BUDGET', self.token_budget))
+        self.top_k = int(app.config.get('REFERENCE_CONTEXT_TOP_K', self.top_k))
+        self.chunk_chars = int(app.config.get('REFERENCE_CHUNK_CHARS', self.chunk_chars))
+        directory = os.path.join(app.config['UPLOAD_FOLDER'], 'cache', 'reference_index')
+        self._disk = DiskTier(directory, max_bytes=256 * 1024 * 1024)
+        with self._lock:
+            self._memory.clear()
+
+    def _key(self, content: str) -> str:
+        digest = hashlib.sha256(f"v{INDEX_VERSION}:{self.chunk_chars}:".encode('utf-8'))
+        digest.update(content.encode('utf-8'))
+        return digest.hexdigest()
+
+    def build(self, content: str) -> '_FileIndex':
+        """取（必要时建立并保存）某个参考文件内容的索引；解析完成时调用以提前建好"""
+        key = self._key(content)
+        with self._lock:
+            index = self._memory.get(key)
+            if index is not None:
+                self._memory.move_to_end(key)
+                return index
+
+        data = self._disk.get(key) if self._disk else None
+        if data is not None:
+            index = _FileIndex.from_dict(data)
+            self.loaded += 1
+        else:
+            index = _FileIndex.build(content, self.chunk_chars)
+            self.built += 1
+            if self._disk:
+                try:
+                    self._disk.set(key, index.to_dict())
+                except OSError as e:
+                    logger.warning(f"Failed to persist reference index {key[:12]}: {e}")
+            logger.debug(f"Built reference index {key[:12]}: {len(index.chunks)} chunks")
+
+        with self._lock:
+            self._memory[key] = index
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+        return index
+
+    def select(self, reference_files_content: Optional[List[Dict[str, str]]], query: str) -> List[Dict[str, str]]:
+        """
+        按 token 预算裁剪参考文件内容，返回与 reference_files_content 相同结构的列表
+
+        Args:
+            reference_files_content: [{'filename': ..., 'content': ...}, ...]
+            query: 检索用文本（页面标题、要点、章节）
+        """
+        files = [f for f in reference_files_content or [] if f.get('content')]
+        if not files or self.token_budget <= 0:
+            return reference_files_content or []
+        total_tokens = sum(estimate_tokens(f['content']) for f in files)
+        if total_tokens <= self.token_budget:
+            return reference_files_content
+
+        indexes = [self.build(f['content']) for f in files]
+        picked = self._pick(indexes, tokenize(query))
+
+        selected = []
+        used_tokens = 0
+        for file_pos, (file_info, index) in enumerate(zip(files, indexes)):
+            chunk_ids = sorted(chunk_id for pos, chunk_id in picked if pos == file_pos)
+            if not chunk_ids:
+                continue
+            parts = []
+            last_heading = None
+            for chunk_id in chunk_ids:
+                chunk = index.chunks[chunk_id]
+                text = chunk['text']
+                # 分块不是从标题开始时补上所属标题，保留上下文
+                if chunk['heading'] and not text.startswith(chunk['heading']) and chunk['heading'] != last_heading:
+                    text = f"{chunk['heading']}\n\n{text}"
+                last_heading = chunk['heading']
+                parts.append(text)
+            content = '\n\n...\n\n'.join(parts)
+            used_tokens += estimate_tokens(content)
+            selected.append({**file_info, 'content': content})
+
+        with self._lock:
+            self.trimmed_prompts += 1
+            self.tokens_saved += max(0, total_tokens - used_tokens)
+        return selected
+
+    def _pick(self, indexes: List['_FileIndex'], query_tokens: List[str]) -> List[Tuple[int, int]]:
+        """BM25 打分，按分数从高到低选取不超过 top_k 个、总量不超过预算的分块 -> [(文件序号, 分块序号)]"""
+        total_chunks = sum(len(index.chunks) for index in indexes)
+        if total_chunks == 0:
+            return []
+        avg_length = sum(sum(index.lengths) for index in indexes) / total_chunks or 1.0
+        terms = set(query_tokens)
+        idf = {}
+        for term in terms:
+            df = sum(index.doc_freq.get(term, 0) for index in indexes)
+            if df:
+                idf[term] = math.log(1 + (total_chunks - df + 0.5) / (df + 0.5))
+
+        scored = []
+        for file_pos, index in enumerate(indexes):
+            for chunk_id, tf in enumerate(index.term_freqs):
+                norm = _K1 * (1 - _B + _B * index.lengths[chunk_id] / avg_length)
+                score = sum(
+                    weight * tf[term] * (_K1 + 1) / (tf[term] + norm)
+                    for term, weight in idf.items() if term in tf
+                )
+                if score > 0:
+                    scored.append((score, file_pos, chunk_id))
+
+        if scored:
+            scored.sort(key=lambda item: (-item[0], item[1], item[2]))
+            candidates = [(file_pos, chunk_id) for _, file_pos, chunk_id in scored]
+        else:
+            # 与该页没有任何词重叠：退回到各文件开头部分
+            candidates = [(file_pos, chunk_id) for file_pos, index in enumerate(indexes)
+                          for chunk_id in range(len(index.chunks))]
+
+        picked, used = [], 0
+        for file_pos, chunk_id in candidates:
+            if len(picked) >= self.top_k:
+                break
+            chunk = indexes[file_pos].chunks[chunk_id]
+            cost = estimate_tokens(chunk['text']) + estimate_tokens(chunk['heading'])
+            if used + cost > self.token_budget:
+                continue
+            picked.append((file_pos, chunk_id))
+            used += cost
+        return picked
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                'token_budget': self.token_budget,
+                'top_k': self.top_k,
+                'built': self.built,
+                'loaded': self.loaded,
+                'memory_entries': len(self._memory),
+                'trimmed_prompts': self.trimmed_prompts,
+                'tokens_saved': self.tokens_saved,
+            }
+        if self._disk is not None:
+            stats['disk'] = self._disk.stats()
+        return stats
+
+
+# Global reference index
+reference_index = ReferenceIndex()
@@ -0,0 +1,142 @@
+"""
+Remote Images - 参考图 URL 的本地磁盘缓存
+
+页面描述中嵌入的素材图片以 URL 形式传给 AIService.generate_image。以前每次生图都按顺序
+重新下载（每个 30 秒超时），同一素材在多页、多次生成之间反复下载。
+
+现在下载结果按 URL 保存在 UPLOAD_FOLDER/cache/urls，超过 REFERENCE_URL_CACHE_MB 时淘汰
+最久未使用的文件。只接受 Content-Type 为 image/* 且能被 PIL 识别的响应，单张大小不超过
+REFERENCE_URL_MAX_MB；校验失败的响应不会写入缓存。
+
+    image = remote_images.open(url)   # 命中时不发请求，解码结果经 reference_images 在页面线程间共享
+
+素材 URL 指向上传后不再修改的文件，因此缓存不设过期时间。
+"""
+import io
+import os
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+import requests
+from PIL import Image
+
+from .response_cache import BinaryDiskTier
+from .reference_images import reference_images
+from .single_flight import SingleFlight
+from .http_sessions import http_sessions
+from .concurrency import ResourceClass
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_TIMEOUT = 30
+_CHUNK_SIZE = 64 * 1024
+
+
+class RemoteImageError(Exception):
+    """参考图下载失败或内容不是图片"""
+
+
+class RemoteImageCache:
+    """URL -> 本地文件"""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 512 * 1024 * 1024,
+                 max_image_bytes: int = 20 * 1024 * 1024):
+        self.max_image_bytes = max_image_bytes
+        self._tier = BinaryDiskTier(directory, max_bytes=max_bytes, suffix='.img') if directory else None
+        self.hits = 0
+        self.downloads = 0
+        self.rejected = 0
+        self._flight = SingleFlight('reference url')
+
+    def init_app(self, app):
+        directory = os.path.join(app.config['UPLOAD_FOLDER'], 'cache', 'urls')
+        max_bytes = int(float(app.config.get('REFERENCE_URL_CACHE_MB', 512)) * 1024 * 1024)
+        self.max_image_bytes = int(float(app.config.get('REFERENCE_URL_MAX_MB', 20)) * 1024 * 1024)
+        self._tier = BinaryDiskTier(directory, max_bytes=max_bytes, suffix='.img')
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def fetch(self, url: str) -> str:
+        """
+        返回 URL 对应图片的本地路径（必要时下载）
+
+        Raises:
+            RemoteImageError: 下载失败、响应不是图片或超过大小上限
+        """
+        if self._tier is None:
+            raise RemoteImageError("Remote image cache is not initialized")
+        key = self._key(url)
+        path = self._tier.locate(key)
+        if path is not None:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            self.hits += 1
+            return path
+
+        # 多个页面同时引用同一素材时只下载一次
+        return self._flight.do(key, self._download_to_cache, url, key)
+
+    def _download_to_cache(self, url: str, key: str) -> str:
+        self._tier.set(key, self._download(url))
+        self.downloads += 1
+        path = self._tier.locate(key)
+        if path is None:
+            # 写入后立即被淘汰（缓存上限小于单张图片）
+            raise RemoteImageError(f"Downloaded image was evicted immediately: {url}")
+        return path
+
+    def open(self, url: str) -> Image.Image:
+        """
+        下载（或从缓存读取）并解码 URL 图片
+
+        未 init_app 时（脚本中直接使用 AIService）不落盘，直接从响应解码。
+        """
+        if self._tier is None:
+            image = Image.open(io.BytesIO(self._download(url)))
+            image.load()
+            return image
+        return reference_images.open(self.fetch(url))
+
+    def _download(self, url: str) -> bytes:
+        try:
+            response = http_sessions.get(ResourceClass.NETWORK_IO).get(url, timeout=DOWNLOAD_TIMEOUT, stream=True)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise RemoteImageError(f"Failed to download {url}: {e}") from e
+
+        with response:
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if content_type and not content_type.startswith('image/'):
+                self.rejected += 1
+                raise RemoteImageError(f"Unexpected content type {content_type!r} for {url}")
+
+            buffer = io.BytesIO()
+            for chunk in response.iter_content(_CHUNK_SIZE):
+                buffer.write(chunk)
+                if buffer.tell() > self.max_image_bytes:
+                    self.rejected += 1
+                    raise RemoteImageError(f"Image at {url} exceeds {self.max_image_bytes} bytes")
+
+        data = buffer.getvalue()
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image.verify()
+        except Exception as e:
+            self.rejected += 1
+            raise RemoteImageError(f"Response from {url} is not a valid image: {e}") from e
+        return data
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {'hits': self.hits, 'downloads': self.downloads, 'rejected': self.rejected}
+        if self._tier is not None:
+            stats.update(self._tier.stats())
+        return stats
+
+
+# Global remote image cache
+remote_images = RemoteImageCache()
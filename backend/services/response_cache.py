@@ -0,0 +1,351 @@
+"""
+Response Cache - 文本 LLM 响应的内容寻址缓存
+
+用户重新打开项目、出错后重新生成、测试回放流程时，AIService 经常用完全相同的
+提示词、模型和参数再次调用文本模型。响应按输入内容寻址缓存：
+
+    key = response_cache.make_key(provider, model, prompt, thinking_budget=1000)
+    text = response_cache.get(key)
+    if text is None:
+        text = provider.generate_text(prompt, thinking_budget=1000)
+        response_cache.set(key, text)
+
+两级存储：
+- MemoryTier：进程内 LRU，按条目数淘汰
+- DiskTier：UPLOAD_FOLDER/cache/llm 下每个 key 一个 JSON 文件，按总大小淘汰最久未使用的条目，
+  进程重启和多个 worker 进程之间共享
+
+两级都按 LLM_CACHE_TTL 过期；磁盘命中会回填内存。调用方可以按次绕过读取
+（AIService 的 use_cache=False），新结果仍会写入缓存覆盖旧值。
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 缓存格式变化时递增，旧条目自然失效
+CACHE_KEY_VERSION = 1
+
+
+class CacheTier:
+    """缓存层接口：字符串 key -> 字符串 value"""
+
+    name = 'tier'
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class MemoryTier(CacheTier):
+    """进程内 LRU"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries: int = 256, ttl: float = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (stored_at, value)
+        self._entries: 'OrderedDict[str, Tuple[float, str]]' = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self.ttl and time.time() - entry[0] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries, 'evictions': self.evictions}
+
+
+class DiskTier(CacheTier):
+    """
+    磁盘缓存：<directory>/<key[:2]>/<key><suffix>
+
+    命中时刷新文件修改时间，超过 max_bytes 时按修改时间从旧到新删除，直到低于上限的 90%。
+    写入先写临时文件再 rename，多个进程并发读写同一目录是安全的。
+    子类通过 _encode / _decode 改变文件内容格式（见 BinaryDiskTier）。
+    """
+
+    name = 'disk'
+    suffix = '.json'
+
+    def __init__(self, directory: str, max_bytes: int = 100 * 1024 * 1024, ttl: float = 0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # 目录总大小（首次写入时扫描，之后增量维护；其他进程的写入在下次淘汰扫描时校正）
+        self._total_bytes: Optional[int] = None
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}{self.suffix}")
+
+    def locate(self, key: str) -> Optional[str]:
+        """条目的文件路径，不存在时返回 None（调用方可直接按文件读取）"""
+        path = self._path(key)
+        return path if os.path.exists(path) else None
+
+    def _encode(self, value: Any) -> bytes:
+        return json.dumps({'stored_at': time.time(), 'value': value}, ensure_ascii=False).encode('utf-8')
+
+    def _decode(self, raw: bytes) -> Optional[Any]:
+        """文件内容 -> 值；过期时返回 None"""
+        entry = json.loads(raw.decode('utf-8'))
+        if self.ttl and time.time() - entry.get('stored_at', 0) > self.ttl:
+            return None
+        return entry.get('value')
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = self._decode(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable cache entry {path}: {e}")
+            self._remove(path)
+            return None
+
+        if value is None:
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key: str, value: Any):
+        path = self._path(key)
+        data = self._encode(value)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(data) - previous
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in self._list_entries():
+                self._remove(path)
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'directory': self.directory,
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+            }
+
+    # ---- helpers ----
+
+    def _list_entries(self) -> List[Tuple[str, float, int]]:
+        """[(path, mtime, size)]"""
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(self.suffix):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, st.st_mtime, st.st_size))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, _, size in self._list_entries())
+
+    def _evict(self):
+        entries = sorted(self._list_entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        target = int(self.max_bytes * 0.9)
+        for path, _, size in entries:
+            if total <= target:
+                break
+            if self._remove(path):
+                total -= size
+                self.evictions += 1
+        self._total_bytes = total
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+class BinaryDiskTier(DiskTier):
+    """原样保存字节内容的磁盘缓存（只按大小淘汰，不设 TTL）"""
+
+    suffix = '.bin'
+
+    def __init__(self, directory: str, max_bytes: int = 100 * 1024 * 1024, suffix: Optional[str] = None):
+        super().__init__(directory, max_bytes=max_bytes, ttl=0)
+        if suffix:
+            self.suffix = suffix
+
+    def _encode(self, value: bytes) -> bytes:
+        return value
+
+    def _decode(self, raw: bytes) -> Optional[bytes]:
+        return raw
+
+
+class ResponseCache:
+    """
+    多级响应缓存
+
+    按顺序查询各层，命中后回填前面的层；写入同时写所有层。某一层出错只记录日志，
+    不影响调用方（缓存失败时退化为直接调用模型）。
+    """
+
+    def __init__(self, tiers: Optional[List[CacheTier]] = None, enabled: bool = True):
+        self.enabled = enabled
+        self.tiers: List[CacheTier] = tiers if tiers is not None else [MemoryTier()]
+        self._lock = threading.Lock()
+        self._counters = self._empty_counters()
+
+    def _empty_counters(self) -> Dict[str, Any]:
+        return {'hits': {tier.name: 0 for tier in self.tiers}, 'misses': 0, 'bypassed': 0, 'writes': 0}
+
+    def init_app(self, app):
+        """按配置重建缓存层（LLM_CACHE_*）"""
+        self.enabled = app.config.get('LLM_CACHE_ENABLED', True)
+        ttl = float(app.config.get('LLM_CACHE_TTL', 7 * 24 * 3600))
+        tiers: List[CacheTier] = [MemoryTier(
+            max_entries=int(app.config.get('LLM_CACHE_MEMORY_ENTRIES', 256)), ttl=ttl
+        )]
+        disk_max_mb = float(app.config.get('LLM_CACHE_DISK_MAX_MB', 100))
+        if disk_max_mb > 0:
+            directory = os.path.join(app.config['UPLOAD_FOLDER'], 'cache', 'llm')
+            tiers.append(DiskTier(directory, max_bytes=int(disk_max_mb * 1024 * 1024), ttl=ttl))
+        with self._lock:
+            self.tiers = tiers
+            self._counters = self._empty_counters()
+
+    @staticmethod
+    def make_key(provider: Any, model: str, prompt: str, **params) -> str:
+        """由 provider 类型、模型、提示词和调用参数计算 key"""
+        provider_name = provider if isinstance(provider, str) else type(provider).__name__
+        raw = json.dumps(
+            [CACHE_KEY_VERSION, provider_name, model, prompt, params],
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        tiers = self.tiers
+        for index, tier in enumerate(tiers):
+            try:
+                value = tier.get(key)
+            except Exception as e:
+                logger.warning(f"LLM cache {tier.name} read failed: {e}")
+                continue
+            if value is None:
+                continue
+            for upper in tiers[:index]:
+                self._safe_set(upper, key, value)
+            self._count('hits', tier.name)
+            return value
+        self._count('misses')
+        return None
+
+    def set(self, key: str, value: str):
+        if not self.enabled or value is None:
+            return
+        for tier in self.tiers:
+            self._safe_set(tier, key, value)
+        self._count('writes')
+
+    def record_bypass(self):
+        """调用方跳过了读取（强制重新生成）"""
+        self._count('bypassed')
+
+    def clear(self):
+        for tier in self.tiers:
+            try:
+                tier.clear()
+            except Exception as e:
+                logger.warning(f"LLM cache {tier.name} clear failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = json.loads(json.dumps(self._counters))
+        return dict(counters, enabled=self.enabled, tiers={tier.name: tier.stats() for tier in self.tiers})
+
+    # ---- helpers ----
+
+    @staticmethod
+    def _safe_set(tier: CacheTier, key: str, value: str):
+        try:
+            tier.set(key, value)
+        except Exception as e:
+            logger.warning(f"LLM cache {tier.name} write failed: {e}")
+
+    def _count(self, name: str, tier_name: Optional[str] = None):
+        with self._lock:
+            if tier_name is None:
+                self._counters[name] += 1
+            else:
+                hits = self._counters[name]
+                hits[tier_name] = hits.get(tier_name, 0) + 1
+
+
+# Global response cache
+response_cache = ResponseCache()
@@ -0,0 +1,75 @@
+"""
+Single Flight - 合并并发的相同 provider 请求
+
+两个浏览器标签页或一次重试的请求同时触发同一页的描述 / 图片生成时，两次调用都会打到
+provider。AIService 用请求 key（与响应缓存相同的内容哈希）把 provider 调用包一层：
+
+    text = text_flight.do(key, provider.generate_text, prompt, thinking_budget=1000)
+
+同一时刻相同 key 只有第一个调用真正执行，其余调用等待它的结果（成功或异常）并共享。
+调用结束后 key 立即移除，之后的调用交给响应缓存处理。
+"""
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """按 key 合并同时进行的相同调用"""
+
+    def __init__(self, name: str, copy_result: Optional[Callable[[Any], Any]] = None):
+        """
+        Args:
+            name: 名称（用于日志和统计）
+            copy_result: 等待方拿到结果前的复制函数（结果是可变对象时使用，如 PIL Image）
+        """
+        self.name = name
+        self.copy_result = copy_result
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        """执行 fn(*args, **kwargs)；相同 key 的调用正在进行时等待并共享其结果"""
+        with self._lock:
+            self.calls += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            logger.info(f"Coalesced identical {self.name} request {key[:12]}, waiting for the in-flight call")
+            result = future.result()
+            return self.copy_result(result) if self.copy_result and result is not None else result
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'calls': self.calls, 'coalesced': self.coalesced, 'in_flight': len(self._in_flight)}
+
+
+def _copy_image(image):
+    return image.copy()
+
+
+# Global single-flight groups for text and image provider calls
+text_flight = SingleFlight('text')
+image_flight = SingleFlight('image', copy_result=_copy_image)
@@ -0,0 +1,74 @@
+"""
+Task Checkpoints - 批量任务的页面级检查点
+
+批量任务（描述生成、图片生成）每完成一页，就把该页的输入指纹记录到 task_checkpoints 表，
+与页面结果在同一个事务中提交。任务被队列重新派发（worker 崩溃、租约过期）或被用户重试时：
+
+    done = load_checkpoints(task_id, IMAGE_STAGE)
+    if done.get(page.id) == page_image_fingerprint(...) and page.generated_image_path:
+        # 跳过：结果仍在且输入没有变化
+
+只重新生成缺失、失败或输入已变化（描述被编辑、模板被替换、参数不同）的页面。
+"""
+import os
+import json
+import hashlib
+import logging
+from typing import Any, Dict
+
+from models import db, TaskCheckpoint
+
+logger = logging.getLogger(__name__)
+
+DESCRIPTION_STAGE = 'description'
+IMAGE_STAGE = 'image'
+
+
+def fingerprint(*parts: Any) -> str:
+    """计算输入的稳定摘要（dict 按 key 排序）"""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def page_description_fingerprint(outline, page_outline: Dict, page_index: int, language: str = None) -> str:
+    """单页描述的输入指纹"""
+    return fingerprint(DESCRIPTION_STAGE, outline, page_outline, page_index, language)
+
+
+def page_image_fingerprint(page, page_data: Dict, template_path: str = None,
+                           aspect_ratio: str = None, resolution: str = None,
+                           extra_requirements: str = None, language: str = None) -> str:
+    """
+    单页图片的输入指纹
+
+    模板按路径 + 修改时间参与计算，替换模板后页面被视为过期。
+    """
+    template_mtime = None
+    if template_path and os.path.exists(template_path):
+        template_mtime = os.path.getmtime(template_path)
+    return fingerprint(
+        IMAGE_STAGE, page.get_description_content(), page_data,
+        template_path, template_mtime, aspect_ratio, resolution, extra_requirements, language
+    )
+
+
+def load_checkpoints(task_id: str, stage: str) -> Dict[str, str]:
+    """任务在某阶段已完成的页面：page_id -> fingerprint"""
+    rows = db.session.query(TaskCheckpoint.page_id, TaskCheckpoint.fingerprint).filter(
+        TaskCheckpoint.task_id == task_id,
+        TaskCheckpoint.stage == stage,
+    ).all()
+    return {page_id: value for page_id, value in rows}
+
+
+def stage_checkpoint(task_id: str, page_id: str, stage: str, value: str):
+    """
+    把检查点加入当前会话（不提交）
+
+    调用方在同一个事务中提交页面结果和检查点，二者要么都落库，要么都不落库。
+    """
+    checkpoint = TaskCheckpoint.query.filter_by(task_id=task_id, page_id=page_id, stage=stage).first()
+    if checkpoint is None:
+        db.session.add(TaskCheckpoint(task_id=task_id, page_id=page_id, stage=stage, fingerprint=value))
+    else:
+        checkpoint.fingerprint = value
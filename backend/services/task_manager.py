@@ -1,7 +1,12 @@
 """
 Task Manager - handles background tasks using ThreadPoolExecutor
-No need for Celery or Redis, uses in-memory task tracking
+No need for Celery or Redis: tasks are persisted in the database (see services/task_queue.py)
+and dispatched to a local thread pool, so queued work survives process restarts.
 """
+import os
+import json
+import uuid
+import socket
 import logging
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -11,30 +16,171 @@ from sqlalchemy import func
 from models import db, Task, Page, Material, PageImageVersion
 from utils import get_filtered_pages
 from pathlib import Path
+from services.task_queue import TaskQueue, decode_task_args
+from services.concurrency import scheduler, ResourceClass
+from services.progress_hub import progress_hub
+from services.progress_writer import progress_writer
+from services.task_checkpoints import (
+    DESCRIPTION_STAGE, IMAGE_STAGE, load_checkpoints, stage_checkpoint,
+    page_description_fingerprint, page_image_fingerprint
+)
+from services.cancellation import (
+    CANCELLED_STATUS, TaskCancelledError, get_cancellation_token,
+    discard_cancellation_token, reset_cancellation_token, cancel_local_task
+)
 
 logger = logging.getLogger(__name__)
 
 
 class TaskManager:
-    """Simple task manager using ThreadPoolExecutor"""
+    """
+    Task manager backed by the durable task queue
+    
+    submit_task() 只负责把任务写入数据库队列；dispatcher 线程从队列中认领任务，
+    在本地线程池执行，并定期心跳续约。进程重启后未完成的任务会在租约过期后被重新派发。
+    """
     
-    def __init__(self, max_workers: int = 4):
+    def __init__(self, max_workers: int = 4, queue: TaskQueue = None):
         """Initialize task manager"""
+        self.max_workers = max_workers
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.queue = queue or TaskQueue()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.handlers: Dict[str, Callable] = {}
         self.active_tasks = {}  # task_id -> Future
         self.lock = threading.Lock()
+        
+        self.poll_interval = 2.0
+        self._app = None
+        self._dispatcher = None
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._last_heartbeat = 0.0
+    
+    def register_handler(self, func: Callable, name: str = None):
+        """Register a task function so that queued payloads can be resolved by name"""
+        self.handlers[name or func.__name__] = func
+        return func
+    
+    def init_app(self, app, start_dispatcher: bool = True):
+        """
+        Bind the manager to a Flask app and (optionally) start the dispatcher thread
+        
+        Args:
+            app: Flask app instance, used for app context inside dispatcher/worker threads
+            start_dispatcher: 是否在当前进程中消费队列
+        """
+        self._app = app
+        self.poll_interval = app.config.get('TASK_QUEUE_POLL_INTERVAL', self.poll_interval)
+        self.queue.configure(
+            lease_seconds=app.config.get('TASK_LEASE_SECONDS'),
+            max_attempts=app.config.get('TASK_MAX_ATTEMPTS'),
+        )
+        
+        max_workers = app.config.get('TASK_WORKERS', self.max_workers)
+        if max_workers != self.max_workers and not self.active_tasks:
+            self.executor.shutdown(wait=False)
+            self.executor = ThreadPoolExecutor(max_workers=max_workers)
+            self.max_workers = max_workers
+        
+        if start_dispatcher:
+            self.start()
+    
+    def start(self):
+        """Start the dispatcher thread (idempotent)"""
+        if self._app is None:
+            raise RuntimeError("TaskManager.init_app() must be called before start()")
+        if self._dispatcher and self._dispatcher.is_alive():
+            return
+        self._stop.clear()
+        self._dispatcher = threading.Thread(
+            target=self._dispatch_loop, name='task-dispatcher', daemon=True
+        )
+        self._dispatcher.start()
+        logger.info(f"Task dispatcher started (worker={self.worker_id}, threads={self.max_workers})")
     
     def submit_task(self, task_id: str, func: Callable, *args, **kwargs):
-        """Submit a background task"""
-        future = self.executor.submit(func, task_id, *args, **kwargs)
+        """
+        Submit a background task
+        
+        任务参数会被持久化到 Task.payload，因此必须是 JSON 可序列化的值，
+        或者是 encode_task_args 支持的运行时对象（app / ai_service / file_service / ProjectContext）。
+        """
+        name = func.__name__
+        if self.handlers.get(name) is not func:
+            self.register_handler(func)
+        
+        self.queue.enqueue(task_id, name, args, kwargs)
+        
+        if self._app is None:
+            # 未显式 init_app 时，使用当前应用启动 dispatcher
+            from flask import current_app
+            self.init_app(current_app._get_current_object())
+        self._wakeup.set()
+    
+    def _dispatch_loop(self):
+        """Claim queued tasks while there is free capacity, and keep leases alive"""
+        import time
+        
+        while not self._stop.is_set():
+            try:
+                with self._app.app_context():
+                    self.queue.recover()
+                    
+                    with self.lock:
+                        free_slots = self.max_workers - len(self.active_tasks)
+                    for task_id, payload in self.queue.claim(self.worker_id, limit=free_slots):
+                        self._run_claimed(task_id, payload)
+                    
+                    if time.monotonic() - self._last_heartbeat >= self.queue.lease_seconds / 4:
+                        with self.lock:
+                            active_ids = list(self.active_tasks.keys())
+                        self.queue.heartbeat(self.worker_id, active_ids)
+                        self._last_heartbeat = time.monotonic()
+            except Exception as e:
+                logger.warning(f"Task dispatcher iteration failed: {e}")
+            
+            self._wakeup.wait(timeout=self.poll_interval)
+            self._wakeup.clear()
+    
+    def _run_claimed(self, task_id: str, payload: Dict[str, Any]):
+        """Run a claimed task on the local executor"""
+        # 每次执行使用新的取消令牌：重试的任务不能沿用上一次执行已取消的令牌
+        token = reset_cancellation_token(task_id, self._app)
+        future = self.executor.submit(self._execute, task_id, payload)
         
         with self.lock:
             self.active_tasks[task_id] = future
         
         # Add callback to clean up when done and log exceptions
-        future.add_done_callback(lambda f: self._task_done_callback(task_id, f))
+        future.add_done_callback(lambda f: self._task_done_callback(task_id, f, token))
+    
+    def _execute(self, task_id: str, payload: Dict[str, Any]):
+        """Resolve the handler and arguments from the payload and run it"""
+        error = None
+        try:
+            handler = self.handlers.get(payload.get('handler'))
+            if handler is None:
+                raise ValueError(f"Unknown task handler: {payload.get('handler')}")
+            
+            with self._app.app_context():
+                task = Task.query.get(task_id)
+                if task and task.status == CANCELLED_STATUS:
+                    # 认领后、开始执行前被取消：直接放弃
+                    logger.info(f"Task {task_id} was cancelled before it started")
+                    return
+                args = decode_task_args(payload.get('args') or [], self._app)
+                kwargs = decode_task_args(payload.get('kwargs') or {}, self._app)
+            
+            handler(task_id, *args, **kwargs)
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            with self._app.app_context():
+                self.queue.release(task_id, self.worker_id, error=error)
     
-    def _task_done_callback(self, task_id: str, future):
+    def _task_done_callback(self, task_id: str, future, token=None):
         """Handle task completion and log any exceptions"""
         try:
             # Check if task raised an exception
@@ -44,22 +190,81 @@ class TaskManager:
         except Exception as e:
             logger.error(f"Error in task callback for {task_id}: {e}", exc_info=True)
         finally:
-            self._cleanup_task(task_id)
+            self._cleanup_task(task_id, future, token)
+            # 有空闲槽位，立即尝试认领下一个任务
+            self._wakeup.set()
     
-    def _cleanup_task(self, task_id: str):
-        """Clean up completed task"""
+    def _cleanup_task(self, task_id: str, future=None, token=None):
+        """Clean up completed task (only this run's future and token)"""
         with self.lock:
-            if task_id in self.active_tasks:
+            if task_id in self.active_tasks and (future is None or self.active_tasks[task_id] is future):
                 del self.active_tasks[task_id]
+        discard_cancellation_token(task_id, token)
+        # 提前返回（如被取消）的任务可能还有未落库的进度
+        progress_writer.flush(task_id)
+        progress_writer.discard(task_id)
+    
+    def cancel_task(self, task_id: str) -> bool:
+        """
+        Request cooperative cancellation of a task (must be called in app context)
+        
+        任务状态立即标记为 CANCELLED（排队中的任务不会再被认领）；正在执行的任务
+        通过取消令牌感知，在下一个阶段边界停止。其他进程中的任务通过轮询状态感知。
+        
+        Returns:
+            False if the task does not exist or has already finished
+        """
+        from services.task_queue import TERMINAL_STATUSES
+        
+        rowcount = Task.query.filter(
+            Task.id == task_id,
+            Task.status.notin_(TERMINAL_STATUSES),
+        ).update({
+            'status': CANCELLED_STATUS,
+            'error_message': 'Cancelled by user',
+            'completed_at': datetime.utcnow(),
+        }, synchronize_session=False)
+        db.session.commit()
+        
+        if rowcount:
+            cancel_local_task(task_id)
+            # 批量 UPDATE 不经过会话事件，手动推送一次状态
+            task = Task.query.get(task_id)
+            if task:
+                progress_hub.publish(task_id, task.to_dict())
+            logger.info(f"Task {task_id} cancellation requested")
+        return bool(rowcount)
+    
+    def retry_task(self, task_id: str) -> bool:
+        """
+        Re-run a failed or cancelled task (must be called in app context)
+        
+        只重新生成缺失、失败或输入已变化的页面，已完成的页面按检查点跳过。
+        
+        Returns:
+            False if the task cannot be retried
+        """
+        if not self.queue.requeue(task_id):
+            return False
+        task = Task.query.get(task_id)
+        if task:
+            progress_hub.publish(task_id, task.to_dict())
+        self._wakeup.set()
+        return True
     
     def is_task_active(self, task_id: str) -> bool:
-        """Check if task is still running"""
+        """Check if task is still running in this process"""
         with self.lock:
             return task_id in self.active_tasks
     
     def shutdown(self):
-        """Shutdown the executor"""
+        """Stop the dispatcher and shutdown the executor"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._dispatcher:
+            self._dispatcher.join(timeout=self.poll_interval * 2)
         self.executor.shutdown(wait=True)
+        progress_writer.flush()
 
 
 # Global task manager instance
@@ -126,10 +331,226 @@ def save_image_with_version(image, project_id: str, page_id: str, file_service,
     return image_path, next_version
 
 
+def _generate_page_description(app, project_context, outline: List[Dict], page_id: str,
+                               page_outline: Dict, page_index: int, language: str = None,
+                               cancel_token=None, use_cache: bool = True):
+    """
+    生成单页描述（在调度器线程中执行）
+
+    use_cache=False 时跳过文本模型响应缓存（force_regenerate）。
+
+    Returns:
+        (page_id, desc_content, error)
+    """
+    # 任务已取消时，排队中的页面直接放弃
+    if cancel_token is not None and cancel_token.cancelled:
+        return (page_id, None, CANCELLED_STATUS)
+
+    # 关键修复：在子线程中也需要应用上下文
+    with app.app_context():
+        try:
+            # Get singleton AI service instance
+            from services.ai_service_manager import get_ai_service
+            ai_service = get_ai_service()
+
+            desc_text = ai_service.generate_page_description(
+                project_context, outline, page_outline, page_index,
+                language=language, use_cache=use_cache
+            )
+
+            # Parse description into structured format
+            # This is a simplified version - you may want more sophisticated parsing
+            desc_content = {
+                "text": desc_text,
+                "generated_at": datetime.utcnow().isoformat()
+            }
+
+            return (page_id, desc_content, None)
+        except Exception as e:
+            import traceback
+            error_detail = traceback.format_exc()
+            logger.error(f"Failed to generate description for page {page_id}: {error_detail}")
+            return (page_id, None, str(e))
+
+
+def _generate_page_image(app, project_id: str, page_id: str, page_data: Dict, page_index: int,
+                         total: int, ai_service, file_service, outline: List[Dict],
+                         use_template: bool, aspect_ratio: str, resolution: str,
+                         extra_requirements: str = None, language: str = None,
+                         cancel_token=None, task_id: str = None, use_cache: bool = True):
+    """
+    根据页面已保存的描述生成单页图片并保存为新版本（在调度器线程中执行）
+
+    cancel_token 在每个阶段边界（生成提示词 -> 生图 -> 保存）检查，
+    取消后页面恢复为 DESCRIPTION_GENERATED 状态。
+    提供 task_id 时，该页的输入指纹作为检查点与新图片版本在同一事务中提交。
+    use_cache=False 时跳过生图结果缓存（force_regenerate）。
+
+    Returns:
+        (page_id, image_path, error)
+    """
+    if cancel_token is not None and cancel_token.cancelled:
+        return (page_id, None, CANCELLED_STATUS)
+
+    def check_cancelled():
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+
+    # 关键修复：在子线程中也需要应用上下文
+    with app.app_context():
+        page_obj = None
+        try:
+            logger.debug(f"Starting image generation for page {page_id}, index {page_index}")
+            # Get page from database in this thread
+            page_obj = Page.query.get(page_id)
+            if not page_obj:
+                raise ValueError(f"Page {page_id} not found")
+
+            # Update page status
+            page_obj.status = 'GENERATING'
+            db.session.commit()
+            logger.debug(f"Page {page_id} status updated to GENERATING")
+
+            # Get description content
+            desc_content = page_obj.get_description_content()
+            if not desc_content:
+                raise ValueError("No description content for page")
+
+            # 获取描述文本（可能是 text 字段或 text_content 数组）
+            desc_text = desc_content.get('text', '')
+            if not desc_text and desc_content.get('text_content'):
+                # 如果 text 字段不存在，尝试从 text_content 数组获取
+                text_content = desc_content.get('text_content', [])
+                if isinstance(text_content, list):
+                    desc_text = '\n'.join(text_content)
+                else:
+                    desc_text = str(text_content)
+
+            logger.debug(f"Got description text for page {page_id}: {desc_text[:100]}...")
+
+            # 从当前页面的描述内容中提取图片 URL
+            page_additional_ref_images = []
+            has_material_images = False
+
+            # 从描述文本中提取图片
+            if desc_text:
+                image_urls = ai_service.extract_image_urls_from_markdown(desc_text)
+                if image_urls:
+                    logger.info(f"Found {len(image_urls)} image(s) in page {page_id} description")
+                    page_additional_ref_images = image_urls
+                    has_material_images = True
+
+            # 在子线程中动态获取模板路径，确保使用最新模板
+            page_ref_image_path = None
+            if use_template:
+                page_ref_image_path = file_service.get_template_path(project_id)
+                # 注意：如果有风格描述，即使没有模板图片也允许生成
+                # 这个检查已经在 controller 层完成，这里不再检查
+
+            # Generate image prompt
+            check_cancelled()
+            prompt = ai_service.generate_image_prompt(
+                outline, page_data, desc_text, page_index,
+                has_material_images=has_material_images,
+                extra_requirements=extra_requirements,
+                language=language,
+                has_template=use_template
+            )
+            logger.debug(f"Generated image prompt for page {page_id}")
+
+            # Generate image
+            check_cancelled()
+            logger.info(f"🎨 Calling AI service to generate image for page {page_index}/{total}...")
+            image = ai_service.generate_image(
+                prompt, page_ref_image_path, aspect_ratio, resolution,
+                additional_ref_images=page_additional_ref_images if page_additional_ref_images else None,
+                use_cache=use_cache
+            )
+            logger.info(f"✅ Image generated successfully for page {page_index}")
+
+            if not image:
+                raise ValueError("Failed to generate image")
+
+            check_cancelled()
+            if task_id:
+                stage_checkpoint(task_id, page_id, IMAGE_STAGE, page_image_fingerprint(
+                    page_obj, page_data, page_ref_image_path,
+                    aspect_ratio, resolution, extra_requirements, language
+                ))
+            # 优化：直接在子线程中计算版本号并保存到最终位置
+            # 每个页面独立，使用数据库事务保证版本号原子性，避免临时文件
+            image_path, next_version = save_image_with_version(
+                image, project_id, page_id, file_service, page_obj=page_obj
+            )
+
+            return (page_id, image_path, None)
+
+        except TaskCancelledError:
+            logger.info(f"Image generation for page {page_id} stopped: task cancelled")
+            if page_obj is not None:
+                page_obj.status = 'DESCRIPTION_GENERATED'
+                db.session.commit()
+            return (page_id, None, CANCELLED_STATUS)
+        except Exception as e:
+            import traceback
+            error_detail = traceback.format_exc()
+            logger.error(f"Failed to generate image for page {page_id}: {error_detail}")
+            return (page_id, None, str(e))
+
+
+def _image_checkpoint_valid(done: Dict[str, str], page, page_data: Dict, file_service, project_id: str,
+                            use_template: bool, aspect_ratio: str, resolution: str,
+                            extra_requirements: str = None, language: str = None) -> bool:
+    """检查点指纹与当前输入一致、且图片仍在时，该页无需重新生成"""
+    if page.id not in done or page.status == 'FAILED' or not page.generated_image_path:
+        return False
+    template_path = file_service.get_template_path(project_id) if use_template else None
+    return done[page.id] == page_image_fingerprint(
+        page, page_data, template_path, aspect_ratio, resolution, extra_requirements, language
+    )
+
+
+def _transition_task(task_id: str, status: str, progress: Dict = None, error_message: str = None) -> bool:
+    """
+    条件更新任务状态：已取消的任务保持 CANCELLED
+
+    cancel_task 可能在处理函数开始、完成或失败前的任意时刻落库，
+    这里用带条件的 UPDATE 代替无条件赋值，避免把取消覆盖成 PROCESSING / COMPLETED / FAILED。
+
+    Returns:
+        False 表示任务已被取消（或不存在），状态未改变
+    """
+    values = {'status': status}
+    if status in ('COMPLETED', 'FAILED'):
+        values['completed_at'] = datetime.utcnow()
+    if progress is not None:
+        values['progress'] = json.dumps(progress)
+    if error_message is not None:
+        values['error_message'] = error_message
+    rowcount = Task.query.filter(
+        Task.id == task_id,
+        Task.status != CANCELLED_STATUS,
+    ).update(values, synchronize_session=False)
+    db.session.commit()
+
+    if rowcount:
+        # 批量 UPDATE 不经过会话事件，刷新会话中的对象后手动推送一次状态
+        task = Task.query.populate_existing().get(task_id)
+        if task:
+            progress_hub.publish(task_id, task.to_dict())
+    return bool(rowcount)
+
+
+def _drop_pending(futures):
+    """任务取消后丢弃尚未开始执行的页面级工作（正在执行的工作会在下一个阶段边界停止）"""
+    for future in futures:
+        future.cancel()
+
+
 def generate_descriptions_task(task_id: str, project_id: str, ai_service, 
                                project_context, outline: List[Dict], 
                                max_workers: int = 5, app=None,
-                               language: str = None):
+                               language: str = None, use_cache: bool = True):
     """
     Background task for generating page descriptions
     Based on demo.py gen_desc() with parallel processing
@@ -142,9 +563,10 @@ def generate_descriptions_task(task_id: str, project_id: str, ai_service,
         ai_service: AI service instance
         project_context: ProjectContext object containing all project information
         outline: Complete outline structure
-        max_workers: Maximum number of parallel workers
+        max_workers: 保留参数（并发数由全局调度器的 text_llm 预算控制）
         app: Flask app instance
         language: Output language (zh, en, ja, auto)
+        use_cache: 是否读取文本模型响应缓存（force_regenerate 时为 False）
     """
     if app is None:
         raise ValueError("Flask app instance must be provided")
@@ -158,8 +580,10 @@ def generate_descriptions_task(task_id: str, project_id: str, ai_service,
                 logger.error(f"Task {task_id} not found")
                 return
             
-            task.status = 'PROCESSING'
-            db.session.commit()
+            if not _transition_task(task_id, 'PROCESSING'):
+                logger.info(f"Task {task_id} was cancelled before it started")
+                return
+            cancel_token = get_cancellation_token(task_id, app)
             logger.info(f"Task {task_id} status updated to PROCESSING")
             
             # Flatten outline to get pages
@@ -171,16 +595,28 @@ def generate_descriptions_task(task_id: str, project_id: str, ai_service,
             if len(pages) != len(pages_data):
                 raise ValueError("Page count mismatch")
             
+            # 任务被重新派发或重试时，跳过已完成且输入未变化的页面
+            done = load_checkpoints(task_id, DESCRIPTION_STAGE)
+            fingerprints = {}
+            todo = []
+            for i, (page, page_data) in enumerate(zip(pages, pages_data), 1):
+                fingerprints[page.id] = page_description_fingerprint(outline, page_data, i, language)
+                if done.get(page.id) == fingerprints[page.id] and page.get_description_content():
+                    continue
+                todo.append((i, page, page_data))
+            if len(todo) < len(pages):
+                logger.info(f"Task {task_id} resuming: {len(pages) - len(todo)} page description(s) already done")
+            
             # Initialize progress
             task.set_progress({
                 "total": len(pages),
-                "completed": 0,
+                "completed": len(pages) - len(todo),
                 "failed": 0
             })
             db.session.commit()
             
             # Generate descriptions in parallel
-            completed = 0
+            completed = len(pages) - len(todo)
             failed = 0
             
             def generate_single_desc(page_id, page_outline, page_index):
@@ -188,72 +624,53 @@ def generate_descriptions_task(task_id: str, project_id: str, ai_service,
                 Generate description for a single page
                 注意：只传递 page_id（字符串），不传递 ORM 对象，避免跨线程会话问题
                 """
-                # 关键修复：在子线程中也需要应用上下文
-                with app.app_context():
-                    try:
-                        # Get singleton AI service instance
-                        from services.ai_service_manager import get_ai_service
-                        ai_service = get_ai_service()
-                        
-                        desc_text = ai_service.generate_page_description(
-                            project_context, outline, page_outline, page_index,
-                            language=language
-                        )
-                        
-                        # Parse description into structured format
-                        # This is a simplified version - you may want more sophisticated parsing
-                        desc_content = {
-                            "text": desc_text,
-                            "generated_at": datetime.utcnow().isoformat()
-                        }
-                        
-                        return (page_id, desc_content, None)
-                    except Exception as e:
-                        import traceback
-                        error_detail = traceback.format_exc()
-                        logger.error(f"Failed to generate description for page {page_id}: {error_detail}")
-                        return (page_id, None, str(e))
-            
-            # Use ThreadPoolExecutor for parallel generation
+                return _generate_page_description(
+                    app, project_context, outline, page_id, page_outline, page_index, language,
+                    cancel_token=cancel_token, use_cache=use_cache
+                )
+            
+            # Submit to the shared text LLM budget (并发数由全局调度器控制)
             # 关键：提前提取 page.id，不要传递 ORM 对象到子线程
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = [
-                    executor.submit(generate_single_desc, page.id, page_data, i)
-                    for i, (page, page_data) in enumerate(zip(pages, pages_data), 1)
-                ]
+            futures = [
+                scheduler.submit(ResourceClass.TEXT_LLM, generate_single_desc, page.id, page_data, i)
+                for i, page, page_data in todo
+            ]
+            
+            # Process results as they complete
+            for future in as_completed(futures):
+                page_id, desc_content, error = future.result()
                 
-                # Process results as they complete
-                for future in as_completed(futures):
-                    page_id, desc_content, error = future.result()
-                    
-                    db.session.expire_all()
-                    
-                    # Update page in database
-                    page = Page.query.get(page_id)
-                    if page:
-                        if error:
-                            page.status = 'FAILED'
-                            failed += 1
-                        else:
-                            page.set_description_content(desc_content)
-                            page.status = 'DESCRIPTION_GENERATED'
-                            completed += 1
-                        
-                        db.session.commit()
+                db.session.expire_all()
+                
+                # Update page in database
+                page = Page.query.get(page_id)
+                if page and error != CANCELLED_STATUS:
+                    if error:
+                        page.status = 'FAILED'
+                        failed += 1
+                    else:
+                        page.set_description_content(desc_content)
+                        page.status = 'DESCRIPTION_GENERATED'
+                        stage_checkpoint(task_id, page_id, DESCRIPTION_STAGE, fingerprints[page_id])
+                        completed += 1
                     
-                    # Update task progress
-                    task = Task.query.get(task_id)
-                    if task:
-                        task.update_progress(completed=completed, failed=failed)
-                        db.session.commit()
-                        logger.info(f"Description Progress: {completed}/{len(pages)} pages completed")
+                    db.session.commit()
+                
+                # Update task progress
+                progress_writer.update(task_id, completed=completed, failed=failed)
+                logger.info(f"Description Progress: {completed}/{len(pages)} pages completed")
+                
+                if cancel_token.cancelled:
+                    _drop_pending(futures)
+                    break
+            
+            if cancel_token.cancelled:
+                logger.info(f"Task {task_id} CANCELLED - {completed} pages generated before cancellation")
+                return
             
             # Mark task as completed
-            task = Task.query.get(task_id)
-            if task:
-                task.status = 'COMPLETED'
-                task.completed_at = datetime.utcnow()
-                db.session.commit()
+            progress_writer.flush(task_id)
+            if _transition_task(task_id, 'COMPLETED'):
                 logger.info(f"Task {task_id} COMPLETED - {completed} pages generated, {failed} failed")
             
             # Update project status
@@ -265,13 +682,9 @@ def generate_descriptions_task(task_id: str, project_id: str, ai_service,
                 logger.info(f"Project {project_id} status updated to DESCRIPTIONS_GENERATED")
         
         except Exception as e:
+            progress_writer.flush(task_id)
             # Mark task as failed
-            task = Task.query.get(task_id)
-            if task:
-                task.status = 'FAILED'
-                task.error_message = str(e)
-                task.completed_at = datetime.utcnow()
-                db.session.commit()
+            _transition_task(task_id, 'FAILED', error_message=str(e))
 
 
 def generate_images_task(task_id: str, project_id: str, ai_service, file_service,
@@ -280,7 +693,8 @@ def generate_images_task(task_id: str, project_id: str, ai_service, file_service
                         resolution: str = "2K", app=None,
                         extra_requirements: str = None,
                         language: str = None,
-                        page_ids: list = None):
+                        page_ids: list = None,
+                        use_cache: bool = True):
     """
     Background task for generating page images
     Based on demo.py gen_images_parallel()
@@ -288,8 +702,10 @@ def generate_images_task(task_id: str, project_id: str, ai_service, file_service
     Note: app instance MUST be passed from the request context
     
     Args:
+        max_workers: 保留参数（并发数由全局调度器的 image_llm 预算控制）
         language: Output language (zh, en, ja, auto)
         page_ids: Optional list of page IDs to generate (if not provided, generates all pages)
+        use_cache: 是否读取生图结果缓存（force_regenerate 时为 False）
     """
     if app is None:
         raise ValueError("Flask app instance must be provided")
@@ -301,8 +717,10 @@ def generate_images_task(task_id: str, project_id: str, ai_service, file_service
             if not task:
                 return
             
-            task.status = 'PROCESSING'
-            db.session.commit()
+            if not _transition_task(task_id, 'PROCESSING'):
+                logger.info(f"Task {task_id} was cancelled before it started")
+                return
+            cancel_token = get_cancellation_token(task_id, app)
             
             # Get pages for this project (filtered by page_ids if provided)
             pages = get_filtered_pages(project_id, page_ids)
@@ -311,16 +729,27 @@ def generate_images_task(task_id: str, project_id: str, ai_service, file_service
             # 注意：不在任务开始时获取模板路径，而是在每个子线程中动态获取
             # 这样可以确保即使用户在上传新模板后立即生成，也能使用最新模板
             
+            # 任务被重新派发或重试时，跳过已完成且输入未变化的页面
+            done = load_checkpoints(task_id, IMAGE_STAGE)
+            todo = [
+                (i, page, page_data)
+                for i, (page, page_data) in enumerate(zip(pages, pages_data), 1)
+                if not _image_checkpoint_valid(done, page, page_data, file_service, project_id, use_template,
+                                               aspect_ratio, resolution, extra_requirements, language)
+            ]
+            if len(todo) < len(pages):
+                logger.info(f"Task {task_id} resuming: {len(pages) - len(todo)} page image(s) already done")
+            
             # Initialize progress
             task.set_progress({
                 "total": len(pages),
-                "completed": 0,
+                "completed": len(pages) - len(todo),
                 "failed": 0
             })
             db.session.commit()
             
             # Generate images in parallel
-            completed = 0
+            completed = len(pages) - len(todo)
             failed = 0
             
             def generate_single_image(page_id, page_data, page_index):
@@ -328,131 +757,54 @@ def generate_images_task(task_id: str, project_id: str, ai_service, file_service
                 Generate image for a single page
                 注意：只传递 page_id（字符串），不传递 ORM 对象，避免跨线程会话问题
                 """
-                # 关键修复：在子线程中也需要应用上下文
-                with app.app_context():
-                    try:
-                        logger.debug(f"Starting image generation for page {page_id}, index {page_index}")
-                        # Get page from database in this thread
-                        page_obj = Page.query.get(page_id)
-                        if not page_obj:
-                            raise ValueError(f"Page {page_id} not found")
-                        
-                        # Update page status
-                        page_obj.status = 'GENERATING'
-                        db.session.commit()
-                        logger.debug(f"Page {page_id} status updated to GENERATING")
-                        
-                        # Get description content
-                        desc_content = page_obj.get_description_content()
-                        if not desc_content:
-                            raise ValueError("No description content for page")
-                        
-                        # 获取描述文本（可能是 text 字段或 text_content 数组）
-                        desc_text = desc_content.get('text', '')
-                        if not desc_text and desc_content.get('text_content'):
-                            # 如果 text 字段不存在，尝试从 text_content 数组获取
-                            text_content = desc_content.get('text_content', [])
-                            if isinstance(text_content, list):
-                                desc_text = '\n'.join(text_content)
-                            else:
-                                desc_text = str(text_content)
-                        
-                        logger.debug(f"Got description text for page {page_id}: {desc_text[:100]}...")
-                        
-                        # 从当前页面的描述内容中提取图片 URL
-                        page_additional_ref_images = []
-                        has_material_images = False
-                        
-                        # 从描述文本中提取图片
-                        if desc_text:
-                            image_urls = ai_service.extract_image_urls_from_markdown(desc_text)
-                            if image_urls:
-                                logger.info(f"Found {len(image_urls)} image(s) in page {page_id} description")
-                                page_additional_ref_images = image_urls
-                                has_material_images = True
-                        
-                        # 在子线程中动态获取模板路径，确保使用最新模板
-                        page_ref_image_path = None
-                        if use_template:
-                            page_ref_image_path = file_service.get_template_path(project_id)
-                            # 注意：如果有风格描述，即使没有模板图片也允许生成
-                            # 这个检查已经在 controller 层完成，这里不再检查
-                        
-                        # Generate image prompt
-                        prompt = ai_service.generate_image_prompt(
-                            outline, page_data, desc_text, page_index,
-                            has_material_images=has_material_images,
-                            extra_requirements=extra_requirements,
-                            language=language,
-                            has_template=use_template
-                        )
-                        logger.debug(f"Generated image prompt for page {page_id}")
-                        
-                        # Generate image
-                        logger.info(f"🎨 Calling AI service to generate image for page {page_index}/{len(pages)}...")
-                        image = ai_service.generate_image(
-                            prompt, page_ref_image_path, aspect_ratio, resolution,
-                            additional_ref_images=page_additional_ref_images if page_additional_ref_images else None
-                        )
-                        logger.info(f"✅ Image generated successfully for page {page_index}")
-                        
-                        if not image:
-                            raise ValueError("Failed to generate image")
-                        
-                        # 优化：直接在子线程中计算版本号并保存到最终位置
-                        # 每个页面独立，使用数据库事务保证版本号原子性，避免临时文件
-                        image_path, next_version = save_image_with_version(
-                            image, project_id, page_id, file_service, page_obj=page_obj
-                        )
-                        
-                        return (page_id, image_path, None)
-                        
-                    except Exception as e:
-                        import traceback
-                        error_detail = traceback.format_exc()
-                        logger.error(f"Failed to generate image for page {page_id}: {error_detail}")
-                        return (page_id, None, str(e))
-            
-            # Use ThreadPoolExecutor for parallel generation
+                return _generate_page_image(
+                    app, project_id, page_id, page_data, page_index, len(pages),
+                    ai_service, file_service, outline, use_template,
+                    aspect_ratio, resolution, extra_requirements, language,
+                    cancel_token=cancel_token, task_id=task_id, use_cache=use_cache
+                )
+            
+            # Submit to the shared image LLM budget (并发数由全局调度器控制)
             # 关键：提前提取 page.id，不要传递 ORM 对象到子线程
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = [
-                    executor.submit(generate_single_image, page.id, page_data, i)
-                    for i, (page, page_data) in enumerate(zip(pages, pages_data), 1)
-                ]
+            futures = [
+                scheduler.submit(ResourceClass.IMAGE_LLM, generate_single_image, page.id, page_data, i)
+                for i, page, page_data in todo
+            ]
+            
+            # Process results as they complete
+            for future in as_completed(futures):
+                page_id, image_path, error = future.result()
                 
-                # Process results as they complete
-                for future in as_completed(futures):
-                    page_id, image_path, error = future.result()
-                    
-                    db.session.expire_all()
-                    
-                    # Update page in database (主要是为了更新失败状态)
-                    page = Page.query.get(page_id)
-                    if page:
-                        if error:
-                            page.status = 'FAILED'
-                            failed += 1
-                            db.session.commit()
-                        else:
-                            # 图片已在子线程中保存并创建版本记录，这里只需要更新计数
-                            completed += 1
-                            # 刷新页面对象以获取最新状态
-                            db.session.refresh(page)
-                    
-                    # Update task progress
-                    task = Task.query.get(task_id)
-                    if task:
-                        task.update_progress(completed=completed, failed=failed)
+                db.session.expire_all()
+                
+                # Update page in database (主要是为了更新失败状态)
+                page = Page.query.get(page_id)
+                if page and error != CANCELLED_STATUS:
+                    if error:
+                        page.status = 'FAILED'
+                        failed += 1
                         db.session.commit()
-                        logger.info(f"Image Progress: {completed}/{len(pages)} pages completed")
+                    else:
+                        # 图片已在子线程中保存并创建版本记录，这里只需要更新计数
+                        completed += 1
+                        # 刷新页面对象以获取最新状态
+                        db.session.refresh(page)
+                
+                # Update task progress
+                progress_writer.update(task_id, completed=completed, failed=failed)
+                logger.info(f"Image Progress: {completed}/{len(pages)} pages completed")
+                
+                if cancel_token.cancelled:
+                    _drop_pending(futures)
+                    break
+            
+            if cancel_token.cancelled:
+                logger.info(f"Task {task_id} CANCELLED - {completed} images generated before cancellation")
+                return
             
             # Mark task as completed
-            task = Task.query.get(task_id)
-            if task:
-                task.status = 'COMPLETED'
-                task.completed_at = datetime.utcnow()
-                db.session.commit()
+            progress_writer.flush(task_id)
+            if _transition_task(task_id, 'COMPLETED'):
                 logger.info(f"Task {task_id} COMPLETED - {completed} images generated, {failed} failed")
             
             # Update project status
@@ -464,13 +816,180 @@ def generate_images_task(task_id: str, project_id: str, ai_service, file_service
                 logger.info(f"Project {project_id} status updated to COMPLETED")
         
         except Exception as e:
+            progress_writer.flush(task_id)
             # Mark task as failed
+            _transition_task(task_id, 'FAILED', error_message=str(e))
+
+
+def generate_descriptions_and_images_task(task_id: str, project_id: str, ai_service, file_service,
+                                          project_context, outline: List[Dict],
+                                          use_template: bool = True, aspect_ratio: str = "16:9",
+                                          resolution: str = "2K", app=None,
+                                          extra_requirements: str = None,
+                                          language: str = None, use_cache: bool = True,
+                                          use_image_cache: bool = True):
+    """
+    Background task: generate descriptions and images in one pipelined pass
+
+    每页描述提交到数据库后立即把该页的图片生成提交到 image_llm 预算，
+    不再等待所有描述完成后再开始生图，整体耗时接近最长的单页（描述 + 图片）链路。
+    单页的描述/图片生成逻辑与 generate_descriptions_task / generate_images_task 相同。
+
+    Note: app instance MUST be passed from the request context
+
+    Args:
+        use_template: 是否使用项目模板图片作为参考
+        extra_requirements: 额外要求（含风格描述）
+        language: Output language (zh, en, ja, auto)
+        use_cache: 描述是否读取文本模型响应缓存（force_regenerate 时为 False）
+        use_image_cache: 图片是否读取生图结果缓存（与 generate_images_task 的 use_cache 相同）
+    """
+    if app is None:
+        raise ValueError("Flask app instance must be provided")
+
+    with app.app_context():
+        try:
             task = Task.query.get(task_id)
-            if task:
-                task.status = 'FAILED'
-                task.error_message = str(e)
-                task.completed_at = datetime.utcnow()
+            if not task:
+                logger.error(f"Task {task_id} not found")
+                return
+
+            if not _transition_task(task_id, 'PROCESSING'):
+                logger.info(f"Task {task_id} was cancelled before it started")
+                return
+            cancel_token = get_cancellation_token(task_id, app)
+
+            pages_data = ai_service.flatten_outline(outline)
+            pages = Page.query.filter_by(project_id=project_id).order_by(Page.order_index).all()
+
+            if len(pages) != len(pages_data):
+                raise ValueError("Page count mismatch")
+
+            total = len(pages)
+            described = 0
+            completed = 0
+            failed = 0
+            page_meta = {}
+            fingerprints = {}
+
+            def submit_image(page_id):
+                page_data, page_index = page_meta[page_id]
+                return scheduler.submit(
+                    ResourceClass.IMAGE_LLM, _generate_page_image,
+                    app, project_id, page_id, page_data, page_index, total,
+                    ai_service, file_service, outline, use_template,
+                    aspect_ratio, resolution, extra_requirements, language,
+                    cancel_token=cancel_token, task_id=task_id, use_cache=use_image_cache
+                )
+
+            # 任务被重新派发或重试时，跳过已完成且输入未变化的描述 / 图片
+            done_descriptions = load_checkpoints(task_id, DESCRIPTION_STAGE)
+            done_images = load_checkpoints(task_id, IMAGE_STAGE)
+            desc_todo = []
+            image_todo = []
+            for i, (page, page_data) in enumerate(zip(pages, pages_data), 1):
+                page_meta[page.id] = (page_data, i)
+                fingerprints[page.id] = page_description_fingerprint(outline, page_data, i, language)
+                if done_descriptions.get(page.id) != fingerprints[page.id] or not page.get_description_content():
+                    desc_todo.append(page.id)
+                    continue
+                described += 1
+                if _image_checkpoint_valid(done_images, page, page_data, file_service, project_id, use_template,
+                                           aspect_ratio, resolution, extra_requirements, language):
+                    completed += 1
+                else:
+                    image_todo.append(page.id)
+            if described:
+                logger.info(f"Task {task_id} resuming: {described} description(s) and {completed} image(s) already done")
+
+            task.set_progress({
+                "total": total,
+                "completed": completed,
+                "failed": 0,
+                "descriptions_completed": described
+            })
+            db.session.commit()
+
+            # 关键：提前提取 page.id，不要传递 ORM 对象到子线程
+            desc_futures = []
+            for page_id in desc_todo:
+                page_data, i = page_meta[page_id]
+                desc_futures.append(scheduler.submit(
+                    ResourceClass.TEXT_LLM, _generate_page_description,
+                    app, project_context, outline, page_id, page_data, i, language,
+                    cancel_token=cancel_token, use_cache=use_cache
+                ))
+
+            # 描述已完成、只差图片的页面直接开始生图
+            image_futures = [submit_image(page_id) for page_id in image_todo]
+            for future in as_completed(desc_futures):
+                page_id, desc_content, error = future.result()
+
+                db.session.expire_all()
+                page = Page.query.get(page_id)
+                if page and error != CANCELLED_STATUS:
+                    if error:
+                        page.status = 'FAILED'
+                        failed += 1
+                        db.session.commit()
+                    else:
+                        page.set_description_content(desc_content)
+                        page.status = 'DESCRIPTION_GENERATED'
+                        stage_checkpoint(task_id, page_id, DESCRIPTION_STAGE, fingerprints[page_id])
+                        described += 1
+                        db.session.commit()
+
+                        # 描述已提交，立即开始这一页的图片生成（已取消时不再提交）
+                        if not cancel_token.cancelled:
+                            image_futures.append(submit_image(page_id))
+
+                    progress_writer.update(task_id, failed=failed, descriptions_completed=described)
+                    logger.info(f"Description Progress: {described}/{total} pages described")
+
+                # 取消后的第一个结果（包括被放弃的页面）就停止，不再等待其余描述
+                if error == CANCELLED_STATUS or cancel_token.cancelled:
+                    _drop_pending(desc_futures + image_futures)
+                    break
+
+            for future in as_completed([] if cancel_token.cancelled else image_futures):
+                page_id, image_path, error = future.result()
+
+                db.session.expire_all()
+                page = Page.query.get(page_id)
+                if page and error != CANCELLED_STATUS:
+                    if error:
+                        page.status = 'FAILED'
+                        failed += 1
+                        db.session.commit()
+                    else:
+                        completed += 1
+
+                progress_writer.update(task_id, completed=completed, failed=failed)
+                logger.info(f"Image Progress: {completed}/{total} pages completed")
+
+                if cancel_token.cancelled:
+                    _drop_pending(image_futures)
+                    break
+
+            if cancel_token.cancelled:
+                progress_writer.flush(task_id)
+                logger.info(f"Task {task_id} CANCELLED - {completed} pages rendered before cancellation")
+                return
+
+            progress_writer.flush(task_id)
+            if _transition_task(task_id, 'COMPLETED'):
+                logger.info(f"Task {task_id} COMPLETED - {completed} pages rendered, {failed} failed")
+
+            from models import Project
+            project = Project.query.get(project_id)
+            if project:
+                project.status = 'COMPLETED' if failed == 0 else 'DESCRIPTIONS_GENERATED'
                 db.session.commit()
+                logger.info(f"Project {project_id} status updated to {project.status}")
+
+        except Exception as e:
+            progress_writer.flush(task_id)
+            _transition_task(task_id, 'FAILED', error_message=str(e))
 
 
 def generate_single_page_image_task(task_id: str, project_id: str, page_id: str, 
@@ -478,11 +997,15 @@ def generate_single_page_image_task(task_id: str, project_id: str, page_id: str,
                                     use_template: bool = True, aspect_ratio: str = "16:9",
                                     resolution: str = "2K", app=None,
                                     extra_requirements: str = None,
-                                    language: str = None):
+                                    language: str = None,
+                                    use_cache: bool = True):
     """
     Background task for generating a single page image
     
     Note: app instance MUST be passed from the request context
+    
+    Args:
+        use_cache: 是否读取生图结果缓存（force_regenerate 时为 False）
     """
     if app is None:
         raise ValueError("Flask app instance must be provided")
@@ -494,8 +1017,10 @@ def generate_single_page_image_task(task_id: str, project_id: str, page_id: str,
             if not task:
                 return
             
-            task.status = 'PROCESSING'
-            db.session.commit()
+            if not _transition_task(task_id, 'PROCESSING'):
+                logger.info(f"Task {task_id} was cancelled before it started")
+                return
+            cancel_token = get_cancellation_token(task_id, app)
             
             # Get page from database
             page = Page.query.get(page_id)
@@ -503,6 +1028,7 @@ def generate_single_page_image_task(task_id: str, project_id: str, page_id: str,
                 raise ValueError(f"Page {page_id} not found")
             
             # Update page status
+            previous_status = page.status
             page.status = 'GENERATING'
             db.session.commit()
             
@@ -543,6 +1069,7 @@ def generate_single_page_image_task(task_id: str, project_id: str, page_id: str,
             if page.part:
                 page_data['part'] = page.part
             
+            cancel_token.raise_if_cancelled()
             prompt = ai_service.generate_image_prompt(
                 outline, page_data, desc_text, page.order_index + 1,
                 has_material_images=has_material_images,
@@ -552,31 +1079,39 @@ def generate_single_page_image_task(task_id: str, project_id: str, page_id: str,
             )
             
             # Generate image
+            cancel_token.raise_if_cancelled()
             logger.info(f"🎨 Generating image for page {page_id}...")
-            image = ai_service.generate_image(
-                prompt, ref_image_path, aspect_ratio, resolution,
-                additional_ref_images=additional_ref_images if additional_ref_images else None
-            )
+            with scheduler.slot(ResourceClass.IMAGE_LLM):
+                image = ai_service.generate_image(
+                    prompt, ref_image_path, aspect_ratio, resolution,
+                    additional_ref_images=additional_ref_images if additional_ref_images else None,
+                    use_cache=use_cache
+                )
             
             if not image:
                 raise ValueError("Failed to generate image")
             
             # 保存图片并创建历史版本记录
+            cancel_token.raise_if_cancelled()
             image_path, next_version = save_image_with_version(
                 image, project_id, page_id, file_service, page_obj=page
             )
             
             # Mark task as completed
-            task.status = 'COMPLETED'
-            task.completed_at = datetime.utcnow()
-            task.set_progress({
+            if _transition_task(task_id, 'COMPLETED', progress={
                 "total": 1,
                 "completed": 1,
                 "failed": 0
-            })
-            db.session.commit()
-            
-            logger.info(f"✅ Task {task_id} COMPLETED - Page {page_id} image generated")
+            }):
+                logger.info(f"✅ Task {task_id} COMPLETED - Page {page_id} image generated")
+        
+        except TaskCancelledError:
+            # 状态已由 cancel_task 标记为 CANCELLED，页面恢复为生成前的状态
+            logger.info(f"Task {task_id} CANCELLED - page {page_id} image not generated")
+            page = Page.query.get(page_id)
+            if page and page.status == 'GENERATING':
+                page.status = previous_status
+                db.session.commit()
         
         except Exception as e:
             import traceback
@@ -584,12 +1119,7 @@ def generate_single_page_image_task(task_id: str, project_id: str, page_id: str,
             logger.error(f"Task {task_id} FAILED: {error_detail}")
             
             # Mark task as failed
-            task = Task.query.get(task_id)
-            if task:
-                task.status = 'FAILED'
-                task.error_message = str(e)
-                task.completed_at = datetime.utcnow()
-                db.session.commit()
+            _transition_task(task_id, 'FAILED', error_message=str(e))
             
             # Update page status
             page = Page.query.get(page_id)
@@ -619,8 +1149,10 @@ def edit_page_image_task(task_id: str, project_id: str, page_id: str,
             if not task:
                 return
             
-            task.status = 'PROCESSING'
-            db.session.commit()
+            if not _transition_task(task_id, 'PROCESSING'):
+                logger.info(f"Task {task_id} was cancelled before it started")
+                return
+            cancel_token = get_cancellation_token(task_id, app)
             
             # Get page from database
             page = Page.query.get(page_id)
@@ -631,6 +1163,7 @@ def edit_page_image_task(task_id: str, project_id: str, page_id: str,
                 raise ValueError("Page must have generated image first")
             
             # Update page status
+            previous_status = page.status
             page.status = 'GENERATING'
             db.session.commit()
             
@@ -640,14 +1173,16 @@ def edit_page_image_task(task_id: str, project_id: str, page_id: str,
             # Edit image
             logger.info(f"🎨 Editing image for page {page_id}...")
             try:
-                image = ai_service.edit_image(
-                    edit_instruction,
-                    current_image_path,
-                    aspect_ratio,
-                    resolution,
-                    original_description=original_description,
-                    additional_ref_images=additional_ref_images if additional_ref_images else None
-                )
+                cancel_token.raise_if_cancelled()
+                with scheduler.slot(ResourceClass.IMAGE_LLM):
+                    image = ai_service.edit_image(
+                        edit_instruction,
+                        current_image_path,
+                        aspect_ratio,
+                        resolution,
+                        original_description=original_description,
+                        additional_ref_images=additional_ref_images if additional_ref_images else None
+                    )
             finally:
                 # Clean up temp directory if created
                 if temp_dir:
@@ -661,21 +1196,26 @@ def edit_page_image_task(task_id: str, project_id: str, page_id: str,
                 raise ValueError("Failed to edit image")
             
             # 保存编辑后的图片并创建历史版本记录
+            cancel_token.raise_if_cancelled()
             image_path, next_version = save_image_with_version(
                 image, project_id, page_id, file_service, page_obj=page
             )
             
             # Mark task as completed
-            task.status = 'COMPLETED'
-            task.completed_at = datetime.utcnow()
-            task.set_progress({
+            if _transition_task(task_id, 'COMPLETED', progress={
                 "total": 1,
                 "completed": 1,
                 "failed": 0
-            })
-            db.session.commit()
-            
-            logger.info(f"✅ Task {task_id} COMPLETED - Page {page_id} image edited")
+            }):
+                logger.info(f"✅ Task {task_id} COMPLETED - Page {page_id} image edited")
+        
+        except TaskCancelledError:
+            # 状态已由 cancel_task 标记为 CANCELLED，页面恢复为编辑前的状态
+            logger.info(f"Task {task_id} CANCELLED - page {page_id} image not edited")
+            page = Page.query.get(page_id)
+            if page and page.status == 'GENERATING':
+                page.status = previous_status
+                db.session.commit()
         
         except Exception as e:
             import traceback
@@ -691,12 +1231,7 @@ def edit_page_image_task(task_id: str, project_id: str, page_id: str,
                     shutil.rmtree(temp_dir)
             
             # Mark task as failed
-            task = Task.query.get(task_id)
-            if task:
-                task.status = 'FAILED'
-                task.error_message = str(e)
-                task.completed_at = datetime.utcnow()
-                db.session.commit()
+            _transition_task(task_id, 'FAILED', error_message=str(e))
             
             # Update page status
             page = Page.query.get(page_id)
@@ -730,21 +1265,26 @@ def generate_material_image_task(task_id: str, project_id: str, prompt: str,
             if not task:
                 return
             
-            task.status = 'PROCESSING'
-            db.session.commit()
+            if not _transition_task(task_id, 'PROCESSING'):
+                logger.info(f"Task {task_id} was cancelled before it started")
+                return
+            cancel_token = get_cancellation_token(task_id, app)
             
             # Generate image (复用核心逻辑)
+            cancel_token.raise_if_cancelled()
             logger.info(f"🎨 Generating material image with prompt: {prompt[:100]}...")
-            image = ai_service.generate_image(
-                prompt=prompt,
-                ref_image_path=ref_image_path,
-                aspect_ratio=aspect_ratio,
-                resolution=resolution,
-                additional_ref_images=additional_ref_images or None,
-            )
+            with scheduler.slot(ResourceClass.IMAGE_LLM):
+                image = ai_service.generate_image(
+                    prompt=prompt,
+                    ref_image_path=ref_image_path,
+                    aspect_ratio=aspect_ratio,
+                    resolution=resolution,
+                    additional_ref_images=additional_ref_images or None,
+                )
             
             if not image:
                 raise ValueError("Failed to generate image")
+            cancel_token.raise_if_cancelled()
             
             # 处理project_id：如果为'global'或None，转换为None
             actual_project_id = None if (project_id == 'global' or project_id is None) else project_id
@@ -765,20 +1305,21 @@ def generate_material_image_task(task_id: str, project_id: str, prompt: str,
                 url=image_url
             )
             db.session.add(material)
+            db.session.flush()
             
             # Mark task as completed
-            task.status = 'COMPLETED'
-            task.completed_at = datetime.utcnow()
-            task.set_progress({
+            if _transition_task(task_id, 'COMPLETED', progress={
                 "total": 1,
                 "completed": 1,
                 "failed": 0,
                 "material_id": material.id,
                 "image_url": image_url
-            })
-            db.session.commit()
-            
-            logger.info(f"✅ Task {task_id} COMPLETED - Material {material.id} generated")
+            }):
+                logger.info(f"✅ Task {task_id} COMPLETED - Material {material.id} generated")
+        
+        except TaskCancelledError:
+            # 状态已由 cancel_task 标记为 CANCELLED
+            logger.info(f"Task {task_id} CANCELLED - material image not generated")
         
         except Exception as e:
             import traceback
@@ -786,12 +1327,7 @@ def generate_material_image_task(task_id: str, project_id: str, prompt: str,
             logger.error(f"Task {task_id} FAILED: {error_detail}")
             
             # Mark task as failed
-            task = Task.query.get(task_id)
-            if task:
-                task.status = 'FAILED'
-                task.error_message = str(e)
-                task.completed_at = datetime.utcnow()
-                db.session.commit()
+            _transition_task(task_id, 'FAILED', error_message=str(e))
         
         finally:
             # Clean up temp directory
@@ -891,7 +1427,7 @@ def export_editable_pptx_with_recursive_analysis_task(
             max_messages = 10  # 最多保留最近10条消息
             
             def progress_callback(step: str, message: str, percent: int):
-                """更新任务进度到数据库"""
+                """更新任务进度（经 progress_writer 批量落库）"""
                 nonlocal progress_messages
                 try:
                     # 添加新消息到日志
@@ -901,18 +1437,15 @@ def export_editable_pptx_with_recursive_analysis_task(
                     if len(progress_messages) > max_messages:
                         progress_messages = progress_messages[-max_messages:]
                     
-                    # 更新数据库
-                    task = Task.query.get(task_id)
-                    if task:
-                        task.set_progress({
-                            "total": 100,
-                            "completed": percent,
-                            "failed": 0,
-                            "current_step": message,
-                            "percent": percent,
-                            "messages": progress_messages.copy()
-                        })
-                        db.session.commit()
+                    # 写入进度缓冲（批量落库）
+                    progress_writer.set(task_id, {
+                        "total": 100,
+                        "completed": percent,
+                        "failed": 0,
+                        "current_step": message,
+                        "percent": percent,
+                        "messages": progress_messages.copy()
+                    })
                 except Exception as e:
                     logger.warning(f"更新进度失败: {e}")
             
@@ -964,7 +1497,8 @@ def export_editable_pptx_with_recursive_analysis_task(
                 text_attribute_extractor=text_attribute_extractor,
                 progress_callback=progress_callback,
                 export_extractor_method=export_extractor_method,
-                export_inpaint_method=export_inpaint_method
+                export_inpaint_method=export_inpaint_method,
+                cancel_token=get_cancellation_token(task_id, app)
             )
             
             logger.info(f"✓ 可编辑PPTX已创建: {output_path}")
@@ -982,36 +1516,46 @@ def export_editable_pptx_with_recursive_analysis_task(
                 progress_messages.extend(warning_messages)
                 logger.warning(f"导出有 {len(warning_messages)} 条警告")
             
-            task = Task.query.get(task_id)
-            if task:
-                task.status = 'COMPLETED'
-                task.completed_at = datetime.utcnow()
-                task.set_progress({
-                    "total": 100,
-                    "completed": 100,
-                    "failed": 0,
-                    "current_step": "✓ 导出完成",
-                    "percent": 100,
-                    "messages": progress_messages,
-                    "download_url": download_path,
-                    "filename": filename,
-                    "method": "recursive_analysis",
-                    "max_depth": max_depth,
-                    "warnings": warning_messages,  # 单独的警告列表
-                    "warning_details": export_warnings.to_dict() if export_warnings else {}  # 详细警告信息
-                })
-                db.session.commit()
+            # 最终进度直接写入任务记录，丢弃尚未落库的中间进度
+            progress_writer.discard(task_id)
+            if _transition_task(task_id, 'COMPLETED', progress={
+                "total": 100,
+                "completed": 100,
+                "failed": 0,
+                "current_step": "✓ 导出完成",
+                "percent": 100,
+                "messages": progress_messages,
+                "download_url": download_path,
+                "filename": filename,
+                "method": "recursive_analysis",
+                "max_depth": max_depth,
+                "warnings": warning_messages,  # 单独的警告列表
+                "warning_details": export_warnings.to_dict() if export_warnings else {}  # 详细警告信息
+            }):
                 logger.info(f"✓ 任务 {task_id} 完成 - 递归分析导出成功（深度={max_depth}）")
         
+        except TaskCancelledError:
+            # 状态已由 cancel_task 标记为 CANCELLED
+            logger.info(f"Task {task_id} CANCELLED - editable export stopped")
+        
         except Exception as e:
             import traceback
             error_detail = traceback.format_exc()
             logger.error(f"✗ 任务 {task_id} 失败: {error_detail}")
+            progress_writer.flush(task_id)
             
             # 标记任务失败
-            task = Task.query.get(task_id)
-            if task:
-                task.status = 'FAILED'
-                task.error_message = str(e)
-                task.completed_at = datetime.utcnow()
-                db.session.commit()
+            _transition_task(task_id, 'FAILED', error_message=str(e))
+
+
+# 注册可持久化的任务处理函数：队列中按函数名保存，进程重启后据此恢复执行
+for _handler in (
+    generate_descriptions_task,
+    generate_images_task,
+    generate_descriptions_and_images_task,
+    generate_single_page_image_task,
+    edit_page_image_task,
+    generate_material_image_task,
+    export_editable_pptx_with_recursive_analysis_task,
+):
+    task_manager.register_handler(_handler)
@@ -0,0 +1,303 @@
+"""
+Task Queue - 基于数据库（SQLite）的持久化任务队列
+
+任务的处理函数名和参数以 JSON 形式存放在 Task.payload 中，worker 通过租约（lease）
+认领任务并定期心跳续约。进程崩溃或重启后，租约过期的任务会被自动重新派发，
+不再因为内存中的 Future 丢失而永远停留在 PENDING/PROCESSING。
+
+语义为 at-least-once：同一任务在极端情况下（worker 卡死超过租约时间）可能被执行多次。
+"""
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import or_, and_
+
+from models import db, Task
+
+logger = logging.getLogger(__name__)
+
+# 可被队列认领的任务状态（PROCESSING 也包含在内：执行中的 worker 崩溃后需要重新派发）
+CLAIMABLE_STATUSES = ('PENDING', 'PROCESSING')
+TERMINAL_STATUSES = ('COMPLETED', 'FAILED', 'CANCELLED')
+
+# 参数中引用运行时对象的标记键
+_REF_KEY = '__ref__'
+
+
+def encode_task_args(value: Any) -> Any:
+    """
+    将任务参数编码为可 JSON 序列化的结构
+
+    Flask app、AIService、FileService 等运行时对象无法持久化，编码为引用标记，
+    在 worker 执行前由 decode_task_args 重新构造。
+    """
+    from flask import Flask
+    from services.ai_service import AIService, ProjectContext
+    from services.file_service import FileService
+
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, Flask):
+        return {_REF_KEY: 'app'}
+    if isinstance(value, AIService):
+        return {_REF_KEY: 'ai_service'}
+    if isinstance(value, FileService):
+        return {_REF_KEY: 'file_service'}
+    if isinstance(value, ProjectContext):
+        return {_REF_KEY: 'project_context', 'data': value.to_dict()}
+    if isinstance(value, (list, tuple)):
+        return [encode_task_args(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): encode_task_args(v) for k, v in value.items()}
+    raise TypeError(f"Task argument of type {type(value).__name__} cannot be persisted to the task queue")
+
+
+def decode_task_args(value: Any, app) -> Any:
+    """
+    还原 encode_task_args 编码的参数（需要在 app context 中调用）
+    """
+    if isinstance(value, list):
+        return [decode_task_args(v, app) for v in value]
+    if isinstance(value, dict):
+        ref = value.get(_REF_KEY)
+        if ref is None:
+            return {k: decode_task_args(v, app) for k, v in value.items()}
+        if ref == 'app':
+            return app
+        if ref == 'ai_service':
+            from services.ai_service_manager import get_ai_service
+            return get_ai_service()
+        if ref == 'file_service':
+            from services.file_service import FileService
+            return FileService(app.config['UPLOAD_FOLDER'])
+        if ref == 'project_context':
+            from services.ai_service import ProjectContext
+            data = value.get('data') or {}
+            return ProjectContext(data, data.get('reference_files_content'))
+        raise ValueError(f"Unknown task argument reference: {ref}")
+    return value
+
+
+class TaskQueue:
+    """
+    持久化任务队列
+
+    所有状态都保存在 tasks 表中，因此多个进程（web 进程、独立 worker 进程）
+    可以共享同一个队列。认领操作使用带条件的 UPDATE，依赖数据库写锁保证原子性。
+    """
+
+    def __init__(self, lease_seconds: int = 60, max_attempts: int = 3):
+        """
+        Args:
+            lease_seconds: 租约时长（秒），worker 需要在过期前心跳续约
+            max_attempts: 单个任务最多被认领执行的次数，超过后标记为 FAILED
+        """
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def configure(self, lease_seconds: int = None, max_attempts: int = None):
+        """根据应用配置调整队列参数"""
+        if lease_seconds:
+            self.lease_seconds = lease_seconds
+        if max_attempts:
+            self.max_attempts = max_attempts
+
+    def enqueue(self, task_id: str, handler: str, args: List = None, kwargs: Dict = None):
+        """
+        将任务写入队列（任务记录需要已存在，由 controller 创建）
+
+        Args:
+            task_id: 任务ID
+            handler: 处理函数名（需已在 TaskManager 中注册）
+            args: 位置参数（会被 encode_task_args 编码）
+            kwargs: 关键字参数
+        """
+        task = Task.query.get(task_id)
+        if not task:
+            raise ValueError(f"Task {task_id} not found")
+
+        task.set_payload({
+            'handler': handler,
+            'args': encode_task_args(list(args or [])),
+            'kwargs': encode_task_args(dict(kwargs or {})),
+        })
+        task.attempts = 0
+        task.lease_owner = None
+        task.lease_expires_at = None
+        task.heartbeat_at = None
+        db.session.commit()
+        logger.debug(f"Task {task_id} enqueued with handler {handler}")
+
+    def requeue(self, task_id: str) -> bool:
+        """
+        把已失败 / 已取消的任务重新放回队列（保留原 payload）
+
+        任务重新执行时按检查点跳过已完成的页面（见 services/task_checkpoints.py）。
+        被取消的任务在处理函数返回、释放租约之前仍在执行，此时不能重新入队，
+        否则同一任务会有两次执行同时进行。
+
+        Returns:
+            任务不存在、没有 payload、不是 FAILED / CANCELLED 状态或租约仍有效时返回 False
+        """
+        rowcount = Task.query.filter(
+            Task.id == task_id,
+            Task.payload.isnot(None),
+            Task.status.in_(('FAILED', 'CANCELLED')),
+            or_(Task.lease_owner.is_(None), Task.lease_expires_at < datetime.utcnow()),
+        ).update({
+            'status': 'PENDING',
+            'error_message': None,
+            'completed_at': None,
+            'attempts': 0,
+            'lease_owner': None,
+            'lease_expires_at': None,
+            'heartbeat_at': None,
+        }, synchronize_session=False)
+        db.session.commit()
+        if rowcount:
+            logger.info(f"Task {task_id} requeued")
+        return bool(rowcount)
+
+    def is_leased(self, task_id: str) -> bool:
+        """任务是否仍被某个 worker 持有有效租约（即仍在执行）"""
+        return db.session.query(Task.id).filter(
+            Task.id == task_id,
+            Task.lease_owner.isnot(None),
+            Task.lease_expires_at >= datetime.utcnow(),
+        ).first() is not None
+
+    def _claimable_filter(self, now: datetime):
+        return and_(
+            Task.payload.isnot(None),
+            Task.status.in_(CLAIMABLE_STATUSES),
+            or_(Task.lease_owner.is_(None), Task.lease_expires_at < now),
+        )
+
+    def claim(self, worker_id: str, limit: int = 1) -> List[Tuple[str, Dict]]:
+        """
+        认领最多 limit 个可执行任务
+
+        Returns:
+            [(task_id, payload), ...]
+        """
+        if limit <= 0:
+            return []
+
+        now = datetime.utcnow()
+        candidate_ids = [
+            row[0] for row in db.session.query(Task.id)
+            .filter(self._claimable_filter(now))
+            .filter(Task.attempts < self.max_attempts)
+            .order_by(Task.created_at)
+            .limit(limit)
+            .all()
+        ]
+
+        claimed = []
+        for task_id in candidate_ids:
+            # 条件更新：只有在任务仍然可认领时才会成功，防止多个 worker 重复认领
+            rowcount = Task.query.filter(
+                Task.id == task_id,
+                self._claimable_filter(now),
+            ).update({
+                'lease_owner': worker_id,
+                'lease_expires_at': now + timedelta(seconds=self.lease_seconds),
+                'heartbeat_at': now,
+                'attempts': Task.attempts + 1,
+            }, synchronize_session=False)
+            db.session.commit()
+
+            if rowcount == 1:
+                payload = db.session.query(Task.payload).filter(Task.id == task_id).scalar()
+                claimed.append((task_id, json.loads(payload) if payload else {}))
+
+        if claimed:
+            logger.info(f"Worker {worker_id} claimed {len(claimed)} task(s): {[c[0] for c in claimed]}")
+        return claimed
+
+    def heartbeat(self, worker_id: str, task_ids: List[str]) -> int:
+        """
+        为 worker 持有的任务续约
+
+        Returns:
+            成功续约的任务数（租约已被其他 worker 接管的任务不会续约）
+        """
+        if not task_ids:
+            return 0
+        now = datetime.utcnow()
+        rowcount = Task.query.filter(
+            Task.id.in_(task_ids),
+            Task.lease_owner == worker_id,
+        ).update({
+            'lease_expires_at': now + timedelta(seconds=self.lease_seconds),
+            'heartbeat_at': now,
+        }, synchronize_session=False)
+        db.session.commit()
+        return rowcount
+
+    def release(self, task_id: str, worker_id: str, error: str = None):
+        """
+        任务函数返回后释放租约
+
+        任务函数负责把状态写为 COMPLETED/FAILED；如果返回后状态仍未终结
+        （例如处理函数抛出异常），这里统一标记为 FAILED，避免被重复派发。
+        """
+        db.session.expire_all()
+        task = Task.query.get(task_id)
+        if not task or task.lease_owner != worker_id:
+            return
+
+        task.lease_owner = None
+        task.lease_expires_at = None
+        task.heartbeat_at = None
+        if task.status not in TERMINAL_STATUSES:
+            task.status = 'FAILED'
+            task.error_message = error or task.error_message or 'Task handler exited without finishing the task'
+            task.completed_at = datetime.utcnow()
+        db.session.commit()
+
+    def recover(self) -> int:
+        """
+        处理异常任务：
+        1. 租约过期且已达到最大尝试次数的任务 -> FAILED
+        2. 没有 payload 且长时间未完成的任务（旧版本内存队列遗留、或入队前进程退出）-> FAILED
+
+        租约过期但仍可重试的任务不需要处理，claim 会直接重新认领它们。
+
+        Returns:
+            被标记为失败的任务数
+        """
+        now = datetime.utcnow()
+
+        exhausted = Task.query.filter(
+            self._claimable_filter(now),
+            Task.attempts >= self.max_attempts,
+        ).update({
+            'status': 'FAILED',
+            'error_message': f'Task exceeded max attempts ({self.max_attempts})',
+            'completed_at': now,
+            'lease_owner': None,
+            'lease_expires_at': None,
+        }, synchronize_session=False)
+
+        orphaned = Task.query.filter(
+            Task.payload.is_(None),
+            Task.status.in_(CLAIMABLE_STATUSES),
+            Task.created_at < now - timedelta(seconds=self.lease_seconds),
+        ).update({
+            'status': 'FAILED',
+            'error_message': 'Task was interrupted by a service restart',
+            'completed_at': now,
+        }, synchronize_session=False)
+
+        db.session.commit()
+
+        if exhausted or orphaned:
+            logger.warning(f"Task queue recovery: {exhausted} task(s) exceeded max attempts, {orphaned} orphaned task(s) failed")
+        return exhausted + orphaned
+
+    def pending_count(self) -> int:
+        """当前等待执行（含租约过期待重新派发）的任务数"""
+        return Task.query.filter(self._claimable_filter(datetime.utcnow())).count()
@@ -20,6 +20,8 @@ os.environ['TESTING'] = 'true'
 os.environ['USE_MOCK_AI'] = 'true'  # 标记使用mock AI服务
 os.environ['GOOGLE_API_KEY'] = os.environ.get('GOOGLE_API_KEY', 'mock-api-key-for-testing')
 os.environ['FLASK_ENV'] = 'testing'
+os.environ['TASK_QUEUE_EMBEDDED_WORKER'] = 'false'  # 测试中不启动后台任务派发线程
+os.environ['LLM_CACHE_ENABLED'] = 'false'  # 测试之间不共享文本模型响应缓存
 
 
 @pytest.fixture(scope='session')
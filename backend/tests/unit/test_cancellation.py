@@ -0,0 +1,92 @@
+"""
+任务取消单元测试
+"""
+
+import pytest
+
+from services.cancellation import CancellationToken, TaskCancelledError
+
+
+class TestTaskCancellation:
+    """协作式取消测试"""
+
+    def test_cancel_queued_task(self, client, sample_project):
+        """测试取消排队中的任务后不再被认领，重复取消返回 400"""
+        from models import db, Task
+        from services.task_queue import TaskQueue
+
+        project_id = sample_project['project_id']
+        task = Task(project_id=project_id, task_type='GENERATE_IMAGES', status='PENDING')
+        db.session.add(task)
+        db.session.commit()
+        queue = TaskQueue(lease_seconds=60)
+        queue.enqueue(task.id, 'generate_images_task', [], {})
+
+        response = client.post(f'/api/projects/{project_id}/tasks/{task.id}/cancel')
+        assert response.status_code == 200
+        assert response.get_json()['data']['status'] == 'CANCELLED'
+        assert queue.claim('worker-a', limit=4) == []
+
+        response = client.post(f'/api/projects/{project_id}/tasks/{task.id}/cancel')
+        assert response.status_code == 400
+
+    def test_token_sees_cancellation_from_other_process(self, app, client, sample_project):
+        """测试令牌通过任务状态感知其他进程发起的取消"""
+        from models import db, Task
+
+        task = Task(project_id=sample_project['project_id'], task_type='GENERATE_IMAGES', status='PROCESSING')
+        db.session.add(task)
+        db.session.commit()
+
+        token = CancellationToken(task.id, app, check_interval=0)
+        assert not token.cancelled
+
+        task.status = 'CANCELLED'
+        db.session.commit()
+        assert token.cancelled
+        with pytest.raises(TaskCancelledError):
+            token.raise_if_cancelled()
+
+    def test_cancelled_status_is_final(self, app, client, sample_project):
+        """测试取消后处理函数不会把状态覆盖为 PROCESSING / COMPLETED，单页生图不保存结果"""
+        from unittest.mock import MagicMock
+        from models import db, Page, Task
+        from services import task_manager as tm
+
+        project_id = sample_project['project_id']
+        page = Page(project_id=project_id, order_index=0, status='DESCRIPTION_GENERATED')
+        page.set_description_content({'text': '页面描述'})
+        db.session.add(page)
+        task = Task(project_id=project_id, task_type='GENERATE_PAGE_IMAGE', status='CANCELLED')
+        db.session.add(task)
+        db.session.commit()
+        page_id, task_id = page.id, task.id
+
+        # 认领后、处理函数开始前被取消
+        ai_service = MagicMock()
+        tm.generate_single_page_image_task(task_id, project_id, page_id, ai_service, MagicMock(), [], app=app)
+        db.session.expire_all()
+        assert Task.query.get(task_id).status == 'CANCELLED'
+        ai_service.generate_image_prompt.assert_not_called()
+
+        # 生图期间被取消：结果不保存，页面恢复原状态，任务保持 CANCELLED
+        Task.query.get(task_id).status = 'PENDING'
+        db.session.commit()
+
+        def generate_image(*args, **kwargs):
+            with app.app_context():
+                tm.task_manager.cancel_task(task_id)
+            return MagicMock()
+
+        ai_service.generate_image.side_effect = generate_image
+        file_service = MagicMock()
+        file_service.get_template_path.return_value = None
+        try:
+            tm.generate_single_page_image_task(task_id, project_id, page_id, ai_service, file_service, [], app=app)
+        finally:
+            tm.discard_cancellation_token(task_id)
+
+        db.session.expire_all()
+        assert Task.query.get(task_id).status == 'CANCELLED'
+        assert Page.query.get(page_id).status == 'DESCRIPTION_GENERATED'
+        assert Page.query.get(page_id).generated_image_path is None
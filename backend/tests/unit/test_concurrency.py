@@ -0,0 +1,109 @@
+"""
+全局并发调度器单元测试
+"""
+
+import threading
+import time
+
+from services.concurrency import ConcurrencyScheduler
+
+
+class TestConcurrencyScheduler:
+    """并发调度器测试"""
+
+    def test_budget_limits_parallelism(self):
+        """测试同一类别的并发数不超过预算（submit 与 slot 共享预算）"""
+        scheduler = ConcurrencyScheduler({'res': 2})
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def work():
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.02)
+            with lock:
+                state['running'] -= 1
+
+        def slot_work():
+            with scheduler.slot('res'):
+                work()
+
+        futures = [scheduler.submit('res', work) for _ in range(6)]
+        threads = [threading.Thread(target=slot_work) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for f in futures:
+            f.result()
+        for t in threads:
+            t.join()
+
+        assert state['peak'] <= 2
+        assert scheduler.stats()['res']['total'] == 9
+
+    def test_nested_submit_runs_inline(self):
+        """测试持有名额的线程再次提交同类别工作时直接执行，不会死锁"""
+        scheduler = ConcurrencyScheduler({'res': 1})
+
+        def child(x):
+            return threading.current_thread().name, x * 2
+
+        def parent():
+            futures = [scheduler.submit('res', child, i) for i in range(3)]
+            return threading.current_thread().name, [f.result() for f in futures]
+
+        parent_thread, results = scheduler.submit('res', parent).result(timeout=5)
+        assert [r[1] for r in results] == [0, 2, 4]
+        assert all(r[0] == parent_thread for r in results)
+
+    def test_set_limit_expands_budget(self):
+        """测试运行时调整预算"""
+        scheduler = ConcurrencyScheduler({'res': 1})
+        scheduler.set_limit('res', 3)
+        barrier = threading.Barrier(3, timeout=5)
+
+        futures = [scheduler.submit('res', barrier.wait) for _ in range(3)]
+        for f in futures:
+            f.result(timeout=5)
+        assert scheduler.get_limit('res') == 3
+
+
+class TestAdaptiveConcurrency:
+    """AIMD 自适应并发测试"""
+
+    def test_throttle_halves_and_success_recovers(self, monkeypatch):
+        """测试限流时并发减半、恢复后逐步加回到配置上限"""
+        from services import adaptive_concurrency as ac
+        from services.concurrency import ResourceClass
+
+        scheduler = ConcurrencyScheduler({ResourceClass.IMAGE_LLM: 8})
+        monkeypatch.setattr(ac, 'scheduler', scheduler)
+        controller = ac.AdaptiveConcurrencyController(cooldown_seconds=60)
+        resource = ResourceClass.IMAGE_LLM
+
+        class RateLimited(Exception):
+            status_code = 429
+
+        try:
+            with controller.observe(resource):
+                raise RateLimited('too many requests')
+        except RateLimited:
+            pass
+        assert scheduler.get_limit(resource) == 4
+
+        # 冷却期内的连续限流只减少一次
+        controller.record_throttle(resource)
+        assert scheduler.get_limit(resource) == 4
+
+        # 其他错误不影响并发
+        try:
+            with controller.observe(resource):
+                raise ValueError('bad prompt')
+        except ValueError:
+            pass
+        assert scheduler.get_limit(resource) == 4
+
+        for _ in range(100):
+            controller.record_success(resource, 1.0)
+        assert scheduler.get_limit(resource) == 8
+        assert controller.stats()['resources'][resource]['throttles'] == 2
@@ -0,0 +1,100 @@
+"""
+provider 端上下文缓存单元测试
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from services.ai_providers.text.base import TextProvider
+from services.context_cache import ContextCacheRegistry
+
+
+class LocalContextCacheProvider(TextProvider):
+    """本地替身：在内存中保存注册的前缀，记录每次调用实际发送的内容"""
+
+    supports_context_cache = True
+    model = 'local'
+
+    def __init__(self):
+        self.prefixes = {}
+        self.sent = []
+
+    def generate_text(self, prompt, thinking_budget=1000):
+        self.sent.append(prompt)
+        return f"reply:{len(prompt)}"
+
+    def create_context_cache(self, prefix, ttl_seconds):
+        handle = f"cachedContents/{len(self.prefixes)}"
+        self.prefixes[handle] = prefix
+        return handle
+
+    def generate_text_with_context(self, cache_handle, suffix, thinking_budget=1000):
+        if cache_handle not in self.prefixes:
+            raise LookupError(f"{cache_handle} expired")
+        self.sent.append(suffix)
+        return f"reply:{len(self.prefixes[cache_handle]) + len(suffix)}"
+
+
+class TestContextCache:
+    """共享前缀缓存测试"""
+
+    def test_prefix_registered_once_and_reused(self):
+        """并行的各页调用只注册一次前缀，之后只发送后缀，结果与发送完整 prompt 一致"""
+        registry = ContextCacheRegistry(enabled=True, min_tokens=10)
+        provider = LocalContextCacheProvider()
+        prefix = '参考文件与大纲。' * 50
+        prompts = [prefix + f"现在请为第 {i} 页生成描述" for i in range(1, 9)]
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            replies = list(pool.map(lambda p: registry.generate(provider, p, prefix), prompts))
+
+        assert replies == [f"reply:{len(p)}" for p in prompts]
+        assert len(provider.prefixes) == 1
+        assert all(not sent.startswith(prefix) for sent in provider.sent)
+        stats = registry.stats()
+        assert stats['created'] == 1 and stats['fallbacks'] == 0
+
+    def test_fallback_to_full_prompt(self):
+        """未开启、前缀过短或句柄失效时发送完整 prompt"""
+        provider = LocalContextCacheProvider()
+        prefix = '共享前缀' * 50
+        prompt = prefix + '页面后缀'
+
+        ContextCacheRegistry(enabled=False).generate(provider, prompt, prefix)
+        ContextCacheRegistry(enabled=True, min_tokens=100000).generate(provider, prompt, prefix)
+        assert provider.sent == [prompt, prompt]
+
+        registry = ContextCacheRegistry(enabled=True, min_tokens=10)
+        registry.generate(provider, prompt, prefix)
+        provider.prefixes.clear()  # provider 端过期
+        assert registry.generate(provider, prompt, prefix) == f"reply:{len(prompt)}"
+        assert provider.sent[-1] == prompt
+        assert registry.stats()['fallbacks'] == 1
+
+    def test_rate_limit_keeps_handle(self):
+        """限流等非缓存错误原样抛出，不重发完整 prompt，句柄继续使用"""
+        import pytest
+        from tenacity import retry, stop_after_attempt
+
+        class ThrottledProvider(LocalContextCacheProvider):
+            throttled = True
+
+            @retry(stop=stop_after_attempt(2))
+            def generate_text_with_context(self, cache_handle, suffix, thinking_budget=1000):
+                if self.throttled:
+                    raise RuntimeError('429 RESOURCE_EXHAUSTED. Quota exceeded for cached content requests')
+                return super().generate_text_with_context(cache_handle, suffix, thinking_budget)
+
+        registry = ContextCacheRegistry(enabled=True, min_tokens=10)
+        provider = ThrottledProvider()
+        prefix = '共享前缀' * 50
+        prompt = prefix + '页面后缀'
+
+        with pytest.raises(Exception):
+            registry.generate(provider, prompt, prefix)
+        assert provider.sent == []
+
+        provider.throttled = False
+        assert registry.generate(provider, prompt, prefix) == f"reply:{len(prompt)}"
+        assert provider.sent == ['页面后缀']
+        stats = registry.stats()
+        assert stats['created'] == 1 and stats['fallbacks'] == 0
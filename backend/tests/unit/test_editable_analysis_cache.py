@@ -0,0 +1,130 @@
+"""
+可编辑导出版面分析缓存单元测试
+"""
+
+from pathlib import Path
+
+from PIL import Image
+
+from services.image_editability import (
+    ElementExtractor,
+    ExtractorRegistry,
+    ImageEditabilityService,
+    InpaintProvider,
+    InpaintProviderRegistry,
+    ServiceConfig,
+)
+from services.image_editability.analysis_cache import EditableAnalysisCache
+from services.image_editability.extractors import ExtractionResult, ExtractionContext
+
+
+class FakeExtractor(ElementExtractor):
+    def __init__(self):
+        self.calls = 0
+
+    def supports_type(self, element_type):
+        return True
+
+    def extract(self, image_path, element_type=None, **kwargs):
+        self.calls += 1
+        size = Image.open(image_path).size
+        return ExtractionResult(
+            elements=[{'bbox': [10, 10, 60, 30], 'type': 'text', 'content': '标题'}],
+            context=ExtractionContext(metadata={'image_size': size}),
+        )
+
+
+class FakeInpaint(InpaintProvider):
+    def inpaint_regions(self, image, bboxes, types=None, **kwargs):
+        return Image.new('RGB', image.size, 'white')
+
+
+class TestEditableAnalysisCache:
+    """版面分析缓存测试"""
+
+    def _make_service(self, tmp_path, extractor, **settings):
+        extractors = ExtractorRegistry().register_default(extractor)
+        inpaint = InpaintProviderRegistry().register_default(FakeInpaint())
+        config = ServiceConfig(tmp_path / 'uploads', extractors, inpaint, settings=settings)
+        return ImageEditabilityService(config)
+
+    def test_unchanged_page_reuses_analysis(self, tmp_path, monkeypatch):
+        """图片和设置都未变化时复用分析结果（含背景和元素裁剪图）；图片或设置变化时重新分析"""
+        from services.image_editability import service as service_module
+
+        cache = EditableAnalysisCache(str(tmp_path / 'cache'))
+        monkeypatch.setattr(service_module, 'editable_analysis_cache', cache)
+        page = tmp_path / 'page.png'
+        Image.new('RGB', (200, 100), 'blue').save(page)
+
+        extractor = FakeExtractor()
+        service = self._make_service(tmp_path, extractor)
+        first = service.make_image_editable(str(page))
+        second = service.make_image_editable(str(page))
+
+        assert extractor.calls == 1
+        assert cache.stats()['hits'] == 1
+        assert second.image_path == str(page)
+        assert [e.content for e in second.elements] == ['标题']
+        assert second.elements[0].bbox == first.elements[0].bbox
+        assert Path(second.clean_background).exists()
+        assert str(tmp_path / 'cache') in second.elements[0].image_path
+
+        # 设置变化（如重绘方法参数）时重新分析
+        self._make_service(tmp_path, extractor, enhance_quality=False).make_image_editable(str(page))
+        assert extractor.calls == 2
+
+        # 页面图片变化时重新分析
+        Image.new('RGB', (200, 100), 'red').save(page)
+        service.make_image_editable(str(page))
+        assert extractor.calls == 3
+
+    def test_incomplete_analysis_not_cached(self, tmp_path, monkeypatch):
+        """背景重绘失败的结果不写入缓存"""
+        from services.image_editability import service as service_module
+
+        cache = EditableAnalysisCache(str(tmp_path / 'cache'))
+        monkeypatch.setattr(service_module, 'editable_analysis_cache', cache)
+        monkeypatch.setattr(FakeInpaint, 'inpaint_regions', lambda self, image, bboxes, types=None, **kw: None)
+        page = tmp_path / 'page.png'
+        Image.new('RGB', (200, 100), 'blue').save(page)
+
+        extractor = FakeExtractor()
+        service = self._make_service(tmp_path, extractor)
+        service.make_image_editable(str(page))
+        service.make_image_editable(str(page))
+
+        assert extractor.calls == 2
+        assert cache.stats()['skipped_incomplete'] == 2
+
+    def test_eviction_keeps_recently_loaded_entries(self, tmp_path, monkeypatch):
+        """超出上限时只淘汰久未使用的条目，刚被导出读取的条目保留"""
+        import os
+        import time
+        from services.image_editability import service as service_module
+
+        cache = EditableAnalysisCache(str(tmp_path / 'cache'))
+        monkeypatch.setattr(service_module, 'editable_analysis_cache', cache)
+        pages = []
+        for name, color in (('a', 'blue'), ('b', 'green'), ('c', 'red')):
+            pages.append(tmp_path / f'{name}.png')
+            Image.new('RGB', (200, 100), color).save(pages[-1])
+
+        extractor = FakeExtractor()
+        service = self._make_service(tmp_path, extractor)
+        service.make_image_editable(str(pages[0]))
+        service.make_image_editable(str(pages[1]))
+        stale = time.time() - 3600
+        for entry_dir, _, _ in cache._list_entries():
+            os.utime(os.path.join(entry_dir, 'tree.json'), (stale, stale))
+
+        # a 被另一个导出读取，随后新页面写入触发淘汰
+        loaded = service.make_image_editable(str(pages[0]))
+        cache.max_bytes = 1
+        service.make_image_editable(str(pages[2]))
+
+        assert cache.stats()['evictions'] == 1
+        assert Path(loaded.clean_background).exists()
+        assert Path(loaded.elements[0].image_path).exists()
+        service.make_image_editable(str(pages[1]))
+        assert extractor.calls == 4
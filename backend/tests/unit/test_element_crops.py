@@ -0,0 +1,117 @@
+"""
+元素裁剪图（内存 + 后台写入）单元测试
+"""
+
+import os
+
+from PIL import Image
+
+from services.image_editability import (
+    ElementExtractor,
+    ExtractorRegistry,
+    ImageEditabilityService,
+    InpaintProvider,
+    InpaintProviderRegistry,
+    ServiceConfig,
+)
+from services.image_editability.analysis_cache import EditableAnalysisCache
+from services.image_editability.element_crops import ElementCropStore, element_crops
+from services.image_editability.extractors import ExtractionResult, ExtractionContext
+
+
+class TextAndImageExtractor(ElementExtractor):
+    def supports_type(self, element_type):
+        return True
+
+    def extract(self, image_path, element_type=None, **kwargs):
+        return ExtractionResult(
+            elements=[
+                {'bbox': [10, 10, 120, 30], 'type': 'text', 'content': '标题'},
+                {'bbox': [20, 40, 100, 90], 'type': 'image'},
+            ],
+            context=ExtractionContext(metadata={}),
+        )
+
+
+class WhiteInpaint(InpaintProvider):
+    def inpaint_regions(self, image, bboxes, types=None, **kwargs):
+        return Image.new('RGB', image.size, 'white')
+
+
+class TestElementCrops:
+    """裁剪图惰性写盘"""
+
+    def test_only_file_consumers_trigger_writes(self, tmp_path, monkeypatch):
+        """文字裁剪图留在内存中供样式识别使用，图片元素后台写盘，分析缓存直接编码到条目中"""
+        from services.image_editability import service as service_module
+
+        cache = EditableAnalysisCache(str(tmp_path / 'cache'))
+        monkeypatch.setattr(service_module, 'editable_analysis_cache', cache)
+        page = tmp_path / 'page.png'
+        Image.new('RGB', (200, 100), 'blue').save(page)
+
+        config = ServiceConfig(
+            tmp_path / 'uploads',
+            ExtractorRegistry().register_default(TextAndImageExtractor()),
+            InpaintProviderRegistry().register_default(WhiteInpaint()),
+        )
+        result = ImageEditabilityService(config).make_image_editable(str(page))
+        text_elem, image_elem = result.elements
+
+        # 图片元素：需要文件（add_picture），后台写入
+        assert element_crops.materialize(image_elem.image_path) == image_elem.image_path
+        assert Image.open(image_elem.image_path).size == (80, 50)
+
+        # 文字元素：不写盘，直接从内存读取
+        assert not os.path.exists(text_elem.image_path)
+        assert element_crops.exists(text_elem.image_path)
+        assert element_crops.open(text_elem.image_path).size == (110, 20)
+
+        # 分析缓存条目包含两张裁剪图
+        cached = cache.load(cache.make_key(str(page), config.analysis_settings()), str(page))
+        assert [Image.open(e.image_path).size for e in cached.elements] == [(110, 20), (80, 50)]
+
+        element_crops.release([text_elem.image_path, image_elem.image_path])
+        assert not element_crops.exists(text_elem.image_path)
+        assert not os.path.exists(text_elem.image_path)
+
+    def test_memory_budget_spills_oldest_crops(self, tmp_path):
+        """内存超出上限时最早的裁剪图写盘后释放，之后从文件读取"""
+        store = ElementCropStore(max_bytes=2 * 100 * 100 * 3)
+        paths = [str(tmp_path / 'elements' / f"{i}_text.png") for i in range(3)]
+        for i, path in enumerate(paths):
+            store.add(path, Image.new('RGB', (100, 100), (i, 0, 0)))
+
+        store.materialize(paths[0])
+        stats = store.stats()
+        assert stats['spilled'] == 1 and stats['written'] == 1
+        assert stats['in_memory'] == 2
+        assert os.path.exists(paths[0]) and not os.path.exists(paths[2])
+        assert store.open(paths[0]).getpixel((0, 0)) == (0, 0, 0)
+
+    def test_aborted_export_releases_crops(self, tmp_path, monkeypatch):
+        """导出在构建 PPTX 前被取消时同样释放本次分析登记的裁剪图"""
+        import pytest
+        from services.export_service import ExportService
+        from services.cancellation import CancellationToken, TaskCancelledError
+        from services.image_editability import service as service_module
+
+        monkeypatch.setattr(service_module, 'editable_analysis_cache', EditableAnalysisCache(str(tmp_path / 'cache')))
+        page = tmp_path / 'page.png'
+        Image.new('RGB', (200, 100), 'blue').save(page)
+        config = ServiceConfig(
+            tmp_path / 'uploads',
+            ExtractorRegistry().register_default(TextAndImageExtractor()),
+            InpaintProviderRegistry().register_default(WhiteInpaint()),
+        )
+        result = ImageEditabilityService(config).make_image_editable(str(page))
+        text_elem = result.elements[0]
+        assert element_crops.exists(text_elem.image_path)
+
+        token = CancellationToken()
+        token.cancel()
+        with pytest.raises(TaskCancelledError):
+            ExportService.create_editable_pptx_with_recursive_analysis(
+                editable_images=[result], cancel_token=token
+            )
+        assert not element_crops.exists(text_elem.image_path)
@@ -0,0 +1,65 @@
+"""
+共享 HTTP 连接池单元测试
+"""
+
+from services.http_sessions import HttpSessionRegistry
+from services.concurrency import scheduler, ResourceClass
+
+
+class TestHttpSessionRegistry:
+    """连接池注册表测试"""
+
+    def test_session_shared_per_resource_and_sized_by_budget(self):
+        """同一资源类别复用同一个 Session，池大小等于并发预算，只重试建连失败"""
+        registry = HttpSessionRegistry(connect_retries=2)
+        session = registry.get(ResourceClass.MINERU)
+        assert registry.get(ResourceClass.MINERU) is session
+        assert registry.get(ResourceClass.BAIDU_OCR) is not session
+
+        adapter = session.get_adapter('https://mineru.net/api')
+        assert adapter._pool_maxsize == max(1, scheduler.get_limit(ResourceClass.MINERU))
+        assert adapter.max_retries.connect == 2
+        assert adapter.max_retries.read == 0
+        assert set(registry.stats()) == {ResourceClass.MINERU, ResourceClass.BAIDU_OCR}
+
+
+class TestVolcengineInpaintingService:
+    """火山引擎 Inpainting 复用 SDK 实例测试"""
+
+    def test_service_built_once_and_authenticated(self):
+        """多次调用返回同一个已设置 AK/SK、挂载共享连接池的 VisualService"""
+        import sys
+        import types
+        import requests
+        from unittest.mock import patch
+        from services.ai_providers.image.volcengine_inpainting_provider import VolcengineInpaintingProvider
+
+        class FakeVisualService:
+            instances = 0
+
+            def __init__(self):
+                FakeVisualService.instances += 1
+                self.session = requests.Session()
+
+            def set_ak(self, ak):
+                self.ak = ak
+
+            def set_sk(self, sk):
+                self.sk = sk
+
+        module = types.ModuleType('volcengine.visual.VisualService')
+        module.VisualService = FakeVisualService
+        fake_modules = {
+            'volcengine': types.ModuleType('volcengine'),
+            'volcengine.visual': types.ModuleType('volcengine.visual'),
+            'volcengine.visual.VisualService': module,
+        }
+        provider = VolcengineInpaintingProvider('test-ak', 'test-sk')
+        with patch.dict(sys.modules, fake_modules):
+            service = provider._get_service()
+            assert provider._get_service() is service
+
+        assert FakeVisualService.instances == 1
+        assert (service.ak, service.sk) == ('test-ak', 'test-sk')
+        adapter = service.session.get_adapter('https://visual.volcengineapi.com')
+        assert adapter._pool_maxsize == max(1, scheduler.get_limit(ResourceClass.BAIDU_INPAINT))
@@ -0,0 +1,87 @@
+"""
+整页分析内已解码图片缓存单元测试
+"""
+
+from PIL import Image
+
+from services.image_editability import (
+    ElementExtractor,
+    ExtractorRegistry,
+    ImageEditabilityService,
+    InpaintProvider,
+    InpaintProviderRegistry,
+    ServiceConfig,
+)
+from services.image_editability.extractors import ExtractionResult, ExtractionContext
+from services.image_editability.analysis_cache import EditableAnalysisCache
+from services.image_editability.image_cache import DecodedImageCache
+
+
+class NestedExtractor(ElementExtractor):
+    """根图返回一个文字和一个可递归的大图片元素，子图只返回文字"""
+
+    def supports_type(self, element_type):
+        return True
+
+    def extract(self, image_path, element_type=None, **kwargs):
+        if kwargs.get('depth', 0) == 0:
+            elements = [
+                {'bbox': [20, 20, 300, 60], 'type': 'text', 'content': '标题'},
+                {'bbox': [100, 100, 500, 400], 'type': 'image'},
+            ]
+        else:
+            elements = [{'bbox': [10, 10, 100, 40], 'type': 'text', 'content': '图注'}]
+        return ExtractionResult(elements=elements, context=ExtractionContext(metadata={}))
+
+
+class CopyInpaint(InpaintProvider):
+    def inpaint_regions(self, image, bboxes, types=None, **kwargs):
+        return image.copy()
+
+
+class TestDecodedImageCache:
+    """同一页的图片只解码一次"""
+
+    def test_page_and_children_share_decoded_images(self, tmp_path, monkeypatch):
+        """根图在裁剪、重绘、子图裁剪中只解码一次，子图直接使用内存中的裁剪结果，页面完成后释放"""
+        from services.image_editability import service as service_module
+
+        created = []
+
+        class RecordingCache(DecodedImageCache):
+            def __init__(self):
+                super().__init__()
+                created.append(self)
+
+        monkeypatch.setattr(service_module, 'DecodedImageCache', RecordingCache)
+        monkeypatch.setattr(service_module, 'editable_analysis_cache', EditableAnalysisCache())
+        page = tmp_path / 'page.png'
+        Image.new('RGB', (800, 600), 'blue').save(page)
+
+        config = ServiceConfig(
+            tmp_path / 'uploads',
+            ExtractorRegistry().register_default(NestedExtractor()),
+            InpaintProviderRegistry().register_default(CopyInpaint()),
+            max_depth=2,
+        )
+        result = ImageEditabilityService(config).make_image_editable(str(page))
+
+        image_element = result.elements[1]
+        assert [child.content for child in image_element.children] == ['图注']
+        assert image_element.inpainted_background_path is not None
+        assert len(created) == 1
+        cache = created[0]
+        assert cache.decodes == 1
+        assert cache.hits >= 4
+        assert cache._images == {}
+
+    def test_size_reads_header_only(self, tmp_path):
+        """未解码的图片只读取尺寸"""
+        page = tmp_path / 'page.png'
+        Image.new('RGB', (320, 180), 'red').save(page)
+        cache = DecodedImageCache()
+
+        assert cache.size(str(page)) == (320, 180)
+        assert cache.decodes == 0
+        assert cache.crop(str(page), (0, 0, 10, 10)).size == (10, 10)
+        assert cache.decodes == 1
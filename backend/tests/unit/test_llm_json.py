@@ -0,0 +1,52 @@
+"""
+LLM JSON 容错解析单元测试
+"""
+
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.llm_json import LLMJsonParser
+
+
+class TestLLMJsonParser:
+    """容错解析测试"""
+
+    @pytest.mark.parametrize('text, expected', [
+        ('好的，以下是大纲：\n```json\n[{"title": "封面",},]\n```\n如需调整请告诉我 [1]。', [{'title': '封面'}]),
+        ('{"description": "第一行\n第二行\t缩进"}', {'description': '第一行\n第二行\t缩进'}),
+        ('[{"title": "封面"}, {"title": "目录", "points": ["a", "b"]}', [{'title': '封面'}, {'title': '目录', 'points': ['a', 'b']}]),
+        ('说明 [见下]：{"pages": 3} 以上。', {'pages': 3}),
+    ])
+    def test_repairs_common_malformations(self, text, expected):
+        """前后说明文字、代码块、多余逗号、未转义换行、缺少结尾括号都能修复"""
+        parser = LLMJsonParser()
+        assert parser.parse(text) == expected
+        assert parser.stats()['provider_calls_saved'] == 1
+
+    @pytest.mark.parametrize('text', [
+        '[{"title": "封面"}, {"title": "目录',
+        '{"title":',
+        '抱歉，我无法完成这个请求。',
+    ])
+    def test_unrecoverable_output_raises(self, text):
+        """截断在字符串中间、缺少值或没有 JSON 时仍然抛出，由调用方重新生成"""
+        parser = LLMJsonParser()
+        with pytest.raises(json.JSONDecodeError):
+            parser.parse(text)
+        assert parser.stats()['failed'] == 1
+
+    def test_generate_json_skips_regeneration_for_repairable_output(self, monkeypatch):
+        """generate_json 收到可修复的输出时不再重新调用模型"""
+        from services import ai_service as ai_service_module
+        from services.response_cache import ResponseCache, MemoryTier
+
+        monkeypatch.setattr(ai_service_module, 'response_cache', ResponseCache([MemoryTier()]))
+        provider = MagicMock()
+        provider.generate_text.return_value = '这是结果：\n[{"title": "封面"},\n'
+        ai_service = ai_service_module.AIService(text_provider=provider, image_provider=MagicMock())
+
+        assert ai_service.generate_json('outline prompt') == [{'title': '封面'}]
+        assert ai_service.generate_json('outline prompt') == [{'title': '封面'}]
+        assert provider.generate_text.call_count == 1
@@ -0,0 +1,94 @@
+"""
+MinerU 批量解析单元测试
+"""
+
+import re
+import json
+
+from PIL import Image
+
+from services.image_editability import MinerUElementExtractor
+
+
+class FakeParserService:
+    """按PDF页数生成多页 layout.json / content_list.json，每页一个标题块"""
+
+    def __init__(self, upload_folder):
+        self.upload_folder = upload_folder
+        self.calls = []
+
+    def parse_file(self, file_path, filename):
+        with open(file_path, 'rb') as f:
+            page_count = len(re.findall(rb'/Type\s*/Page\b(?!s)', f.read()))
+        self.calls.append(page_count)
+        extract_id = f"fake{len(self.calls)}"
+        result_dir = self.upload_folder / 'mineru_files' / extract_id
+        (result_dir / 'images').mkdir(parents=True)
+        pdf_info, content_list = [], []
+        for idx in range(page_count):
+            (result_dir / 'images' / f"{idx}.jpg").write_bytes(b'jpg')
+            pdf_info.append({
+                'page_idx': idx,
+                'page_size': [100, 50],
+                'para_blocks': [
+                    {'type': 'title', 'bbox': [10, 10, 50, 20],
+                     'lines': [{'spans': [{'type': 'text', 'content': f"第{idx + 1}页"}]}]},
+                    {'type': 'image', 'bbox': [60, 10, 90, 40],
+                     'blocks': [{'type': 'image_body', 'lines': [{'spans': [{'type': 'image', 'image_path': f"{idx}.jpg"}]}]}]},
+                ],
+            })
+            content_list.append({'type': 'text', 'text': f"第{idx + 1}页", 'page_idx': idx})
+        (result_dir / 'layout.json').write_text(json.dumps({'pdf_info': pdf_info}), encoding='utf-8')
+        (result_dir / 'deck_content_list.json').write_text(json.dumps(content_list), encoding='utf-8')
+        return 'batch', '# md', extract_id, None, 0
+
+
+class FailingParserService(FakeParserService):
+    def parse_file(self, file_path, filename):
+        super().parse_file(file_path, filename)
+        return None, None, None, 'MinerU timeout', 0
+
+
+class TestMinerUBatch:
+    """整套幻灯片一次提交 MinerU"""
+
+    def test_prefetch_parses_deck_once_and_splits_pages(self, tmp_path):
+        """多页只解析一次，拆分后逐页 extract 命中各自的结果；内容相同的页面只占一页"""
+        upload = tmp_path / 'uploads'
+        parser = FakeParserService(upload)
+        extractor = MinerUElementExtractor(parser, upload)
+        pages = []
+        for i, color in enumerate(['red', 'green', 'blue', 'red']):
+            path = tmp_path / f"page{i}.png"
+            Image.new('RGB', (200, 100), color).save(path)
+            pages.append(str(path))
+
+        extractor.prefetch(pages, max_pages=50)
+        results = [extractor.extract(page) for page in pages]
+
+        assert parser.calls == [3]
+        titles = [next(e['content'] for e in r.elements if e['type'] == 'title') for r in results]
+        assert titles == ['第1页', '第2页', '第3页', '第1页']
+        # bbox 按页面图片尺寸缩放，图片路径指向拆分后的单页目录
+        assert results[1].elements[0]['bbox'] == [20, 20, 100, 40]
+        image_element = next(e for e in results[2].elements if e['type'] == 'image')
+        assert image_element['image_path'].endswith('fake1_p3/images/2.jpg')
+
+        # 已有结果的页面不再提交
+        extractor.prefetch(pages, max_pages=50)
+        assert parser.calls == [3]
+
+    def test_batch_failure_falls_back_to_single_pages(self, tmp_path):
+        """批量解析失败时不记录结果，逐页 extract 仍单独解析"""
+        upload = tmp_path / 'uploads'
+        parser = FailingParserService(upload)
+        extractor = MinerUElementExtractor(parser, upload)
+        pages = []
+        for i, color in enumerate(['red', 'green']):
+            path = tmp_path / f"page{i}.png"
+            Image.new('RGB', (200, 100), color).save(path)
+            pages.append(str(path))
+
+        extractor.prefetch(pages, max_pages=50)
+        assert parser.calls == [2]
+        assert extractor._find_cache(pages[0]) is None
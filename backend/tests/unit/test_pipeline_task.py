@@ -0,0 +1,114 @@
+"""
+描述 + 图片流水线任务单元测试
+"""
+
+import threading
+from unittest.mock import MagicMock, patch
+
+
+class TestDescriptionsAndImagesTask:
+    """流水线任务测试"""
+
+    def test_image_starts_before_all_descriptions_finish(self, app, client, sample_project):
+        """测试某页描述完成后立即开始该页生图，不等待其余页面的描述"""
+        from models import db, Page, Task, Project
+        from services import task_manager as tm
+
+        project_id = sample_project['project_id']
+        for i in range(2):
+            db.session.add(Page(project_id=project_id, order_index=i, status='DRAFT'))
+        task = Task(project_id=project_id, task_type='GENERATE_DESCRIPTIONS_AND_IMAGES', status='PENDING')
+        db.session.add(task)
+        db.session.commit()
+        task_id = task.id
+
+        ai_service = MagicMock()
+        ai_service.flatten_outline.return_value = [{'title': 'p1'}, {'title': 'p2'}]
+        first_image_started = threading.Event()
+        image_cache_flags = []
+
+        def fake_description(app_, context, outline, page_id, page_outline, page_index, language, **kwargs):
+            if page_index == 2:
+                # 第二页的描述要等第一页开始生图后才完成
+                assert first_image_started.wait(5)
+            return page_id, {'text': page_outline['title']}, None
+
+        def fake_image(app_, project_id_, page_id, page_data, page_index, *args, **kwargs):
+            if page_index == 1:
+                first_image_started.set()
+            image_cache_flags.append(kwargs.get('use_cache'))
+            return page_id, f'{page_id}.png', None
+
+        with patch.object(tm, '_generate_page_description', fake_description), \
+                patch.object(tm, '_generate_page_image', fake_image):
+            tm.generate_descriptions_and_images_task(
+                task_id, project_id, ai_service, MagicMock(), MagicMock(), [], app=app,
+                use_image_cache=False
+            )
+
+        db.session.expire_all()
+        task = Task.query.get(task_id)
+        assert task.status == 'COMPLETED'
+        assert image_cache_flags == [False, False]
+        assert task.get_progress() == {'total': 2, 'completed': 2, 'failed': 0, 'descriptions_completed': 2}
+        assert Project.query.get(project_id).status == 'COMPLETED'
+
+    def test_cancel_during_descriptions_drops_pending_pages(self, app, client, sample_project):
+        """测试描述阶段取消后立即停止：不等待其余描述、不再提交生图，并写回已缓冲的进度"""
+        from models import db, Page, Task
+        from services import task_manager as tm
+
+        project_id = sample_project['project_id']
+        for i in range(3):
+            db.session.add(Page(project_id=project_id, order_index=i, status='DRAFT'))
+        task = Task(project_id=project_id, task_type='GENERATE_DESCRIPTIONS_AND_IMAGES', status='PENDING')
+        db.session.add(task)
+        db.session.commit()
+        task_id = task.id
+
+        ai_service = MagicMock()
+        ai_service.flatten_outline.return_value = [{'title': 'p1'}, {'title': 'p2'}, {'title': 'p3'}]
+        first_page_reported = threading.Event()
+        release_last = threading.Event()
+        finished = []
+        rendered = []
+
+        def fake_description(app_, context, outline, page_id, page_outline, page_index, language, **kwargs):
+            if page_index == 2:
+                # 第一页描述提交并汇报进度后，用户取消任务
+                assert first_page_reported.wait(5)
+                with app.app_context():
+                    tm.task_manager.cancel_task(task_id)
+                return page_id, None, tm.CANCELLED_STATUS
+            if page_index == 3:
+                # 最后一页一直卡住，取消后的任务不应等待它
+                release_last.wait(5)
+            finished.append(page_index)
+            return page_id, {'text': page_outline['title']}, None
+
+        def fake_image(app_, project_id_, page_id, page_data, page_index, *args, **kwargs):
+            rendered.append(page_index)
+            return page_id, f'{page_id}.png', None
+
+        update_progress = tm.progress_writer.update
+
+        def fake_update(task_id_, **kwargs):
+            progress = update_progress(task_id_, **kwargs)
+            if kwargs.get('descriptions_completed') == 1:
+                first_page_reported.set()
+            return progress
+
+        with patch.object(tm, '_generate_page_description', fake_description), \
+                patch.object(tm, '_generate_page_image', fake_image), \
+                patch.object(tm.progress_writer, 'update', fake_update):
+            tm.generate_descriptions_and_images_task(
+                task_id, project_id, ai_service, MagicMock(), MagicMock(), [], app=app
+            )
+        assert finished == [1]
+        release_last.set()
+
+        db.session.expire_all()
+        task = Task.query.get(task_id)
+        assert task.status == 'CANCELLED'
+        assert rendered == [1]
+        assert task.get_progress()['descriptions_completed'] == 1
@@ -0,0 +1,63 @@
+"""
+任务进度推送单元测试
+"""
+
+import threading
+
+from services.progress_hub import ProgressHub
+
+
+class TestProgressHub:
+    """进度发布/订阅测试"""
+
+    def test_wait_returns_newer_version(self):
+        """测试等待方在新版本发布后被唤醒，已知版本时超时返回 None"""
+        hub = ProgressHub()
+        assert hub.publish('t1', {'status': 'PENDING'}) == 1
+        assert hub.wait('t1', since=0, timeout=0.1) == (1, {'status': 'PENDING'})
+        assert hub.wait('t1', since=1, timeout=0.05) is None
+
+        timer = threading.Timer(0.05, hub.publish, args=('t1', {'status': 'PROCESSING'}))
+        timer.start()
+        assert hub.wait('t1', since=1, timeout=5) == (2, {'status': 'PROCESSING'})
+        # 内容不变的快照不产生新版本
+        assert hub.sync('t1', {'status': 'PROCESSING'})[0] == 2
+
+    def test_commit_publishes_and_long_poll(self, client, sample_project):
+        """测试任务提交后发布快照，长轮询带最新版本号时等待超时返回当前状态"""
+        from models import db, Task
+        from services.progress_hub import progress_hub
+
+        project_id = sample_project['project_id']
+        task = Task(project_id=project_id, task_type='GENERATE_IMAGES', status='PROCESSING')
+        db.session.add(task)
+        db.session.commit()
+        version, snapshot = progress_hub.latest(task.id)
+        assert snapshot['status'] == 'PROCESSING'
+
+        task.set_progress({'total': 3, 'completed': 1, 'failed': 0})
+        db.session.commit()
+        new_version, snapshot = progress_hub.latest(task.id)
+        assert new_version == version + 1
+        assert snapshot['progress']['completed'] == 1
+
+        response = client.get(f'/api/projects/{project_id}/tasks/{task.id}?wait=0.2&since={new_version}')
+        data = response.get_json()['data']
+        assert data['version'] == new_version
+        assert data['progress']['completed'] == 1
+
+    def test_sse_stream_ends_with_terminal_status(self, client, sample_project):
+        """测试 SSE 推送当前状态，任务已结束时关闭连接"""
+        from models import db, Task
+
+        project_id = sample_project['project_id']
+        task = Task(project_id=project_id, task_type='GENERATE_IMAGES', status='COMPLETED')
+        db.session.add(task)
+        db.session.commit()
+
+        response = client.get(f'/api/projects/{project_id}/tasks/{task.id}/events')
+        assert response.mimetype == 'text/event-stream'
+        body = response.get_data(as_text=True)
+        assert body.startswith('id: ')
+        assert 'event: progress' in body
+        assert '"status": "COMPLETED"' in body
@@ -0,0 +1,52 @@
+"""
+进度合并写入单元测试
+"""
+
+
+class TestProgressWriter:
+    """进度写缓冲测试"""
+
+    def test_buffered_progress_visible_before_flush(self, client, sample_project):
+        """测试缓冲中的进度不落库，但读取方能看到实时值；flush 后落库"""
+        from models import db, Task
+        from services.progress_writer import progress_writer
+
+        project_id = sample_project['project_id']
+        task = Task(project_id=project_id, task_type='GENERATE_IMAGES', status='PROCESSING')
+        task.set_progress({'total': 4, 'completed': 0, 'failed': 0})
+        db.session.add(task)
+        db.session.commit()
+        task_id = task.id
+
+        progress_writer.update(task_id, completed=1)
+        progress_writer.update(task_id, completed=2, failed=1)
+
+        db.session.expire_all()
+        assert Task.query.get(task_id).get_progress()['completed'] == 0
+        response = client.get(f'/api/projects/{project_id}/tasks/{task_id}')
+        assert response.get_json()['data']['progress'] == {'total': 4, 'completed': 2, 'failed': 1}
+
+        progress_writer.flush(task_id)
+        db.session.expire_all()
+        assert Task.query.get(task_id).get_progress() == {'total': 4, 'completed': 2, 'failed': 1}
+        assert progress_writer.pending(task_id) is None
+
+    def test_background_flush_keeps_final_progress(self, client, sample_project):
+        """测试后台批量刷新不覆盖已结束任务的最终进度"""
+        from models import db, Task
+        from services.progress_writer import progress_writer
+
+        task = Task(project_id=sample_project['project_id'], task_type='EXPORT_EDITABLE_PPTX', status='PROCESSING')
+        db.session.add(task)
+        db.session.commit()
+        task_id = task.id
+
+        progress_writer.set(task_id, {'total': 100, 'completed': 50, 'failed': 0})
+        task.status = 'COMPLETED'
+        task.set_progress({'total': 100, 'completed': 100, 'failed': 0, 'download_url': '/files/x.pptx'})
+        db.session.commit()
+
+        progress_writer.flush()
+        db.session.expire_all()
+        assert Task.query.get(task_id).get_progress()['download_url'] == '/files/x.pptx'
+        progress_writer.discard(task_id)
@@ -0,0 +1,64 @@
+"""
+令牌桶限流单元测试
+"""
+
+from services.ai_providers.rate_limiter import (
+    RateLimiter, InProcessBackend, SQLiteBackend, parse_limit, is_rate_limit_error
+)
+
+
+class TestRateLimiter:
+    """令牌桶限流测试"""
+
+    def test_parse_limit(self):
+        """测试限额配置解析"""
+        assert parse_limit('2') == (2.0, 2.0)
+        assert parse_limit('0.5:3') == (0.5, 3.0)
+        assert parse_limit('0') == (0.0, 0.0)
+        assert parse_limit(None) is None
+        assert parse_limit('abc') is None
+
+    def test_is_rate_limit_error(self):
+        """测试限流判断优先看状态码，消息中只认明确的限流描述"""
+        class StatusError(Exception):
+            def __init__(self, message, status_code):
+                super().__init__(message)
+                self.status_code = status_code
+
+        class RateLimitError(Exception):
+            pass
+
+        assert is_rate_limit_error(StatusError('slow down', 429))
+        assert not is_rate_limit_error(StatusError('rate limit exceeded', 500))
+        assert is_rate_limit_error(RateLimitError('quota'))
+        assert is_rate_limit_error(Exception('429 RESOURCE_EXHAUSTED. Quota exceeded'))
+        assert is_rate_limit_error(Exception('429 Client Error: Too Many Requests for url'))
+        assert is_rate_limit_error(Exception("Error code: 429 - {'message': 'Rate limit reached'}"))
+        assert not is_rate_limit_error(Exception('image size 1429x804 exceeds the limit'))
+        assert not is_rate_limit_error(Exception('request 4290 failed: prompt has 429 tokens'))
+
+    def test_burst_then_wait(self):
+        """测试突发容量用完后按速率排队，且按 API Key 隔离"""
+        backend = InProcessBackend()
+        assert backend.reserve('p:a', 10, 2) == 0
+        assert backend.reserve('p:a', 10, 2) == 0
+        wait = backend.reserve('p:a', 10, 2)
+        assert 0.05 < wait <= 0.1
+        # 后到的调用方排在后面
+        assert backend.reserve('p:a', 10, 2) > wait
+        # 其他 Key 不受影响
+        assert backend.reserve('p:b', 10, 2) == 0
+
+    def test_penalize_blocks_unlimited_provider(self):
+        """测试服务端限流后，即使不限速的 provider 也会整体退避"""
+        limiter = RateLimiter(limits={'svc': (0, 0)})
+        assert limiter.backend.reserve(limiter._key('svc', 'k'), 0, 0) == 0
+        limiter.penalize('svc', 'k', seconds=5)
+        assert limiter.backend.reserve(limiter._key('svc', 'k'), 0, 0) > 4
+
+    def test_sqlite_backend_shared_between_instances(self, tmp_path):
+        """测试 SQLite 后端的令牌桶状态在多个实例（进程）之间共享"""
+        path = str(tmp_path / 'rate_limits.db')
+        first, second = SQLiteBackend(path), SQLiteBackend(path)
+        assert first.reserve('p:a', 1, 1) == 0
+        assert second.reserve('p:a', 1, 1) > 0.5
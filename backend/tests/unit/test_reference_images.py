@@ -0,0 +1,119 @@
+"""
+参考图解码 / 编码缓存单元测试
+"""
+
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+from PIL import Image
+
+from services.reference_images import ReferenceImageCache
+from services.remote_images import RemoteImageCache, RemoteImageError
+from services.http_sessions import http_sessions
+from services.concurrency import ResourceClass
+
+
+class TestReferenceImageCache:
+    """参考图缓存测试"""
+
+    def test_template_decoded_and_encoded_once(self, tmp_path):
+        """多个页面线程共享同一模板的解码结果和发送格式；文件被替换后重新解码"""
+        cache = ReferenceImageCache()
+        path = str(tmp_path / 'template.png')
+        Image.new('RGB', (16, 9), 'blue').save(path)
+        encoded = []
+
+        def encode(image):
+            encoded.append(image)
+            return b'payload'
+
+        def page_thread(_):
+            image = cache.open(path)
+            return image, cache.payload(image, 'jpeg', encode)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(page_thread, range(40)))
+
+        assert len({id(image) for image, _ in results}) == 1
+        assert all(payload == b'payload' for _, payload in results)
+        assert len(encoded) == 1
+        assert cache.stats()['encodes'] == 1
+
+        # 未经 open() 的图片不缓存
+        cache.payload(Image.new('RGB', (2, 2)), 'jpeg', encode)
+        assert len(encoded) == 2
+
+        Image.new('RGB', (32, 18), 'red').save(path)
+        os.utime(path, ns=(0, 1))
+        replaced = cache.open(path)
+        assert replaced is not results[0][0]
+        assert replaced.size == (32, 18)
+
+    def test_prepare_downscales_once_next_to_original(self, tmp_path):
+        """超出长边上限的模板缩小后保存在原文件旁边，后续页面直接复用"""
+        cache = ReferenceImageCache(max_edge=1024)
+        path = str(tmp_path / 'template.png')
+        Image.new('RGB', (3840, 2160), 'blue').save(path)
+
+        prepared = cache.prepare(cache.open(path))
+        assert prepared.size == (1024, 576)
+        assert prepared.format == 'JPEG'
+        assert os.path.dirname(cache.source_path(prepared)) == str(tmp_path / '.refcache')
+        assert cache.prepare(cache.open(path)) is prepared
+
+        small = str(tmp_path / 'logo.png')
+        Image.new('RGBA', (256, 256)).save(small)
+        assert cache.prepare(cache.open(small)).size == (256, 256)
+
+    def test_delete_template_removes_variants(self, tmp_path):
+        """删除模板时一并删除 .refcache 中的缩小版本"""
+        from services.file_service import FileService
+
+        file_service = FileService(str(tmp_path))
+        template_dir = tmp_path / 'project-1' / 'template'
+        template_dir.mkdir(parents=True)
+        path = str(template_dir / 'template.png')
+        Image.new('RGB', (3840, 2160), 'blue').save(path)
+        cache = ReferenceImageCache(max_edge=1024)
+        cache.prepare(cache.open(path))
+        assert (template_dir / '.refcache').is_dir()
+
+        assert file_service.delete_template('project-1') is True
+        assert list(template_dir.iterdir()) == []
+
+
+class TestRemoteImageCache:
+    """参考图 URL 下载缓存测试"""
+
+    @staticmethod
+    def _response(content: bytes, content_type: str):
+        response = MagicMock()
+        response.headers = {'Content-Type': content_type}
+        response.iter_content.return_value = [content]
+        response.__enter__.return_value = response
+        return response
+
+    def test_download_cached_and_validated(self, tmp_path):
+        """同一 URL 只下载一次；非图片响应被拒绝且不写入缓存"""
+        cache = RemoteImageCache(str(tmp_path / 'urls'))
+        png = io.BytesIO()
+        Image.new('RGB', (4, 4), 'red').save(png, format='PNG')
+
+        with patch.object(http_sessions.get(ResourceClass.NETWORK_IO), 'get',
+                   return_value=self._response(png.getvalue(), 'image/png')) as get:
+            first = cache.fetch('https://example.com/a.png')
+            second = cache.fetch('https://example.com/a.png')
+        assert first == second
+        assert get.call_count == 1
+        with Image.open(first) as image:
+            assert image.size == (4, 4)
+
+        with patch.object(http_sessions.get(ResourceClass.NETWORK_IO), 'get',
+                   return_value=self._response(b'<html>login</html>', 'text/html')):
+            with pytest.raises(RemoteImageError):
+                cache.fetch('https://example.com/b.png')
+        assert cache.stats()['rejected'] == 1
+        assert cache.stats()['downloads'] == 1
@@ -0,0 +1,49 @@
+"""
+参考文件分块检索单元测试
+"""
+
+from services.reference_index import ReferenceIndex, estimate_tokens, split_chunks
+
+
+def _make_document():
+    sections = []
+    for topic in ['光合作用', '细胞呼吸', '基因表达', '生态系统']:
+        sections.append(f"## {topic}")
+        for i in range(6):
+            sections.append(f"{topic}相关的第{i}段内容。" * 20)
+    return '\n\n'.join(sections)
+
+
+class TestReferenceIndex:
+    """分块索引测试"""
+
+    def test_small_reference_sent_in_full(self):
+        """参考文件在预算以内时原样返回"""
+        index = ReferenceIndex(token_budget=1000)
+        files = [{'filename': 'a.md', 'content': '# 标题\n\n很短的参考内容'}]
+        assert index.select(files, '标题') is files
+        assert index.stats()['trimmed_prompts'] == 0
+
+    def test_large_reference_trimmed_to_relevant_chunks(self):
+        """超出预算时只保留与页面相关的分块，总量不超过预算，并带上所属标题"""
+        document = _make_document()
+        index = ReferenceIndex(token_budget=1200, top_k=4, chunk_chars=400)
+        files = [{'filename': 'bio.pdf', 'content': document}]
+
+        selected = index.select(files, '基因表达的调控')
+        assert len(selected) == 1 and selected[0]['filename'] == 'bio.pdf'
+        content = selected[0]['content']
+        assert '## 基因表达' in content
+        assert '光合作用相关' not in content
+        assert estimate_tokens(content) <= 1200 + 50
+        assert index.stats()['tokens_saved'] > 0
+
+        # 同一内容只建一次索引
+        index.select(files, '生态系统')
+        assert index.stats()['built'] == 1
+
+    def test_split_chunks_respects_size_and_headings(self):
+        """分块不超过设定大小，并记录所属标题"""
+        chunks = split_chunks(_make_document(), 400)
+        assert all(len(c['text']) <= 400 for c in chunks)
+        assert {c['heading'] for c in chunks} == {'## 光合作用', '## 细胞呼吸', '## 基因表达', '## 生态系统'}
@@ -0,0 +1,154 @@
+"""
+文本 LLM 响应缓存测试
+"""
+import os
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.response_cache import ResponseCache, MemoryTier, DiskTier
+
+
+class TestResponseCacheTiers:
+    """缓存层的淘汰与过期"""
+
+    def test_memory_lru_and_ttl(self):
+        """内存层按最近使用淘汰，过期条目不再返回"""
+        tier = MemoryTier(max_entries=2, ttl=0)
+        tier.set('a', '1')
+        tier.set('b', '2')
+        assert tier.get('a') == '1'  # a 变为最近使用
+        tier.set('c', '3')
+        assert tier.get('b') is None
+        assert tier.get('a') == '1'
+
+        expiring = MemoryTier(max_entries=2, ttl=0.05)
+        expiring.set('a', '1')
+        time.sleep(0.1)
+        assert expiring.get('a') is None
+
+    def test_disk_tier_persists_and_backfills_memory(self, tmp_path):
+        """磁盘层跨实例共享，命中后回填内存层；超出大小上限时淘汰最旧的条目"""
+        directory = str(tmp_path / 'llm')
+        ResponseCache([MemoryTier(), DiskTier(directory)]).set('k' * 64, 'cached')
+
+        cache = ResponseCache([MemoryTier(), DiskTier(directory)])
+        assert cache.get('k' * 64) == 'cached'
+        assert cache.get('k' * 64) == 'cached'
+        stats = cache.stats()
+        assert stats['hits'] == {'memory': 1, 'disk': 1}
+
+        small = DiskTier(str(tmp_path / 'small'), max_bytes=300)
+        for i in range(5):
+            small.set(f'{i:064d}', 'x' * 100)
+            os.utime(small._path(f'{i:064d}'), (i, i))
+        assert small.get(f'{0:064d}') is None
+        assert small.get(f'{4:064d}') == 'x' * 100
+
+
+class TestAIServiceResponseCache:
+    """AIService 的文本调用经过缓存"""
+
+    @pytest.fixture
+    def ai_service(self, monkeypatch):
+        from services import ai_service as ai_service_module
+
+        monkeypatch.setattr(ai_service_module, 'response_cache', ResponseCache([MemoryTier()]))
+        provider = MagicMock()
+        provider.generate_text.return_value = '```json\n[{"title": "封面"}]\n```'
+        return ai_service_module.AIService(text_provider=provider, image_provider=MagicMock())
+
+    def test_identical_prompt_hits_cache(self, ai_service):
+        """相同提示词只调用一次模型；参数不同或 use_cache=False 时重新调用"""
+        assert ai_service.generate_json('outline prompt') == [{'title': '封面'}]
+        assert ai_service.generate_json('outline prompt') == [{'title': '封面'}]
+        assert ai_service.text_provider.generate_text.call_count == 1
+
+        ai_service.generate_json('outline prompt', thinking_budget=2000)
+        assert ai_service.text_provider.generate_text.call_count == 2
+
+        ai_service.generate_json('outline prompt', use_cache=False)
+        assert ai_service.text_provider.generate_text.call_count == 3
+
+    def test_unparseable_response_not_cached(self, ai_service):
+        """解析失败的响应不进入缓存，重试拿到的是新结果"""
+        ai_service.text_provider.generate_text.side_effect = ['not json', '{"ok": true}']
+        assert ai_service.generate_json('prompt') == {'ok': True}
+        assert ai_service.generate_json('prompt') == {'ok': True}
+        assert ai_service.text_provider.generate_text.call_count == 2
+
+    def test_regenerate_descriptions_skips_cache(self, ai_service, client, sample_project):
+        """批量生成描述走缓存；页面已有描述时重新生成默认跳过缓存，再次调用模型"""
+        from unittest.mock import patch
+        from models import db, Page, Project
+        from controllers import project_controller
+        from services import task_manager as tm
+
+        project_id = sample_project['project_id']
+        for i in range(2):
+            page = Page(project_id=project_id, order_index=i, status='DRAFT')
+            page.set_outline_content({'title': f'第{i + 1}页', 'points': []})
+            db.session.add(page)
+        db.session.commit()
+        ai_service.text_provider.generate_text.return_value = '页面描述'
+
+        def run_inline(task_id, func, *args, **kwargs):
+            func(task_id, *args, **kwargs)
+
+        def generate(json_body):
+            response = client.post(f'/api/projects/{project_id}/generate/descriptions', json=json_body)
+            assert response.status_code == 202
+            # 任务在请求内同步执行完，随后接口才把项目标记为生成中
+            project = Project.query.get(project_id)
+            project.status = 'DESCRIPTIONS_GENERATED'
+            db.session.commit()
+
+        with patch.object(project_controller, 'get_ai_service', return_value=ai_service), \
+                patch('services.ai_service_manager.get_ai_service', return_value=ai_service), \
+                patch.object(tm.task_manager, 'submit_task', run_inline):
+            generate({})
+            assert ai_service.text_provider.generate_text.call_count == 2
+
+            generate({'force_regenerate': False})
+            assert ai_service.text_provider.generate_text.call_count == 2
+
+            generate({})
+            assert ai_service.text_provider.generate_text.call_count == 4
+
+
+class TestImageResultCache:
+    """生图结果缓存"""
+
+    def test_generate_image_reuses_cached_result(self, monkeypatch, tmp_path):
+        """提示词和参考图相同时复用已生成的图片；参考图内容变化或 force_regenerate 时重新生图"""
+        from PIL import Image
+        from services import ai_service as ai_service_module
+        from services.image_result_cache import ImageResultCache
+        from services.response_cache import BinaryDiskTier
+
+        cache = ImageResultCache()
+        cache.enabled = True
+        cache.tiers = [BinaryDiskTier(str(tmp_path / 'images'), suffix='.png')]
+        cache._counters = cache._empty_counters()
+        monkeypatch.setattr(ai_service_module, 'image_result_cache', cache)
+
+        provider = MagicMock()
+        provider.generate_image.return_value = Image.new('RGB', (8, 8), 'red')
+        service = ai_service_module.AIService(text_provider=MagicMock(), image_provider=provider)
+
+        ref = tmp_path / 'template.png'
+        Image.new('RGB', (4, 4), 'blue').save(ref)
+
+        first = service.generate_image('page prompt', str(ref))
+        second = service.generate_image('page prompt', str(ref))
+        assert provider.generate_image.call_count == 1
+        assert second.getpixel((0, 0)) == first.getpixel((0, 0))
+
+        service.generate_image('page prompt', str(ref), use_cache=False)
+        assert provider.generate_image.call_count == 2
+
+        Image.new('RGB', (4, 4), 'green').save(ref)
+        service.generate_image('page prompt', str(ref))
+        assert provider.generate_image.call_count == 3
+        assert cache.stats()['hits'] == {'disk': 1}
@@ -0,0 +1,47 @@
+"""
+相同 provider 请求合并（single flight）单元测试
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """single flight 测试"""
+
+    def test_concurrent_calls_share_one_result(self):
+        """同一 key 的并发调用只执行一次，等待方共享结果（或异常）"""
+        flight = SingleFlight('test')
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_call(value):
+            calls.append(value)
+            started.set()
+            release.wait(5)
+            return value * 2
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            leader = pool.submit(flight.do, 'key', slow_call, 21)
+            assert started.wait(5)
+            followers = [pool.submit(flight.do, 'key', slow_call, 21) for _ in range(2)]
+            while flight.stats()['coalesced'] < 2:
+                threading.Event().wait(0.01)
+            release.set()
+            assert [f.result() for f in [leader] + followers] == [42, 42, 42]
+
+        assert calls == [21]
+        assert flight.stats() == {'calls': 3, 'coalesced': 2, 'in_flight': 0}
+
+        # 失败也共享，且 key 随即释放，之后的调用重新执行
+        def failing_call():
+            raise RuntimeError('provider down')
+
+        with pytest.raises(RuntimeError):
+            flight.do('key', failing_call)
+        assert flight.do('key', lambda: 'ok') == 'ok'
@@ -0,0 +1,56 @@
+"""
+空间索引单元测试
+"""
+
+import random
+
+from services.image_editability import BBoxUtils, SpatialIndex
+from services.image_editability.extractors import BaiduOCRElementExtractor
+
+
+def _random_boxes(rng, count):
+    boxes = []
+    for _ in range(count):
+        x0, y0 = rng.randint(0, 400), rng.randint(0, 300)
+        boxes.append([x0, y0, x0 + rng.randint(-5, 120), y0 + rng.randint(-5, 60)])
+    return boxes
+
+
+class TestSpatialIndex:
+    """空间索引测试"""
+
+    def test_queries_match_bbox_utils(self):
+        """包含 / 相交查询结果与 BBoxUtils 逐个比较的结果一致（含无效 bbox）"""
+        rng = random.Random(7)
+        boxes = _random_boxes(rng, 300) + [None, [], [10, 10, 10, 50], [50, 50, 20, 20]]
+        index = SpatialIndex(boxes)
+
+        for query in _random_boxes(rng, 100) + [None, [0, 0, 0, 0]]:
+            expected_contained = [i for i, box in enumerate(boxes) if BBoxUtils.is_contained(box, query, 0.8)]
+            expected_intersecting = [i for i, box in enumerate(boxes) if BBoxUtils.has_intersection(query, box, 0.3)]
+            assert index.contained_in(query, 0.8).tolist() == expected_contained
+            assert index.intersecting(query, 0.3).tolist() == expected_intersecting
+
+    def test_pairs_within(self):
+        """只返回间距小于 distance 的 bbox 对"""
+        boxes = [[0, 0, 10, 10], [15, 0, 25, 10], [40, 0, 50, 10], [5, 5, 20, 20]]
+        first, second = SpatialIndex(boxes).pairs_within(6)
+
+        assert sorted(zip(first.tolist(), second.tolist())) == [(0, 1), (0, 3), (1, 3)]
+
+    def test_shrink_cells_separates_overlapping_cells(self):
+        """表格单元格收缩后相邻单元格之间留出间距，相距较远的单元格不影响结果"""
+        cells = [
+            {'bbox': [0, 0, 100, 40]},
+            {'bbox': [100, 0, 200, 40]},
+            {'bbox': [0, 40, 100, 80]},
+            {'bbox': [100, 40, 200, 80]},
+        ]
+        extractor = BaiduOCRElementExtractor(baidu_table_ocr_provider=None)
+        shrunk = extractor._shrink_cells_to_avoid_overlap(cells, depth=0)
+
+        assert shrunk[0][2] < shrunk[1][0]
+        assert shrunk[0][3] < shrunk[2][1]
+        assert extractor._shrink_cells_to_avoid_overlap([{'bbox': [0, 0, 10, 10]}, {'bbox': [50, 50, 60, 60]}], depth=0) == [
+            [0.0, 0.0, 10.0, 10.0], [50.0, 50.0, 60.0, 60.0]
+        ]
@@ -0,0 +1,74 @@
+"""
+批量任务检查点单元测试
+"""
+
+from unittest.mock import MagicMock
+
+from PIL import Image
+
+
+class TestTaskCheckpoints:
+    """检查点续跑测试"""
+
+    def _setup(self, sample_project):
+        from models import db, Page, Task
+
+        project_id = sample_project['project_id']
+        for i, title in enumerate(['a', 'b']):
+            page = Page(project_id=project_id, order_index=i, status='DESCRIPTION_GENERATED')
+            page.set_description_content({'text': f'page {title}'})
+            db.session.add(page)
+        task = Task(project_id=project_id, task_type='GENERATE_IMAGES', status='PENDING')
+        db.session.add(task)
+        db.session.commit()
+
+        ai_service = MagicMock()
+        ai_service.flatten_outline.return_value = [{'title': 'a'}, {'title': 'b'}]
+        ai_service.extract_image_urls_from_markdown.return_value = []
+        ai_service.generate_image_prompt.side_effect = lambda outline, page_data, *args, **kwargs: page_data['title']
+        file_service = MagicMock()
+        file_service.save_generated_image.side_effect = \
+            lambda image, project_id, page_id, version_number, image_format: f'{page_id}_v{version_number}.png'
+        return project_id, task.id, ai_service, file_service
+
+    def test_retry_only_regenerates_failed_pages(self, app, client, sample_project):
+        """测试重试时只重新生成失败的页面，已完成的页面按检查点跳过"""
+        from models import db, Task, Page
+        from services.task_manager import generate_images_task
+
+        project_id, task_id, ai_service, file_service = self._setup(sample_project)
+
+        def flaky(prompt, *args, **kwargs):
+            if prompt == 'b':
+                raise RuntimeError('provider error')
+            return Image.new('RGB', (4, 4))
+
+        ai_service.generate_image.side_effect = flaky
+        generate_images_task(task_id, project_id, ai_service, file_service, [], use_template=False, app=app)
+        assert ai_service.generate_image.call_count == 2
+
+        ai_service.generate_image.reset_mock()
+        ai_service.generate_image.side_effect = lambda *args, **kwargs: Image.new('RGB', (4, 4))
+        generate_images_task(task_id, project_id, ai_service, file_service, [], use_template=False, app=app)
+
+        assert [c.args[0] for c in ai_service.generate_image.call_args_list] == ['b']
+        db.session.expire_all()
+        assert Task.query.get(task_id).get_progress()['completed'] == 2
+        assert all(p.status == 'COMPLETED' for p in Page.query.filter_by(project_id=project_id))
+
+    def test_edited_page_is_stale(self, app, client, sample_project):
+        """测试描述被编辑后，该页的检查点失效并重新生成"""
+        from models import db, Page
+        from services.task_manager import generate_images_task
+
+        project_id, task_id, ai_service, file_service = self._setup(sample_project)
+        ai_service.generate_image.side_effect = lambda *args, **kwargs: Image.new('RGB', (4, 4))
+        generate_images_task(task_id, project_id, ai_service, file_service, [], use_template=False, app=app)
+
+        page = Page.query.filter_by(project_id=project_id, order_index=0).first()
+        page.set_description_content({'text': 'page a, edited'})
+        db.session.commit()
+
+        ai_service.generate_image.reset_mock()
+        generate_images_task(task_id, project_id, ai_service, file_service, [], use_template=False, app=app)
+        assert [c.args[0] for c in ai_service.generate_image.call_args_list] == ['a']
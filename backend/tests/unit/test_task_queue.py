@@ -0,0 +1,165 @@
+"""
+持久化任务队列单元测试
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def queue_task(client, sample_project):
+    """创建一个已入队的任务"""
+    from models import db, Task
+    from services.task_queue import TaskQueue
+
+    task = Task(project_id=sample_project['project_id'], task_type='GENERATE_IMAGES', status='PENDING')
+    db.session.add(task)
+    db.session.commit()
+
+    queue = TaskQueue(lease_seconds=60, max_attempts=2)
+    queue.enqueue(task.id, 'generate_images_task', ['p1', {'a': [1, 2]}], {'language': 'zh'})
+    return queue, task.id
+
+
+class TestTaskQueue:
+    """任务队列测试"""
+
+    def test_claim_is_exclusive(self, queue_task):
+        """测试同一任务只能被一个 worker 认领"""
+        queue, task_id = queue_task
+
+        claimed = queue.claim('worker-a', limit=4)
+        assert [c[0] for c in claimed] == [task_id]
+        assert claimed[0][1]['handler'] == 'generate_images_task'
+        assert claimed[0][1]['kwargs'] == {'language': 'zh'}
+
+        assert queue.claim('worker-b', limit=4) == []
+
+    def test_expired_lease_is_redispatched(self, queue_task):
+        """测试租约过期后任务被重新派发"""
+        from models import db, Task
+        queue, task_id = queue_task
+
+        queue.claim('worker-a')
+        task = Task.query.get(task_id)
+        task.status = 'PROCESSING'
+        task.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+        claimed = queue.claim('worker-b')
+        assert [c[0] for c in claimed] == [task_id]
+
+        db.session.expire_all()
+        task = Task.query.get(task_id)
+        assert task.lease_owner == 'worker-b'
+        assert task.attempts == 2
+
+        # 原 worker 的心跳不会抢回租约
+        assert queue.heartbeat('worker-a', [task_id]) == 0
+        assert queue.heartbeat('worker-b', [task_id]) == 1
+
+    def test_exhausted_task_marked_failed(self, queue_task):
+        """测试超过最大尝试次数的任务被标记为失败"""
+        from models import db, Task
+        queue, task_id = queue_task
+
+        for _ in range(2):
+            queue.claim('worker-a')
+            Task.query.filter_by(id=task_id).update({'lease_expires_at': datetime.utcnow() - timedelta(seconds=1)})
+            db.session.commit()
+
+        assert queue.claim('worker-a') == []
+        assert queue.recover() == 1
+
+        db.session.expire_all()
+        task = Task.query.get(task_id)
+        assert task.status == 'FAILED'
+        assert task.lease_owner is None
+
+    def test_retry_waits_for_cancelled_run_to_release(self, client, sample_project, queue_task):
+        """测试被取消的任务在原执行释放租约前不能重试（返回 409），释放后可以重试"""
+        from models import db, Task
+        queue, task_id = queue_task
+        project_id = sample_project['project_id']
+
+        queue.claim('worker-a')
+        response = client.post(f'/api/projects/{project_id}/tasks/{task_id}/cancel')
+        assert response.status_code == 200
+
+        response = client.post(f'/api/projects/{project_id}/tasks/{task_id}/retry')
+        assert response.status_code == 409
+        assert queue.claim('worker-a') == []
+
+        queue.release(task_id, 'worker-a')
+        db.session.expire_all()
+        assert Task.query.get(task_id).status == 'CANCELLED'
+        response = client.post(f'/api/projects/{project_id}/tasks/{task_id}/retry')
+        assert response.status_code == 200
+        assert [c[0] for c in queue.claim('worker-a')] == [task_id]
+
+    def test_old_run_cleanup_keeps_new_run(self, app):
+        """测试同一任务重新认领后，上一次执行的清理不会移除新执行的 Future 和取消令牌"""
+        from concurrent.futures import Future
+        from services.task_manager import TaskManager
+        from services.cancellation import get_cancellation_token, reset_cancellation_token
+
+        manager = TaskManager(max_workers=1)
+        old_future, new_future = Future(), Future()
+        old_token = reset_cancellation_token('task-x', app)
+        old_token.cancel()
+        new_token = reset_cancellation_token('task-x', app)
+        assert not get_cancellation_token('task-x').cancelled
+        manager.active_tasks['task-x'] = new_future
+
+        with app.app_context():
+            manager._cleanup_task('task-x', old_future, old_token)
+        assert manager.active_tasks['task-x'] is new_future
+        assert get_cancellation_token('task-x') is new_token
+
+        with app.app_context():
+            manager._cleanup_task('task-x', new_future, new_token)
+        assert 'task-x' not in manager.active_tasks
+
+    def test_release_fails_unfinished_task(self, queue_task):
+        """测试处理函数异常退出时释放租约并标记失败"""
+        from models import db, Task
+        queue, task_id = queue_task
+
+        queue.claim('worker-a')
+        queue.release(task_id, 'worker-a', error='boom')
+
+        db.session.expire_all()
+        task = Task.query.get(task_id)
+        assert task.status == 'FAILED'
+        assert task.error_message == 'boom'
+        assert task.lease_owner is None
+        assert queue.claim('worker-b') == []
+
+
+class TestTaskArgsCodec:
+    """任务参数编解码测试"""
+
+    def test_runtime_objects_roundtrip(self, app):
+        """测试运行时对象编码为引用并在 worker 中还原"""
+        from services import FileService, ProjectContext
+        from services.task_queue import encode_task_args, decode_task_args
+
+        context = ProjectContext({'idea_prompt': '测试', 'creation_type': 'idea'}, [{'filename': 'a.md', 'content': 'x'}])
+        encoded = encode_task_args([app, FileService(app.config['UPLOAD_FOLDER']), context, (1, 'a')])
+
+        with app.app_context():
+            decoded = decode_task_args(encoded, app)
+
+        assert decoded[0] is app
+        assert isinstance(decoded[1], FileService)
+        assert decoded[2].idea_prompt == '测试'
+        assert decoded[2].reference_files_content == [{'filename': 'a.md', 'content': 'x'}]
+        assert decoded[3] == [1, 'a']
+
+    def test_unsupported_object_rejected(self):
+        """测试不可持久化的参数被拒绝"""
+        from services.task_queue import encode_task_args
+
+        with pytest.raises(TypeError):
+            encode_task_args(object())
@@ -0,0 +1,131 @@
+"""
+Standalone Task Worker Entry Point
+
+在独立进程中消费持久化任务队列（services/task_queue.py），把图片生成、描述生成和
+可编辑PPTX导出等 CPU/IO 密集型任务移出 Flask web 进程，避免与请求处理争抢 GIL。
+
+Usage:
+    python worker.py                         # 使用 WORKER_PROCESSES / TASK_WORKERS 配置
+    python worker.py --processes 2 --threads 4
+
+与独立 worker 配合使用时，建议在 web 进程中设置 TASK_QUEUE_EMBEDDED_WORKER=false，
+web 进程只负责入队，所有任务都由 worker 执行。
+"""
+import os
+import sys
+import time
+import signal
+import logging
+import argparse
+import threading
+import multiprocessing
+
+# worker 进程在 init_app 之后显式启动 dispatcher，创建 app 时不使用 web 进程的内置开关
+# （必须在导入 config 之前设置）
+os.environ['TASK_QUEUE_EMBEDDED_WORKER'] = 'false'
+
+logger = logging.getLogger('worker')
+
+
+def run_worker_process(threads: int):
+    """
+    单个 worker 进程：创建 Flask app 并启动任务派发线程，直到收到退出信号
+
+    Args:
+        threads: 本进程同时执行的任务数
+    """
+    from app import app
+    from services.task_manager import task_manager
+
+    app.config['TASK_WORKERS'] = threads
+    task_manager.init_app(app, start_dispatcher=True)
+
+    stop_event = threading.Event()
+
+    def _handle_signal(signum, frame):
+        logger.info(f"Worker {os.getpid()} received signal {signum}, finishing running tasks...")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, _handle_signal)
+    signal.signal(signal.SIGINT, _handle_signal)
+
+    logger.info(f"Worker process {os.getpid()} started ({threads} threads, id={task_manager.worker_id})")
+    stop_event.wait()
+
+    # 停止认领新任务，等待正在执行的任务结束（租约随之释放）
+    task_manager.shutdown()
+    logger.info(f"Worker process {os.getpid()} stopped")
+
+
+def run_supervisor(processes: int, threads: int):
+    """
+    启动并守护多个 worker 进程；子进程异常退出时自动重启
+
+    Args:
+        processes: worker 进程数
+        threads: 每个进程的任务线程数
+    """
+    ctx = multiprocessing.get_context('spawn')
+    children = {}
+    stopping = False
+
+    def _spawn(slot: int):
+        proc = ctx.Process(target=run_worker_process, args=(threads,), name=f'banana-worker-{slot}')
+        proc.start()
+        children[slot] = proc
+        logger.info(f"Started worker #{slot} (pid={proc.pid})")
+
+    def _handle_signal(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for proc in children.values():
+            if proc.is_alive():
+                proc.terminate()  # 子进程收到 SIGTERM 后会优雅退出
+
+    signal.signal(signal.SIGTERM, _handle_signal)
+    signal.signal(signal.SIGINT, _handle_signal)
+
+    for slot in range(processes):
+        _spawn(slot)
+
+    while not stopping:
+        time.sleep(1)
+        for slot, proc in list(children.items()):
+            if not proc.is_alive() and not stopping:
+                logger.warning(f"Worker #{slot} (pid={proc.pid}) exited with code {proc.exitcode}, restarting...")
+                time.sleep(1)
+                _spawn(slot)
+
+    for proc in children.values():
+        proc.join()
+    logger.info("All workers stopped")
+
+
+def main():
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Banana Slides background task worker')
+    parser.add_argument('--processes', type=int, default=Config.WORKER_PROCESSES,
+                        help='number of worker processes (default: WORKER_PROCESSES)')
+    parser.add_argument('--threads', type=int, default=Config.TASK_WORKERS,
+                        help='concurrent tasks per process (default: TASK_WORKERS)')
+    args = parser.parse_args()
+
+    if args.processes < 1 or args.threads < 1:
+        parser.error('--processes and --threads must be >= 1')
+
+    logging.basicConfig(
+        level=getattr(logging, Config.LOG_LEVEL, logging.INFO),
+        format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
+        handlers=[logging.StreamHandler(sys.stdout)],
+    )
+    logger.info(f"Starting Banana Slides worker: processes={args.processes}, threads={args.threads}")
+
+    if args.processes == 1:
+        run_worker_process(args.threads)
+    else:
+        run_supervisor(args.processes, args.threads)
+
+
+if __name__ == '__main__':
+    main()
@@ -138,12 +138,18 @@ export const generateFromDescription = async (projectId: string, descriptionText
  * 批量生成描述
  * @param projectId 项目ID
  * @param language 输出语言（可选，默认从 sessionStorage 获取）
+ * @param renderImages 是否在每页描述完成后立即生成该页图片（可选）
  */
-export const generateDescriptions = async (projectId: string, language?: OutputLanguage): Promise<ApiResponse> => {
+export const generateDescriptions = async (
+  projectId: string,
+  language?: OutputLanguage,
+  renderImages?: boolean
+): Promise<ApiResponse> => {
   const lang = language || await getStoredOutputLanguage();
   const response = await apiClient.post<ApiResponse>(
     `/api/projects/${projectId}/generate/descriptions`,
-    { language: lang }
+    // renderImages: 每页描述完成后立即生成该页图片（流水线模式）
+    renderImages ? { language: lang, render_images: true } : { language: lang }
   );
   return response.data;
 };
@@ -399,9 +405,65 @@ export const addPage = async (projectId: string, data: Partial<Page>): Promise<A
 
 /**
  * 查询任务状态
+ * @param options.wait 长轮询：最多等待的秒数，有比 since 更新的版本时立即返回
+ * @param options.since 长轮询：上次响应中的 version
+ */
+export const getTaskStatus = async (
+  projectId: string,
+  taskId: string,
+  options?: { wait?: number; since?: number }
+): Promise<ApiResponse<Task>> => {
+  const response = await apiClient.get<ApiResponse<Task>>(`/api/projects/${projectId}/tasks/${taskId}`, {
+    params: options,
+    // 长轮询请求需要比服务端挂起时间更长的超时
+    ...(options?.wait ? { timeout: (options.wait + 30) * 1000 } : {}),
+  });
+  return response.data;
+};
+
+/**
+ * 通过 SSE 订阅任务进度（每次任务状态变化推送一次，任务结束后服务端关闭连接）
+ * @param onError 连接失败时调用，调用方可回退为轮询
+ * @returns 取消订阅函数；浏览器不支持 EventSource 时返回 null
+ */
+export const subscribeTaskEvents = (
+  projectId: string,
+  taskId: string,
+  onTask: (task: Task) => void,
+  onError?: () => void
+): (() => void) | null => {
+  if (typeof EventSource === 'undefined') {
+    return null;
+  }
+  const source = new EventSource(`/api/projects/${projectId}/tasks/${taskId}/events`);
+  let received = false;
+  source.addEventListener('progress', (event) => {
+    received = true;
+    onTask(JSON.parse((event as MessageEvent).data) as Task);
+  });
+  source.onerror = () => {
+    // 已收到过事件时交给 EventSource 自动重连；一次都没收到说明 SSE 不可用
+    if (!received || source.readyState === EventSource.CLOSED) {
+      source.close();
+      onError?.();
+    }
+  };
+  return () => source.close();
+};
+
+/**
+ * 取消任务（排队中的页面直接丢弃，进行中的页面在下一阶段停止）
+ */
+export const cancelTask = async (projectId: string, taskId: string): Promise<ApiResponse<Task>> => {
+  const response = await apiClient.post<ApiResponse<Task>>(`/api/projects/${projectId}/tasks/${taskId}/cancel`);
+  return response.data;
+};
+
+/**
+ * 重试失败或已取消的任务（已完成的页面会被跳过）
  */
-export const getTaskStatus = async (projectId: string, taskId: string): Promise<ApiResponse<Task>> => {
-  const response = await apiClient.get<ApiResponse<Task>>(`/api/projects/${projectId}/tasks/${taskId}`);
+export const retryTask = async (projectId: string, taskId: string): Promise<ApiResponse<Task>> => {
+  const response = await apiClient.post<ApiResponse<Task>>(`/api/projects/${projectId}/tasks/${taskId}/retry`);
   return response.data;
 };
 
@@ -358,19 +358,104 @@ const debouncedUpdatePage = debounce(
     }
   },
 
-  // 轮询任务状态
+  // 跟踪任务状态（优先 SSE 推送，不可用时回退为长轮询）
   pollTask: async (taskId) => {
-    console.log(`[轮询] 开始轮询任务: ${taskId}`);
+    console.log(`[轮询] 开始跟踪任务: ${taskId}`);
     const { currentProject } = get();
     if (!currentProject) {
       console.warn('[轮询] 没有当前项目，停止轮询');
       return;
     }
+    const projectId = currentProject.id!;
 
-    const poll = async () => {
+    // 处理一次任务快照，返回任务是否仍在进行中
+    const handleTask = async (task: Task): Promise<boolean> => {
+      // 更新进度
+      if (task.progress) {
+        set({ taskProgress: task.progress });
+      }
+
+      console.log(`[轮询] Task ${taskId} 状态: ${task.status}`, task);
+
+      // 检查任务状态
+      if (task.status === 'COMPLETED') {
+        console.log(`[轮询] Task ${taskId} 已完成，刷新项目数据`);
+        
+        // 如果是导出可编辑PPTX任务，检查是否有下载链接
+        if (task.task_type === 'EXPORT_EDITABLE_PPTX' && task.progress) {
+          const progress = typeof task.progress === 'string' 
+            ? JSON.parse(task.progress) 
+            : task.progress;
+          
+          const downloadUrl = progress?.download_url;
+          if (downloadUrl) {
+            console.log('[导出可编辑PPTX] 从任务响应中获取下载链接:', downloadUrl);
+            // 延迟一下，确保状态更新完成后再打开下载链接
+            setTimeout(() => {
+              window.open(downloadUrl, '_blank');
+            }, 500);
+          } else {
+            console.warn('[导出可编辑PPTX] 任务完成但没有下载链接');
+          }
+        }
+        
+        set({ 
+          activeTaskId: null, 
+          taskProgress: null, 
+          isGlobalLoading: false 
+        });
+        // 刷新项目数据
+        await get().syncProject();
+        return false;
+      } else if (task.status === 'FAILED') {
+        console.error(`[轮询] Task ${taskId} 失败:`, task.error_message || task.error);
+        set({ 
+          error: normalizeErrorMessage(task.error_message || task.error || '任务失败'),
+          activeTaskId: null,
+          taskProgress: null,
+          isGlobalLoading: false
+        });
+        return false;
+      } else if (task.status === 'CANCELLED') {
+        console.log(`[轮询] Task ${taskId} 已取消`);
+        set({ 
+          activeTaskId: null, 
+          taskProgress: null, 
+          isGlobalLoading: false 
+        });
+        // 取消前已生成的页面保留，刷新项目数据
+        await get().syncProject();
+        return false;
+      } else if (task.status === 'PENDING' || task.status === 'PROCESSING') {
+        return true;
+      }
+      // 未知状态，停止轮询
+      console.warn(`[轮询] Task ${taskId} 未知状态: ${task.status}，停止轮询`);
+      set({ 
+        error: `未知任务状态: ${task.status}`,
+        activeTaskId: null,
+        taskProgress: null,
+        isGlobalLoading: false
+      });
+      return false;
+    };
+
+    const handleError = (error: any) => {
+      console.error('任务轮询错误:', error);
+      set({ 
+        error: normalizeErrorMessage(error.message || '任务查询失败'),
+        activeTaskId: null,
+        isGlobalLoading: false
+      });
+    };
+
+    // 长轮询：带上已知版本号，服务端在有新进度时才返回
+    const poll = async (since?: number) => {
       try {
         console.log(`[轮询] 查询任务状态: ${taskId}`);
-        const response = await api.getTaskStatus(currentProject.id!, taskId);
+        const response = await api.getTaskStatus(
+          projectId, taskId, since !== undefined ? { wait: 30, since } : undefined
+        );
         const task = response.data;
         
         if (!task) {
@@ -378,75 +463,43 @@ const debouncedUpdatePage = debounce(
           return;
         }
 
-        // 更新进度
-        if (task.progress) {
-          set({ taskProgress: task.progress });
-        }
-
-        console.log(`[轮询] Task ${taskId} 状态: ${task.status}`, task);
-
-        // 检查任务状态
-        if (task.status === 'COMPLETED') {
-          console.log(`[轮询] Task ${taskId} 已完成，刷新项目数据`);
-          
-          // 如果是导出可编辑PPTX任务，检查是否有下载链接
-          if (task.task_type === 'EXPORT_EDITABLE_PPTX' && task.progress) {
-            const progress = typeof task.progress === 'string' 
-              ? JSON.parse(task.progress) 
-              : task.progress;
-            
-            const downloadUrl = progress?.download_url;
-            if (downloadUrl) {
-              console.log('[导出可编辑PPTX] 从任务响应中获取下载链接:', downloadUrl);
-              // 延迟一下，确保状态更新完成后再打开下载链接
-              setTimeout(() => {
-                window.open(downloadUrl, '_blank');
-              }, 500);
-            } else {
-              console.warn('[导出可编辑PPTX] 任务完成但没有下载链接');
-            }
+        if (await handleTask(task)) {
+          if (task.version !== undefined) {
+            poll(task.version);
+          } else {
+            // 服务端不支持长轮询时按固定间隔轮询
+            console.log(`[轮询] Task ${taskId} 处理中，2秒后继续轮询...`);
+            setTimeout(() => poll(), 2000);
           }
-          
-          set({ 
-            activeTaskId: null, 
-            taskProgress: null, 
-            isGlobalLoading: false 
-          });
-          // 刷新项目数据
-          await get().syncProject();
-        } else if (task.status === 'FAILED') {
-          console.error(`[轮询] Task ${taskId} 失败:`, task.error_message || task.error);
-          set({ 
-            error: normalizeErrorMessage(task.error_message || task.error || '任务失败'),
-            activeTaskId: null,
-            taskProgress: null,
-            isGlobalLoading: false
-          });
-        } else if (task.status === 'PENDING' || task.status === 'PROCESSING') {
-          // 继续轮询（PENDING 或 PROCESSING）
-          console.log(`[轮询] Task ${taskId} 处理中，2秒后继续轮询...`);
-          setTimeout(poll, 2000);
-        } else {
-          // 未知状态，停止轮询
-          console.warn(`[轮询] Task ${taskId} 未知状态: ${task.status}，停止轮询`);
-          set({ 
-            error: `未知任务状态: ${task.status}`,
-            activeTaskId: null,
-            taskProgress: null,
-            isGlobalLoading: false
-          });
         }
       } catch (error: any) {
-        console.error('任务轮询错误:', error);
-        set({ 
-          error: normalizeErrorMessage(error.message || '任务查询失败'),
-          activeTaskId: null,
-          isGlobalLoading: false
-        });
+        handleError(error);
       }
     };
 
-    await poll();
+    let finished = false;
+    const unsubscribe = api.subscribeTaskEvents(
+      projectId,
+      taskId,
+      (task) => {
+        if (finished) return;
+        if (task.status !== 'PENDING' && task.status !== 'PROCESSING') {
+          // 服务端推送最终状态后会关闭连接，先标记结束，避免触发回退轮询
+          finished = true;
+          unsubscribe?.();
+        }
+        handleTask(task).catch(handleError);
+      },
+      () => {
+        if (finished) return;
+        console.warn('[轮询] SSE 不可用，回退为长轮询');
+        poll();
+      }
+    );
+
+    if (!unsubscribe) {
+      await poll();
+    }
   },
 
   // 生成大纲（同步操作，不需要轮询）
@@ -78,7 +78,7 @@ export interface Project {
 }
 
 // 任务状态
-export type TaskStatus = 'PENDING' | 'RUNNING' | 'COMPLETED' | 'FAILED';
+export type TaskStatus = 'PENDING' | 'RUNNING' | 'COMPLETED' | 'FAILED' | 'CANCELLED';
 
 // 任务信息
 export interface Task {
@@ -97,6 +97,7 @@ export interface Task {
   error?: string; // 别名
   created_at?: string;
   completed_at?: string;
+  version?: number; // 进度版本号（长轮询的 since 参数）
 }
 
 // 创建项目请求